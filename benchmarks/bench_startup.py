@@ -0,0 +1,118 @@
+﻿'''
+Benchmark de arranque del CLI basado en `python -X importtime`.
+
+Mide cuánto tarda en importarse el entry point y qué módulos pesan más.
+`main` solo difiere el import del CLI, así que por defecto se miden los dos:
+`src.cli` es lo que realmente se carga al ejecutar un comando (rich, etc.).
+Verifica además que las dependencias pesadas no se carguen al arrancar.
+
+Uso:
+    python benchmarks/bench_startup.py                 # import main y src.cli
+    python benchmarks/bench_startup.py --module src.graph.workflow
+    python benchmarks/bench_startup.py --runs 10 --top 20
+'''
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencias que no deberían importarse solo por arrancar el CLI
+HEAVY_MODULES = ['langgraph', 'langchain_core', 'groq', 'httpx', 'pydantic']
+
+# Entry points medidos por defecto; en ellos las dependencias pesadas hacen fallar el benchmark
+ENTRY_MODULES = ['main', 'src.cli']
+
+
+def run_importtime(module: str) -> Tuple[float, Dict[str, int]]:
+    '''
+    Ejecuta `python -X importtime -c "import <module>"` en un proceso nuevo.
+
+    Returns:
+        Tuple de (tiempo total en ms, {módulo: tiempo acumulado en µs})
+    '''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, cumulative_us, name = line.split('|')
+            cumulative[name.strip()] = int(cumulative_us)
+        except ValueError:
+            continue
+
+    total_ms = cumulative.get(module, max(cumulative.values(), default=0)) / 1000
+    return total_ms, cumulative
+
+
+def top_modules(cumulative: Dict[str, int], n: int) -> List[Tuple[str, int]]:
+    '''Módulos de primer nivel ordenados por tiempo acumulado'''
+    top_level: Dict[str, int] = {}
+    for name, us in cumulative.items():
+        root = name.split('.')[0]
+        top_level[root] = max(top_level.get(root, 0), us)
+    return sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+def bench_module(module: str, runs: int, top: int) -> List[str]:
+    '''
+    Mide e imprime el arranque de un módulo.
+
+    Returns:
+        Dependencias pesadas que se cargaron al importarlo
+    '''
+    timings = []
+    cumulative: Dict[str, int] = {}
+    for _ in range(runs):
+        total_ms, cumulative = run_importtime(module)
+        timings.append(total_ms)
+
+    print(f'import {module}: {runs} corridas')
+    print(f'  mediana: {statistics.median(timings):8.1f} ms')
+    print(f'  mínimo:  {min(timings):8.1f} ms')
+    print(f'  máximo:  {max(timings):8.1f} ms')
+    print()
+    print(f'Top {top} paquetes por tiempo acumulado (última corrida):')
+    for name, us in top_modules(cumulative, top):
+        print(f'  {us / 1000:8.1f} ms  {name}')
+
+    loaded_heavy = [m for m in HEAVY_MODULES if m in cumulative]
+    print()
+    if loaded_heavy:
+        print(f'⚠️  Dependencias pesadas cargadas al importar {module}: {", ".join(loaded_heavy)}')
+    else:
+        print(f'✓ Ninguna dependencia pesada se carga al importar {module}')
+    return loaded_heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque (python -X importtime)')
+    parser.add_argument('--module', action='append',
+                        help=f'Módulo a importar, repetible (default: {" y ".join(ENTRY_MODULES)})')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    failed = False
+    for i, module in enumerate(args.module or ENTRY_MODULES):
+        if i:
+            print()
+        loaded_heavy = bench_module(module, args.runs, args.top)
+        failed = failed or (module in ENTRY_MODULES and bool(loaded_heavy))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,13 +11,13 @@ def cleanup_test_reports():
     """Limpia reportes generados por tests"""
     yield  # Corre el test primero
     
-    for report in glob.glob('reports/*test*.md'):
+    for report in glob.glob('reports/*test*.*'):
         try:
             os.remove(report)
         except:
             pass
     
-    for report in glob.glob('reports/*Test*.md'):
+    for report in glob.glob('reports/*Test*.*'):
         try:
             os.remove(report)
         except:
@@ -1,62 +1,38 @@
 ﻿"""
 Research Assistant - Multi-Agent System
 Entry point principal
+
+Uso:
+    python main.py [tema]          # usa el daemon si está corriendo, si no corre local
+    python main.py --survey [tema] # modo survey: muchos subtemas agrupados en clusters
+    python main.py --refresh <reporte.md>  # agrega/modifica subtemas de un reporte previo
+    python main.py --max-cost 0.05 --deadline 300 [tema]  # presupuesto: degrada en lugar de pasarse
+    python main.py --daemon        # inicia el daemon (mantiene todo cargado en memoria)
+    python main.py --stop-daemon   # detiene el daemon
 """
-from src.graph.workflow import ResearchWorkflow
-from src.core.config_validator import ConfigValidator
-from rich.console import Console
-from rich.panel import Panel
 import sys
 
-console = Console()
-
 def main():
-    console.print()
-    console.print(Panel(
-        "[bold]🔍 SMART CONTENT RESEARCH ASSISTANT 🔍[/bold]\n\n"
-        "Sistema multi-agente con validación humana\n"
-        "y optimización inteligente de costos",
-        border_style="cyan",
-        width=62,
-        padding=(1, 2)
-    ))
-    
-    # VALIDAR CONFIGURACIÓN PRIMERO
-    if not ConfigValidator.validate_all():
-        console.print()
-        console.print("[red]❌ El sistema no puede iniciar debido a errores de configuración.[/red]")
-        return
-    
-    # Obtener tema del usuario
-    if len(sys.argv) > 1:
-        topic = " ".join(sys.argv[1:])
-    else:
-        console.print()
-        console.print("[bold]¿Sobre qué tema querés investigar?[/bold]")
-        console.print()
-        topic = input("Tema: ").strip()
-    
-    if not topic:
-        console.print("[red]❌ Necesitás especificar un tema.[/red]")
-        return
-    
-    # Crear workflow y ejecutar
-    workflow = ResearchWorkflow()
-    
-    try:
-        final_state = workflow.run(topic)
-        
-        console.print()
-        console.print("[bold green]✓ ¡Investigación completada exitosamente![/bold green]")
-        
-    except KeyboardInterrupt:
-        console.print()
-        console.print()
-        console.print("[yellow]⚠️  Investigación cancelada por el usuario.[/yellow]")
-    except Exception as e:
-        console.print()
-        console.print(f"[red]❌ Error: {e}[/red]")
-        raise
+    argv = sys.argv[1:]
+
+    if argv[:1] == ['--daemon']:
+        from src.service.daemon import ResearchDaemon
+        ResearchDaemon().serve_forever()
+        return 0
+
+    if argv[:1] == ['--stop-daemon']:
+        from src.service.client import stop_daemon
+        return 0 if stop_daemon() else 1
+
+    # Cliente liviano: si hay un daemon corriendo, delegarle la ejecución
+    from src.service.client import run_via_daemon
+    exit_code = run_via_daemon(argv)
+    if exit_code is not None:
+        return exit_code
+
+    # Sin daemon: ejecución local completa
+    from src.cli import run_cli
+    return run_cli(argv)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
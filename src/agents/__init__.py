@@ -1,6 +1,11 @@
-﻿from .investigator import InvestigatorAgent
-from .curator import CuratorAgent
-from .reporter import ReporterAgent
-from .supervisor import SupervisorAgent
+﻿from ..core.lazy import lazy_exports
 
-__all__ = ['InvestigatorAgent', 'CuratorAgent', 'ReporterAgent', 'SupervisorAgent']
+_EXPORTS = {
+    'InvestigatorAgent': '.investigator',
+    'CuratorAgent': '.curator',
+    'ReporterAgent': '.reporter',
+    'SupervisorAgent': '.supervisor',
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
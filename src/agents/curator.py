@@ -1,8 +1,17 @@
-﻿from typing import List
+﻿import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
 from ..models.schemas import Finding, CuratedContent
 from ..models.enums import TaskComplexity
 from ..core.llm_client import LLMClient
+from ..core.budget import RunBudget
 from ..core.cost_optimizer import CostOptimizer
+from ..core.knowledge_cache import get_knowledge_cache
+from ..core.settings import get_setting
+from ..search.chunker import select_context
+from ..search.fetcher import FetchedDocument
+from ..utils.json_repair import JSONRepairError, parse_json
 from rich.console import Console
 
 console = Console()
@@ -16,45 +25,179 @@ class CuratorAgent:
     def __init__(self, llm_client: LLMClient, cost_optimizer: CostOptimizer):
         self.llm = llm_client
         self.cost_optimizer = cost_optimizer
+        self.context_tokens = get_setting('agents.curator.context_tokens', 750)
+        self.max_concurrency = get_setting('agents.curator.max_concurrency', 4)
+        # Análisis de corridas anteriores, por subtema normalizado
+        self.knowledge_cache = get_knowledge_cache()
+        self.cache_hits = 0
+        # Análisis empezados durante el streaming del investigator, por (tema, título, descripción)
+        self.speculative = get_setting('agents.curator.speculative', False)
+        self._speculation: Dict[Tuple[str, str, str], Future] = {}
+        self._speculation_pool: Optional[ThreadPoolExecutor] = None
     
-    def curate(self, findings: List[Finding], topic: str) -> List[CuratedContent]:
+    def curate(
+        self,
+        findings: List[Finding],
+        topic: str,
+        documents: Optional[List[FetchedDocument]] = None,
+        prior: Optional[Dict[int, CuratedContent]] = None,
+        budget: Optional[RunBudget] = None
+    ) -> List[CuratedContent]:
         """
         Analiza en profundidad los findings aprobados.
         
         Args:
             findings: Lista de findings aprobados por el usuario
             topic: Tema principal de investigación
+            documents: Texto descargado de las fuentes (opcional)
+            prior: Análisis ya hechos por ID de finding (ej: de un reporte previo casi igual)
+            budget: Presupuesto de la corrida; agotado el costo no se empiezan
+                análisis nuevos y al vencer el deadline se abandonan los que falten
         
         Returns:
-            Lista de contenido curado y analizado
+            Lista de contenido curado y analizado (sin los que no llegaron a terminar)
         """
         console.print(f"\n[bold magenta]🔬 Curator Agent:[/bold magenta] Analizando {len(findings)} subtemas...")
         
-        curated_items = []
+        # Primero la caché de conocimiento: solo se analizan los subtemas nuevos
+        prior = prior or {}
+        curated_items: List[Optional[CuratedContent]] = [
+            prior.get(f.id) or self._cached_analysis(f, topic) for f in findings
+        ]
+        pending = [i for i, item in enumerate(curated_items) if item is None]
+        reused = len(findings) - len(pending)
+        if reused:
+            self.cache_hits += reused
+            console.print(f"[dim]  ♻️  {reused} subtemas reutilizados de corridas anteriores[/dim]")
         
-        for finding in findings:
+        # Vencido el deadline los análisis abandonados no escalan ni empiezan
+        cancel = threading.Event()
+        
+        def analyze(finding: Finding) -> Optional[CuratedContent]:
+            if cancel.is_set() or (budget is not None and budget.exhausted(self.cost_optimizer.committed_cost)):
+                return None
             console.print(f"[dim]  Analizando: {finding.title}...[/dim]")
-            curated = self._deep_analysis(finding, topic)
-            curated_items.append(curated)
+            return self._deep_analysis(finding, topic, documents or [], cancel=cancel)
+        
+        # Los subtemas aprobados sin cambios pueden tener un análisis especulativo en curso
+        analyzed = self._collect_speculation(findings, topic, pending)
+        if analyzed:
+            console.print(f"[dim]  ⚡ {len(analyzed)} análisis especulativos aprovechados[/dim]")
+        
+        # Cada análisis es independiente: se corren en paralelo conservando el orden
+        to_analyze = [i for i in pending if i not in analyzed]
+        workers = max(1, min(self.max_concurrency, len(to_analyze)))
+        deadline = budget.remaining_time(budget.report_reserve_s) if budget is not None else None
+        if workers == 1 and deadline is None:
+            analyzed.update((i, analyze(findings[i])) for i in to_analyze)
+        elif to_analyze:
+            analyzed.update(self._analyze_until(analyze, findings, to_analyze, workers, deadline, cancel))
+        
+        for i, content in analyzed.items():
+            if content is None:
+                continue
+            curated_items[i] = content
+            if self.knowledge_cache is not None:
+                self.knowledge_cache.put(topic, findings[i].title, findings[i].description, content)
         
-        console.print(f"[green]✓[/green] Análisis profundo completado")
+        completed = sum(content is not None for content in analyzed.values())
+        console.print(f"[green]✓[/green] Análisis profundo completado ({completed} nuevos, {reused} reutilizados)")
+        if completed < len(analyzed):
+            console.print(f"[yellow]⏰ {len(analyzed) - completed} subtemas sin analizar (presupuesto agotado)[/yellow]")
         
-        return curated_items
+        return [item for item in curated_items if item is not None]
     
-    def _deep_analysis(self, finding: Finding, main_topic: str) -> CuratedContent:
-        """Realiza análisis profundo de un finding"""
+    def _analyze_until(
+        self,
+        analyze: Callable[[Finding], Optional[CuratedContent]],
+        findings: List[Finding],
+        indices: List[int],
+        workers: int,
+        timeout: Optional[float],
+        cancel: threading.Event
+    ) -> Dict[int, Optional[CuratedContent]]:
+        """
+        Análisis en paralelo; pasado timeout los que no terminaron quedan en None.
+        Los que siguen en vuelo se abandonan: cancel evita que escalen y su
+        llamada en curso queda reservada en el presupuesto hasta que termina.
+        """
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='curator')
+        futures = {pool.submit(analyze, findings[i]): i for i in indices}
+        done, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            cancel.set()
+        pool.shutdown(wait=not not_done, cancel_futures=True)
         
-        # Seleccionar modelo más potente para análisis complejo
-        model = self.cost_optimizer.select_model(
-            task_complexity=TaskComplexity.MODERATE,
-            estimated_tokens=1500
-        )
+        results: Dict[int, Optional[CuratedContent]] = {i: None for i in indices}
+        for future in done:
+            results[futures[future]] = future.result()
+        return results
+    
+    def speculate(self, finding: Finding, topic: str):
+        """
+        Empieza a analizar un subtema antes de la validación humana (mientras el
+        investigator sigue generando los demás). curate() usa el resultado si el
+        subtema se aprueba sin cambios; el resto se cancela si no empezó.
+        Sin extractos de fuentes: todavía no se descargaron.
+        """
+        key = (topic, finding.title, finding.description)
+        if key in self._speculation or self._cached_analysis(finding, topic) is not None:
+            return
+        if self._speculation_pool is None:
+            self._speculation_pool = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix='speculative'
+            )
+        console.print(f"[dim]  ⚡ Análisis especulativo: {finding.title}[/dim]")
+        self._speculation[key] = self._speculation_pool.submit(self._deep_analysis, finding, topic, [])
+    
+    def _collect_speculation(self, findings: List[Finding], topic: str, pending: List[int]) -> Dict[int, CuratedContent]:
+        """Resultados especulativos de los findings pendientes; cancela los que no se usan"""
+        collected: Dict[int, CuratedContent] = {}
+        for i in pending:
+            future = self._speculation.pop((topic, findings[i].title, findings[i].description), None)
+            if future is None:
+                continue
+            try:
+                collected[i] = future.result().model_copy(update={'topic': findings[i].title})
+            except Exception as e:
+                console.print(f"[yellow]⚠️  Falló el análisis especulativo de '{findings[i].title}': {e}[/yellow]")
+        
+        for future in self._speculation.values():
+            future.cancel()
+        self._speculation.clear()
+        return collected
+    
+    def _cached_analysis(self, finding: Finding, topic: str) -> Optional[CuratedContent]:
+        """Busca el análisis del subtema en la caché de conocimiento"""
+        if self.knowledge_cache is None:
+            return None
+        try:
+            cached = self.knowledge_cache.get(topic, finding.title, finding.description)
+        except Exception as e:
+            console.print(f"[yellow]⚠️  Caché de conocimiento no disponible: {e}[/yellow]")
+            self.knowledge_cache = None
+            return None
+        # El título mostrado es el del finding actual (puede diferir en mayúsculas o puntuación)
+        return cached.model_copy(update={'topic': finding.title}) if cached else None
+    
+    def _deep_analysis(
+        self,
+        finding: Finding,
+        main_topic: str,
+        documents: Optional[List[FetchedDocument]] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> CuratedContent:
+        """Realiza análisis profundo de un finding (con cancel puesto, sin escalar en la cascada)"""
+        
+        # Extractos de las fuentes descargadas más afines al subtema
+        excerpts, used_documents = self._source_excerpts(finding, documents or [])
+        excerpts_text = f"\n    Source excerpts (ground your analysis on them):\n{excerpts}\n" if excerpts else ""
         
         prompt = f"""You are an expert analyst researching: {main_topic}
 
     Specific subtopic: {finding.title}
     Description: {finding.description}
-
+{excerpts_text}
     Your task: Perform an in-depth, structured analysis of this subtopic.
 
     Provide:
@@ -62,37 +205,68 @@ class CuratorAgent:
     2. 3-5 most important key points
     3. Related sources or knowledge areas
 
-    Response format:
+    IMPORTANT: Respond ONLY with the following JSON format, without additional text:
 
-    ANALYSIS:
-    [Your detailed analysis here]
-
-    KEY POINTS:
-    - Point 1
-    - Point 2
-    - Point 3
-
-    SOURCES/AREAS:
-    - Source 1
-    - Source 2
+    {{
+    "analysis": "Your detailed analysis (paragraphs separated by \\n\\n)",
+    "key_points": ["Point 1", "Point 2", "Point 3"],
+    "sources": ["Source or knowledge area 1", "Source or knowledge area 2"]
+    }}
     """
 
         system_message = "You are an expert academic researcher with deep knowledge across multiple disciplines."
         
-        response = self.llm.generate(
-            prompt=prompt,
-            model=model,
-            temperature=0.6,
-            max_tokens=1500,
-            system_message=system_message
+        # Límites según la longitud real de análisis anteriores
+        prompt_tokens = self.llm.count_tokens_estimate(prompt)
+        estimated_tokens, max_tokens = self.cost_optimizer.plan_tokens(
+            'analysis', prompt_tokens, max_tokens=1500, estimated_tokens=1500
+        )
+        
+        # Seleccionar modelo más potente para análisis complejo (en cascada, el barato primero)
+        cascade = self.cost_optimizer.cascade
+        model = self.cost_optimizer.select_model(
+            task_complexity=TaskComplexity.MODERATE,
+            estimated_tokens=estimated_tokens,
+            force_model='cheap' if cascade else None
         )
         
-        # Log del uso
-        tokens_used = self.llm.count_tokens_estimate(prompt + response)
-        self.cost_optimizer.log_usage(model, tokens_used, f"Deep analysis: {finding.title}")
+        escalation = 0
+        while True:
+            # El presupuesto cuenta la llamada desde que sale, no cuando se registra
+            reserved = self.cost_optimizer.reserve(model, prompt_tokens + max_tokens)
+            try:
+                response = self.llm.generate(
+                    prompt=prompt,
+                    model=model,
+                    temperature=0.6,
+                    max_tokens=max_tokens,
+                    system_message=system_message,
+                    response_format={"type": "json_object"} if get_setting('llm.json_mode', True) else None,
+                    task='analysis',
+                    escalation=escalation
+                )
+                
+                # Log del uso (tokens reales informados por la API)
+                self.cost_optimizer.log_usage(model, self._tokens_used(prompt, response), f"Deep analysis: {finding.title}")
+            finally:
+                self.cost_optimizer.release(reserved)
+            
+            # Parsear respuesta
+            analysis, key_points, sources = self._parse_analysis_response(response)
+            
+            cancelled = cancel is not None and cancel.is_set()
+            problem = self._check_analysis(analysis, key_points) if cascade and not cancelled else None
+            next_model = self.cost_optimizer.next_tier(
+                model, escalation, max_tier=self.cost_optimizer.curator_max_tier
+            ) if problem else None
+            if next_model is None:
+                break
+            console.print(f"[dim]  ↗ {finding.title}: {problem}, reintentando con {next_model}[/dim]")
+            model, escalation = next_model, escalation + 1
         
-        # Parsear respuesta
-        analysis, key_points, sources = self._parse_analysis_response(response)
+        if cascade:
+            self.cost_optimizer.record_cascade(escalation)
+        sources += [doc.url for doc in used_documents if doc.url not in sources]
         
         return CuratedContent(
             topic=finding.title,
@@ -102,48 +276,107 @@ class CuratorAgent:
             word_count=len(analysis.split())
         )
     
-    def _parse_analysis_response(self, response: str) -> tuple[str, List[str], List[str]]:
-        """Parsea la respuesta estructurada del LLM"""
+    def _tokens_used(self, prompt: str, response: str) -> int:
+        """Tokens de la última llamada de este thread (estimados si el cliente no informa el uso)"""
+        usage = getattr(self.llm, 'last_usage', None)
+        if usage is not None:
+            return usage.prompt_tokens + usage.completion_tokens
+        return self.llm.count_tokens_estimate(prompt + response)
+    
+    @staticmethod
+    def _check_analysis(analysis: str, key_points: List[str]) -> Optional[str]:
+        """Chequeo local de la cascada: None si el análisis es aceptable, si no el motivo"""
+        min_key_points = get_setting('cost_optimization.cascade.min_key_points', 3)
+        min_words = get_setting('cost_optimization.cascade.min_analysis_words', 120)
+        if len(key_points) < min_key_points:
+            return f"{len(key_points)} puntos clave (mínimo {min_key_points})"
+        words = len(analysis.split())
+        if words < min_words:
+            return f"análisis de {words} palabras (mínimo {min_words})"
+        return None
+    
+    def _source_excerpts(self, finding: Finding, documents: List[FetchedDocument]) -> tuple[str, List[FetchedDocument]]:
+        """Arma los extractos con los pasajes más relevantes dentro del presupuesto de tokens"""
+        if not documents:
+            return "", []
+        
+        passages = select_context(
+            f"{finding.title} {finding.description}",
+            documents,
+            token_budget=self.context_tokens
+        )
         
+        # Agrupar por documento conservando el orden de relevancia
+        by_document: dict = {}
+        for passage in passages:
+            by_document.setdefault(passage.url, []).append(passage)
+        
+        documents_by_url = {doc.url: doc for doc in documents}
+        blocks = []
+        for url, doc_passages in by_document.items():
+            text = "\n    ...\n    ".join(p.text for p in doc_passages)
+            blocks.append(f"    [{doc_passages[0].title or url}] ({url})\n    {text}")
+        
+        return "\n\n".join(blocks), [documents_by_url[url] for url in by_document]
+    
+    def _parse_analysis_response(self, response: str) -> tuple[str, List[str], List[str]]:
+        """
+        Parsea la respuesta del LLM: JSON (tolerante a truncado) y, si el modelo
+        ignoró el formato, encabezados ANALYSIS / KEY POINTS / SOURCES (o en español).
+        """
         try:
-            # Extraer secciones
-            parts = response.split('ANÁLISIS:')
-            if len(parts) < 2:
-                return response, [], []
-            
-            rest = parts[1]
-            
-            # Extraer análisis
-            if 'PUNTOS CLAVE:' in rest:
-                analysis = rest.split('PUNTOS CLAVE:')[0].strip()
-                rest = rest.split('PUNTOS CLAVE:')[1]
-            else:
-                analysis = rest.strip()
-                return analysis, [], []
-            
-            # Extraer puntos clave
-            if 'FUENTES/ÁREAS:' in rest:
-                key_points_text = rest.split('FUENTES/ÁREAS:')[0].strip()
-                sources_text = rest.split('FUENTES/ÁREAS:')[1].strip()
-            else:
-                key_points_text = rest.strip()
-                sources_text = ""
-            
-            # Parsear listas
-            key_points = [
-                line.strip().lstrip('-•').strip() 
-                for line in key_points_text.split('\n') 
-                if line.strip() and (line.strip().startswith('-') or line.strip().startswith('•'))
-            ]
-            
-            sources = [
-                line.strip().lstrip('-•').strip() 
-                for line in sources_text.split('\n') 
-                if line.strip() and (line.strip().startswith('-') or line.strip().startswith('•'))
-            ]
-            
-            return analysis, key_points, sources
+            data, repaired = parse_json(response)
+            if isinstance(data, dict) and str(data.get('analysis') or '').strip():
+                self.cost_optimizer.record_parse(repaired=repaired)
+                return (
+                    str(data['analysis']).strip(),
+                    self._string_list(data.get('key_points')),
+                    self._string_list(data.get('sources'))
+                )
+        except JSONRepairError:
+            pass
         
-        except Exception as e:
-            console.print(f"[yellow]⚠️  Error parseando análisis: {e}[/yellow]")
-            return response, [], []
+        sections = self._split_headers(response)
+        if 'analysis' not in sections:
+            console.print(f"[yellow]⚠️  Respuesta sin formato reconocible, se usa como análisis[/yellow]")
+            self.cost_optimizer.record_parse(failed=True)
+            return response.strip(), [], []
+        
+        self.cost_optimizer.record_parse(repaired=True)
+        return (
+            sections['analysis'],
+            self._bullets(sections.get('key_points', '')),
+            self._bullets(sections.get('sources', ''))
+        )
+    
+    _HEADERS = {
+        'analysis': r'AN[AÁ]LISIS|ANALYSIS',
+        'key_points': r'KEY POINTS|PUNTOS CLAVE',
+        'sources': r'SOURCES(?:/AREAS)?|FUENTES(?:/[AÁ]REAS)?',
+    }
+    
+    def _split_headers(self, response: str) -> dict:
+        """Texto de cada sección por encabezado (en inglés o español)"""
+        pattern = '|'.join(f'(?P<{name}>{regex})' for name, regex in self._HEADERS.items())
+        matches = list(re.finditer(rf'^[\s#*]*(?:{pattern})[\s*]*:[\s*]*', response, re.IGNORECASE | re.MULTILINE))
+        sections = {}
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+            sections.setdefault(match.lastgroup, response[match.end():end].strip())
+        return sections
+    
+    @staticmethod
+    def _bullets(text: str) -> List[str]:
+        return [
+            line.strip().lstrip('-•*').strip()
+            for line in text.split('\n')
+            if line.strip().startswith(('-', '•', '*'))
+        ]
+    
+    @staticmethod
+    def _string_list(value) -> List[str]:
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            return []
+        return [str(item).strip() for item in value if str(item).strip()]
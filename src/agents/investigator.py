@@ -1,8 +1,15 @@
-﻿from typing import List, Dict
+﻿from typing import Any, Callable, List, Dict, Optional
 from ..models.schemas import Finding
 from ..models.enums import TaskComplexity
 from ..core.llm_client import LLMClient
 from ..core.cost_optimizer import CostOptimizer
+from ..core.settings import get_setting
+from ..search.base import SearchProvider, get_search_provider
+from ..search.fanout import FanOutSearchProvider, QueryExpander
+from ..search.rerank import SourceReranker
+from ..utils.dedupe import dedupe_findings, find_near_duplicate
+from ..utils.clustering import FindingCluster, cluster_findings
+from ..utils.json_repair import IncrementalJSONParser, JSONRepairError, parse_json
 from rich.console import Console
 
 
@@ -13,126 +20,108 @@ class InvestigatorAgent:
     Agente encargado de la investigación inicial.
     """
     
-    def __init__(self, llm_client: LLMClient, cost_optimizer: CostOptimizer):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        cost_optimizer: CostOptimizer,
+        search_provider: Optional[SearchProvider] = None
+    ):
         self.llm = llm_client
         self.cost_optimizer = cost_optimizer
+        self.search_provider = self._with_fanout(search_provider or get_search_provider())
+        self.max_results = get_setting('web_search.max_results', 10)
+        self.last_sources: List[Dict] = []
+        self.last_clusters: List[FindingCluster] = []
+        self.dedupe_threshold = get_setting('agents.investigator.dedupe_threshold', 0.45)
+        self.streaming = get_setting('agents.investigator.streaming', True)
+        self.top_k = get_setting('web_search.rerank.top_k', 5)
+        self.reranker = SourceReranker(
+            weights=get_setting('web_search.rerank.weights'),
+            half_life_days=get_setting('web_search.rerank.half_life_days', 180),
+            mmr_lambda=get_setting('web_search.rerank.mmr_lambda', 0.7)
+        )
     
-    def investigate(self, topic: str) -> List[Finding]:
-        console.print(f"\n[bold cyan]🔍 Investigator Agent:[/bold cyan] Investigando '{topic}'...")
-        
-        mock_sources = self._mock_web_search(topic)
-        findings = self._extract_subtopics(topic, mock_sources)
-        
-        console.print(f"[green]✓[/green] Encontrados {len(findings)} subtemas potenciales")
+    def _with_fanout(self, provider: SearchProvider) -> SearchProvider:
+        '''Envuelve el proveedor con sub-consultas en paralelo si está habilitado'''
+        if not get_setting('web_search.fanout.enabled', True) or isinstance(provider, FanOutSearchProvider):
+            return provider
         
-        return findings
+        use_llm = get_setting('web_search.fanout.use_llm', False)
+        expander = QueryExpander(
+            max_queries=get_setting('web_search.fanout.max_queries', 4),
+            llm_client=self.llm if use_llm else None,
+            cost_optimizer=self.cost_optimizer
+        )
+        return FanOutSearchProvider(provider, expander, rrf_k=get_setting('web_search.fanout.rrf_k', 60))
     
-    def _mock_web_search(self, topic: str) -> List[Dict[str, str]]:
+    def investigate(
+        self,
+        topic: str,
+        survey: bool = False,
+        on_finding: Optional[Callable[[Finding], None]] = None
+    ) -> List[Finding]:
         """
-        Simula una búsqueda web con resultados realistas y variados.
-        En producción esto sería reemplazado por Tavily API o similar.
+        Busca fuentes y extrae subtemas candidatos.
+        
+        Args:
+            topic: Tema principal
+            survey: Modo survey: decenas de candidatos agrupados en clusters
+                (quedan en self.last_clusters)
+            on_finding: Con streaming, se llama con cada subtema apenas llega
+                (antes de la deduplicación final; los casi duplicados se omiten)
         """
-        import random
-        from datetime import datetime, timedelta
-        
-        # Fuentes variadas
-        sources = [
-            "arXiv", "Nature", "Science", "IEEE", "ACM",
-            "TechCrunch", "Wired", "MIT Technology Review",
-            "Forbes", "Harvard Business Review", "McKinsey",
-            "GitHub", "Stack Overflow", "Medium"
-        ]
+        console.print(f"\n[bold cyan]🔍 Investigator Agent:[/bold cyan] Investigando '{topic}'...")
         
-        # Templates de títulos variados
-        title_templates = [
-            f"Recent advances in {topic}: A 2024 comprehensive review",
-            f"How {topic} is transforming industries",
-            f"The future of {topic}: Expert predictions",
-            f"Practical applications of {topic} in real-world scenarios",
-            f"Challenges and limitations of {topic}",
-            f"A beginner's guide to {topic}",
-            f"Case study: Successful implementation of {topic}",
-            f"{topic}: Current state and future directions",
-            f"Ethical considerations in {topic}",
-            f"Comparative analysis of {topic} approaches"
-        ]
+        sources = self.search_provider.search(topic, self.max_results)
+        self.last_sources = sources
+        console.print(f"[dim]  {len(sources)} fuentes encontradas ({self.search_provider.name})[/dim]")
+        findings = self._extract_subtopics(topic, sources, survey, on_finding)
         
-        # Snippet templates
-        snippet_templates = [
-            f"This comprehensive study examines the latest developments in {topic}, "
-            f"highlighting key breakthroughs and their implications for the field...",
-            
-            f"Major companies are implementing {topic} to transform their operations. "
-            f"This article explores successful use cases and lessons learned...",
-            
-            f"Experts predict that {topic} will significantly impact various sectors. "
-            f"We analyze current trends and future possibilities...",
-            
-            f"Understanding {topic} requires examining both theoretical foundations "
-            f"and practical applications. This guide provides a comprehensive overview...",
-            
-            f"While {topic} offers numerous benefits, it also presents challenges. "
-            f"This analysis explores limitations and potential solutions...",
-            
-            f"From fundamentals to advanced concepts, this resource covers everything "
-            f"you need to know about {topic}...",
-            
-            f"Real-world implementation of {topic} reveals important insights. "
-            f"This case study documents the journey and outcomes...",
-            
-            f"The landscape of {topic} is rapidly evolving. This report provides "
-            f"an up-to-date assessment of current capabilities and future directions...",
-            
-            f"As {topic} becomes more prevalent, ethical considerations become crucial. "
-            f"This paper examines key concerns and proposes frameworks...",
-            
-            f"Different approaches to {topic} offer various trade-offs. "
-            f"This comparative study evaluates strengths and weaknesses..."
-        ]
+        # Con muchos candidatos se valida por clusters en lugar de uno por uno
+        self.last_clusters = []
+        if len(findings) > get_setting('agents.investigator.survey.cluster_threshold', 20):
+            findings, self.last_clusters = cluster_findings(findings)
+            console.print(f"[dim]  Agrupados en {len(self.last_clusters)} clusters[/dim]")
         
-        # Generar 8-10 resultados variados
-        results = []
-        num_results = random.randint(8, 10)
+        console.print(f"[green]✓[/green] Encontrados {len(findings)} subtemas potenciales")
         
-        for i in range(num_results):
-            # Fecha aleatoria en los últimos 6 meses
-            days_ago = random.randint(1, 180)
-            date = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
-            
-            result = {
-                "title": random.choice(title_templates),
-                "url": f"https://example.com/article/{i+1}",
-                "snippet": random.choice(snippet_templates),
-                "source": random.choice(sources),
-                "date": date,
-                "relevance": round(random.uniform(0.7, 0.95), 2)
-            }
-            results.append(result)
-        
-        # Ordenar por relevancia
-        results.sort(key=lambda x: x['relevance'], reverse=True)
-        
-        return results
+        return findings
     
-    def _extract_subtopics(self, topic: str, sources: List[Dict[str, str]]) -> List[Finding]:
+    def _extract_subtopics(
+        self,
+        topic: str,
+        sources: List[Dict[str, str]],
+        survey: bool = False,
+        on_finding: Optional[Callable[[Finding], None]] = None
+    ) -> List[Finding]:
         """Extrae subtemas usando LLM (modelo barato)"""
         
-        # Seleccionar modelo (tarea simple = modelo barato)
-        model = self.cost_optimizer.select_model(
-            task_complexity=TaskComplexity.SIMPLE,
-            estimated_tokens=800
-        )
+        if survey:
+            min_subtopics = get_setting('agents.investigator.survey.min_subtopics', 50)
+            max_subtopics = get_setting('agents.investigator.survey.max_subtopics', 120)
+            max_tokens = get_setting('agents.investigator.survey.max_tokens', 8000)
+            top_k = get_setting('agents.investigator.survey.top_sources', 15)
+            accepted = (min_subtopics, max_subtopics)
+        else:
+            min_subtopics, max_subtopics, max_tokens, top_k = 4, 6, 2000, self.top_k
+            accepted = (
+                get_setting('agents.investigator.min_subtopics', min_subtopics),
+                get_setting('agents.investigator.max_subtopics', max_subtopics)
+            )
+        
+        # Top-k por reranking (similitud, recencia, autoridad y diversidad MMR)
+        top_sources = self.reranker.rerank(topic, sources, top_k=top_k)
         
         # Formatear sources de manera más rica
         formatted_sources = []
-        for src in sources[:5]:  # Top 5 más relevantes
+        for src in top_sources:
             formatted_sources.append(
                 f"• [{src['source']}] {src['title']}\n"
                 f"  Date: {src['date']} | Relevance: {src['relevance']}\n"
                 f"  {src['snippet'][:150]}..."
             )
         
-        sources_text = "\n\n".join(formatted_sources)
+        sources_text = "\n\n".join(formatted_sources) or "(No sources found: rely on your own knowledge of the topic)"
         
         prompt = f"""You are an expert research assistant.
 
@@ -141,7 +130,7 @@ class InvestigatorAgent:
     Sources found on the web:
     {sources_text}
 
-    Your task: Identify between 4 and 6 specific and relevant subtopics that should be investigated in depth.
+    Your task: Identify between {min_subtopics} and {max_subtopics} specific and relevant subtopics that should be investigated in depth.
 
     IMPORTANT: Respond ONLY with the following JSON format, without additional text:
 
@@ -161,54 +150,158 @@ class InvestigatorAgent:
 
         system_message = "You are an expert academic researcher who identifies key subtopics for research."
         
-        response = self.llm.generate(
+        # Límites según la longitud real de listas de subtemas anteriores
+        task = 'subtopics_survey' if survey else 'subtopics'
+        estimated_tokens, max_tokens = self.cost_optimizer.plan_tokens(
+            task, self.llm.count_tokens_estimate(prompt), max_tokens, estimated_tokens=800
+        )
+        
+        # Seleccionar modelo (tarea simple = modelo barato)
+        model = self.cost_optimizer.select_model(
+            task_complexity=TaskComplexity.SIMPLE,
+            estimated_tokens=estimated_tokens
+        )
+        
+        # Cascada: si la lista no pasa el chequeo local se repite en el tier siguiente
+        escalation = 0
+        while True:
+            if self.streaming:
+                response = self._stream_subtopics(prompt, model, max_tokens, system_message, task, escalation, on_finding)
+            else:
+                response = self.llm.generate(
+                    prompt=prompt,
+                    model=model,
+                    temperature=0.3,
+                    max_tokens=max_tokens,
+                    system_message=system_message,
+                    response_format={"type": "json_object"} if get_setting('llm.json_mode', True) else None,
+                    task=task,
+                    escalation=escalation
+                )
+            
+            # Log del uso
+            tokens_used = self.llm.count_tokens_estimate(prompt + response)
+            self.cost_optimizer.log_usage(model, tokens_used, "Extracción de subtemas")
+            
+            # Parsear respuesta JSON
+            findings = self._parse_llm_response(response, topic)
+            
+            problem = self._check_subtopics(findings, *accepted) if self.cost_optimizer.cascade else None
+            next_model = self.cost_optimizer.next_tier(model, escalation) if problem else None
+            if next_model is None:
+                break
+            console.print(f"[yellow]↗ {problem}: reintentando con {next_model}[/yellow]")
+            model, escalation = next_model, escalation + 1
+        
+        if self.cost_optimizer.cascade:
+            self.cost_optimizer.record_cascade(escalation)
+        
+        # Cada duplicado aprobado costaría una llamada completa al curator
+        findings, merged = dedupe_findings(findings, self.dedupe_threshold)
+        for kept, dropped in merged:
+            console.print(f"[dim]  ↳ '{dropped.title}' fusionado con '{kept.title}' (casi duplicado)[/dim]")
+        
+        return findings
+    
+    def _stream_subtopics(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        system_message: str,
+        task: str,
+        escalation: int = 0,
+        on_finding: Optional[Callable[[Finding], None]] = None
+    ) -> str:
+        """
+        Pide los subtemas en streaming y muestra cada uno apenas se cierra su
+        objeto JSON. Sin JSON mode (Groq no lo admite con streaming): la
+        respuesta completa se parsea igual con _parse_llm_response.
+        """
+        parser = IncrementalJSONParser()
+        streamed: List[Finding] = []
+        
+        def on_chunk(chunk: str):
+            for item in parser.feed(chunk):
+                finding = self._finding_from_item(item, len(streamed) + 1)
+                if finding is None:
+                    continue
+                duplicate = find_near_duplicate(finding, streamed, self.dedupe_threshold)
+                streamed.append(finding)
+                if duplicate is not None:
+                    console.print(f"[dim]  • {finding.title} (casi duplicado de '{duplicate.title}')[/dim]")
+                    continue
+                console.print(f"[dim]  • {finding.title} ({finding.relevance_score:.2f})[/dim]")
+                if on_finding is not None:
+                    on_finding(finding)
+        
+        return self.llm.generate(
             prompt=prompt,
             model=model,
             temperature=0.3,
-            system_message=system_message
+            max_tokens=max_tokens,
+            system_message=system_message,
+            stream=True,
+            on_chunk=on_chunk,
+            task=task,
+            escalation=escalation
         )
+    
+    @staticmethod
+    def _check_subtopics(findings: List[Finding], min_count: int, max_count: int) -> Optional[str]:
+        """Chequeo local de la cascada: None si la lista es aceptable, si no el motivo"""
+        if findings and findings[0].source == "Fallback":
+            return "La respuesta no tiene JSON válido"
+        if not min_count <= len(findings) <= max_count:
+            return f"{len(findings)} subtemas (se esperaban entre {min_count} y {max_count})"
+        return None
+    
+    def _parse_llm_response(self, response: str, topic: str) -> List[Finding]:
+        """Parsea el JSON de subtemas (tolerante a fences, comas colgantes y truncado)"""
+        try:
+            data, repaired = parse_json(response)
+        except JSONRepairError as e:
+            console.print(f"[yellow]⚠️  Error parseando JSON: {e}[/yellow]")
+            console.print(f"[dim]Respuesta: {response[:200]}...[/dim]")
+            self.cost_optimizer.record_parse(failed=True)
+            return self._create_fallback_findings(topic)
         
-        # Log del uso
-        tokens_used = self.llm.count_tokens_estimate(prompt + response)
-        self.cost_optimizer.log_usage(model, tokens_used, "Extracción de subtemas")
+        items = data.get('subtopics', []) if isinstance(data, dict) else data if isinstance(data, list) else []
+        findings = [
+            finding for position, item in enumerate(items, start=1)
+            if (finding := self._finding_from_item(item, position)) is not None
+        ]
         
-        # Parsear respuesta JSON
-        findings = self._parse_llm_response(response, topic)
+        if not findings:
+            console.print(f"[yellow]⚠️  El JSON no tiene subtemas válidos[/yellow]")
+            self.cost_optimizer.record_parse(failed=True)
+            return self._create_fallback_findings(topic)
         
+        # Items descartados también cuentan como reparación
+        self.cost_optimizer.record_parse(repaired=repaired or len(findings) < len(items))
         return findings
     
-    def _parse_llm_response(self, response: str, topic: str) -> List[Finding]:
-        import json
+    def _finding_from_item(self, item: Any, position: int) -> Optional[Finding]:
+        """Convierte un subtema del JSON en Finding; None si no tiene título"""
+        if not isinstance(item, dict) or not str(item.get('title') or '').strip():
+            return None
         
         try:
-            clean_response = response.strip()
-            if clean_response.startswith('`'):
-                clean_response = clean_response.split('`')[1]
-                if clean_response.startswith('json'):
-                    clean_response = clean_response[4:]
-            if clean_response.endswith('`'):
-                clean_response = clean_response.rsplit('`', 1)[0]
-            clean_response = clean_response.strip()
-            
-            data = json.loads(clean_response)
-            
-            findings = []
-            for item in data.get('subtopics', []):
-                finding = Finding(
-                    id=item['id'],
-                    title=item['title'],
-                    description=item['description'],
-                    relevance_score=item.get('relevance', 0.5),
-                    source="LLM Analysis"
-                )
-                findings.append(finding)
-            
-            return findings
+            relevance = float(item.get('relevance', 0.5))
+        except (TypeError, ValueError):
+            relevance = 0.5
+        try:
+            id = int(item.get('id', position))
+        except (TypeError, ValueError):
+            id = position
         
-        except Exception as e:
-            console.print(f"[yellow]⚠️  Error parseando JSON: {e}[/yellow]")
-            console.print(f"[dim]Respuesta: {response[:200]}...[/dim]")
-            return self._create_fallback_findings(topic)
+        return Finding(
+            id=id,
+            title=str(item['title']).strip(),
+            description=str(item.get('description') or '').strip(),
+            relevance_score=min(max(relevance, 0.0), 1.0),
+            source="LLM Analysis"
+        )
     
     def _create_fallback_findings(self, topic: str) -> List[Finding]:
         console.print("[yellow]⚠️  Usando findings de fallback[/yellow]")
@@ -1,14 +1,24 @@
-﻿from typing import List
-from ..models.schemas import CuratedContent
+﻿from typing import List, Optional, Tuple
+from ..models.schemas import CuratedContent, Finding
 from ..models.enums import TaskComplexity
 from ..core.llm_client import LLMClient
 from ..core.cost_optimizer import CostOptimizer
+from ..core.report_index import ReportIndex
+from ..core.settings import get_setting
+from ..utils.compression import CompressionStats, compress_curated
+from ..utils.markdown_sections import Section, extract_section, find_section, parse_sections, render_sections
+from ..utils.report_validator import (
+    CLOSING_TITLES, CONCLUSIONS_TITLES, INTRODUCTION_TITLES, validate_report
+)
 from rich.console import Console
 from datetime import datetime
 import os
 
 console = Console()
 
+# Marca de fin del reporte: se usa como stop sequence
+END_OF_REPORT = '<<END_OF_REPORT>>'
+
 class ReporterAgent:
     """
     Agente que genera el reporte final en formato Markdown.
@@ -18,12 +28,14 @@ class ReporterAgent:
     def __init__(self, llm_client: LLMClient, cost_optimizer: CostOptimizer):
         self.llm = llm_client
         self.cost_optimizer = cost_optimizer
+        self.last_compression: Optional[CompressionStats] = None
     
     def generate_report(
         self, 
         topic: str, 
         curated_content: List[CuratedContent],
-        output_dir: str = "./reports"
+        output_dir: str = "./reports",
+        findings: Optional[List[Finding]] = None
     ) -> tuple[str, str]:
         """
         Genera el reporte final en Markdown.
@@ -32,6 +44,7 @@ class ReporterAgent:
             topic: Tema principal de investigación
             curated_content: Contenido curado por el Curator
             output_dir: Directorio donde guardar el reporte
+            findings: Findings aprobados (se guardan en el sidecar del índice)
         
         Returns:
             Tuple de (reporte_texto, ruta_archivo)
@@ -44,8 +57,8 @@ class ReporterAgent:
             force_model="expensive"
         )
         
-        # Construir contexto para el LLM
-        context = self._build_context(curated_content)
+        # Construir contexto para el LLM (comprimido localmente al presupuesto)
+        context = self._build_context(self._compress(curated_content))
         
         prompt = f"""You are a professional technical writer.
 
@@ -84,6 +97,7 @@ IMPORTANT:
 - Minimum 500 words
 - Well structured with headers
 - No placeholder text
+- End with the line {END_OF_REPORT} right after the references
 """
 
         system_message = "You are a senior technical writer specialized in academic and research reports."
@@ -94,14 +108,23 @@ IMPORTANT:
         console.print('─' * 60)
         console.print()
 
+        # Límite según la longitud real de reportes anteriores
+        _, max_tokens = self.cost_optimizer.plan_tokens(
+            'report', self.llm.count_tokens_estimate(prompt), max_tokens=3000, estimated_tokens=3000
+        )
+        
         report = self.llm.generate(
             prompt=prompt,
             model=model,
             temperature=0.4,
-            max_tokens=3000,
+            max_tokens=max_tokens,
             system_message=system_message,
-            stream=False  # Activar Streaming
+            stream=False,  # Activar Streaming
+            # Corta lo que el modelo agregue después de las referencias
+            stop=[END_OF_REPORT],
+            task='report'
         )
+        report = report.split(END_OF_REPORT)[0].rstrip()
 
         console.print()
         console.print('─' * 60)
@@ -111,13 +134,313 @@ IMPORTANT:
         tokens_used = self.llm.count_tokens_estimate(prompt + report)
         self.cost_optimizer.log_usage(model, tokens_used, "Generación de reporte final")
         
+        # Completar secciones faltantes o cortas sin regenerar todo el reporte
+        report = self._repair_report(topic, report, curated_content)
+        
         # Guardar archivo
         file_path = self._save_report(report, topic, output_dir)
+        self._index_report(topic, file_path, curated_content, findings, output_dir)
         
         console.print(f"[green]✓[/green] Reporte generado: {file_path}")
         
         return report, file_path
     
+    def generate_anytime_report(
+        self,
+        topic: str,
+        curated_content: List[CuratedContent],
+        output_dir: str = "./reports",
+        findings: Optional[List[Finding]] = None
+    ) -> tuple[str, str]:
+        """
+        Arma el reporte localmente (sin LLM) con lo que ya se curó. Se usa
+        cuando el presupuesto o el deadline no alcanzan para la redacción.
+        
+        Args:
+            topic: Tema principal de investigación
+            curated_content: Contenido curado hasta el momento
+            output_dir: Directorio donde guardar el reporte
+            findings: Findings aprobados; los que no llegaron a curarse se listan como pendientes
+        
+        Returns:
+            Tuple de (reporte_texto, ruta_archivo)
+        """
+        console.print(f"\n[bold green]📝 Reporter Agent:[/bold green] Armando reporte parcial sin LLM...")
+        
+        curated_topics = {content.topic for content in curated_content}
+        pending = [f for f in findings or [] if f.title not in curated_topics]
+        
+        parts = [
+            f"# {topic}: Partial Analysis\n",
+            f"> Partial report assembled without the LLM because the run budget ran out: "
+            f"{len(curated_content)} analyzed subtopics"
+            + (f", {len(pending)} pending." if pending else ".") + "\n",
+            "## Introduction\n",
+            f"This report covers {len(curated_content)} subtopics of {topic}: "
+            + ", ".join(content.topic for content in curated_content) + ".\n"
+            if curated_content else f"No subtopic of {topic} could be analyzed within the budget.\n",
+        ]
+        for content in curated_content:
+            parts.append(f"## {content.topic}\n")
+            parts.append(f"{content.analysis.strip()}\n")
+            if content.key_points:
+                parts.append("**Key Points:**\n" + "\n".join(f"- {point}" for point in content.key_points) + "\n")
+        if pending:
+            parts.append("## Pending Subtopics\n")
+            parts.append("\n".join(f"- {f.title}: {f.description}" for f in pending) + "\n")
+        
+        # Conclusiones: el primer punto clave de cada subtema
+        parts.append("## Conclusions\n")
+        highlights = [content.key_points[0] for content in curated_content if content.key_points]
+        parts.append("\n".join(f"- {point}" for point in highlights) + "\n" if highlights else "Pending.\n")
+        
+        sources = list(dict.fromkeys(source for content in curated_content for source in content.sources))
+        parts.append("## References\n")
+        parts.append("\n".join(f"- {source}" for source in sources) + "\n" if sources else "- N/A\n")
+        
+        report = "\n".join(parts)
+        self.last_compression = None
+        
+        file_path = self._save_report(report, topic, output_dir)
+        self._index_report(topic, file_path, curated_content, findings, output_dir)
+        
+        console.print(f"[green]✓[/green] Reporte parcial generado: {file_path}")
+        
+        return report, file_path
+    
+    def refresh_report(
+        self,
+        topic: str,
+        report_path: str,
+        curated_content: List[CuratedContent],
+        updated: List[Tuple[Optional[str], CuratedContent]],
+        removed_titles: List[str],
+        findings: Optional[List[Finding]] = None
+    ) -> tuple[str, str]:
+        """
+        Parchea un reporte existente: regenera solo las secciones de subtemas
+        nuevos o modificados, borra las de subtemas quitados y re-sintetiza
+        la introducción y las conclusiones.
+        
+        Args:
+            topic: Tema principal de investigación
+            report_path: Reporte a parchear (se sobrescribe)
+            curated_content: Contenido curado completo, en el orden final
+            updated: (título anterior o None si es nuevo, contenido nuevo)
+            removed_titles: Títulos de subtemas que ya no van en el reporte
+            findings: Findings aprobados (se guardan en el sidecar del índice)
+        
+        Returns:
+            Tuple de (reporte_texto, ruta_archivo)
+        """
+        console.print(f"\n[bold green]📝 Reporter Agent:[/bold green] Actualizando {len(updated)} secciones...")
+        
+        with open(report_path, encoding='utf-8') as f:
+            preamble, sections = parse_sections(f.read())
+        
+        for title in removed_titles:
+            index = find_section(sections, title)
+            if index is not None:
+                console.print(f"[dim]  Quitando: {sections[index].title}[/dim]")
+                del sections[index]
+        
+        for old_title, content in updated:
+            console.print(f"[dim]  Redactando: {content.topic}...[/dim]")
+            section = self._generate_section(topic, content)
+            # Un subtema modificado cambia también el encabezado
+            self._place_section(sections, section, *([old_title] if old_title else []), keep_title=False)
+        
+        introduction, conclusions = self._synthesize_frame(topic, curated_content)
+        if introduction is not None:
+            self._place_section(sections, introduction, *INTRODUCTION_TITLES, insert_at=0)
+        if conclusions is not None:
+            self._place_section(sections, conclusions, *CONCLUSIONS_TITLES)
+        
+        report = render_sections(preamble, sections)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(report)
+        self._index_report(topic, report_path, curated_content, findings, os.path.dirname(report_path) or '.')
+        
+        console.print(f"[green]✓[/green] Reporte actualizado: {report_path}")
+        
+        return report, report_path
+    
+    def _repair_report(self, topic: str, report: str, curated_content: List[CuratedContent]) -> str:
+        """Valida la estructura del reporte y regenera solo las secciones con problemas"""
+        if not get_setting('agents.reporter.validation.enabled', True):
+            return report
+        
+        issues = validate_report(
+            report,
+            [content.topic for content in curated_content],
+            min_words=get_setting('agents.reporter.min_words', 500),
+            min_section_words=get_setting('agents.reporter.validation.min_section_words', 60)
+        )
+        if not issues:
+            return report
+        
+        console.print(f"[yellow]⚠️  Reporte incompleto: {'; '.join(issue.describe() for issue in issues)}[/yellow]")
+        console.print(f"[dim]  Regenerando {len(issues)} secciones...[/dim]")
+        
+        preamble, sections = parse_sections(report)
+        if not preamble.strip():
+            preamble = f"# {topic}: Comprehensive Analysis\n"
+        
+        # Introducción y conclusiones salen de una sola llamada
+        frame_roles = {issue.role for issue in issues if issue.role != 'subtopic'}
+        if frame_roles:
+            introduction, conclusions = self._synthesize_frame(topic, curated_content)
+            if introduction is not None and 'introduction' in frame_roles:
+                self._place_section(sections, introduction, *INTRODUCTION_TITLES, insert_at=0)
+            if conclusions is not None and 'conclusions' in frame_roles:
+                self._place_section(sections, conclusions, *CONCLUSIONS_TITLES)
+        
+        by_topic = {content.topic: content for content in curated_content}
+        for issue in issues:
+            if issue.role == 'subtopic' and issue.subtopic in by_topic:
+                section = self._generate_section(topic, by_topic[issue.subtopic])
+                self._place_section(sections, section, issue.section, issue.subtopic)
+        
+        return render_sections(preamble, sections)
+    
+    def _place_section(
+        self,
+        sections: List[Section],
+        section: Section,
+        *titles: str,
+        insert_at: Optional[int] = None,
+        keep_title: bool = True
+    ):
+        """
+        Reemplaza la sección que coincide con alguno de los títulos (por defecto
+        conservando su encabezado) o, si no existe, la inserta en insert_at o
+        antes de las conclusiones/referencias.
+        """
+        index = find_section(sections, *titles) if titles else None
+        if index is not None:
+            title = sections[index].title if keep_title else section.title
+            sections[index] = Section(title, section.body, sections[index].level)
+            return
+        if insert_at is None:
+            closing = find_section(sections, *CLOSING_TITLES)
+            insert_at = closing if closing is not None else len(sections)
+        sections.insert(insert_at, section)
+    
+    def _generate_section(self, topic: str, content: CuratedContent) -> Section:
+        """Redacta la sección de un único subtema"""
+        model = self.cost_optimizer.select_model(
+            task_complexity=TaskComplexity.CRITICAL,
+            force_model="expensive"
+        )
+        
+        prompt = f"""You are a professional technical writer updating a research report on: {topic}
+
+Write ONLY the section for this subtopic:
+{self._build_context([content])}
+
+REQUIRED STRUCTURE:
+
+## {content.topic}
+[Detailed analysis, 1-3 paragraphs]
+
+**Key Points:**
+- [Point 1]
+- [Point 2]
+
+IMPORTANT:
+- Use professional Markdown
+- Do not add an introduction, conclusions or references
+"""
+        
+        _, max_tokens = self.cost_optimizer.plan_tokens(
+            'report_section', self.llm.count_tokens_estimate(prompt), max_tokens=900, estimated_tokens=900
+        )
+        
+        section_text = self.llm.generate(
+            prompt=prompt,
+            model=model,
+            temperature=0.4,
+            max_tokens=max_tokens,
+            system_message="You are a senior technical writer specialized in academic and research reports.",
+            task='report_section'
+        )
+        
+        tokens_used = self.llm.count_tokens_estimate(prompt + section_text)
+        self.cost_optimizer.log_usage(model, tokens_used, f"Sección de reporte: {content.topic}")
+        
+        section = extract_section(section_text, content.topic)
+        if section is None:
+            # Sin encabezado reconocible: se usa la respuesta completa como cuerpo
+            section = Section(content.topic, section_text.strip() + '\n')
+        if not section.body.endswith('\n\n'):
+            section.body = section.body.rstrip('\n') + '\n\n'
+        return section
+    
+    def _synthesize_frame(self, topic: str, curated_content: List[CuratedContent]) -> tuple[Optional[Section], Optional[Section]]:
+        """Re-escribe introducción y conclusiones a partir de los puntos clave de todas las secciones"""
+        model = self.cost_optimizer.select_model(
+            task_complexity=TaskComplexity.CRITICAL,
+            force_model="expensive"
+        )
+        
+        outline = "\n".join(
+            f"- {content.topic}: " + "; ".join(content.key_points[:3])
+            for content in curated_content
+        )
+        
+        prompt = f"""You are a professional technical writer. A research report on "{topic}" covers these subtopics (with their key points):
+
+{outline}
+
+Write ONLY its introduction and conclusions, with exactly this structure:
+
+## Introduction
+[Introductory paragraph contextualizing the topic and the subtopics covered]
+
+## Conclusions
+[Synthesis of main findings and future perspectives]
+"""
+        
+        _, max_tokens = self.cost_optimizer.plan_tokens(
+            'report_frame', self.llm.count_tokens_estimate(prompt), max_tokens=800, estimated_tokens=800
+        )
+        
+        response = self.llm.generate(
+            prompt=prompt,
+            model=model,
+            temperature=0.4,
+            max_tokens=max_tokens,
+            system_message="You are a senior technical writer specialized in academic and research reports.",
+            task='report_frame'
+        )
+        
+        tokens_used = self.llm.count_tokens_estimate(prompt + response)
+        self.cost_optimizer.log_usage(model, tokens_used, "Introducción y conclusiones")
+        
+        introduction = extract_section(response, 'Introduction', 'Introducción')
+        conclusions = extract_section(response, 'Conclusions', 'Conclusiones')
+        for section in (introduction, conclusions):
+            if section is not None and not section.body.endswith('\n\n'):
+                section.body = section.body.rstrip('\n') + '\n\n'
+        return introduction, conclusions
+    
+    def _compress(self, curated_content: List[CuratedContent]) -> List[CuratedContent]:
+        """Dedup de puntos clave/fuentes y TextRank hasta agents.reporter.context_token_budget"""
+        budget = get_setting('agents.reporter.context_token_budget', 2000)
+        if not budget:
+            self.last_compression = None
+            return curated_content
+        
+        compressed, stats = compress_curated(curated_content, budget, estimate=self.llm.count_tokens_estimate)
+        self.last_compression = stats
+        if stats.compressed_tokens < stats.original_tokens:
+            console.print(
+                f"[dim]🗜️  Contexto: {stats.original_tokens} → {stats.compressed_tokens} tokens "
+                f"({stats.ratio:.0%}) · sin {stats.key_points_removed} puntos clave, "
+                f"{stats.sources_removed} fuentes y {stats.sentences_removed} oraciones repetidas o secundarias[/dim]"
+            )
+        return compressed
+    
     def _build_context(self, curated_content: List[CuratedContent]) -> str:
         """Construye el contexto para el LLM"""
         
@@ -140,6 +463,22 @@ Fuentes:
         
         return "\n\n---\n\n".join(context_parts)
     
+    def _index_report(
+        self,
+        topic: str,
+        file_path: str,
+        curated_content: List[CuratedContent],
+        findings: Optional[List[Finding]],
+        output_dir: str
+    ):
+        """Registra el reporte en el índice de reportes (para reutilizarlo en corridas parecidas)"""
+        if not get_setting('output.report_index.enabled', True):
+            return
+        try:
+            ReportIndex(output_dir).add(topic, file_path, curated_content, findings)
+        except OSError as e:
+            console.print(f"[yellow]⚠️  No se pudo indexar el reporte: {e}[/yellow]")
+    
     def _save_report(self, report: str, topic: str, output_dir: str) -> str:
         """Guarda el reporte en un archivo Markdown"""
         
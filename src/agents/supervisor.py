@@ -1,13 +1,23 @@
 ﻿'''
 Supervisor Agent - Orquesta el flujo completo del sistema
 '''
-from typing import Dict, Literal
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Literal, Optional
 from ..models.state import ResearchState
+from ..models.schemas import CuratedContent, ExecutionMetrics, Finding, HumanFeedback
 from ..models.enums import TaskComplexity
 from ..core.llm_client import LLMClient
 from ..core.cost_optimizer import CostOptimizer
+from ..core.budget import BudgetPlan, RunBudget
+from ..core.estimator import RunEstimate, RunEstimator
+from ..core.usage_ledger import get_usage_ledger
 from ..utils.parsers import HumanInputParser
 from ..utils.visualizer import WorkflowVisualizer
+from ..utils.clustering import FindingCluster, format_id_ranges
+from ..search.fetcher import FetchedDocument, get_source_fetcher
+from ..core.settings import get_setting
+from ..core.report_index import ReportIndex, match_prior_subtopics, sidecar_path
 from .investigator import InvestigatorAgent
 from .curator import CuratorAgent
 from .reporter import ReporterAgent
@@ -40,9 +50,37 @@ class SupervisorAgent:
         self.investigator = InvestigatorAgent(self.llm_client, self.cost_optimizer)
         self.curator = CuratorAgent(self.llm_client, self.cost_optimizer)
         self.reporter = ReporterAgent(self.llm_client, self.cost_optimizer)
+        # Los duplicados del hedging cuentan en el costo y el presupuesto de la corrida
+        self.llm_client.on_hedge_cost = lambda model, tokens: self.cost_optimizer.log_hedge(model, tokens)
+        
+        # Descarga de fuentes (corre en background durante la validación humana)
+        self.fetcher = get_source_fetcher()
+        self._fetch_executor: Optional[ThreadPoolExecutor] = None
+        self._fetch_future: Optional[Future] = None
+        
+        # Presupuesto de la corrida (costo máximo y/o deadline); lo fija el workflow
+        self.budget: Optional[RunBudget] = None
         
         console.print('[dim]✓ Supervisor Agent listo[/dim]')
     
+    def reset_run_state(self):
+        '''
+        Reinicia el estado por corrida (métricas, parser, visualizer) conservando
+        el cliente LLM y los agentes. Permite reutilizar un workflow "caliente".
+        '''
+        self.cost_optimizer = CostOptimizer()
+        self.parser = HumanInputParser()
+        self.visualizer = WorkflowVisualizer()
+        self._fetch_future = None
+        self.budget = None
+        
+        for agent in (self.investigator, self.curator, self.reporter):
+            agent.cost_optimizer = self.cost_optimizer
+        
+        # El presupuesto de hedging es por corrida
+        if self.llm_client.hedging is not None:
+            self.llm_client.hedging.reset()
+    
     def orchestrate(self, state: ResearchState) -> ResearchState:
         '''
         Orquesta el flujo completo basado en el estado actual.
@@ -53,6 +91,8 @@ class SupervisorAgent:
         
         console.print(f'[dim]📋 Supervisor: Paso actual = {current_step}[/dim]')
         
+        self._apply_budget(state)
+        
         if current_step == 'investigator':
             return self._run_investigator(state)
         
@@ -70,6 +110,46 @@ class SupervisorAgent:
             state['error'] = f'Unknown step: {current_step}'
             return state
     
+    def _apply_budget(self, state: ResearchState) -> Optional[BudgetPlan]:
+        '''
+        Ajusta tiers y max_tokens según cuánto del presupuesto se consumió.
+        Los escalones solo bajan: costo y tiempo no vuelven atrás.
+        
+        Returns:
+            Plan vigente (None si la corrida no tiene presupuesto)
+        '''
+        if self.budget is None:
+            return None
+        
+        spent = self.cost_optimizer.committed_cost
+        plan = self.budget.plan(spent)
+        self.cost_optimizer.apply_budget(plan.max_tier, plan.token_scale)
+        
+        metrics = state['execution_metrics']
+        if plan.level != metrics.budget_level:
+            metrics.budget_level = plan.level
+            console.print(
+                f'[yellow]💸 Presupuesto {plan.level} ({self.budget.describe(spent)}): '
+                f'tier máximo {plan.max_tier or "sin tope"}, max_tokens x{plan.token_scale}[/yellow]'
+            )
+        return plan
+    
+    @staticmethod
+    def _drop_low_relevance(
+        findings: List[Finding],
+        min_relevance: float,
+        prior: Dict[int, CuratedContent]
+    ) -> List[Finding]:
+        '''
+        Findings que se curan con el presupuesto ajustado: los de relevancia
+        suficiente y los que ya tienen análisis previo (no cuestan). Siempre
+        queda al menos el más relevante.
+        '''
+        kept = [f for f in findings if f.relevance_score >= min_relevance or f.id in prior]
+        if not kept and findings:
+            kept = [max(findings, key=lambda f: f.relevance_score)]
+        return kept
+    
     def _run_investigator(self, state: ResearchState) -> ResearchState:
         '''Ejecuta el Investigator Agent'''
         console.print('[dim]🎯 Supervisor: Delegando a Investigator Agent[/dim]')
@@ -83,11 +163,20 @@ class SupervisorAgent:
         console.print('[bold cyan]PASO 1: INVESTIGACIÓN INICIAL[/bold cyan]')
         console.print('='*60)
         
+        # Con curación especulativa, cada subtema empieza a analizarse apenas llega
+        on_finding = None
+        if self.curator.speculative and not state.get('survey_mode', False):
+            on_finding = lambda finding: self.curator.speculate(finding, state['topic'])
+        
         # Ejecutar investigator
-        findings = self.investigator.investigate(state['topic'])
+        findings = self.investigator.investigate(
+            state['topic'], survey=state.get('survey_mode', False), on_finding=on_finding
+        )
         
         # Actualizar estado
         state['raw_findings'] = findings
+        state['clusters'] = self.investigator.last_clusters
+        state['sources'] = self.investigator.last_sources
         state['investigator_completed'] = True
         state['awaiting_human_input'] = True
         state['current_step'] = 'human_validation'
@@ -100,6 +189,9 @@ class SupervisorAgent:
         )
         self.visualizer.display()
         
+        # Las fuentes se descargan mientras el usuario decide qué aprobar
+        self.start_source_fetch(state['sources'])
+        
         console.print('[dim]✓ Supervisor: Investigator completado[/dim]')
         
         return state
@@ -118,9 +210,13 @@ class SupervisorAgent:
         console.print('='*60)
         
         findings = state['raw_findings']
+        clusters = state.get('clusters') or []
         
-        # Mostrar findings
-        self._display_findings(findings)
+        # Mostrar findings (agrupados si son muchos)
+        if clusters:
+            self._display_clusters(clusters, findings)
+        else:
+            self._display_findings(findings)
         
         # Pedir input al usuario
         console.print()
@@ -128,6 +224,9 @@ class SupervisorAgent:
         console.print()
         console.print('[dim]Comandos disponibles:[/dim]')
         console.print('  • approve 1,3,5        (aprobar subtemas específicos)')
+        console.print('  • approve 1-10         (aprobar un rango de IDs)')
+        if clusters:
+            console.print('  • approve cluster 1,3  (aprobar clusters completos)')
         console.print('  • reject 2             (rechazar subtemas)')
         console.print('  • approve all          (aprobar todos)')
         console.print('  • approve all except 2 (aprobar todos menos algunos)')
@@ -135,29 +234,16 @@ class SupervisorAgent:
         console.print("  • modify 1 to 'texto'  (modificar un subtema)")
         console.print()
         
-        # Loop hasta obtener input válido
-        feedback = None
-        available_ids = [f.id for f in findings]
+        # Costo y tiempo esperados de curator + reporter según la selección
+        estimator = RunEstimator(self.cost_optimizer, get_usage_ledger(), self.curator.max_concurrency)
+        def estimate(feedback: HumanFeedback) -> RunEstimate:
+            return estimator.estimate(len(feedback.approved_ids) + len(feedback.additions))
+        console.print(f'[dim]💰 Aprobando todo: {self._describe_estimate(estimator.estimate(len(findings)))}[/dim]')
+        console.print()
         
-        while feedback is None:
-            user_input = input('[Tu decisión] > ').strip()
-            
-            feedback, error = self.parser.parse(user_input, available_ids)
-            
-            if error:
-                console.print(f'{error}')
-                console.print()
-                feedback = None
-            else:
-                # Mostrar resumen
-                console.print(self.parser.format_feedback_summary(feedback))
-                
-                # Confirmar
-                confirm = input('¿Confirmar? (s/n) > ').strip().lower()
-                if confirm not in ['s', 'si', 'y', 'yes']:
-                    console.print('[yellow]Cancelado. Ingresá tu decisión de nuevo.[/yellow]')
-                    console.print()
-                    feedback = None
+        available_ids = [f.id for f in findings]
+        cluster_ids = {cluster.id: cluster.finding_ids for cluster in clusters}
+        feedback = self._ask_feedback(available_ids, cluster_ids, estimate)
         
         # Actualizar estado
         state['human_feedback'] = feedback
@@ -183,6 +269,82 @@ class SupervisorAgent:
         
         return state
     
+    def _ask_feedback(
+        self,
+        available_ids: List[int],
+        cluster_ids: Optional[Dict[int, List[int]]] = None,
+        estimate: Optional[Callable[[HumanFeedback], RunEstimate]] = None
+    ) -> HumanFeedback:
+        '''
+        Pide comandos al usuario hasta obtener uno válido y confirmado.
+        
+        Args:
+            available_ids: IDs válidos
+            cluster_ids: Mapa cluster → IDs (modo survey)
+            estimate: Costo y tiempo esperados de una selección (se muestra al confirmar
+                y, con prompt_toolkit, en vivo mientras se escribe el comando)
+        '''
+        toolbar = None
+        if estimate is not None:
+            preview = HumanInputParser()
+            def toolbar(text: str) -> str:
+                feedback, error = preview.parse(text, available_ids, cluster_ids) if text.strip() else (None, None)
+                if feedback is None or error:
+                    return '💰 Escribí un comando para ver el costo estimado'
+                return f'💰 {self._describe_estimate(estimate(feedback))}'
+        
+        feedback = None
+        while feedback is None:
+            user_input = self._read_decision(toolbar).strip()
+            
+            feedback, error = self.parser.parse(user_input, available_ids, cluster_ids)
+            
+            if error:
+                console.print(f'{error}')
+                console.print()
+                feedback = None
+            else:
+                # Mostrar resumen
+                console.print(self.parser.format_feedback_summary(feedback))
+                if estimate is not None:
+                    console.print(f'💰 Estimación: {self._describe_estimate(estimate(feedback))}')
+                
+                # Confirmar
+                confirm = input('¿Confirmar? (s/n) > ').strip().lower()
+                if confirm not in ['s', 'si', 'y', 'yes']:
+                    console.print('[yellow]Cancelado. Ingresá tu decisión de nuevo.[/yellow]')
+                    console.print()
+                    feedback = None
+        return feedback
+    
+    @staticmethod
+    def _read_decision(toolbar: Optional[Callable[[str], str]] = None) -> str:
+        '''
+        Lee un comando de validación. Con prompt_toolkit instalado y una
+        terminal real, la barra inferior se recalcula con cada tecla.
+        '''
+        if toolbar is not None and sys.stdin.isatty() and sys.stdout.isatty():
+            try:
+                from prompt_toolkit import prompt
+                from prompt_toolkit.application import get_app
+            except ImportError:
+                pass
+            else:
+                return prompt('[Tu decisión] > ', bottom_toolbar=lambda: toolbar(get_app().current_buffer.text))
+        return input('[Tu decisión] > ')
+    
+    def _describe_estimate(self, estimate: RunEstimate) -> str:
+        '''Estimación en texto, avisando si no entra en lo que queda del presupuesto'''
+        text = estimate.describe()
+        if self.budget is not None and estimate.subtopics:
+            spent = self.cost_optimizer.committed_cost
+            if self.budget.max_cost and estimate.cost > self.budget.max_cost - spent:
+                text += f' ⚠️  supera el presupuesto restante (${max(0.0, self.budget.max_cost - spent):.4f})'
+            remaining = self.budget.remaining_time()
+            if remaining is not None and estimate.seconds > remaining:
+                text += f' ⚠️  no entra en el deadline ({remaining:.0f}s restantes)'
+        return text
+    
     def _run_curator(self, state: ResearchState) -> ResearchState:
         '''Ejecuta el Curator Agent'''
         console.print('[dim]🎯 Supervisor: Delegando a Curator Agent[/dim]')
@@ -199,35 +361,39 @@ class SupervisorAgent:
         feedback = state['human_feedback']
         all_findings = state['raw_findings']
         
-        # Obtener findings aprobados
-        approved_findings = [
-            f for f in all_findings 
-            if f.id in feedback.approved_ids
-        ]
+        approved_findings = self.build_approved_findings(feedback, all_findings)
+        state['approved_findings'] = approved_findings
         
-        # Agregar temas custom
-        if feedback.additions:
-            console.print()
-            console.print(f'[cyan]📝 Agregando {len(feedback.additions)} temas personalizados...[/cyan]')
-            from ..models.schemas import Finding
-            for i, topic in enumerate(feedback.additions):
-                custom_finding = Finding(
-                    id=max([f.id for f in all_findings]) + i + 1,
-                    title=topic,
-                    description=f'Tema agregado por el usuario: {topic}',
-                    relevance_score=1.0,
-                    source='User Input'
-                )
-                approved_findings.append(custom_finding)
-        
-        # Aplicar modificaciones
-        if feedback.modifications:
-            for finding in approved_findings:
-                if finding.id in feedback.modifications:
-                    finding.title = feedback.modifications[finding.id]
+        # Subtemas que ya estaban curados en un reporte previo casi igual
+        prior, _ = match_prior_subtopics(
+            approved_findings,
+            state.get('prior_curated') or [],
+            get_setting('output.report_index.subtopic_threshold', 0.6)
+        )
         
-        # Ejecutar curator
-        curated = self.curator.curate(approved_findings, state['topic'])
+        # Esperar la descarga de fuentes iniciada después del investigator
+        documents = self.collect_source_documents()
+        state['source_documents'] = [doc.to_dict() for doc in documents]
+        state['execution_metrics'].sources_analyzed = len(documents)
+        
+        # Con el presupuesto ajustado se saltean los subtemas menos relevantes
+        to_curate = approved_findings
+        plan = self._apply_budget(state)
+        if plan is not None and plan.min_relevance:
+            to_curate = self._drop_low_relevance(approved_findings, plan.min_relevance, prior)
+            skipped = len(approved_findings) - len(to_curate)
+            if skipped:
+                console.print(f'[yellow]💸 {skipped} subtemas con relevancia < {plan.min_relevance} quedan sin analizar[/yellow]')
+            state['execution_metrics'].skipped_findings = skipped
+        
+        # Ejecutar curator (cluster por cluster en modo survey)
+        cache_hits = self.curator.cache_hits
+        clusters = state.get('clusters') or []
+        if clusters:
+            curated = self._curate_by_cluster(to_curate, clusters, state['topic'], documents, prior)
+        else:
+            curated = self.curator.curate(to_curate, state['topic'], documents, prior, budget=self.budget)
+        state['execution_metrics'].cached_analyses = self.curator.cache_hits - cache_hits
         
         # Actualizar estado
         state['curated_content'] = curated
@@ -261,11 +427,18 @@ class SupervisorAgent:
         
         curated_content = state['curated_content']
         
-        # Ejecutar reporter
-        report, file_path = self.reporter.generate_report(
+        # Sin presupuesto (o tiempo) para el LLM: reporte "anytime" armado localmente.
+        # Cuenta también los análisis abandonados que siguen en vuelo
+        self._apply_budget(state)
+        anytime = self.budget is not None and self.budget.needs_anytime_report(self.cost_optimizer.committed_cost)
+        generate = self.reporter.generate_anytime_report if anytime else self.reporter.generate_report
+        report, file_path = generate(
             state['topic'],
-            curated_content
+            curated_content,
+            output_dir=get_setting('output.reports_dir', './reports'),
+            findings=state.get('approved_findings')
         )
+        state['execution_metrics'].anytime_report = anytime
         
         # Actualizar estado
         state['final_report'] = report
@@ -275,6 +448,11 @@ class SupervisorAgent:
         
         # Actualizar métricas finales
         from datetime import datetime
+        if self.reporter.last_compression is not None:
+            state['execution_metrics'].context_compression = self.reporter.last_compression.ratio
+        if self.llm_client.hedging is not None:
+            state['execution_metrics'].hedged_requests = self.llm_client.hedging.stats.hedged
+            state['execution_metrics'].hedge_tokens = self.llm_client.hedging.stats.extra_tokens
         state['execution_metrics'].end_time = datetime.now()
         state['execution_metrics'].final_report_words = len(report.split())
         
@@ -291,6 +469,202 @@ class SupervisorAgent:
         
         return state
     
+    def refresh_report(self, report_path: str) -> dict:
+        '''
+        Modo incremental (--refresh): toma el contenido curado de un reporte
+        previo, deja agregar, modificar o quitar subtemas y regenera solo las
+        secciones afectadas (más la introducción y las conclusiones).
+        
+        Returns:
+            Estado final (mismas claves que una corrida completa)
+        '''
+        from datetime import datetime
+        
+        sidecar = ReportIndex.load_sidecar(report_path)
+        if sidecar is None:
+            raise FileNotFoundError(
+                f'{report_path} no tiene contenido curado asociado ({sidecar_path(report_path)}); '
+                'solo se pueden actualizar reportes generados con el índice habilitado'
+            )
+        
+        topic = sidecar['topic']
+        prior_curated = sidecar['curated_content']
+        findings = sidecar['findings'] or [
+            Finding(id=i, title=content.topic, description=content.analysis[:200],
+                    relevance_score=1.0, source='Reporte previo')
+            for i, content in enumerate(prior_curated, start=1)
+        ]
+        curated_by_title = {content.topic: content for content in prior_curated}
+        metrics = ExecutionMetrics(start_time=datetime.now(), total_findings=len(findings))
+        
+        self._display_findings(findings)
+        console.print()
+        console.print('[bold]¿Qué cambios querés hacer?[/bold] [dim](los subtemas no rechazados se conservan)[/dim]')
+        console.print("  • add 'nuevo tema'     (agregar una sección)")
+        console.print("  • modify 1 to 'texto'  (rehacer una sección con otro enfoque)")
+        console.print('  • reject 2             (quitar una sección)')
+        console.print()
+        
+        feedback = self._ask_feedback([f.id for f in findings])
+        feedback.approved_ids = [f.id for f in findings if f.id not in feedback.rejected_ids]
+        
+        original = {f.id: f for f in findings}
+        approved = self.build_approved_findings(feedback, [f.model_copy() for f in findings])
+        
+        # Sin cambios de título ni de ID, la sección existente sigue valiendo
+        unchanged: Dict[int, CuratedContent] = {}
+        changed: List[Finding] = []
+        for finding in approved:
+            before = original.get(finding.id)
+            if before is not None and before.title == finding.title and finding.title in curated_by_title:
+                unchanged[finding.id] = curated_by_title[finding.title]
+            else:
+                changed.append(finding)
+        removed = [original[id].title for id in feedback.rejected_ids if id in original]
+        
+        with open(report_path, encoding='utf-8') as f:
+            report = f.read()
+        
+        if changed or removed:
+            cache_hits = self.curator.cache_hits
+            new_content = self.curator.curate(changed, topic) if changed else []
+            metrics.cached_analyses = self.curator.cache_hits - cache_hits
+            by_id = {finding.id: content for finding, content in zip(changed, new_content)}
+            
+            curated = [unchanged.get(f.id) or by_id[f.id] for f in approved]
+            updated = [
+                (original[f.id].title if f.id in original else None, by_id[f.id])
+                for f in changed
+            ]
+            report, report_path = self.reporter.refresh_report(
+                topic, report_path, curated, updated, removed, findings=approved
+            )
+        else:
+            console.print('[yellow]⚠️  No hay cambios: el reporte queda igual.[/yellow]')
+            curated = prior_curated
+        
+        metrics.approved_findings = len(curated)
+        metrics.end_time = datetime.now()
+        metrics.final_report_words = len(report.split())
+        
+        return {
+            'topic': topic,
+            'raw_findings': findings,
+            'approved_findings': approved,
+            'human_feedback': feedback,
+            'curated_content': curated,
+            'final_report': report,
+            'report_file_path': report_path,
+            'execution_metrics': metrics,
+            'cost_metrics': self.cost_optimizer.get_metrics(),
+            'current_step': 'completed',
+            'error': None,
+        }
+    
+    def _curate_by_cluster(
+        self,
+        findings: List[Finding],
+        clusters: List[FindingCluster],
+        topic: str,
+        documents: List[FetchedDocument],
+        prior: Optional[Dict[int, CuratedContent]] = None
+    ) -> List:
+        '''
+        Cura los findings aprobados agrupados por cluster (en orden de
+        relevancia del cluster); los temas agregados por el usuario van al final.
+        '''
+        by_id = {f.id: f for f in findings}
+        batches = []
+        for cluster in clusters:
+            members = [by_id.pop(id) for id in cluster.finding_ids if id in by_id]
+            if members:
+                batches.append((cluster.label, members))
+        if by_id:
+            batches.append(('Otros subtemas', list(by_id.values())))
+        
+        curated = []
+        for i, (label, members) in enumerate(batches, start=1):
+            if self.budget is not None and self.budget.exhausted(self.cost_optimizer.committed_cost):
+                console.print(f'[yellow]💸 Presupuesto agotado: {len(batches) - i + 1} clusters sin analizar[/yellow]')
+                break
+            console.print(f'\n[bold]📦 Cluster {i}/{len(batches)}:[/bold] {label} ({len(members)} subtemas)')
+            curated.extend(self.curator.curate(members, topic, documents, prior, budget=self.budget))
+        return curated
+    
+    def fetch_sources(self, sources: List[Dict]) -> List[FetchedDocument]:
+        '''Descarga (o toma de la caché) el texto de las fuentes. Retorna solo las exitosas.'''
+        if self.fetcher is None or not self.investigator.search_provider.fetchable or not sources:
+            return []
+        
+        max_documents = get_setting('web_search.fetch.max_documents', 10)
+        titles = {src['url']: src.get('title') for src in sources}
+        documents = self.fetcher.fetch_all([src['url'] for src in sources[:max_documents]])
+        
+        for doc in documents:
+            doc.title = doc.title or titles.get(doc.url)
+        return [doc for doc in documents if doc.ok]
+    
+    def start_source_fetch(self, sources: List[Dict]):
+        '''Lanza fetch_sources en un thread aparte; el resultado se toma con collect_source_documents()'''
+        if self.fetcher is None or not self.investigator.search_provider.fetchable or not sources:
+            self._fetch_future = None
+            return
+        
+        if self._fetch_executor is None:
+            self._fetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='source-fetch')
+        self._fetch_future = self._fetch_executor.submit(self.fetch_sources, sources)
+    
+    def collect_source_documents(self) -> List[FetchedDocument]:
+        '''Espera la descarga en curso (si hay) y retorna los documentos'''
+        future, self._fetch_future = self._fetch_future, None
+        if future is None:
+            return []
+        
+        try:
+            documents = future.result()
+        except Exception as e:
+            console.print(f'[yellow]⚠️  No se pudieron descargar las fuentes: {e}[/yellow]')
+            return []
+        
+        cached = sum(1 for doc in documents if doc.status in ('not_modified', 'local'))
+        console.print(f'[dim]📄 {len(documents)} fuentes con texto completo ({cached} desde caché)[/dim]')
+        return documents
+    
+    @staticmethod
+    def build_approved_findings(feedback: HumanFeedback, all_findings: List[Finding]) -> List[Finding]:
+        '''
+        Aplica el feedback humano: filtra aprobados, agrega temas custom
+        y aplica modificaciones de título.
+        '''
+        # Obtener findings aprobados
+        approved_findings = [
+            f for f in all_findings 
+            if f.id in feedback.approved_ids
+        ]
+        
+        # Agregar temas custom
+        if feedback.additions:
+            console.print()
+            console.print(f'[cyan]📝 Agregando {len(feedback.additions)} temas personalizados...[/cyan]')
+            max_id = max([f.id for f in all_findings], default=0)
+            for i, topic in enumerate(feedback.additions):
+                custom_finding = Finding(
+                    id=max_id + i + 1,
+                    title=topic,
+                    description=f'Tema agregado por el usuario: {topic}',
+                    relevance_score=1.0,
+                    source='User Input'
+                )
+                approved_findings.append(custom_finding)
+        
+        # Aplicar modificaciones
+        if feedback.modifications:
+            for finding in approved_findings:
+                if finding.id in feedback.modifications:
+                    finding.title = feedback.modifications[finding.id]
+        
+        return approved_findings
+    
     def _display_findings(self, findings):
         '''Muestra los findings en una tabla'''
         table = Table(title='Subtemas Identificados', show_header=True, header_style='bold cyan')
@@ -310,6 +684,28 @@ class SupervisorAgent:
         
         console.print(table)
     
+    def _display_clusters(self, clusters: List[FindingCluster], findings: List[Finding]):
+        '''Muestra una fila por cluster en lugar de una por finding'''
+        table = Table(title='Subtemas Identificados (por cluster)', show_header=True, header_style='bold cyan')
+        
+        table.add_column('Cluster', style='cyan', width=8, justify='center')
+        table.add_column('Tema representativo', style='magenta', width=44)
+        table.add_column('Subtemas', style='white', width=9, justify='center')
+        table.add_column('IDs', style='white', width=16)
+        table.add_column('Relevancia', style='green', width=10, justify='center')
+        
+        for cluster in clusters:
+            table.add_row(
+                str(cluster.id),
+                cluster.label,
+                str(len(cluster.finding_ids)),
+                format_id_ranges(cluster.finding_ids),
+                f'{cluster.relevance:.2f}'
+            )
+        
+        console.print(table)
+        console.print(f'[dim]{len(findings)} subtemas en {len(clusters)} clusters[/dim]')
+    
     def get_cost_optimizer(self):
         '''Retorna el cost optimizer para métricas'''
         return self.cost_optimizer
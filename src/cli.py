@@ -0,0 +1,130 @@
+﻿"""
+Flujo de línea de comandos compartido por main.py (modo local) y el daemon
+"""
+import os
+from typing import List, Optional
+
+from rich.console import Console
+from rich.panel import Panel
+
+console = Console()
+
+def print_banner():
+    console.print()
+    console.print(Panel(
+        "[bold]🔍 SMART CONTENT RESEARCH ASSISTANT 🔍[/bold]\n\n"
+        "Sistema multi-agente con validación humana\n"
+        "y optimización inteligente de costos",
+        border_style="cyan",
+        width=62,
+        padding=(1, 2)
+    ))
+
+def _pop_number(argv: List[str], flag: str) -> tuple[List[str], Optional[float]]:
+    """Saca `flag <número>` de argv (ValueError si falta o no es un número positivo)"""
+    if flag not in argv:
+        return argv, None
+    position = argv.index(flag)
+    if position + 1 >= len(argv):
+        raise ValueError(f"Uso: {flag} <número>")
+    try:
+        value = float(argv[position + 1])
+    except ValueError:
+        raise ValueError(f"{flag} espera un número, no '{argv[position + 1]}'")
+    if value <= 0:
+        raise ValueError(f"{flag} tiene que ser mayor a 0")
+    return argv[:position] + argv[position + 2:], value
+
+def run_cli(argv: List[str], workflow=None, validate: bool = True) -> int:
+    """
+    Ejecuta una investigación completa desde la línea de comandos.
+
+    Args:
+        argv: Argumentos (el tema, si se pasó por línea de comandos, --survey, --refresh <reporte>,
+            --max-cost <USD> o --deadline <segundos>)
+        workflow: ResearchWorkflow ya construido (el daemon reutiliza uno "caliente")
+        validate: Si True, valida la configuración antes de empezar
+
+    Returns:
+        Código de salida
+    """
+    print_banner()
+
+    # --survey: decenas de subtemas candidatos, validados por cluster
+    survey = '--survey' in argv
+    argv = [arg for arg in argv if arg != '--survey']
+    
+    # --max-cost / --deadline: presupuesto de la corrida (degrada en lugar de pasarse)
+    try:
+        argv, max_cost = _pop_number(argv, '--max-cost')
+        argv, deadline_s = _pop_number(argv, '--deadline')
+    except ValueError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        return 1
+    
+    # --refresh <reporte>: regenerar solo las secciones que cambian
+    refresh_path = None
+    if '--refresh' in argv:
+        position = argv.index('--refresh')
+        if position + 1 >= len(argv):
+            console.print("[red]❌ Uso: --refresh <ruta del reporte .md>[/red]")
+            return 1
+        refresh_path = argv[position + 1]
+        if not os.path.exists(refresh_path):
+            console.print(f"[red]❌ No existe el reporte: {refresh_path}[/red]")
+            return 1
+        argv = argv[:position] + argv[position + 2:]
+
+    # VALIDAR CONFIGURACIÓN PRIMERO
+    if validate:
+        from src.core.config_validator import ConfigValidator
+        if not ConfigValidator.validate_all():
+            console.print()
+            console.print("[red]❌ El sistema no puede iniciar debido a errores de configuración.[/red]")
+            return 1
+
+    # Pre-calentar conexiones al LLM mientras el usuario escribe el tema
+    if workflow is None and os.getenv('LLM_HTTP_WARMUP', '1') not in ('0', 'false', 'no'):
+        from src.core.http_pool import get_shared_pool
+        get_shared_pool().warm_up(background=True)
+
+    # Obtener tema del usuario
+    if refresh_path:
+        topic = refresh_path
+    elif argv:
+        topic = " ".join(argv)
+    else:
+        console.print()
+        console.print("[bold]¿Sobre qué tema querés investigar?[/bold]")
+        console.print()
+        topic = input("Tema: ").strip()
+
+    if not topic:
+        console.print("[red]❌ Necesitás especificar un tema.[/red]")
+        return 1
+
+    # Crear workflow y ejecutar (langgraph, groq y los agentes se importan recién acá)
+    if workflow is None:
+        from src.graph.workflow import ResearchWorkflow
+        workflow = ResearchWorkflow()
+
+    try:
+        if refresh_path:
+            final_state = workflow.refresh(refresh_path)
+        else:
+            final_state = workflow.run(topic, survey=survey, max_cost=max_cost, deadline_s=deadline_s, interactive=True)
+
+        console.print()
+        console.print("[bold green]✓ ¡Investigación completada exitosamente![/bold green]")
+
+    except KeyboardInterrupt:
+        console.print()
+        console.print()
+        console.print("[yellow]⚠️  Investigación cancelada por el usuario.[/yellow]")
+        return 130
+    except Exception as e:
+        console.print()
+        console.print(f"[red]❌ Error: {e}[/red]")
+        raise
+
+    return 0
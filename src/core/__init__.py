@@ -1,5 +1,10 @@
-﻿from .cost_optimizer import CostOptimizer
-from .llm_client import LLMClient
-from .config_validator import ConfigValidator
+﻿from .lazy import lazy_exports
 
-__all__ = ['CostOptimizer', 'LLMClient', 'ConfigValidator']
+_EXPORTS = {
+    'CostOptimizer': '.cost_optimizer',
+    'LLMClient': '.llm_client',
+    'ConfigValidator': '.config_validator',
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
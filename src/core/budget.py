@@ -0,0 +1,125 @@
+﻿'''
+Presupuesto por corrida: costo máximo y deadline de reloj
+
+A medida que se consume, la corrida se degrada por escalones en lugar de
+pasarse: primero tiers más baratos y menos tokens de salida, después se
+saltean los subtemas menos relevantes y, agotado el presupuesto, el
+reporte se arma localmente ("anytime") con lo que ya se curó.
+'''
+import time
+from dataclasses import dataclass
+from typing import Callable, Literal, Optional
+
+BudgetLevel = Literal['normal', 'tight', 'critical', 'exhausted']
+
+
+@dataclass
+class BudgetPlan:
+    '''Qué se ajusta en cada escalón'''
+    level: BudgetLevel
+    # Tier más caro permitido (None = sin tope)
+    max_tier: Optional[Literal['cheap', 'moderate', 'expensive']] = None
+    # Factor sobre max_tokens
+    token_scale: float = 1.0
+    # Los findings con menor relevance_score no se curan
+    min_relevance: float = 0.0
+
+    @property
+    def degraded(self) -> bool:
+        return self.level != 'normal'
+
+
+PLANS = {
+    'normal': BudgetPlan('normal'),
+    'tight': BudgetPlan('tight', max_tier='moderate', token_scale=0.75, min_relevance=0.5),
+    'critical': BudgetPlan('critical', max_tier='cheap', token_scale=0.5, min_relevance=0.7),
+    'exhausted': BudgetPlan('exhausted', max_tier='cheap', token_scale=0.5, min_relevance=0.7),
+}
+
+
+class RunBudget:
+    '''
+    Costo máximo (en las mismas unidades que CostOptimizer) y deadline en
+    segundos desde el inicio de la corrida. Cualquiera de los dos puede ser None.
+    Los últimos report_reserve_s segundos quedan para el reporte.
+    '''
+
+    def __init__(
+        self,
+        max_cost: Optional[float] = None,
+        deadline_s: Optional[float] = None,
+        tight_at: float = 0.6,
+        critical_at: float = 0.85,
+        report_reserve_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_cost = max_cost
+        self.deadline_s = deadline_s
+        self.report_reserve_s = report_reserve_s
+        self.tight_at = tight_at
+        self.critical_at = critical_at
+        self._clock = clock
+        self.started_at = clock()
+
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self.started_at
+
+    def remaining_time(self, reserve: float = 0.0) -> Optional[float]:
+        '''Segundos hasta el deadline menos reserve (None si no hay deadline)'''
+        if self.deadline_s is None:
+            return None
+        return max(0.0, self.deadline_s - reserve - self.elapsed)
+
+    def used(self, spent: float) -> float:
+        '''Fracción consumida: la mayor entre costo y tiempo'''
+        fractions = [0.0]
+        if self.max_cost:
+            fractions.append(spent / self.max_cost)
+        if self.deadline_s:
+            fractions.append(self.elapsed / self.deadline_s)
+        return max(fractions)
+
+    def level(self, spent: float) -> BudgetLevel:
+        used = self.used(spent)
+        if used >= 1.0:
+            return 'exhausted'
+        if used >= self.critical_at:
+            return 'critical'
+        if used >= self.tight_at:
+            return 'tight'
+        return 'normal'
+
+    def exhausted(self, spent: float) -> bool:
+        return self.level(spent) == 'exhausted'
+
+    def needs_anytime_report(self, spent: float) -> bool:
+        '''Sin presupuesto (o tiempo) para que el LLM redacte el reporte'''
+        remaining = self.remaining_time()
+        return self.exhausted(spent) or (remaining is not None and remaining < self.report_reserve_s / 2)
+
+    def plan(self, spent: float) -> BudgetPlan:
+        return PLANS[self.level(spent)]
+
+    def describe(self, spent: float) -> str:
+        parts = []
+        if self.max_cost:
+            parts.append(f'${spent:.4f} de ${self.max_cost:.4f}')
+        if self.deadline_s:
+            parts.append(f'{self.elapsed:.0f}s de {self.deadline_s:.0f}s')
+        return ', '.join(parts)
+
+
+def make_run_budget(max_cost: Optional[float] = None, deadline_s: Optional[float] = None) -> Optional[RunBudget]:
+    '''RunBudget con los umbrales de config.yaml (None si no hay límites)'''
+    from .settings import get_setting
+
+    if max_cost is None and deadline_s is None:
+        return None
+    return RunBudget(
+        max_cost=max_cost,
+        deadline_s=deadline_s,
+        tight_at=get_setting('cost_optimization.budget.tight_at', 0.6),
+        critical_at=get_setting('cost_optimization.budget.critical_at', 0.85),
+        report_reserve_s=get_setting('cost_optimization.budget.report_reserve_s', 30),
+    )
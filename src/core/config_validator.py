@@ -31,8 +31,9 @@ class ConfigValidator:
         else:
             load_dotenv()
         
-        # Validar API key
-        api_key = os.getenv('GROQ_API_KEY')
+        # Validar API key (GROQ_API_KEYS permite un pool de varias keys)
+        pool_keys = [k.strip() for k in os.getenv('GROQ_API_KEYS', '').split(',') if k.strip()]
+        api_key = os.getenv('GROQ_API_KEY') or (pool_keys[0] if pool_keys else None)
         if not api_key:
             errors.append('GROQ_API_KEY no configurada en .env')
             errors.append('  → Agregá: GROQ_API_KEY=tu-key-aqui')
@@ -44,6 +45,9 @@ class ConfigValidator:
         else:
             console.print('[green]✓[/green] GROQ_API_KEY configurada correctamente')
         
+        if len(pool_keys) > 1:
+            console.print(f'[green]✓[/green] Pool de {len(pool_keys)} API keys (balanceo y failover)')
+        
         # Validar modelos configurados
         cheap_model = os.getenv('MODEL_CHEAP')
         moderate_model = os.getenv('MODEL_MODERATE')
@@ -1,12 +1,36 @@
-﻿from typing import Literal
+﻿from typing import List, Literal, Optional, Tuple
 from ..models.enums import TaskComplexity
 from ..models.schemas import CostMetrics
+from .env import load_env
+from .settings import get_setting
+from .usage_ledger import get_output_length_model
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import threading
+import time
 
 ModelType = Literal['cheap', 'moderate', 'expensive']
+TIER_ORDER = ('cheap', 'moderate', 'expensive')
+
+def route_tier(
+    task_complexity: TaskComplexity,
+    estimated_tokens: int,
+    simple_task_max_tokens: int = 500,
+    complex_task_min_tokens: int = 1000
+) -> ModelType:
+    '''Tier según complejidad y tokens estimados (lo usa también el simulador de políticas)'''
+    if task_complexity == TaskComplexity.SIMPLE:
+        return 'cheap'
+    elif task_complexity == TaskComplexity.MODERATE:
+        if estimated_tokens < simple_task_max_tokens:
+            return 'cheap'
+        return 'moderate'
+    elif task_complexity == TaskComplexity.COMPLEX:
+        # Las complejas y largas van directo al modelo caro
+        if estimated_tokens >= complex_task_min_tokens:
+            return 'expensive'
+        return 'moderate'
+    else:  # CRITICAL
+        return 'expensive'
 
 class CostOptimizer:
     '''
@@ -22,12 +46,33 @@ class CostOptimizer:
     }
     
     def __init__(self):
+        load_env()
         self.models = {
             'cheap': os.getenv('MODEL_CHEAP', 'llama-3.1-8b-instant'),
             'moderate': os.getenv('MODEL_MODERATE', 'llama-3.1-8b-instant'),
             'expensive': os.getenv('MODEL_EXPENSIVE', 'llama-3.3-70b-versatile'),
         }
         self.metrics = CostMetrics()
+        # Inicio de la corrida: las llamadas del ledger desde acá son de esta corrida
+        self.started_at = time.time()
+        # El curator puede registrar uso desde varios threads
+        self._lock = threading.Lock()
+        # Longitud real de las respuestas anteriores, por tipo de prompt
+        self.output_lengths = get_output_length_model()
+        # Cascada: empezar en el modelo barato y escalar solo si falla el chequeo local
+        self.cascade = get_setting('cost_optimization.cascade.enabled', True)
+        self.max_escalations = get_setting('cost_optimization.cascade.max_escalations', 1)
+        # Tier más alto al que escala el curator: un análisis por subtema en el
+        # modelo caro costaría más que no usar cascada
+        self.curator_max_tier: ModelType = get_setting('cost_optimization.cascade.curator_max_tier', 'moderate')
+        # Umbrales de tokens para el ruteo por complejidad
+        self.simple_task_max_tokens = get_setting('cost_optimization.simple_task_max_tokens', 500)
+        self.complex_task_min_tokens = get_setting('cost_optimization.complex_task_min_tokens', 1000)
+        # Degradación por presupuesto de la corrida (ver core/budget.py)
+        self.max_tier: ModelType | None = None
+        self.token_scale = 1.0
+        # Costo máximo estimado de las llamadas en curso (todavía sin log_usage)
+        self._in_flight_cost = 0.0
     
     def select_model(
         self, 
@@ -35,21 +80,99 @@ class CostOptimizer:
         estimated_tokens: int = 1000,
         force_model: ModelType | None = None
     ) -> str:
-        '''Selecciona el modelo apropiado basado en complejidad.'''
-        if force_model:
-            return self.models[force_model]
+        '''Selecciona el modelo apropiado basado en complejidad (sin pasar de max_tier).'''
+        tier = force_model or route_tier(
+            task_complexity, estimated_tokens, self.simple_task_max_tokens, self.complex_task_min_tokens
+        )
+        return self.models[self._capped(tier)]
+    
+    def _capped(self, tier: ModelType) -> ModelType:
+        if self.max_tier is not None and TIER_ORDER.index(tier) > TIER_ORDER.index(self.max_tier):
+            return self.max_tier
+        return tier
+    
+    def apply_budget(self, max_tier: ModelType | None, token_scale: float):
+        '''Tope de tier y factor de max_tokens para lo que queda de la corrida'''
+        self.max_tier = max_tier
+        self.token_scale = token_scale
+    
+    def tiers(self, max_tier: ModelType | None = None) -> List[str]:
+        '''Modelos de más barato a más caro (hasta max_tier y el tope del presupuesto), sin repetidos'''
+        allowed = TIER_ORDER
+        for cap in (self.max_tier, max_tier):
+            if cap is not None:
+                allowed = allowed[:TIER_ORDER.index(cap) + 1]
+        return list(dict.fromkeys(self.models[tier] for tier in allowed))
+    
+    def next_tier(self, model: str, escalation: int = 0, max_tier: ModelType | None = None) -> Optional[str]:
+        '''
+        Modelo al que escalar cuando la salida de model no pasa el chequeo local.
         
-        # Lógica de decisión
-        if task_complexity == TaskComplexity.SIMPLE:
-            return self.models['cheap']
-        elif task_complexity == TaskComplexity.MODERATE:
-            if estimated_tokens < 500:
-                return self.models['cheap']
-            return self.models['moderate']
-        elif task_complexity == TaskComplexity.COMPLEX:
-            return self.models['moderate']
-        else:  # CRITICAL
-            return self.models['expensive']
+        Args:
+            model: Modelo que falló
+            escalation: Escalamientos ya hechos en esta tarea
+            max_tier: Tier más alto permitido para esta tarea (ej. curator_max_tier)
+        
+        Returns:
+            El siguiente tier, o None si no hay o se llegó a max_escalations
+        '''
+        tiers = self.tiers(max_tier)
+        if escalation >= self.max_escalations or model not in tiers:
+            return None
+        position = tiers.index(model)
+        return tiers[position + 1] if position + 1 < len(tiers) else None
+    
+    def record_cascade(self, escalations: int):
+        '''Registra una tarea resuelta en cascada y cuántas veces escaló'''
+        with self._lock:
+            self.metrics.cascade_tasks += 1
+            self.metrics.escalations += escalations
+    
+    def plan_tokens(
+        self,
+        task: str,
+        prompt_tokens: int,
+        max_tokens: int,
+        estimated_tokens: int
+    ) -> Tuple[int, int]:
+        '''
+        Ajusta los valores fijos de una llamada con el historial de ese tipo de prompt.
+        
+        Args:
+            task: Tipo de prompt (ej. 'analysis')
+            prompt_tokens: Tokens estimados del prompt
+            max_tokens: Límite fijo (queda como techo)
+            estimated_tokens: Estimación fija para select_model
+        
+        Returns:
+            (estimated_tokens, max_tokens); sin historial suficiente, los mismos
+            valores (max_tokens escalado por token_scale si el presupuesto aprieta)
+        '''
+        if self.output_lengths is not None:
+            estimated_tokens = self.output_lengths.estimated_tokens(task, prompt_tokens, estimated_tokens)
+            max_tokens = self.output_lengths.max_tokens(task, max_tokens)
+        return estimated_tokens, max(64, int(max_tokens * self.token_scale))
+    
+    def reserve(self, model: str, max_tokens: int) -> float:
+        '''
+        Anota el costo máximo de una llamada que empieza, para que el
+        presupuesto lo cuente mientras está en vuelo. Retorna lo reservado
+        (pasarlo a release después de log_usage).
+        '''
+        cost = (max_tokens / 1000) * self.PRICES.get(model, 0.0001)
+        with self._lock:
+            self._in_flight_cost += cost
+        return cost
+    
+    def release(self, reserved: float):
+        with self._lock:
+            self._in_flight_cost = max(0.0, self._in_flight_cost - reserved)
+    
+    @property
+    def committed_cost(self) -> float:
+        '''Costo registrado más el de las llamadas en vuelo: lo que mira el presupuesto'''
+        with self._lock:
+            return self.metrics.total_cost + self._in_flight_cost
     
     def log_usage(
         self, 
@@ -60,18 +183,35 @@ class CostOptimizer:
         '''Registra el uso de un modelo y calcula costo'''
         cost = (estimated_tokens / 1000) * self.PRICES.get(model, 0.0001)
         
-        if model == self.models['cheap']:
-            self.metrics.cheap_model_calls += 1
-            self.metrics.cheap_cost += cost
-        elif model == self.models['moderate']:
-            self.metrics.moderate_model_calls += 1
-            self.metrics.moderate_cost += cost
-        else:
-            self.metrics.expensive_model_calls += 1
-            self.metrics.expensive_cost += cost
+        with self._lock:
+            if model == self.models['cheap']:
+                self.metrics.cheap_model_calls += 1
+                self.metrics.cheap_cost += cost
+            elif model == self.models['moderate']:
+                self.metrics.moderate_model_calls += 1
+                self.metrics.moderate_cost += cost
+            else:
+                self.metrics.expensive_model_calls += 1
+                self.metrics.expensive_cost += cost
         
         return cost
     
+    def log_hedge(self, model: str, estimated_tokens: int) -> float:
+        '''Registra el request duplicado que perdió: se paga aunque se descarte'''
+        cost = self.log_usage(model, estimated_tokens, 'Request duplicado (hedge)')
+        with self._lock:
+            self.metrics.hedge_calls += 1
+            self.metrics.hedge_cost += cost
+        return cost
+    
+    def record_parse(self, repaired: bool = False, failed: bool = False):
+        '''Registra el resultado de parsear una respuesta estructurada del LLM'''
+        with self._lock:
+            if failed:
+                self.metrics.parse_failures += 1
+            elif repaired:
+                self.metrics.parse_repairs += 1
+    
     def get_metrics(self) -> CostMetrics:
         '''Retorna las métricas actuales'''
         return self.metrics
@@ -101,6 +241,24 @@ class CostOptimizer:
             'savings_percentage': savings_percentage
         }
 
+    def simulate_policies(self) -> List[dict]:
+        '''
+        Re-juega las llamadas de esta corrida (ledger de uso) con la política
+        vigente y sus alternativas. Lista vacía si no hay llamadas registradas.
+        '''
+        from dataclasses import asdict
+        from .policy_simulator import PolicySimulator, standard_policies
+        from .usage_ledger import get_usage_ledger
+        
+        ledger = get_usage_ledger()
+        if ledger is None:
+            return []
+        simulator = PolicySimulator.from_ledger(ledger, self.PRICES, since=self.started_at)
+        if not simulator.records:
+            return []
+        results = [simulator.observed()] + simulator.compare(standard_policies(self))
+        return [asdict(result) for result in results]
+
     def get_detailed_metrics(self) -> dict:
         """Retorna métricas detalladas con análisis"""
         metrics = self.metrics
@@ -137,5 +295,20 @@ class CostOptimizer:
                     'percentage': expensive_pct
                 }
             },
-            'savings': savings
+            'savings': savings,
+            # Costo y latencia medidos de esta corrida con políticas alternativas
+            'policies': self.simulate_policies(),
+            'parsing': {
+                'repairs': metrics.parse_repairs,
+                'failures': metrics.parse_failures
+            },
+            'hedging': {
+                'calls': metrics.hedge_calls,
+                'cost': metrics.hedge_cost
+            },
+            'cascade': {
+                'tasks': metrics.cascade_tasks,
+                'escalations': metrics.escalations,
+                'escalation_rate': metrics.escalations / metrics.cascade_tasks if metrics.cascade_tasks else 0.0
+            }
         }
\ No newline at end of file
@@ -0,0 +1,11 @@
+﻿'''
+Carga diferida de variables de entorno (.env)
+'''
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def load_env() -> bool:
+    '''Carga .env una sola vez, recién cuando un componente lo necesita'''
+    from dotenv import load_dotenv
+    return load_dotenv()
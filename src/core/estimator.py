@@ -0,0 +1,145 @@
+﻿'''
+Estimación previa de costo y tiempo de curator + reporter
+
+Con el ledger de uso (tokens y latencia reales por tipo de prompt) y la
+configuración vigente (tiers, cascada, tope del presupuesto, concurrencia
+del curator) predice cuánto va a costar y tardar una selección de subtemas
+antes de mandarla a analizar. Se muestra durante la validación humana y lo
+pueden usar políticas batch para decidir sin preguntar.
+'''
+import math
+from dataclasses import dataclass
+from typing import List, Optional
+
+from ..models.enums import TaskComplexity
+from .cost_optimizer import CostOptimizer
+from .usage_ledger import UsageLedger, UsageRecord
+
+# Sin historial: tokens por llamada (prompt + salida) y segundos por llamada.
+# El contexto del reporte se comprime a un presupuesto fijo, así que su
+# tamaño casi no depende de la cantidad de subtemas.
+DEFAULT_PROFILES = {
+    'analysis': (1500, 6.0),
+    'report': (5000, 25.0),
+}
+
+
+@dataclass
+class CallProfile:
+    '''Llamada media de un tipo de prompt'''
+    tokens: float
+    latency_s: float
+    # Escalamientos de la cascada por cada primer intento
+    escalation_rate: float = 0.0
+    samples: int = 0
+
+
+@dataclass
+class RunEstimate:
+    '''Costo y tiempo esperados para una selección'''
+    subtopics: int
+    calls: float
+    curator_cost: float
+    reporter_cost: float
+    seconds: float
+    # False si se usaron los valores por defecto (poco historial)
+    from_history: bool = True
+
+    @property
+    def cost(self) -> float:
+        return self.curator_cost + self.reporter_cost
+
+    def describe(self) -> str:
+        if not self.subtopics:
+            return 'sin subtemas para analizar'
+        text = (
+            f'{self.subtopics} subtemas · ~${self.cost:.4f} '
+            f'(curator ${self.curator_cost:.4f}, reporter ${self.reporter_cost:.4f}) · ~{self.seconds:.0f}s'
+        )
+        return text if self.from_history else f'{text} · sin historial, valores por defecto'
+
+
+class RunEstimator:
+    '''
+    Predice costo y duración de curator + reporter para N subtemas.
+
+    El costo usa la misma tarifa que CostOptimizer.log_usage sobre los
+    tokens medios de cada tipo de llamada; el tiempo asume tandas de
+    max_concurrency análisis en paralelo seguidas de una llamada de reporte.
+    '''
+
+    def __init__(
+        self,
+        cost_optimizer: CostOptimizer,
+        ledger: Optional[UsageLedger] = None,
+        max_concurrency: int = 4,
+        min_samples: int = 5,
+        window: int = 100
+    ):
+        self.cost_optimizer = cost_optimizer
+        self.ledger = ledger
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_samples = min_samples
+        self.window = window
+
+    def profile(self, task: str) -> CallProfile:
+        '''Tokens, latencia y tasa de escalamiento medios de las últimas llamadas'''
+        default_tokens, default_latency = DEFAULT_PROFILES[task]
+        records: List[UsageRecord] = self.ledger.records(task)[-self.window:] if self.ledger is not None else []
+        if len(records) < self.min_samples:
+            return CallProfile(default_tokens, default_latency)
+
+        latencies = [r.latency_s for r in records if r.latency_s is not None]
+        first = sum(r.escalation == 0 for r in records)
+        return CallProfile(
+            tokens=sum(r.prompt_tokens + r.completion_tokens for r in records) / len(records),
+            latency_s=sum(latencies) / len(latencies) if latencies else default_latency,
+            escalation_rate=(len(records) - first) / first if first else 0.0,
+            samples=len(records),
+        )
+
+    def _cost(self, model: str, tokens: float) -> float:
+        return (tokens / 1000) * self.cost_optimizer.PRICES.get(model, 0.0001)
+
+    def estimate(self, subtopics: int, reused: int = 0) -> RunEstimate:
+        '''
+        Args:
+            subtopics: Subtemas que se van a curar (aprobados + agregados)
+            reused: Cuántos ya tienen análisis (caché o reporte previo) y no cuestan
+
+        Returns:
+            Estimación de costo y tiempo
+        '''
+        if subtopics <= 0:
+            return RunEstimate(0, 0, 0.0, 0.0, 0.0)
+
+        optimizer = self.cost_optimizer
+        to_analyze = max(0, subtopics - reused)
+
+        # Curator: mismo ruteo que _deep_analysis (en cascada, el tier barato primero)
+        analysis = self.profile('analysis')
+        model = optimizer.select_model(
+            TaskComplexity.MODERATE,
+            estimated_tokens=int(analysis.tokens),
+            force_model='cheap' if optimizer.cascade else None
+        )
+        per_analysis = self._cost(model, analysis.tokens)
+        escalation_rate = 0.0
+        next_model = optimizer.next_tier(model, max_tier=optimizer.curator_max_tier) if optimizer.cascade else None
+        if next_model is not None:
+            escalation_rate = analysis.escalation_rate
+            per_analysis += escalation_rate * self._cost(next_model, analysis.tokens)
+
+        # Reporter: una llamada en el tier más caro permitido
+        report = self.profile('report')
+        report_model = optimizer.select_model(TaskComplexity.CRITICAL, force_model='expensive')
+
+        waves = math.ceil(to_analyze / self.max_concurrency)
+        return RunEstimate(
+            subtopics=subtopics,
+            calls=to_analyze * (1 + escalation_rate) + 1,
+            curator_cost=to_analyze * per_analysis,
+            reporter_cost=self._cost(report_model, report.tokens),
+            seconds=waves * analysis.latency_s * (1 + escalation_rate) + report.latency_s,
+            from_history=bool(analysis.samples and report.samples),
+        )
@@ -0,0 +1,173 @@
+﻿'''
+Hedging de requests para recortar la cola de latencia
+
+Si una llamada de un tipo de prompt sensible a la latencia no produjo su
+primer token en el p95 observado para ese tipo, se manda un duplicado
+(preferentemente por otra key del pool). Gana el primero en responder; el
+otro se cierra si es un stream o se descarta su resultado si no.
+Los duplicados tienen un tope: una fracción de las llamadas elegibles y un
+presupuesto de tokens extra.
+'''
+import math
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, TimeoutError, wait
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional, Tuple, TypeVar
+
+from .usage_ledger import UsageLedger
+
+T = TypeVar('T')
+
+
+@dataclass
+class HedgeStats:
+    '''Contadores de hedging (por cliente LLM)'''
+    eligible: int = 0
+    hedged: int = 0
+    # Veces que el duplicado respondió antes que el original
+    backup_wins: int = 0
+    # Tokens estimados de los duplicados (se pagan aunque pierdan)
+    extra_tokens: int = 0
+
+    @property
+    def rate(self) -> float:
+        return self.hedged / self.eligible if self.eligible else 0.0
+
+
+class HedgePolicy:
+    '''
+    Decide qué llamadas se duplican y cuándo.
+
+    El umbral es el cuantil `quantile` del tiempo al primer token de las
+    últimas llamadas del mismo tipo (ledger de uso); sin historial
+    suficiente se usa default_delay_s.
+    '''
+
+    def __init__(
+        self,
+        tasks: Iterable[str],
+        ledger: Optional[UsageLedger] = None,
+        quantile: float = 0.95,
+        min_samples: int = 5,
+        min_delay_s: float = 1.0,
+        default_delay_s: float = 8.0,
+        max_rate: float = 0.1,
+        budget_tokens: int = 50_000
+    ):
+        self.tasks = set(tasks)
+        self.ledger = ledger
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay_s = min_delay_s
+        self.default_delay_s = default_delay_s
+        self.max_rate = max_rate
+        self.budget_tokens = budget_tokens
+        self.stats = HedgeStats()
+        self._lock = threading.Lock()
+
+    def applies(self, task: Optional[str]) -> bool:
+        return task is not None and task in self.tasks
+
+    def delay(self, task: str) -> float:
+        '''Segundos a esperar el primer token antes de mandar el duplicado'''
+        samples = []
+        if self.ledger is not None:
+            samples = sorted(
+                r.first_token_s for r in self.ledger.records(task)[-100:] if r.first_token_s is not None
+            )
+        if len(samples) < self.min_samples:
+            return self.default_delay_s
+        rank = max(0, math.ceil(self.quantile * len(samples)) - 1)
+        return max(self.min_delay_s, samples[rank])
+
+    def reset(self):
+        '''Reinicia contadores y presupuesto (nueva corrida)'''
+        with self._lock:
+            self.stats = HedgeStats()
+
+    def count_eligible(self):
+        with self._lock:
+            self.stats.eligible += 1
+
+    def allow(self) -> bool:
+        '''Si hay presupuesto para un duplicado más (tasa y tokens)'''
+        with self._lock:
+            within_rate = self.stats.hedged < 1 + self.max_rate * self.stats.eligible
+            return within_rate and self.stats.extra_tokens < self.budget_tokens
+
+    def record(self, backup_won: bool, extra_tokens: int):
+        with self._lock:
+            self.stats.hedged += 1
+            self.stats.backup_wins += int(backup_won)
+            self.stats.extra_tokens += extra_tokens
+
+
+def run_hedged(
+    attempt: Callable[[int], T],
+    delay: float,
+    executor: Executor,
+    allow: Callable[[], bool],
+    discard: Optional[Callable[[T], None]] = None
+) -> Tuple[T, bool, bool]:
+    '''
+    Corre attempt(0); si no terminó en delay segundos (y allow() lo permite)
+    lanza attempt(1) y se queda con el primero que termine bien.
+
+    Args:
+        attempt: Recibe 0 (original) o 1 (duplicado); "terminar" es tener el primer token
+        delay: Segundos antes de duplicar
+        executor: Donde corren los intentos
+        allow: Presupuesto de hedging
+        discard: Libera el resultado perdedor (ej. cerrar el stream)
+
+    Returns:
+        (resultado, hubo duplicado, ganó el duplicado)
+    '''
+    primary = executor.submit(attempt, 0)
+    try:
+        return primary.result(timeout=delay), False, False
+    except TimeoutError:
+        pass
+    if not allow():
+        return primary.result(), False, False
+
+    backup = executor.submit(attempt, 1)
+    pending = {primary, backup}
+    winner = None
+    error: Optional[BaseException] = None
+    while pending and winner is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+            elif winner is None:
+                winner = future
+
+    # El perdedor sigue en vuelo: se libera apenas termine
+    def release(future):
+        if discard is not None and future.exception() is None:
+            discard(future.result())
+    for future in pending:
+        future.add_done_callback(release)
+
+    if winner is None:
+        raise error
+    return winner.result(), True, winner is backup
+
+
+def get_hedge_policy() -> Optional[HedgePolicy]:
+    '''Política según config.yaml (None si el hedging está deshabilitado)'''
+    from .settings import get_setting
+    from .usage_ledger import get_usage_ledger
+
+    if not get_setting('llm.hedging.enabled', False):
+        return None
+    return HedgePolicy(
+        tasks=get_setting('llm.hedging.tasks', ['report', 'subtopics']),
+        ledger=get_usage_ledger(),
+        quantile=get_setting('llm.hedging.quantile', 0.95),
+        min_delay_s=get_setting('llm.hedging.min_delay_s', 1.0),
+        default_delay_s=get_setting('llm.hedging.default_delay_s', 8.0),
+        max_rate=get_setting('llm.hedging.max_rate', 0.1),
+        budget_tokens=get_setting('llm.hedging.budget_tokens', 50_000),
+    )
@@ -0,0 +1,148 @@
+﻿'''
+Transporte HTTP compartido por todas las instancias de LLMClient del proceso
+'''
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_WARMUP_URLS = ['https://api.groq.com']
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class SharedHTTPPool:
+    '''
+    Pool de conexiones keep-alive (HTTP/2 si está instalado `h2`) con
+    estadísticas de reuso. Reusar conexiones evita el TCP + TLS handshake
+    en cada llamada corta al LLM.
+
+    Variables de entorno:
+    - LLM_POOL_MAX_CONNECTIONS (default 20)
+    - LLM_POOL_MAX_KEEPALIVE (default 10)
+    - LLM_POOL_KEEPALIVE_EXPIRY segundos (default 90)
+    - LLM_HTTP2: 'auto' (default), '1' o '0'
+    '''
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None
+    ):
+        self.max_connections = max_connections or int(_env_float('LLM_POOL_MAX_CONNECTIONS', 20))
+        self.max_keepalive = max_keepalive or int(_env_float('LLM_POOL_MAX_KEEPALIVE', 10))
+        self.keepalive_expiry = keepalive_expiry or _env_float('LLM_POOL_KEEPALIVE_EXPIRY', 90.0)
+
+        if http2 is None:
+            setting = os.getenv('LLM_HTTP2', 'auto').lower()
+            http2 = _http2_available() if setting == 'auto' else setting in ('1', 'true', 'yes')
+        self.http2 = http2 and _http2_available()
+
+        import httpx
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'new_connections': 0,
+            'tls_handshakes': 0,
+            'tls_seconds': 0.0,
+        }
+
+        self.client = httpx.Client(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            event_hooks={'request': [self._attach_trace]},
+        )
+
+    def _attach_trace(self, request: 'httpx.Request'):
+        '''Engancha el trace de httpcore para contar conexiones nuevas vs reusadas'''
+        tls_started: List[float] = []
+
+        def trace(event_name: str, info: Dict):
+            if event_name == 'connection.connect_tcp.complete':
+                with self._lock:
+                    self._stats['new_connections'] += 1
+            elif event_name == 'connection.start_tls.started':
+                tls_started.append(time.perf_counter())
+            elif event_name == 'connection.start_tls.complete' and tls_started:
+                with self._lock:
+                    self._stats['tls_handshakes'] += 1
+                    self._stats['tls_seconds'] += time.perf_counter() - tls_started.pop()
+
+        with self._lock:
+            self._stats['requests'] += 1
+        request.extensions['trace'] = trace
+
+    def warm_up(self, urls: Optional[List[str]] = None, background: bool = False) -> Optional[threading.Thread]:
+        '''
+        Abre conexiones por adelantado (TCP + TLS) para que la primera
+        llamada al LLM no pague el handshake.
+        '''
+        import httpx
+
+        urls = urls or DEFAULT_WARMUP_URLS
+
+        def _run():
+            for url in urls:
+                try:
+                    self.client.head(url, timeout=5.0)
+                except httpx.HTTPError:
+                    pass
+
+        if background:
+            thread = threading.Thread(target=_run, name='http-warmup', daemon=True)
+            thread.start()
+            return thread
+
+        _run()
+        return None
+
+    def stats(self) -> Dict:
+        '''Estadísticas de reuso de conexiones'''
+        with self._lock:
+            stats = dict(self._stats)
+
+        reused = max(stats['requests'] - stats['new_connections'], 0)
+        stats['reused_connections'] = reused
+        stats['reuse_ratio'] = reused / stats['requests'] if stats['requests'] else 0.0
+        stats['avg_tls_seconds'] = (
+            stats['tls_seconds'] / stats['tls_handshakes'] if stats['tls_handshakes'] else 0.0
+        )
+        stats['http2'] = self.http2
+        return stats
+
+    def close(self):
+        self.client.close()
+
+
+_shared_pool: Optional[SharedHTTPPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_pool() -> SharedHTTPPool:
+    '''Retorna el pool del proceso (se crea la primera vez)'''
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = SharedHTTPPool()
+        return _shared_pool
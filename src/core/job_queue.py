@@ -0,0 +1,386 @@
+﻿'''
+Cola de trabajos durable y almacenamiento de estado compartido (SQLite)
+'''
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_DB_PATH = os.path.join('.queue', 'research.db')
+
+
+@dataclass
+class Job:
+    '''Trabajo tomado de la cola por un worker'''
+    id: str
+    run_id: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    worker_id: Optional[str] = None
+
+
+class JobQueue:
+    '''
+    Cola durable compartida entre procesos (o nodos, si la base vive en
+    almacenamiento compartido).
+
+    Cada job se toma con un lease: el worker debe hacer heartbeat antes de que
+    expire. Si el worker muere, el lease vence y el job vuelve a la cola para
+    que otro worker lo reintente (hasta max_attempts).
+    '''
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 3
+    ):
+        self.db_path = db_path or os.getenv('RESEARCH_QUEUE_DB', DEFAULT_DB_PATH)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        '''Abre una conexión con transacción explícita (BEGIN IMMEDIATE)'''
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    run_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    worker_id TEXT,
+                    lease_until REAL,
+                    available_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, available_at);
+                CREATE INDEX IF NOT EXISTS idx_jobs_run ON jobs(run_id, kind, status);
+
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS task_results (
+                    run_id TEXT NOT NULL,
+                    task_key TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, task_key)
+                );
+
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker_id TEXT PRIMARY KEY,
+                    last_seen REAL NOT NULL,
+                    current_job TEXT
+                );
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def enqueue(
+        self,
+        run_id: str,
+        kind: str,
+        payload: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> str:
+        '''
+        Encola un job. Si se pasa job_id y ya existe, no se duplica
+        (permite encolado idempotente desde varios workers).
+
+        Returns:
+            ID del job
+        '''
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute(
+                '''INSERT OR IGNORE INTO jobs
+                   (id, run_id, kind, payload, max_attempts, available_at, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                (job_id, run_id, kind, json.dumps(payload or {}),
+                 max_attempts or self.max_attempts, now, now, now)
+            )
+
+        return job_id
+
+    def claim(self, worker_id: str, kinds: Optional[List[str]] = None) -> Optional[Job]:
+        '''
+        Toma el próximo job disponible y le asigna un lease al worker.
+        Antes de buscar, devuelve a la cola los jobs con lease vencido.
+        '''
+        now = time.time()
+
+        with self._connect() as conn:
+            self._requeue_expired(conn, now)
+
+            query = "SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ?"
+            params: List[Any] = [now]
+            if kinds:
+                query += f" AND kind IN ({','.join('?' for _ in kinds)})"
+                params.extend(kinds)
+            query += ' ORDER BY available_at, created_at LIMIT 1'
+
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                self._touch_worker(conn, worker_id, None, now)
+                return None
+
+            conn.execute(
+                '''UPDATE jobs SET status = 'running', worker_id = ?, attempts = attempts + 1,
+                   lease_until = ?, updated_at = ? WHERE id = ?''',
+                (worker_id, now + self.lease_seconds, now, row['id'])
+            )
+            self._touch_worker(conn, worker_id, row['id'], now)
+
+            return Job(
+                id=row['id'],
+                run_id=row['run_id'],
+                kind=row['kind'],
+                payload=json.loads(row['payload']),
+                attempts=row['attempts'] + 1,
+                worker_id=worker_id
+            )
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        '''
+        Extiende el lease de un job en ejecución.
+        Retorna False si el worker ya no es dueño del job (lease perdido).
+        '''
+        now = time.time()
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                '''UPDATE jobs SET lease_until = ?, updated_at = ?
+                   WHERE id = ? AND worker_id = ? AND status = 'running' ''',
+                (now + self.lease_seconds, now, job_id, worker_id)
+            )
+            self._touch_worker(conn, worker_id, job_id, now)
+            return cursor.rowcount == 1
+
+    def ack(self, job_id: str, worker_id: str) -> bool:
+        '''Marca un job como completado'''
+        now = time.time()
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                '''UPDATE jobs SET status = 'done', lease_until = NULL, updated_at = ?
+                   WHERE id = ? AND worker_id = ? AND status = 'running' ''',
+                (now, job_id, worker_id)
+            )
+            self._touch_worker(conn, worker_id, None, now)
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> str:
+        '''
+        Registra un fallo. El job se reintenta con backoff exponencial
+        hasta agotar max_attempts; después queda en estado 'failed'.
+
+        Returns:
+            Nuevo estado del job ('queued' o 'failed')
+        '''
+        now = time.time()
+
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker_id = ?',
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return 'unknown'
+
+            if row['attempts'] >= row['max_attempts']:
+                status, available_at = 'failed', now
+            else:
+                status, available_at = 'queued', now + min(2 ** row['attempts'], 60)
+
+            conn.execute(
+                '''UPDATE jobs SET status = ?, worker_id = NULL, lease_until = NULL,
+                   available_at = ?, updated_at = ?, error = ? WHERE id = ?''',
+                (status, available_at, now, error[:2000], job_id)
+            )
+            self._touch_worker(conn, worker_id, None, now)
+            return status
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float):
+        '''
+        Devuelve a la cola los jobs cuyo worker dejó de hacer heartbeat.
+        Los que ya agotaron sus intentos quedan para expire_leases().
+        '''
+        conn.execute(
+            '''UPDATE jobs SET status = 'queued', worker_id = NULL, lease_until = NULL,
+               available_at = ?, updated_at = ?
+               WHERE status = 'running' AND lease_until < ? AND attempts < max_attempts''',
+            (now, now, now)
+        )
+
+    def expire_leases(self) -> List[Job]:
+        '''
+        Marca 'failed' los jobs cuyo lease venció en el último intento (el
+        worker murió) y los devuelve, para que pasen por el mismo manejo que
+        un job que falló con una excepción.
+        '''
+        now = time.time()
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                '''SELECT * FROM jobs
+                   WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts''',
+                (now,)
+            ).fetchall()
+            for row in rows:
+                conn.execute(
+                    '''UPDATE jobs SET status = 'failed', worker_id = NULL, lease_until = NULL,
+                       updated_at = ?, error = 'lease expired' WHERE id = ?''',
+                    (now, row['id'])
+                )
+
+        return [
+            Job(
+                id=row['id'],
+                run_id=row['run_id'],
+                kind=row['kind'],
+                payload=json.loads(row['payload']),
+                attempts=row['attempts'],
+                worker_id=row['worker_id']
+            )
+            for row in rows
+        ]
+
+    def _touch_worker(self, conn: sqlite3.Connection, worker_id: str, job_id: Optional[str], now: float):
+        conn.execute(
+            '''INSERT INTO workers (worker_id, last_seen, current_job) VALUES (?, ?, ?)
+               ON CONFLICT(worker_id) DO UPDATE SET last_seen = excluded.last_seen,
+               current_job = excluded.current_job''',
+            (worker_id, now, job_id)
+        )
+
+    def count(self, run_id: str, kind: Optional[str] = None, statuses: Optional[List[str]] = None) -> int:
+        '''Cuenta jobs de una corrida, opcionalmente filtrando por tipo y estado'''
+        query = 'SELECT COUNT(*) FROM jobs WHERE run_id = ?'
+        params: List[Any] = [run_id]
+        if kind:
+            query += ' AND kind = ?'
+            params.append(kind)
+        if statuses:
+            query += f" AND status IN ({','.join('?' for _ in statuses)})"
+            params.extend(statuses)
+
+        with self._connect() as conn:
+            return conn.execute(query, params).fetchone()[0]
+
+    def job_status(self, job_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return row['status'] if row else None
+
+    def stats(self) -> Dict[str, int]:
+        '''Cantidad de jobs por estado (para monitoreo)'''
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+            return {row['status']: row['n'] for row in rows}
+
+    # ------------------------------------------------------------------
+    # Estado de corridas
+    # ------------------------------------------------------------------
+
+    def create_run(self, topic: str, state: Dict[str, Any], run_id: Optional[str] = None) -> str:
+        run_id = run_id or uuid.uuid4().hex[:12]
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO runs (run_id, topic, status, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (run_id, topic, 'queued', json.dumps(state), now, now)
+            )
+
+        return run_id
+
+    def load_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        '''Retorna {'run_id', 'topic', 'status', 'state'} o None si no existe'''
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'run_id': row['run_id'],
+            'topic': row['topic'],
+            'status': row['status'],
+            'state': json.loads(row['state']),
+        }
+
+    def update_run(self, run_id: str, status: Optional[str] = None, state_updates: Optional[Dict[str, Any]] = None):
+        '''Actualiza estado de una corrida (merge atómico de claves del estado)'''
+        with self._connect() as conn:
+            row = conn.execute('SELECT status, state FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+            if row is None:
+                raise KeyError(f'Run {run_id} no existe')
+
+            state = json.loads(row['state'])
+            state.update(state_updates or {})
+
+            conn.execute(
+                'UPDATE runs SET status = ?, state = ?, updated_at = ? WHERE run_id = ?',
+                (status or row['status'], json.dumps(state), time.time(), run_id)
+            )
+
+    def save_result(self, run_id: str, task_key: str, result: Dict[str, Any]):
+        '''Guarda el resultado de una tarea (idempotente ante reintentos)'''
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO task_results (run_id, task_key, result, created_at) VALUES (?, ?, ?, ?)',
+                (run_id, task_key, json.dumps(result), time.time())
+            )
+
+    def load_results(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT task_key, result FROM task_results WHERE run_id = ?', (run_id,)
+            ).fetchall()
+        return {row['task_key']: json.loads(row['result']) for row in rows}
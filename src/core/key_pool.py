@@ -0,0 +1,246 @@
+﻿'''
+Pool de API keys / endpoints compatibles con OpenAI con health score por key
+'''
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Literal, Optional
+from urllib.parse import urlparse
+
+# El SDK de Groq agrega este prefijo a cada request (/openai/v1/chat/completions)
+GROQ_API_PREFIX = '/openai/v1'
+
+# Con streaming la latencia medida es hasta los headers; sin streaming, la respuesta completa
+CallMode = Literal['stream', 'complete']
+
+
+@dataclass
+class Endpoint:
+    '''Una credencial (y opcionalmente un base_url alternativo) del pool'''
+    api_key: str
+    base_url: Optional[str] = None
+    name: str = ''
+
+    # Salud y telemetría
+    health: float = 1.0
+    # Latencia reciente por modo de llamada (no son comparables entre sí)
+    latency_ewma: Dict[str, float] = field(default_factory=dict)
+    remaining_requests: Optional[int] = None
+    limit_requests: Optional[int] = None
+    remaining_tokens: Optional[int] = None
+    limit_tokens: Optional[int] = None
+    cooldown_until: float = 0.0
+    consecutive_failures: int = 0
+    successes: int = 0
+    failures: int = 0
+    client: Any = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if not self.name:
+            host = urlparse(self.base_url).netloc if self.base_url else 'groq'
+            self.name = f'{host}:…{self.api_key[-4:]}'
+
+    @property
+    def sdk_base_url(self) -> Optional[str]:
+        '''base_url para el SDK de Groq: sin el /openai/v1 que el SDK vuelve a agregar'''
+        if not self.base_url:
+            return None
+        url = self.base_url.rstrip('/')
+        return url[:-len(GROQ_API_PREFIX)] if url.endswith(GROQ_API_PREFIX) else url
+
+    @property
+    def quota_ratio(self) -> float:
+        '''Fracción de cuota de tokens restante (1.0 si no se conoce)'''
+        if self.remaining_tokens is None or not self.limit_tokens:
+            return 1.0
+        return max(0.0, min(1.0, self.remaining_tokens / self.limit_tokens))
+
+    @property
+    def request_ratio(self) -> float:
+        '''Fracción de requests restantes en la ventana (1.0 si no se conoce)'''
+        if self.remaining_requests is None:
+            return 1.0
+        if not self.limit_requests:
+            return 0.0 if self.remaining_requests <= 0 else 1.0
+        return max(0.0, min(1.0, self.remaining_requests / self.limit_requests))
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    '''Parsea duraciones de headers de rate limit: "7.66s", "2m59.56s", "120ms", "30"'''
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r'([\d.]+)(ms|h|m|s)', value):
+        matched = True
+        amount = float(amount)
+        total += {'ms': amount / 1000, 's': amount, 'm': amount * 60, 'h': amount * 3600}[unit]
+
+    return total if matched else None
+
+
+class KeyPool:
+    '''
+    Selecciona la key para cada llamada según cuota restante, latencia reciente
+    y salud. Las keys con 429 o 5xx entran en cooldown y pierden health score,
+    que se recupera con las llamadas exitosas.
+    '''
+
+    def __init__(self, endpoints: Iterable[Endpoint], latency_alpha: float = 0.3):
+        self.endpoints: List[Endpoint] = list(endpoints)
+        self.latency_alpha = latency_alpha
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'KeyPool':
+        '''
+        Construye el pool desde variables de entorno:
+        - GROQ_API_KEYS: varias keys de Groq separadas por coma
+        - GROQ_API_KEY: key única (compatibilidad)
+        - LLM_ENDPOINTS: mirrors de la API de Groq "base_url|api_key" separados por coma;
+          base_url es el prefijo hasta /chat/completions (ej. https://host/openai/v1)
+        '''
+        endpoints: List[Endpoint] = []
+        seen = set()
+
+        keys = [k.strip() for k in os.getenv('GROQ_API_KEYS', '').split(',') if k.strip()]
+        single_key = os.getenv('GROQ_API_KEY')
+        if single_key:
+            keys.insert(0, single_key.strip())
+
+        for key in keys:
+            if key not in seen:
+                seen.add(key)
+                endpoints.append(Endpoint(api_key=key))
+
+        for entry in os.getenv('LLM_ENDPOINTS', '').split(','):
+            if '|' not in entry:
+                continue
+            base_url, key = (part.strip() for part in entry.split('|', 1))
+            if base_url and key:
+                endpoints.append(Endpoint(api_key=key, base_url=base_url))
+
+        return cls(endpoints)
+
+    def score(self, endpoint: Endpoint, mode: CallMode = 'complete') -> float:
+        '''
+        Mayor es mejor. Pesa la cuota más ajustada (tokens o requests) y la
+        latencia del mismo modo de llamada; las keys sin latencia medida en
+        ese modo se prueban primero.
+        '''
+        latency = endpoint.latency_ewma.get(mode, 0.0)
+        headroom = min(endpoint.quota_ratio, endpoint.request_ratio)
+        return endpoint.health * (0.2 + 0.8 * headroom) / (1.0 + latency)
+
+    def select(self, exclude: Iterable[str] = (), mode: CallMode = 'complete') -> Optional[Endpoint]:
+        '''
+        Elige la mejor key disponible. Si todas están en cooldown, retorna la
+        que se libera antes. Retorna None si todas están excluidas.
+        '''
+        excluded = set(exclude)
+        now = time.time()
+
+        with self._lock:
+            candidates = [ep for ep in self.endpoints if ep.name not in excluded]
+            if not candidates:
+                return None
+
+            available = [ep for ep in candidates if ep.cooldown_until <= now]
+            if not available:
+                return min(candidates, key=lambda ep: ep.cooldown_until)
+
+            return max(available, key=lambda ep: self.score(ep, mode))
+
+    def record_success(
+        self,
+        endpoint: Endpoint,
+        latency: float,
+        headers: Optional[Dict[str, str]] = None,
+        mode: CallMode = 'complete'
+    ):
+        with self._lock:
+            endpoint.successes += 1
+            endpoint.consecutive_failures = 0
+            endpoint.health = min(1.0, endpoint.health * 0.8 + 0.2)
+
+            previous = endpoint.latency_ewma.get(mode)
+            endpoint.latency_ewma[mode] = latency if previous is None else (
+                self.latency_alpha * latency + (1 - self.latency_alpha) * previous
+            )
+
+            self._update_quota(endpoint, headers or {})
+
+    def record_failure(
+        self,
+        endpoint: Endpoint,
+        status_code: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        '''Registra un fallo (429, 5xx o error de conexión) y aplica cooldown'''
+        headers = headers or {}
+
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            endpoint.health = max(0.05, endpoint.health * 0.5)
+            self._update_quota(endpoint, headers)
+
+            if status_code == 429:
+                wait = (
+                    parse_duration(headers.get('retry-after'))
+                    or parse_duration(headers.get('x-ratelimit-reset-tokens'))
+                    or parse_duration(headers.get('x-ratelimit-reset-requests'))
+                    or 5.0
+                )
+            else:
+                wait = min(2.0 ** endpoint.consecutive_failures, 60.0)
+
+            endpoint.cooldown_until = time.time() + wait
+
+    def _update_quota(self, endpoint: Endpoint, headers: Dict[str, str]):
+        def as_int(name: str) -> Optional[int]:
+            try:
+                return int(float(headers[name]))
+            except (KeyError, TypeError, ValueError):
+                return None
+
+        remaining_requests = as_int('x-ratelimit-remaining-requests')
+        limit_requests = as_int('x-ratelimit-limit-requests')
+        remaining_tokens = as_int('x-ratelimit-remaining-tokens')
+        limit_tokens = as_int('x-ratelimit-limit-tokens')
+
+        if remaining_requests is not None:
+            endpoint.remaining_requests = remaining_requests
+        if limit_requests is not None:
+            endpoint.limit_requests = limit_requests
+        if remaining_tokens is not None:
+            endpoint.remaining_tokens = remaining_tokens
+        if limit_tokens is not None:
+            endpoint.limit_tokens = limit_tokens
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        '''Estado de cada key (para métricas y debugging)'''
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    'name': ep.name,
+                    'health': round(ep.health, 3),
+                    'latency_ewma': {mode: round(value, 3) for mode, value in ep.latency_ewma.items()},
+                    'remaining_requests': ep.remaining_requests,
+                    'remaining_tokens': ep.remaining_tokens,
+                    'cooling_down': ep.cooldown_until > now,
+                    'successes': ep.successes,
+                    'failures': ep.failures,
+                }
+                for ep in self.endpoints
+            ]
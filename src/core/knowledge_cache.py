@@ -0,0 +1,167 @@
+﻿'''
+Caché de conocimiento entre corridas: análisis del curator por subtema (SQLite)
+
+La clave no es el prompt sino el subtema normalizado (tema principal, título,
+descripción) más una versión que controlamos: cambios menores en el template
+del prompt no invalidan la caché; si el formato del análisis cambia de verdad,
+se sube KNOWLEDGE_VERSION.
+'''
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from ..models.schemas import CuratedContent
+
+KNOWLEDGE_VERSION = 1
+DEFAULT_DB_PATH = os.path.join('.cache', 'knowledge.db')
+
+
+def normalize_text(text: str) -> str:
+    '''Minúsculas, sin acentos ni puntuación y con espacios colapsados'''
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    return ' '.join(text.split())
+
+
+def knowledge_key(topic: str, title: str, description: str, version: int = KNOWLEDGE_VERSION) -> str:
+    '''Clave estable del subtema: sha1 de la versión y los campos normalizados'''
+    parts = [str(version), normalize_text(topic), normalize_text(title), normalize_text(description)]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class KnowledgeCache:
+    '''
+    Guarda CuratedContent por subtema con TTL y un tope de tamaño total.
+
+    Al superar max_bytes se descartan primero las entradas usadas hace más
+    tiempo (LRU). Cada operación abre su propia conexión, así que la caché se
+    puede compartir entre threads y procesos.
+    '''
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl_seconds: float = 30 * 24 * 3600,
+        max_bytes: int = 50 * 1024 * 1024,
+        version: int = KNOWLEDGE_VERSION
+    ):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.version = version
+        self._ready = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # El archivo se crea recién con el primer uso
+        if not self._ready:
+            self._init_schema()
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS knowledge (
+                    key TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    topic TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_knowledge_used ON knowledge(last_used);
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+        self._ready = True
+
+    def get(self, topic: str, title: str, description: str) -> Optional[CuratedContent]:
+        '''Retorna el análisis guardado si existe y no venció'''
+        key = knowledge_key(topic, title, description, self.version)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT content, created_at FROM knowledge WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute('DELETE FROM knowledge WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE knowledge SET last_used = ? WHERE key = ?', (now, key))
+        return CuratedContent.model_validate_json(row[0])
+
+    def put(self, topic: str, title: str, description: str, content: CuratedContent):
+        '''Guarda (o reemplaza) el análisis del subtema y aplica el tope de tamaño'''
+        key = knowledge_key(topic, title, description, self.version)
+        payload = content.model_dump_json()
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO knowledge '
+                '(key, version, topic, title, content, size, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, self.version, topic, title, payload, len(payload.encode('utf-8')), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        '''Borra lo vencido y, si todavía sobra, lo menos usado recientemente'''
+        conn.execute('DELETE FROM knowledge WHERE created_at < ?', (now - self.ttl_seconds,))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM knowledge').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in conn.execute('SELECT key, size FROM knowledge ORDER BY last_used ASC'):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany('DELETE FROM knowledge WHERE key = ?', stale)
+
+    def stats(self) -> dict:
+        '''Cantidad de entradas y bytes ocupados'''
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM knowledge'
+            ).fetchone()
+        return {'entries': entries, 'bytes': size}
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM knowledge')
+
+
+def get_knowledge_cache() -> Optional[KnowledgeCache]:
+    '''Caché de conocimiento según config.yaml (None si está deshabilitada)'''
+    from .settings import get_setting
+
+    if not get_setting('agents.curator.knowledge_cache.enabled', True):
+        return None
+    return KnowledgeCache(
+        db_path=os.getenv('RESEARCH_KNOWLEDGE_DB', get_setting('agents.curator.knowledge_cache.path', DEFAULT_DB_PATH)),
+        ttl_seconds=get_setting('agents.curator.knowledge_cache.ttl_days', 30) * 24 * 3600,
+        max_bytes=int(get_setting('agents.curator.knowledge_cache.max_mb', 50) * 1024 * 1024),
+    )
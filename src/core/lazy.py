@@ -0,0 +1,30 @@
+﻿'''
+Exports perezosos para los __init__ de los paquetes (PEP 562)
+
+Los módulos se importan recién cuando se accede al nombre, así arrancar el
+CLI no carga langgraph, groq ni pydantic.
+'''
+import sys
+from importlib import import_module
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    '''
+    Args:
+        package: __name__ del paquete
+        exports: nombre exportado → módulo relativo que lo define (ej. '.curator')
+
+    Returns:
+        (__getattr__, __dir__) para asignar en el __init__
+    '''
+    def __getattr__(name: str):
+        if name in exports:
+            return getattr(import_module(exports[name], package), name)
+        raise AttributeError(f'module {package!r} has no attribute {name!r}')
+
+    def __dir__() -> List[str]:
+        # Lo ya definido en el paquete (submódulos importados incluidos) más los exports
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
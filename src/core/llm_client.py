@@ -1,21 +1,64 @@
-﻿from groq import Groq
-from typing import List, Dict, Optional
-import os
-from dotenv import load_dotenv
+﻿from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Optional, Sequence
+import itertools
+import threading
+import time
 from rich.console import Console
+from .env import load_env
+from .key_pool import Endpoint, KeyPool
+from .http_pool import get_shared_pool
+from .hedging import HedgePolicy, get_hedge_policy, run_hedged
+from .usage_ledger import UsageRecord, get_usage_ledger
 
-load_dotenv()
 console = Console()
 
+def _failover_errors() -> tuple:
+    """Errores ante los que conviene probar con otra key/endpoint"""
+    import groq
+    return (groq.RateLimitError, groq.InternalServerError, groq.APIConnectionError)
+
 class LLMClient:
     """Cliente para interactuar con Groq API (compatible con OpenAI)"""
     
-    def __init__(self):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
+    def __init__(self, endpoints: Optional[List[Endpoint]] = None):
+        # El SDK de Groq se importa recién al crear el primer cliente
+        from groq import Groq
+        
+        load_env()
+        self.pool = KeyPool(endpoints) if endpoints else KeyPool.from_env()
+        if not self.pool.endpoints:
             raise ValueError("GROQ_API_KEY no encontrada en .env")
         
-        self.client = Groq(api_key=api_key)
+        # Todas las instancias comparten el pool de conexiones del proceso
+        self.http_pool = get_shared_pool()
+        
+        # Con varias keys el failover lo hace el pool, no los reintentos del SDK
+        max_retries = 2 if len(self.pool.endpoints) == 1 else 0
+        for endpoint in self.pool.endpoints:
+            endpoint.client = Groq(
+                api_key=endpoint.api_key,
+                base_url=endpoint.sdk_base_url,
+                max_retries=max_retries,
+                http_client=self.http_pool.client
+            )
+        
+        # Cliente principal (compatibilidad)
+        self.client = self.pool.endpoints[0].client
+        
+        # El curator llama desde varios threads: el último uso es por thread
+        self._local = threading.local()
+        
+        # Requests duplicados ante latencias de cola (opt-in en config.yaml)
+        self.hedging: Optional[HedgePolicy] = get_hedge_policy()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        # Recibe (modelo, tokens estimados) del request perdedor de cada hedge
+        # para cobrarlo en el costo de la corrida (ver SupervisorAgent)
+        self.on_hedge_cost: Optional[Callable[[str, int], None]] = None
+    
+    @property
+    def last_usage(self) -> Optional[UsageRecord]:
+        """Tokens reales (o estimados si la API no los informa) de la última llamada de este thread"""
+        return getattr(self._local, 'last_usage', None)
     
     def generate(
         self,
@@ -24,7 +67,12 @@ class LLMClient:
         temperature: float = 0.7,
         max_tokens: int = 2000,
         system_message: Optional[str] = None,
-        stream: bool = False
+        stream: bool = False,
+        response_format: Optional[Dict[str, str]] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        stop: Optional[List[str]] = None,
+        task: Optional[str] = None,
+        escalation: int = 0
     ) -> str:
         """
         Genera una respuesta usando el modelo especificado.
@@ -36,6 +84,14 @@ class LLMClient:
             max_tokens: Máximo de tokens a generar
             system_message: Mensaje de sistema opcional
             stream: Si True, retorna un generator para streaming
+            response_format: Ej. {"type": "json_object"} para JSON mode (si el
+                modelo no lo soporta se reintenta sin él)
+            on_chunk: Con stream=True, recibe cada fragmento a medida que llega
+                (en lugar de imprimirlo)
+            stop: Secuencias que cortan la generación (no se incluyen en la respuesta)
+            task: Tipo de prompt; si se indica, el uso real queda en el ledger
+                para aprender la longitud de las respuestas
+            escalation: Escalamientos de la cascada hasta esta llamada (para el ledger)
         
         Returns:
             Respuesta generada por el modelo
@@ -47,51 +103,225 @@ class LLMClient:
         
         messages.append({"role": "user", "content": prompt})
         
+        extra = {'response_format': response_format} if response_format else {}
+        if stop:
+            extra['stop'] = stop
+        start = time.perf_counter()
+        
+        request = dict(model=model, messages=messages, temperature=temperature, max_tokens=max_tokens, **extra)
+        # Hedging solo para los tipos de prompt sensibles a la latencia
+        hedge = self.hedging if self.hedging is not None and self.hedging.applies(task) else None
+        if hedge is not None:
+            hedge.count_eligible()
+        
         try:
             if not stream:
                 # Modo normal (sin streaming)
                 console.print(f'[dim]🤖 Calling {model} via Groq...[/dim]')
                 
-                response = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
+                hedged = False
+                if hedge is None:
+                    response = self._create_with_format(**request)
+                else:
+                    response, hedged, backup_won = self._hedged(
+                        hedge, task, lambda **kwargs: self._create_with_format(**request, **kwargs)
+                    )
                 
-                return response.choices[0].message.content.strip()
+                content = response.choices[0].message.content.strip()
+                record = self._record_usage(
+                    task, model, max_tokens, messages, content, start,
+                    getattr(response, 'usage', None), getattr(response.choices[0], 'finish_reason', None),
+                    escalation, hedged=hedged
+                )
+                if hedged:
+                    self._charge_hedge(hedge, backup_won, model, record)
+                return content
             
             else:
                 # Modo streaming
                 console.print(f'[dim]🤖 Streaming from {model} via Groq...[/dim]')
-                console.print()
+                if on_chunk is None:
+                    console.print()
                 
-                stream_response = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    stream=True
-                )
+                def open_stream(**kwargs):
+                    # "Responder" es recibir el primer chunk
+                    stream_response = self._create_with_format(**request, stream=True, **kwargs)
+                    chunks = iter(stream_response)
+                    first = next(chunks, None)
+                    return stream_response, itertools.chain([first] if first is not None else [], chunks)
+                
+                hedged = False
+                if hedge is None:
+                    stream_response, chunks = open_stream()
+                else:
+                    (stream_response, chunks), hedged, backup_won = self._hedged(
+                        hedge, task, open_stream, discard=lambda opened: opened[0].close()
+                    )
                 
                 full_response = ""
+                usage = finish_reason = first_token_s = None
                 
-                for chunk in stream_response:
+                for chunk in chunks:
+                    if first_token_s is None:
+                        first_token_s = time.perf_counter() - start
+                    # Groq informa el uso en el último chunk (x_groq.usage)
+                    usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or getattr(chunk, 'usage', None) or usage
+                    if not chunk.choices:
+                        continue
+                    finish_reason = getattr(chunk.choices[0], 'finish_reason', None) or finish_reason
                     if chunk.choices[0].delta.content:
                         content = chunk.choices[0].delta.content
                         full_response += content
-                        # Imprimir en tiempo real
-                        console.print(content, end='', style='cyan')
+                        if on_chunk is not None:
+                            on_chunk(content)
+                        else:
+                            # Imprimir en tiempo real
+                            console.print(content, end='', style='cyan')
                 
-                console.print()  # Salto de línea final
-                console.print()
+                if on_chunk is None:
+                    console.print()  # Salto de línea final
+                    console.print()
                 
+                record = self._record_usage(
+                    task, model, max_tokens, messages, full_response, start, usage, finish_reason,
+                    escalation, first_token_s=first_token_s, hedged=hedged
+                )
+                if hedged:
+                    self._charge_hedge(hedge, backup_won, model, record)
                 return full_response.strip()
         
         except Exception as e:
             console.print(f'[red]❌ Error calling LLM: {e}[/red]')
             raise
     
+    def _record_usage(
+        self,
+        task: Optional[str],
+        model: str,
+        max_tokens: int,
+        messages: List[Dict[str, str]],
+        content: str,
+        start: float,
+        usage=None,
+        finish_reason: Optional[str] = None,
+        escalation: int = 0,
+        first_token_s: Optional[float] = None,
+        hedged: bool = False
+    ) -> UsageRecord:
+        """Guarda el uso de la llamada en last_usage y, si tiene tipo de prompt, en el ledger"""
+        latency = time.perf_counter() - start
+        record = UsageRecord(
+            task=task or '',
+            model=model,
+            prompt_tokens=getattr(usage, 'prompt_tokens', None)
+                or self.count_tokens_estimate(''.join(m['content'] for m in messages)),
+            completion_tokens=getattr(usage, 'completion_tokens', None) or self.count_tokens_estimate(content),
+            max_tokens=max_tokens,
+            finish_reason=finish_reason if isinstance(finish_reason, str) else None,
+            latency_s=latency,
+            escalation=escalation,
+            # Sin streaming, el primer token llega con la respuesta completa
+            first_token_s=first_token_s if first_token_s is not None else latency,
+            hedged=hedged
+        )
+        self._local.last_usage = record
+        
+        ledger = get_usage_ledger() if task else None
+        if ledger is not None:
+            try:
+                ledger.record(record)
+            except OSError as e:
+                console.print(f'[dim]⚠️  No se pudo escribir el ledger de uso: {e}[/dim]')
+        return record
+    
+    def _charge_hedge(self, hedge: HedgePolicy, backup_won: bool, model: str, record: UsageRecord):
+        """
+        Los dos requests salieron: el perdedor se estima con los tokens del
+        ganador (mismo prompt, salida parecida) y se cobra aparte.
+        """
+        extra_tokens = record.prompt_tokens + record.completion_tokens
+        hedge.record(backup_won, extra_tokens)
+        if self.on_hedge_cost is not None:
+            self.on_hedge_cost(model, extra_tokens)
+    
+    def _hedged(self, hedge: HedgePolicy, task: str, create: Callable, discard: Optional[Callable] = None):
+        """
+        Corre create() y, si no respondió para el p95 de este tipo de prompt, un
+        duplicado por otra key (si hay). Retorna (resultado, hubo duplicado, ganó el duplicado).
+        """
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedge')
+        # El original anota las keys que usa para que el duplicado las evite
+        used: List[str] = []
+        
+        def attempt(index: int):
+            if index == 0:
+                return create(used=used)
+            console.print(f'[dim]⚡ Sin respuesta en {delay:.1f}s, duplicando el request ({task})[/dim]')
+            return create(avoid=list(used))
+        
+        delay = hedge.delay(task)
+        return run_hedged(attempt, delay, self._hedge_executor, hedge.allow, discard)
+    
+    def _create_with_format(self, avoid: Sequence[str] = (), used: Optional[List[str]] = None, **kwargs):
+        """Llamada con response_format; si el modelo lo rechaza (400) se repite sin él"""
+        if 'response_format' not in kwargs:
+            return self._create_with_failover(avoid, used, **kwargs)
+        
+        import groq
+        try:
+            return self._create_with_failover(avoid, used, **kwargs)
+        except groq.BadRequestError as e:
+            console.print(f'[dim]↩️  {kwargs["model"]} rechazó response_format ({e.status_code}), reintentando sin JSON mode[/dim]')
+            kwargs.pop('response_format')
+            return self._create_with_failover(avoid, used, **kwargs)
+    
+    def _create_with_failover(self, avoid: Sequence[str] = (), used: Optional[List[str]] = None, **kwargs):
+        """
+        Ejecuta la llamada eligiendo key por cuota, latencia y salud.
+        Ante 429/5xx/errores de conexión prueba con la siguiente key del pool.
+        
+        Args:
+            avoid: Keys a usar solo si no queda otra (ej. las del request original al duplicarlo)
+            used: Si se pasa, se le agregan los nombres de las keys que se usan
+        """
+        failover_errors = _failover_errors()
+        tried: List[str] = []
+        last_error: Optional[Exception] = None
+        
+        mode = 'stream' if kwargs.get('stream') else 'complete'
+        while True:
+            endpoint = self.pool.select(exclude=tried + list(avoid), mode=mode) or self.pool.select(exclude=tried, mode=mode)
+            if endpoint is None:
+                break
+            tried.append(endpoint.name)
+            if used is not None:
+                used.append(endpoint.name)
+            
+            # Si todas las keys están en cooldown, esperar a la primera que se libera
+            wait = endpoint.cooldown_until - time.time()
+            if wait > 0:
+                console.print(f'[dim]⏳ Todas las keys en cooldown, esperando {wait:.1f}s...[/dim]')
+                time.sleep(min(wait, 60.0))
+            
+            start = time.perf_counter()
+            try:
+                raw = endpoint.client.chat.completions.with_raw_response.create(**kwargs)
+            except failover_errors as e:
+                status_code = getattr(e, 'status_code', None)
+                response = getattr(e, 'response', None)
+                headers = dict(response.headers) if response is not None else {}
+                self.pool.record_failure(endpoint, status_code, headers)
+                last_error = e
+                if len(self.pool.endpoints) > 1:
+                    console.print(f'[yellow]⚠️  {endpoint.name} falló ({status_code or type(e).__name__}), probando otra key...[/yellow]')
+                continue
+            
+            self.pool.record_success(endpoint, time.perf_counter() - start, dict(raw.headers), mode=mode)
+            return raw.parse()
+        
+        raise last_error
+    
     def count_tokens_estimate(self, text: str) -> int:
         """
         Estimación simple de tokens (aproximadamente 4 chars = 1 token)
@@ -0,0 +1,341 @@
+﻿'''
+Simulador "what-if" de políticas de ruteo sobre el uso registrado
+
+Re-juega el ledger de uso (una fila por llamada real: tipo de prompt,
+modelo, tokens, latencia) con políticas alternativas de CostOptimizer:
+otro mapeo de tiers, otros umbrales simple_task_max_tokens /
+complex_task_min_tokens, con o sin cascada y con o sin hedging. Costo,
+latencia p50/p95 y throughput se calculan vectorizados con NumPy.
+
+Uso:
+    python -m src.core.policy_simulator
+    python -m src.core.policy_simulator --ledger .cache/usage.jsonl --simple-max 300 --complex-min 800
+'''
+import argparse
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..models.enums import TaskComplexity
+from .cost_optimizer import TIER_ORDER, CostOptimizer, ModelType
+from .usage_ledger import UsageRecord
+
+# Complejidad con la que cada tipo de prompt pide modelo (ver select_model en los agentes)
+TASK_COMPLEXITY = {
+    'subtopics': TaskComplexity.SIMPLE,
+    'subtopics_survey': TaskComplexity.SIMPLE,
+    'query_expansion': TaskComplexity.SIMPLE,
+    'analysis': TaskComplexity.MODERATE,
+    'report': TaskComplexity.CRITICAL,
+    'report_section': TaskComplexity.CRITICAL,
+    'report_frame': TaskComplexity.CRITICAL,
+}
+_COMPLEXITY_CODES = {
+    TaskComplexity.SIMPLE: 0, TaskComplexity.MODERATE: 1, TaskComplexity.COMPLEX: 2, TaskComplexity.CRITICAL: 3,
+}
+# Tipos de prompt que corren en cascada (investigator y curator)
+CASCADE_TASKS = ('subtopics', 'subtopics_survey', 'analysis')
+DEFAULT_PRICE = 0.0001
+
+
+def _seconds(values) -> np.ndarray:
+    '''Segundos opcionales a float64 (None → NaN)'''
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+@dataclass
+class RoutingPolicy:
+    '''Política de ruteo a simular'''
+    name: str
+    # tier → modelo
+    models: Dict[str, str]
+    simple_task_max_tokens: int = 500
+    complex_task_min_tokens: int = 1000
+    cascade: bool = True
+    # Tier más alto al que escalan los análisis del curator
+    curator_max_tier: ModelType = 'moderate'
+    # Todas las llamadas en un tier fijo (ej: "todo caro"), sin cascada
+    force_tier: Optional[ModelType] = None
+    hedging: bool = False
+    hedge_tasks: Sequence[str] = ('report', 'subtopics')
+    hedge_quantile: float = 0.95
+    hedge_max_rate: float = 0.1
+
+    @classmethod
+    def from_optimizer(cls, optimizer: CostOptimizer, name: str = 'Política actual', **overrides) -> 'RoutingPolicy':
+        '''La política vigente (config.yaml + variables de entorno), con cambios opcionales'''
+        from .settings import get_setting
+
+        policy = cls(
+            name=name,
+            models=dict(optimizer.models),
+            simple_task_max_tokens=optimizer.simple_task_max_tokens,
+            complex_task_min_tokens=optimizer.complex_task_min_tokens,
+            cascade=optimizer.cascade,
+            curator_max_tier=optimizer.curator_max_tier,
+            hedging=get_setting('llm.hedging.enabled', False),
+            hedge_tasks=tuple(get_setting('llm.hedging.tasks', ['report', 'subtopics'])),
+            hedge_quantile=get_setting('llm.hedging.quantile', 0.95),
+            hedge_max_rate=get_setting('llm.hedging.max_rate', 0.1),
+        )
+        return replace(policy, **overrides)
+
+
+@dataclass
+class PolicyResult:
+    '''Métricas de una política sobre el historial re-jugado'''
+    name: str
+    # Llamadas esperadas, con escalamientos y duplicados
+    calls: float
+    cost: float
+    p50_s: float
+    p95_s: float
+    # Tokens procesados por segundo de llamada
+    throughput_tps: float
+    escalations: float = 0.0
+    hedges: int = 0
+
+
+class PolicySimulator:
+    '''
+    Re-juega llamadas registradas bajo otras políticas.
+
+    Cada primer intento se re-rutea con la política; los escalamientos de
+    la cascada se agregan con la tasa observada por tipo de prompt (en el
+    costo como valor esperado, en la latencia sorteados con semilla fija).
+    La latencia en otro modelo se escala por los segundos por token de
+    salida medidos para cada modelo.
+    '''
+
+    def __init__(self, records: Sequence[UsageRecord], prices: Dict[str, float], seed: int = 0):
+        self.prices = prices
+        self.seed = seed
+        self.records = list(records)
+        first = [r for r in self.records if r.escalation == 0]
+
+        self.tasks = np.array([r.task for r in first], dtype=object)
+        self.observed_models = np.array([r.model for r in first], dtype=object)
+        self.tokens = np.array([r.prompt_tokens + r.completion_tokens for r in first], dtype=np.float64)
+        self.completion = np.array([r.completion_tokens for r in first], dtype=np.float64)
+        self.latency = _seconds(r.latency_s for r in first)
+        # Sin streaming el primer token llega con la respuesta completa
+        self.first_token = _seconds(r.latency_s if r.first_token_s is None else r.first_token_s for r in first)
+        # Tipos de prompt desconocidos se tratan como CRITICAL (conservan el modelo más caro)
+        self.complexity = np.array(
+            [_COMPLEXITY_CODES[TASK_COMPLEXITY.get(r.task, TaskComplexity.CRITICAL)] for r in first], dtype=np.int8
+        )
+        self.cascade_mask = np.isin(self.tasks, CASCADE_TASKS)
+
+        # Escalamientos por primer intento, por tipo de prompt
+        escalated: Dict[str, int] = {}
+        for record in self.records:
+            if record.escalation > 0:
+                escalated[record.task] = escalated.get(record.task, 0) + 1
+        unique_tasks, counts = np.unique(self.tasks, return_counts=True) if len(first) else ([], [])
+        rates = {task: escalated.get(task, 0) / count for task, count in zip(unique_tasks, counts)}
+        self.escalation_rate = np.array([rates[task] for task in self.tasks], dtype=np.float64)
+
+        # Segundos por token de salida de cada modelo (mediana de lo observado)
+        self.seconds_per_token: Dict[str, float] = {}
+        valid = ~np.isnan(self.latency) & (self.completion > 0)
+        for model in np.unique(self.observed_models[valid]) if valid.any() else []:
+            mask = valid & (self.observed_models == model)
+            self.seconds_per_token[model] = float(np.median(self.latency[mask] / self.completion[mask]))
+        self._observed_spt = np.array(
+            [self.seconds_per_token.get(model, np.nan) for model in self.observed_models], dtype=np.float64
+        )
+
+    @classmethod
+    def from_ledger(cls, ledger, prices: Optional[Dict[str, float]] = None, since: float = 0.0) -> 'PolicySimulator':
+        '''Simulador sobre los registros del ledger posteriores a `since` (timestamp)'''
+        records = [r for r in ledger.records() if r.timestamp >= since]
+        return cls(records, prices if prices is not None else CostOptimizer.PRICES)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def _price(self, model: str) -> float:
+        return self.prices.get(model, DEFAULT_PRICE) / 1000
+
+    def route(self, policy: RoutingPolicy) -> np.ndarray:
+        '''Índice de tier (en TIER_ORDER) de cada primer intento: route_tier vectorizado'''
+        if policy.force_tier is not None:
+            return np.full(len(self), TIER_ORDER.index(policy.force_tier), dtype=np.int8)
+        c, tokens = self.complexity, self.tokens
+        tiers = np.select(
+            [
+                c == 0,
+                (c == 1) & (tokens < policy.simple_task_max_tokens),
+                c == 1,
+                (c == 2) & (tokens >= policy.complex_task_min_tokens),
+                c == 2,
+            ],
+            [0, 0, 1, 2, 1],
+            default=2
+        ).astype(np.int8)
+        if policy.cascade:
+            # La cascada arranca siempre en el tier barato
+            tiers[self.cascade_mask] = 0
+        return tiers
+
+    def _tier_tables(self, policy: RoutingPolicy):
+        '''Precio, segundos por token y tier siguiente (-1 = no hay) de cada tier'''
+        models = [policy.models[tier] for tier in TIER_ORDER]
+        price = np.array([self._price(model) for model in models])
+        spt = np.array([self.seconds_per_token.get(model, np.nan) for model in models])
+        next_tier = np.array([
+            next((j for j in range(i + 1, len(models)) if models[j] != models[i]), -1)
+            for i in range(len(models))
+        ])
+        return price, spt, next_tier
+
+    def _scaled_latency(self, spt_new: np.ndarray) -> np.ndarray:
+        # Sin medición de alguno de los dos modelos se conserva la latencia observada
+        ratio = spt_new / self._observed_spt
+        return self.latency * np.where(np.isfinite(ratio), ratio, 1.0)
+
+    def simulate(self, policy: RoutingPolicy) -> PolicyResult:
+        '''Costo y latencias esperados si el historial hubiese corrido con `policy`'''
+        if not len(self):
+            return PolicyResult(policy.name, 0, 0.0, 0.0, 0.0, 0.0)
+
+        tiers = self.route(policy)
+        price, spt, next_tier = self._tier_tables(policy)
+        cost = self.tokens * price[tiers]
+        latency = self._scaled_latency(spt[tiers])
+        tokens = self.tokens.copy()
+
+        # Cascada: una fracción escala al tier siguiente (y paga de nuevo)
+        escalations = 0.0
+        if policy.cascade and policy.force_tier is None:
+            nxt = next_tier[tiers]
+            capped = (self.tasks == 'analysis') & (nxt > TIER_ORDER.index(policy.curator_max_tier))
+            can_escalate = self.cascade_mask & (nxt >= 0) & ~capped
+            rate = np.where(can_escalate, self.escalation_rate, 0.0)
+            nxt = np.where(can_escalate, nxt, 0)
+            cost = cost + rate * self.tokens * price[nxt]
+            tokens = tokens + rate * self.tokens
+            escalations = float(rate.sum())
+            drawn = np.random.default_rng(self.seed).random(len(self)) < rate
+            latency = latency + np.where(drawn, self._scaled_latency(spt[nxt]), 0.0)
+
+        # Hedging: pasado el cuantil del primer token se duplica la llamada
+        hedges = 0
+        if policy.hedging:
+            latency, cost, tokens, hedges = self._hedge(policy, latency, cost, tokens, price[tiers])
+
+        measured = ~np.isnan(latency)
+        busy = latency[measured].sum()
+        return PolicyResult(
+            name=policy.name,
+            calls=len(self) + escalations + hedges,
+            cost=float(cost.sum()),
+            p50_s=float(np.percentile(latency[measured], 50)) if measured.any() else 0.0,
+            p95_s=float(np.percentile(latency[measured], 95)) if measured.any() else 0.0,
+            throughput_tps=float(tokens[measured].sum() / busy) if busy > 0 else 0.0,
+            escalations=escalations,
+            hedges=hedges,
+        )
+
+    def _hedge(self, policy: RoutingPolicy, latency, cost, tokens, unit_price):
+        '''
+        Un duplicado lanzado en el cuantil `hedge_quantile` del primer token
+        termina (en mediana) delay + latencia mediana del tipo; se paga igual.
+        '''
+        latency, cost, tokens = latency.copy(), cost.copy(), tokens.copy()
+        hedges = 0
+        for task in policy.hedge_tasks:
+            mask = (self.tasks == task) & ~np.isnan(latency)
+            if not mask.any():
+                continue
+            delay = np.quantile(self.first_token[mask], policy.hedge_quantile)
+            backup = delay + np.median(latency[mask])
+            candidates = mask & (self.first_token > delay)
+            # Mismo tope que HedgePolicy.allow: duplicados < 1 + max_rate * elegibles
+            eligible = np.cumsum(mask)
+            order = np.cumsum(candidates)
+            hedged = candidates & (order - 1 < 1 + policy.hedge_max_rate * eligible)
+            latency = np.where(hedged, np.minimum(latency, backup), latency)
+            cost = cost + np.where(hedged, self.tokens * unit_price, 0.0)
+            tokens = tokens + np.where(hedged, self.tokens, 0.0)
+            hedges += int(hedged.sum())
+        return latency, cost, tokens, hedges
+
+    def observed(self, name: str = 'Tu sistema') -> PolicyResult:
+        '''Lo que efectivamente pasó (todas las llamadas, con sus escalamientos)'''
+        if not self.records:
+            return PolicyResult(name, 0, 0.0, 0.0, 0.0, 0.0)
+        tokens = np.array([r.prompt_tokens + r.completion_tokens for r in self.records], dtype=np.float64)
+        cost = tokens * np.array([self._price(r.model) for r in self.records])
+        latency = _seconds(r.latency_s for r in self.records)
+        measured = ~np.isnan(latency)
+        busy = latency[measured].sum()
+        return PolicyResult(
+            name=name,
+            calls=len(self.records),
+            cost=float(cost.sum()),
+            p50_s=float(np.percentile(latency[measured], 50)) if measured.any() else 0.0,
+            p95_s=float(np.percentile(latency[measured], 95)) if measured.any() else 0.0,
+            throughput_tps=float(tokens[measured].sum() / busy) if busy > 0 else 0.0,
+            escalations=float(sum(r.escalation > 0 for r in self.records)),
+            hedges=sum(r.hedged for r in self.records),
+        )
+
+    def compare(self, policies: Sequence[RoutingPolicy]) -> List[PolicyResult]:
+        return [self.simulate(policy) for policy in policies]
+
+
+def standard_policies(optimizer: CostOptimizer) -> List[RoutingPolicy]:
+    '''Alternativas para comparar con la política vigente'''
+    current = RoutingPolicy.from_optimizer(optimizer)
+    return [
+        replace(current, name='Todo modelo caro', force_tier='expensive', cascade=False),
+        current,
+        replace(current, name='Sin cascada' if current.cascade else 'Con cascada', cascade=not current.cascade),
+        replace(current, name='Sin hedging' if current.hedging else 'Con hedging', hedging=not current.hedging),
+        replace(current, name='Todo modelo barato', force_tier='cheap', cascade=False),
+    ]
+
+
+def main():
+    from rich.console import Console
+    from rich.table import Table
+    from .usage_ledger import UsageLedger, get_usage_ledger
+
+    parser = argparse.ArgumentParser(description='Simula políticas de ruteo sobre el ledger de uso')
+    parser.add_argument('--ledger', help='Archivo JSONL (default: el de config.yaml)')
+    parser.add_argument('--simple-max', type=int, help='simple_task_max_tokens alternativo')
+    parser.add_argument('--complex-min', type=int, help='complex_task_min_tokens alternativo')
+    args = parser.parse_args()
+
+    ledger = UsageLedger(args.ledger) if args.ledger else get_usage_ledger()
+    if ledger is None:
+        print('El ledger de uso está deshabilitado (llm.usage_ledger.enabled)')
+        return
+
+    optimizer = CostOptimizer()
+    simulator = PolicySimulator.from_ledger(ledger, optimizer.PRICES)
+    policies = standard_policies(optimizer)
+    if args.simple_max is not None or args.complex_min is not None:
+        current = RoutingPolicy.from_optimizer(optimizer)
+        policies.append(replace(
+            current,
+            name=f'Umbrales {args.simple_max or current.simple_task_max_tokens}/{args.complex_min or current.complex_task_min_tokens}',
+            simple_task_max_tokens=args.simple_max or current.simple_task_max_tokens,
+            complex_task_min_tokens=args.complex_min or current.complex_task_min_tokens,
+        ))
+
+    table = Table(title=f'{len(simulator.records)} llamadas re-jugadas', header_style='bold cyan')
+    for column in ('Política', 'Llamadas', 'Costo', 'p50', 'p95', 'Tokens/s'):
+        table.add_column(column, justify='left' if column == 'Política' else 'right')
+    for result in [simulator.observed()] + simulator.compare(policies):
+        table.add_row(
+            result.name, f'{result.calls:.0f}', f'${result.cost:.4f}',
+            f'{result.p50_s:.1f}s', f'{result.p95_s:.1f}s', f'{result.throughput_tps:.0f}'
+        )
+    Console().print(table)
+
+
+if __name__ == '__main__':
+    main()
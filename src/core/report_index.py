@@ -0,0 +1,193 @@
+﻿'''
+Índice de reportes generados (reports/.index.json) para detectar corridas repetidas
+
+Cada reporte guarda al lado un sidecar JSON con el contenido curado, así una
+corrida casi igual puede devolver el reporte existente o reutilizar los
+subtemas que coinciden y curar solo los distintos.
+'''
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..models.schemas import CuratedContent, Finding
+from ..utils.text_features import char_ngrams, char_vectors, hash_counts, l2_normalize
+
+INDEX_FILENAME = '.index.json'
+SIGNATURE_FEATURES = 2 ** 12
+
+
+def text_signature(text: str) -> Dict[int, float]:
+    '''
+    Firma compacta del texto: n-gramas de caracteres hasheados (TF sublineal,
+    norma L2) guardados como {bucket: peso}. No depende de otros documentos,
+    así que se puede comparar contra firmas guardadas hace semanas.
+    '''
+    counts = hash_counts([char_ngrams(text)], SIGNATURE_FEATURES)
+    vector = l2_normalize(np.log1p(counts))[0]
+    nonzero = np.flatnonzero(vector)
+    return {int(i): round(float(vector[i]), 4) for i in nonzero}
+
+
+def signature_similarity(a: Dict[int, float], b: Dict[int, float]) -> float:
+    '''Coseno entre dos firmas (ya normalizadas)'''
+    if len(a) > len(b):
+        a, b = b, a
+    return float(sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items()))
+
+
+def sidecar_path(report_path: str) -> str:
+    '''reports/tema_20250101_120000.md → reports/tema_20250101_120000.json'''
+    return os.path.splitext(report_path)[0] + '.json'
+
+
+@dataclass
+class ReportEntry:
+    '''Un reporte indexado'''
+    path: str
+    topic: str
+    subtopics: List[str]
+    created_at: float
+    signature: Dict[int, float] = field(default_factory=dict)
+
+    @property
+    def age_days(self) -> float:
+        return (time.time() - self.created_at) / 86400
+
+
+class ReportIndex:
+    '''
+    Índice JSON de los reportes de un directorio.
+
+    Las entradas cuyo archivo ya no existe se descartan al leer; el índice
+    conserva como máximo max_entries reportes (los más recientes).
+    '''
+
+    def __init__(self, reports_dir: str = './reports', max_entries: int = 500):
+        self.reports_dir = reports_dir
+        self.index_path = os.path.join(reports_dir, INDEX_FILENAME)
+        self.max_entries = max_entries
+
+    def entries(self) -> List[ReportEntry]:
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                raw = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+        entries = []
+        for item in raw.get('reports', []):
+            if not os.path.exists(item['path']):
+                continue
+            item['signature'] = {int(k): v for k, v in item.get('signature', {}).items()}
+            entries.append(ReportEntry(**item))
+        return entries
+
+    def add(
+        self,
+        topic: str,
+        report_path: str,
+        curated_content: List[CuratedContent],
+        findings: Optional[List[Finding]] = None
+    ) -> ReportEntry:
+        '''Escribe el sidecar del reporte y lo agrega al índice'''
+        entry = ReportEntry(
+            path=report_path,
+            topic=topic,
+            subtopics=[content.topic for content in curated_content],
+            created_at=time.time(),
+            signature=text_signature(topic),
+        )
+
+        sidecar = {
+            'topic': topic,
+            'created_at': entry.created_at,
+            'findings': [f.model_dump(mode='json') for f in findings or []],
+            'curated_content': [content.model_dump(mode='json') for content in curated_content],
+        }
+        self._write_json(sidecar_path(report_path), sidecar)
+
+        entries = [e for e in self.entries() if e.path != report_path]
+        entries.append(entry)
+        entries = entries[-self.max_entries:]
+        self._write_json(self.index_path, {'reports': [asdict(e) for e in entries]})
+        return entry
+
+    def find_similar(
+        self,
+        topic: str,
+        threshold: float = 0.8,
+        max_age_days: Optional[float] = None
+    ) -> Optional[Tuple[ReportEntry, float]]:
+        '''
+        Busca el reporte reciente con el tema más parecido.
+
+        Returns:
+            (entrada, similitud) o None si ninguno supera el umbral
+        '''
+        signature = text_signature(topic)
+        best: Optional[Tuple[ReportEntry, float]] = None
+        for entry in self.entries():
+            if max_age_days is not None and entry.age_days > max_age_days:
+                continue
+            similarity = signature_similarity(signature, entry.signature)
+            if similarity >= threshold and (best is None or similarity > best[1]
+                                            or (similarity == best[1] and entry.created_at > best[0].created_at)):
+                best = (entry, similarity)
+        return best
+
+    @staticmethod
+    def load_sidecar(report_path: str) -> Optional[dict]:
+        '''Contenido curado guardado junto al reporte (None si no existe)'''
+        try:
+            with open(sidecar_path(report_path), encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        data['findings'] = [Finding.model_validate(f) for f in data.get('findings', [])]
+        data['curated_content'] = [CuratedContent.model_validate(c) for c in data.get('curated_content', [])]
+        return data
+
+    @staticmethod
+    def _write_json(path: str, data: dict):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def match_prior_subtopics(
+    findings: List[Finding],
+    prior: List[CuratedContent],
+    threshold: float = 0.6
+) -> Tuple[Dict[int, CuratedContent], List[Finding]]:
+    '''
+    Empareja findings nuevos con subtemas ya curados (coseno sobre títulos).
+
+    Returns:
+        (análisis reutilizables por ID de finding, findings que hay que curar)
+    '''
+    if not findings or not prior:
+        return {}, list(findings)
+
+    vectors = char_vectors([f.title for f in findings] + [c.topic for c in prior])
+    similarity = vectors[:len(findings)] @ vectors[len(findings):].T
+
+    reused: Dict[int, CuratedContent] = {}
+    pending: List[Finding] = []
+    taken = set()
+    for i, finding in enumerate(findings):
+        candidates = [j for j in np.argsort(-similarity[i]) if j not in taken]
+        if candidates and similarity[i, candidates[0]] >= threshold:
+            j = int(candidates[0])
+            taken.add(j)
+            reused[finding.id] = prior[j].model_copy(update={'topic': finding.title})
+        else:
+            pending.append(finding)
+    return reused, pending
@@ -0,0 +1,35 @@
+﻿'''
+Acceso a la configuración de config.yaml
+'''
+import os
+from functools import lru_cache
+from typing import Any
+
+CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'config.yaml'
+)
+
+
+@lru_cache(maxsize=1)
+def load_config() -> dict:
+    '''Lee config.yaml una sola vez (RESEARCH_CONFIG permite otra ruta)'''
+    path = os.getenv('RESEARCH_CONFIG', CONFIG_PATH)
+    try:
+        import yaml
+        with open(path, encoding='utf-8-sig') as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+
+
+def get_setting(key: str, default: Any = None) -> Any:
+    '''
+    Retorna un valor por ruta con puntos, ej: get_setting('web_search.max_results', 10)
+    '''
+    node: Any = load_config()
+    for part in key.split('.'):
+        if not isinstance(node, dict) or part not in node:
+            return default
+        node = node[part]
+    return node
@@ -0,0 +1,220 @@
+﻿'''
+Registro de uso real de cada llamada al LLM (JSONL) y modelo de longitud de salida
+
+Cada llamada con un tipo de prompt (task) deja una línea con los tokens
+reales que reportó la API. OutputLengthModel usa ese historial para fijar
+max_tokens (cuantil alto + margen) y la estimación de tokens que se le pasa
+a select_model, en lugar de valores fijos elegidos a ojo.
+'''
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Optional
+
+DEFAULT_LEDGER_PATH = os.path.join('.cache', 'usage.jsonl')
+
+
+@dataclass
+class UsageRecord:
+    '''Una llamada al LLM'''
+    task: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    max_tokens: int
+    # 'stop', 'length' (cortada por max_tokens), ...
+    finish_reason: Optional[str] = None
+    latency_s: Optional[float] = None
+    # Escalamientos de la cascada (0 = primer intento, en el tier más barato)
+    escalation: int = 0
+    # Tiempo hasta el primer token (sin streaming, igual a latency_s)
+    first_token_s: Optional[float] = None
+    # Si se mandó un duplicado (hedging)
+    hedged: bool = False
+    timestamp: float = 0.0
+
+    @property
+    def truncated(self) -> bool:
+        return self.finish_reason == 'length'
+
+
+class UsageLedger:
+    '''
+    Historial append-only en JSONL. En memoria se guardan los últimos
+    max_records registros; el archivo se compacta cuando duplica ese tamaño.
+    '''
+
+    def __init__(self, path: Optional[str] = None, max_records: int = 5000):
+        self.path = path or DEFAULT_LEDGER_PATH
+        self.max_records = max_records
+        self._records: Optional[Deque[UsageRecord]] = None
+        self._lines = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> Deque[UsageRecord]:
+        # El archivo se lee recién con el primer uso
+        if self._records is not None:
+            return self._records
+        self._records = deque(maxlen=self.max_records)
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    self._lines += 1
+                    try:
+                        self._records.append(UsageRecord(**json.loads(line)))
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+        return self._records
+
+    def record(self, record: UsageRecord):
+        '''Agrega una llamada al historial (y al archivo)'''
+        if not record.timestamp:
+            record.timestamp = time.time()
+        with self._lock:
+            records = self._load()
+            records.append(record)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self._lines >= 2 * self.max_records:
+                self._compact(records)
+            else:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(asdict(record)) + '\n')
+                self._lines += 1
+
+    def _compact(self, records: Deque[UsageRecord]):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(asdict(record)) + '\n')
+        os.replace(tmp, self.path)
+        self._lines = len(records)
+
+    def records(self, task: Optional[str] = None) -> List[UsageRecord]:
+        '''Registros en memoria, opcionalmente de un solo tipo de prompt'''
+        with self._lock:
+            records = list(self._load())
+        return [r for r in records if task is None or r.task == task]
+
+    def escalation_rate(self, task: Optional[str] = None) -> float:
+        '''Llamadas escaladas por cada primer intento'''
+        records = self.records(task)
+        first = sum(r.escalation == 0 for r in records)
+        return (len(records) - first) / first if first else 0.0
+
+    def hedge_rate(self, task: Optional[str] = None) -> float:
+        '''Fracción de llamadas con duplicado'''
+        records = self.records(task)
+        return sum(r.hedged for r in records) / len(records) if records else 0.0
+
+
+class OutputLengthModel:
+    '''
+    Predice la longitud de la respuesta por tipo de prompt a partir del ledger.
+
+    max_tokens = cuantil `quantile` de las últimas `window` respuestas x `margin`,
+    nunca por encima del valor fijo de antes (que queda como techo). Si
+    alguna respuesta reciente se cortó por max_tokens, el límite aprendido
+    no alcanza y se vuelve al techo.
+    '''
+
+    def __init__(
+        self,
+        ledger: UsageLedger,
+        quantile: float = 0.95,
+        margin: float = 1.2,
+        min_samples: int = 5,
+        window: int = 100,
+        floor: int = 64
+    ):
+        self.ledger = ledger
+        self.quantile = quantile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.window = window
+        self.floor = floor
+
+    def _recent(self, task: str) -> List[UsageRecord]:
+        return self.ledger.records(task)[-self.window:]
+
+    def predict(self, task: str) -> Optional[int]:
+        '''Cuantil de tokens de salida (None si no hay historial suficiente)'''
+        recent = self._recent(task)
+        if len(recent) < self.min_samples:
+            return None
+        lengths = sorted(r.completion_tokens for r in recent)
+        # Cuantil por rango más cercano (sin interpolar)
+        rank = max(0, math.ceil(self.quantile * len(lengths)) - 1)
+        return lengths[rank]
+
+    def max_tokens(self, task: str, default: int) -> int:
+        '''Límite de salida para la próxima llamada de este tipo'''
+        recent = self._recent(task)
+        predicted = self.predict(task)
+        if predicted is None or any(r.truncated for r in recent[-self.min_samples:]):
+            return default
+        return min(default, max(self.floor, math.ceil(predicted * self.margin)))
+
+    def estimated_tokens(self, task: str, prompt_tokens: int, default: int) -> int:
+        '''Tokens totales esperados (prompt + salida media) para select_model'''
+        recent = self._recent(task)
+        if len(recent) < self.min_samples:
+            return default
+        return prompt_tokens + round(sum(r.completion_tokens for r in recent) / len(recent))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        '''Por tipo de prompt: muestras, salida media, cuantil y tasa de truncado'''
+        by_task: Dict[str, List[UsageRecord]] = defaultdict(list)
+        for record in self.ledger.records():
+            by_task[record.task].append(record)
+        return {
+            task: {
+                'samples': len(records),
+                'mean_completion': sum(r.completion_tokens for r in records) / len(records),
+                'predicted': self.predict(task) or 0,
+                'truncation_rate': sum(r.truncated for r in records) / len(records),
+                'escalation_rate': self.ledger.escalation_rate(task),
+            }
+            for task, records in by_task.items()
+        }
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> Optional[UsageLedger]:
+    '''Ledger compartido del proceso según config.yaml (None si está deshabilitado)'''
+    global _ledger
+    from .settings import get_setting
+
+    if not get_setting('llm.usage_ledger.enabled', True):
+        return None
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger(
+                path=os.getenv('RESEARCH_USAGE_LEDGER', get_setting('llm.usage_ledger.path', DEFAULT_LEDGER_PATH)),
+                max_records=get_setting('llm.usage_ledger.max_records', 5000),
+            )
+        return _ledger
+
+
+def get_output_length_model() -> Optional[OutputLengthModel]:
+    '''Modelo de longitudes sobre el ledger compartido (None si está deshabilitado)'''
+    from .settings import get_setting
+
+    ledger = get_usage_ledger()
+    if ledger is None or not get_setting('llm.output_length.enabled', True):
+        return None
+    return OutputLengthModel(
+        ledger,
+        quantile=get_setting('llm.output_length.quantile', 0.95),
+        margin=get_setting('llm.output_length.margin', 1.2),
+        min_samples=get_setting('llm.output_length.min_samples', 5),
+        window=get_setting('llm.output_length.window', 100),
+    )
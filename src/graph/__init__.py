@@ -1,3 +1,8 @@
-﻿from .workflow import ResearchWorkflow
+﻿from ..core.lazy import lazy_exports
 
-__all__ = ['ResearchWorkflow']
+_EXPORTS = {
+    'ResearchWorkflow': '.workflow',
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
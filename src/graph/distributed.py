@@ -0,0 +1,285 @@
+﻿'''
+Ejecución distribuida del workflow sobre una cola de trabajos durable.
+
+Una corrida se divide en jobs:
+- investigate: un job por corrida (Investigator Agent)
+- curate: un job por finding aprobado (Curator Agent)
+- report: un job final cuando terminaron todas las curaciones (Reporter Agent)
+
+Cualquier cantidad de workers (procesos o nodos que compartan la base)
+toma jobs, hace heartbeat mientras trabaja y confirma con ack. Los agentes
+se reutilizan sin cambios.
+'''
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
+
+from ..core.job_queue import Job, JobQueue
+from ..models.schemas import CuratedContent, Finding
+from rich.console import Console
+
+console = Console()
+
+# Estados de una corrida distribuida
+RUN_QUEUED = 'queued'
+RUN_AWAITING_FEEDBACK = 'awaiting_feedback'
+RUN_CURATING = 'curating'
+RUN_REPORTING = 'reporting'
+RUN_COMPLETED = 'completed'
+RUN_FAILED = 'failed'
+
+
+class DistributedResearchWorkflow:
+    '''
+    Fachada para encolar corridas y entregar la validación humana.
+    No ejecuta agentes: eso lo hacen los ResearchWorker.
+    '''
+
+    def __init__(self, queue: Optional[JobQueue] = None):
+        self.queue = queue or JobQueue()
+
+    def submit(self, topic: str, survey: bool = False) -> str:
+        '''Crea una corrida y encola la investigación inicial'''
+        run_id = self.queue.create_run(topic, {
+            'topic': topic,
+            'survey_mode': survey,
+            'raw_findings': [],
+            'clusters': [],
+            'approved_findings': [],
+            'final_report': None,
+            'report_file_path': None,
+            'error': None,
+        })
+        self.queue.enqueue(run_id, 'investigate', {'topic': topic, 'survey': survey}, job_id=f'investigate:{run_id}')
+        return run_id
+
+    def status(self, run_id: str) -> Optional[Dict]:
+        '''Estado de la corrida más el avance de sus curaciones'''
+        run = self.queue.load_run(run_id)
+        if run is None:
+            return None
+
+        run['curate_pending'] = self.queue.count(run_id, 'curate', ['queued', 'running'])
+        run['curate_done'] = self.queue.count(run_id, 'curate', ['done'])
+        run['curate_failed'] = self.queue.count(run_id, 'curate', ['failed'])
+        return run
+
+    def get_findings(self, run_id: str) -> List[Finding]:
+        run = self.queue.load_run(run_id)
+        if run is None:
+            return []
+        return [Finding.model_validate(f) for f in run['state'].get('raw_findings', [])]
+
+    def submit_feedback(self, run_id: str, user_input: str) -> Optional[str]:
+        '''
+        Parsea el comando del usuario y encola un job de curación por finding aprobado.
+
+        Returns:
+            Mensaje de error o None si se encoló correctamente
+        '''
+        from ..agents.supervisor import SupervisorAgent
+        from ..utils.parsers import HumanInputParser
+
+        run = self.queue.load_run(run_id)
+        if run is None:
+            return f'❌ Run {run_id} no existe'
+        if run['status'] != RUN_AWAITING_FEEDBACK:
+            return f'❌ Run {run_id} no está esperando validación (estado: {run["status"]})'
+
+        findings = [Finding.model_validate(f) for f in run['state']['raw_findings']]
+        clusters = {c['id']: c['finding_ids'] for c in run['state'].get('clusters', [])}
+        feedback, error = HumanInputParser().parse(user_input, [f.id for f in findings], clusters)
+        if error:
+            return error
+
+        approved = SupervisorAgent.build_approved_findings(feedback, findings)
+        if not approved:
+            self.queue.update_run(run_id, RUN_COMPLETED, {'error': 'No se aprobó ningún subtema'})
+            return None
+
+        self.queue.update_run(run_id, RUN_CURATING, {
+            'human_feedback': feedback.model_dump(mode='json'),
+            'approved_findings': [f.model_dump(mode='json') for f in approved],
+        })
+
+        for finding in approved:
+            self.queue.enqueue(
+                run_id,
+                'curate',
+                {'topic': run['topic'], 'finding': finding.model_dump(mode='json')},
+                job_id=f'curate:{run_id}:{finding.id}'
+            )
+
+        return None
+
+    def wait_for(self, run_id: str, statuses: Tuple[str, ...], poll_interval: float = 1.0,
+                 timeout: Optional[float] = None) -> Dict:
+        '''Bloquea hasta que la corrida llegue a alguno de los estados indicados'''
+        start = time.time()
+        while True:
+            run = self.status(run_id)
+            if run is None or run['status'] in statuses or run['status'] == RUN_FAILED:
+                return run
+            if timeout is not None and time.time() - start > timeout:
+                return run
+            time.sleep(poll_interval)
+
+
+class ResearchWorker:
+    '''
+    Worker que procesa jobs de la cola usando los agentes existentes.
+    Mientras procesa un job, un thread renueva el lease (heartbeat).
+    '''
+
+    def __init__(
+        self,
+        queue: Optional[JobQueue] = None,
+        worker_id: Optional[str] = None,
+        poll_interval: float = 1.0,
+        output_dir: str = './reports'
+    ):
+        self.queue = queue or JobQueue()
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self.poll_interval = poll_interval
+        self.output_dir = output_dir
+        self._supervisor = None
+
+        self.handlers = {
+            'investigate': self._handle_investigate,
+            'curate': self._handle_curate,
+            'report': self._handle_report,
+        }
+
+    @property
+    def supervisor(self):
+        '''Inicializa los agentes recién cuando llega el primer job'''
+        if self._supervisor is None:
+            from ..agents.supervisor import SupervisorAgent
+            self._supervisor = SupervisorAgent()
+        return self._supervisor
+
+    def run_forever(self, max_jobs: Optional[int] = None, stop_when_idle: bool = False):
+        '''Loop principal del worker'''
+        console.print(f'[bold cyan]⚙️  Worker {self.worker_id} escuchando la cola[/bold cyan] [dim]({self.queue.db_path})[/dim]')
+        processed = 0
+
+        while max_jobs is None or processed < max_jobs:
+            if self.process_one():
+                processed += 1
+            elif stop_when_idle:
+                break
+            else:
+                time.sleep(self.poll_interval)
+
+        return processed
+
+    def process_one(self) -> bool:
+        '''Toma y procesa un job. Retorna False si la cola estaba vacía.'''
+        # Jobs cuyo worker murió durante el último intento: fallan como cualquier otro
+        for expired in self.queue.expire_leases():
+            console.print(f'[red]✗ {expired.kind} ({expired.id}) perdió el lease en su último intento[/red]')
+            self._on_job_failed(expired, 'lease expired')
+        
+        job = self.queue.claim(self.worker_id, list(self.handlers))
+        if job is None:
+            return False
+
+        console.print(f'[dim]▶ {job.kind} ({job.id}) intento {job.attempts}[/dim]')
+
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job, stop_heartbeat), daemon=True)
+        heartbeat.start()
+
+        try:
+            self.handlers[job.kind](job)
+        except Exception as e:
+            stop_heartbeat.set()
+            status = self.queue.fail(job.id, self.worker_id, f'{type(e).__name__}: {e}')
+            console.print(f'[red]✗ {job.kind} falló ({status}): {e}[/red]')
+            if status == 'failed':
+                self._on_job_failed(job, str(e))
+            return True
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join(timeout=1.0)
+
+        if not self.queue.ack(job.id, self.worker_id):
+            # El lease venció y el job es de otro worker: el resultado y el reporte le tocan a él
+            console.print(f'[yellow]⚠️  {job.kind} ({job.id}) terminó sin lease; se descarta el ack[/yellow]')
+            return True
+        if job.kind == 'curate':
+            self._maybe_enqueue_report(job.run_id)
+        console.print(f'[green]✓[/green] [dim]{job.kind} ({job.id}) completado[/dim]')
+        return True
+
+    def _heartbeat_loop(self, job: Job, stop: threading.Event):
+        interval = max(self.queue.lease_seconds / 3, 0.1)
+        while not stop.wait(interval):
+            if not self.queue.heartbeat(job.id, self.worker_id):
+                console.print(f'[yellow]⚠️  Lease perdido para {job.id}[/yellow]')
+                return
+
+    # ------------------------------------------------------------------
+    # Handlers
+    # ------------------------------------------------------------------
+
+    def _handle_investigate(self, job: Job):
+        investigator = self.supervisor.investigator
+        findings = investigator.investigate(job.payload['topic'], survey=job.payload.get('survey', False))
+        sources = investigator.last_sources
+        self.queue.update_run(job.run_id, RUN_AWAITING_FEEDBACK, {
+            'raw_findings': [f.model_dump(mode='json') for f in findings],
+            'clusters': [asdict(cluster) for cluster in investigator.last_clusters],
+            'sources': sources,
+        })
+        # Calentar la caché de fuentes mientras se espera la validación
+        self.supervisor.fetch_sources(sources)
+
+    def _handle_curate(self, job: Job):
+        finding = Finding.model_validate(job.payload['finding'])
+        run = self.queue.load_run(job.run_id)
+        # Con la caché caliente esto son GETs condicionales (304) o lecturas locales
+        documents = self.supervisor.fetch_sources(run['state'].get('sources', []) if run else [])
+        curated = self.supervisor.curator.curate([finding], job.payload['topic'], documents)
+        self.queue.save_result(job.run_id, f'curate:{finding.id}', curated[0].model_dump(mode='json'))
+
+    def _handle_report(self, job: Job):
+        run = self.queue.load_run(job.run_id)
+        results = self.queue.load_results(job.run_id)
+
+        # Respetar el orden de los findings aprobados
+        curated = []
+        for finding in run['state']['approved_findings']:
+            result = results.get(f'curate:{finding["id"]}')
+            if result is not None:
+                curated.append(CuratedContent.model_validate(result))
+
+        report, file_path = self.supervisor.reporter.generate_report(
+            run['topic'], curated, output_dir=self.output_dir
+        )
+        self.queue.update_run(job.run_id, RUN_COMPLETED, {
+            'final_report': report,
+            'report_file_path': file_path,
+        })
+
+    def _maybe_enqueue_report(self, run_id: str):
+        '''Cuando no quedan curaciones pendientes, encola el reporte (una sola vez)'''
+        if self.queue.count(run_id, 'curate', ['queued', 'running']) > 0:
+            return
+        if self.queue.count(run_id, 'curate', ['done']) == 0:
+            self.queue.update_run(run_id, RUN_FAILED, {'error': 'Todas las curaciones fallaron'})
+            return
+        self.queue.update_run(run_id, RUN_REPORTING)
+        self.queue.enqueue(run_id, 'report', {}, job_id=f'report:{run_id}')
+
+    def _on_job_failed(self, job: Job, error: str):
+        '''Un job agotó sus reintentos'''
+        if job.kind == 'curate':
+            # Reportar con lo que se haya podido curar
+            self._maybe_enqueue_report(job.run_id)
+        else:
+            self.queue.update_run(job.run_id, RUN_FAILED, {'error': error})
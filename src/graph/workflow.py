@@ -1,10 +1,13 @@
-﻿from langgraph.graph import StateGraph, END
-from ..models.state import ResearchState
+﻿from ..models.state import ResearchState
 from ..models.schemas import ExecutionMetrics
 from ..agents.supervisor import SupervisorAgent
+from ..core.report_index import ReportEntry, ReportIndex
+from ..core.budget import make_run_budget
+from ..core.settings import get_setting
 from rich.console import Console
 from rich.panel import Panel
 from datetime import datetime
+from typing import Optional
 
 console = Console()
 
@@ -21,8 +24,10 @@ class ResearchWorkflow:
         # Crear el grafo
         self.graph = self._build_graph()
     
-    def _build_graph(self) -> StateGraph:
+    def _build_graph(self) -> 'StateGraph':
         '''Construye el grafo de LangGraph con el Supervisor'''
+        # langgraph (y langchain_core) es la dependencia más pesada: se importa acá
+        from langgraph.graph import StateGraph, END
         
         workflow = StateGraph(ResearchState)
         
@@ -57,28 +62,52 @@ class ResearchWorkflow:
         else:
             return 'continue'
     
-    def run(self, topic: str) -> dict:
+    def run(
+        self,
+        topic: str,
+        survey: bool = False,
+        max_cost: Optional[float] = None,
+        deadline_s: Optional[float] = None,
+        interactive: bool = False
+    ) -> dict:
         '''
         Ejecuta el workflow completo.
         
         Args:
             topic: Tema a investigar
+            survey: Modo survey (decenas de subtemas validados por cluster)
+            max_cost: Costo máximo de la corrida (USD); al acercarse se degrada
+            deadline_s: Segundos de reloj (incluye la validación humana); al
+                vencer se entrega un reporte con lo que ya se curó
+            interactive: Si hay una terminal para preguntar (solo el CLI); sin
+                ella reuse: 'ask' no bloquea en input() y hace una corrida nueva
         
         Returns:
             Estado final con el reporte generado
         '''
         console.print(Panel.fit(
-            f'[bold]🔍 Iniciando Research Assistant[/bold]\n\nTema: {topic}',
+            f'[bold]🔍 Iniciando Research Assistant[/bold]\n\nTema: {topic}' + ('\nModo: survey' if survey else ''),
             border_style='cyan'
         ))
         
+        self.supervisor.budget = make_run_budget(max_cost, deadline_s)
+        if self.supervisor.budget is not None:
+            limits = ([f'costo máximo ${max_cost}'] if max_cost else []) + ([f'deadline {deadline_s:.0f}s'] if deadline_s else [])
+            console.print(f'[dim]💸 Presupuesto: {", ".join(limits)}[/dim]')
+        
         # Estado inicial
         initial_state: ResearchState = {
             'topic': topic,
+            'survey_mode': survey,
             'raw_findings': [],
+            'clusters': [],
+            'sources': [],
             'investigator_completed': False,
             'human_feedback': None,
             'awaiting_human_input': False,
+            'approved_findings': [],
+            'prior_curated': [],
+            'source_documents': [],
             'curated_content': [],
             'curator_completed': False,
             'final_report': None,
@@ -96,6 +125,14 @@ class ResearchWorkflow:
             'error': None
         }
         
+        # ¿Ya hay un reporte reciente sobre (casi) el mismo tema?
+        decision, entry = self._check_previous_reports(topic, interactive)
+        if decision == 'reuse':
+            return self._reuse_report(initial_state, entry)
+        if decision == 'partial':
+            sidecar = ReportIndex.load_sidecar(entry.path)
+            initial_state['prior_curated'] = sidecar['curated_content'] if sidecar else []
+        
         # Ejecutar el grafo
         try:
             final_state = self.graph.invoke(initial_state)
@@ -112,6 +149,95 @@ class ResearchWorkflow:
             console.print(f'\n[red]❌ Error durante la ejecución: {e}[/red]')
             raise
     
+    def refresh(self, report_path: str) -> dict:
+        '''
+        Actualiza un reporte existente regenerando solo las secciones que cambian.
+        
+        Args:
+            report_path: Reporte generado previamente (con su sidecar .json)
+        
+        Returns:
+            Estado final con el reporte actualizado
+        '''
+        console.print(Panel.fit(
+            f'[bold]🔄 Actualización incremental[/bold]\n\nReporte: {report_path}',
+            border_style='cyan'
+        ))
+        
+        final_state = self.supervisor.refresh_report(report_path)
+        self._display_final_summary(final_state)
+        return final_state
+    
+    def _check_previous_reports(self, topic: str, interactive: bool = False) -> tuple[Optional[str], Optional[ReportEntry]]:
+        '''
+        Busca un reporte reciente con un tema parecido y decide qué hacer
+        según output.report_index.reuse: 'ask' (preguntar), 'auto' (devolverlo)
+        u 'off'. Sin interactive, 'ask' no pregunta: sigue con una corrida nueva.
+        
+        Returns:
+            ('reuse' | 'partial' | None, entrada del índice)
+        '''
+        mode = get_setting('output.report_index.reuse', 'ask')
+        if mode == 'off' or not get_setting('output.report_index.enabled', True):
+            return None, None
+        
+        match = ReportIndex(get_setting('output.reports_dir', './reports')).find_similar(
+            topic,
+            threshold=get_setting('output.report_index.similarity_threshold', 0.85),
+            max_age_days=get_setting('output.report_index.max_age_days', 30)
+        )
+        if match is None:
+            return None, None
+        
+        entry, similarity = match
+        console.print()
+        console.print(Panel.fit(
+            f'[bold]♻️  Ya existe un reporte parecido[/bold] (similitud {similarity:.0%}, '
+            f'hace {entry.age_days:.1f} días)\n\n'
+            f'Tema: {entry.topic}\n'
+            f'Subtemas: {len(entry.subtopics)}\n'
+            f'Archivo: [cyan]{entry.path}[/cyan]',
+            border_style='yellow'
+        ))
+        
+        if mode == 'auto':
+            return 'reuse', entry
+        if not interactive:
+            console.print("[dim]  Sin terminal para preguntar: corrida nueva (output.report_index.reuse: auto para reutilizarlo)[/dim]")
+            return None, None
+        
+        console.print('[dim]  r → usar ese reporte · p → investigar de nuevo reutilizando los subtemas que coincidan · n → corrida nueva[/dim]')
+        while True:
+            answer = input('[r/p/n] > ').strip().lower() or 'n'
+            if answer in ('r', 'reuse', 'reusar'):
+                return 'reuse', entry
+            if answer in ('p', 'partial', 'parcial'):
+                return 'partial', entry
+            if answer in ('n', 'new', 'nueva'):
+                return None, None
+            console.print('[yellow]⚠️  Opción inválida. Elegí r, p o n.[/yellow]')
+    
+    def _reuse_report(self, state: dict, entry: ReportEntry) -> dict:
+        '''Devuelve el reporte existente como resultado de la corrida (sin llamadas al LLM)'''
+        with open(entry.path, encoding='utf-8') as f:
+            report = f.read()
+        
+        sidecar = ReportIndex.load_sidecar(entry.path)
+        if sidecar:
+            state['curated_content'] = sidecar['curated_content']
+            state['approved_findings'] = sidecar['findings']
+        state['final_report'] = report
+        state['report_file_path'] = entry.path
+        state['curator_completed'] = True
+        state['reporter_completed'] = True
+        state['current_step'] = 'completed'
+        state['execution_metrics'].end_time = datetime.now()
+        state['execution_metrics'].final_report_words = len(report.split())
+        
+        console.print()
+        console.print(f'[bold green]✓ Reporte reutilizado:[/bold green] [cyan]{entry.path}[/cyan]')
+        return state
+    
     def _display_final_summary(self, state: dict):
         '''Muestra el resumen final de la ejecución'''
         from ..utils.metrics_display import MetricsDisplay
@@ -139,11 +265,34 @@ class ResearchWorkflow:
         summary.add_row('⏱️  Duración', f'{metrics.duration_seconds:.1f} segundos')
         summary.add_row('📊 Subtemas encontrados', str(total_findings))
         summary.add_row('✅ Subtemas aprobados', str(approved_findings))
+        if metrics.cached_analyses:
+            summary.add_row('♻️  Análisis reutilizados', str(metrics.cached_analyses))
+        if metrics.context_compression < 1.0:
+            summary.add_row('🗜️  Contexto del reporte', f'{metrics.context_compression:.0%} del original')
+        if metrics.budget_level != 'normal':
+            summary.add_row('💸 Presupuesto', metrics.budget_level)
+        if metrics.skipped_findings:
+            summary.add_row('⏭️  Subtemas salteados', str(metrics.skipped_findings))
+        if metrics.anytime_report:
+            summary.add_row('⏰ Reporte', 'parcial (armado sin LLM)')
+        if metrics.hedged_requests:
+            summary.add_row('⚡ Requests duplicados', f'{metrics.hedged_requests} (~{metrics.hedge_tokens} tokens extra)')
         summary.add_row('📝 Palabras en reporte', str(metrics.final_report_words))
         summary.add_row('💾 Archivo guardado', state.get('report_file_path', 'N/A'))
         
         console.print(summary)
         
+        # Reuso de conexiones HTTP (pool compartido)
+        pool_stats = self.supervisor.llm_client.http_pool.stats()
+        if pool_stats['requests']:
+            console.print(
+                f"[dim]🔌 HTTP: {pool_stats['requests']} requests, "
+                f"{pool_stats['new_connections']} conexiones nuevas "
+                f"({pool_stats['reuse_ratio']*100:.0f}% reuso, "
+                f"TLS promedio {pool_stats['avg_tls_seconds']*1000:.0f} ms"
+                f"{', HTTP/2' if pool_stats['http2'] else ''})[/dim]"
+            )
+        
         # Métricas detalladas de costo
         detailed_metrics = self.supervisor.cost_optimizer.get_detailed_metrics()
         MetricsDisplay.display_detailed_metrics(detailed_metrics)
@@ -1,15 +1,16 @@
-﻿from .enums import TaskComplexity, AgentRole, ValidationAction
-from .schemas import Finding, HumanFeedback, CuratedContent, CostMetrics, ExecutionMetrics
-from .state import ResearchState
+﻿from ..core.lazy import lazy_exports
 
-__all__ = [
-    'TaskComplexity',
-    'AgentRole', 
-    'ValidationAction',
-    'Finding',
-    'HumanFeedback',
-    'CuratedContent',
-    'CostMetrics',
-    'ExecutionMetrics',
-    'ResearchState',
-]
+_EXPORTS = {
+    'TaskComplexity': '.enums',
+    'AgentRole': '.enums',
+    'ValidationAction': '.enums',
+    'Finding': '.schemas',
+    'HumanFeedback': '.schemas',
+    'CuratedContent': '.schemas',
+    'CostMetrics': '.schemas',
+    'ExecutionMetrics': '.schemas',
+    'ResearchState': '.state',
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -34,6 +34,15 @@ class CostMetrics(BaseModel):
     cheap_cost: float = 0.0
     moderate_cost: float = 0.0
     expensive_cost: float = 0.0
+    # Respuestas estructuradas: reparadas (JSON truncado/mal formado) y perdidas
+    parse_repairs: int = 0
+    parse_failures: int = 0
+    # Cascada: tareas que empezaron en el modelo barato y cuántas escalaron de tier
+    cascade_tasks: int = 0
+    escalations: int = 0
+    # Duplicados por hedging que perdieron (su costo ya está sumado en el tier)
+    hedge_calls: int = 0
+    hedge_cost: float = 0.0
     
     @property
     def total_cost(self) -> float:
@@ -50,6 +59,17 @@ class ExecutionMetrics(BaseModel):
     total_findings: int = 0
     approved_findings: int = 0
     sources_analyzed: int = 0
+    cached_analyses: int = 0
+    # Tokens del contexto del reporter después / antes de la compresión local
+    context_compression: float = 1.0
+    # Requests duplicados por latencia (hedging) y sus tokens estimados
+    hedged_requests: int = 0
+    hedge_tokens: int = 0
+    # Presupuesto de la corrida: escalón alcanzado, subtemas salteados y si
+    # el reporte se armó localmente por falta de tiempo o costo
+    budget_level: str = 'normal'
+    skipped_findings: int = 0
+    anytime_report: bool = False
     final_report_words: int = 0
     
     @property
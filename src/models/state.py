@@ -1,4 +1,4 @@
-﻿from typing import TypedDict, List, Optional
+﻿from typing import TypedDict, List, Optional, Dict, Any
 from .schemas import Finding, HumanFeedback, CuratedContent, CostMetrics, ExecutionMetrics
 
 class ResearchState(TypedDict):
@@ -8,15 +8,25 @@ class ResearchState(TypedDict):
     
     # Input inicial
     topic: str
+    survey_mode: bool
     
     # Investigator outputs (sin Annotated, lista simple)
     raw_findings: List[Finding]
+    clusters: List[Any]  # FindingCluster (solo con muchos candidatos)
+    sources: List[Dict[str, Any]]
     investigator_completed: bool
     
     # Human validation
     human_feedback: Optional[HumanFeedback]
     awaiting_human_input: bool
     
+    # Texto descargado de las fuentes (FetchedDocument.to_dict())
+    source_documents: List[Dict[str, Any]]
+    
+    # Findings aprobados (feedback aplicado) y análisis de un reporte previo casi igual
+    approved_findings: List[Finding]
+    prior_curated: List[CuratedContent]
+    
     # Curator outputs (sin Annotated, lista simple)
     curated_content: List[CuratedContent]
     curator_completed: bool
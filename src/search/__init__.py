@@ -0,0 +1,22 @@
+﻿from importlib import import_module
+
+# Los módulos se importan recién cuando se accede al nombre (PEP 562)
+_EXPORTS = {
+    'SearchProvider': '.base',
+    'get_search_provider': '.base',
+    'MockSearchProvider': '.mock',
+    'LocalBM25Provider': '.bm25',
+    'BM25IndexBuilder': '.bm25',
+    'SourceReranker': '.rerank',
+    'FanOutSearchProvider': '.fanout',
+    'QueryExpander': '.fanout',
+    'SourceFetcher': '.fetcher',
+    'FetchedDocument': '.fetcher',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
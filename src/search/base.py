@@ -0,0 +1,53 @@
+﻿'''
+Interfaz común de los proveedores de búsqueda
+'''
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+# Cada resultado es un dict con: title, url, snippet, source, date (YYYY-MM-DD), relevance (0-1)
+SearchResult = Dict[str, Any]
+
+
+class SearchProvider(ABC):
+    '''Proveedor de búsqueda usado por el Investigator Agent'''
+
+    name: str = 'base'
+    # False si las URLs no apuntan a contenido real (no tiene sentido descargarlas)
+    fetchable: bool = True
+
+    @abstractmethod
+    def search(self, query: str, max_results: int = 10) -> List[SearchResult]:
+        '''
+        Busca documentos relevantes para la consulta.
+
+        Args:
+            query: Consulta (normalmente el tema de investigación)
+            max_results: Cantidad máxima de resultados
+
+        Returns:
+            Resultados ordenados por relevancia descendente
+        '''
+
+
+def get_search_provider() -> SearchProvider:
+    '''
+    Crea el proveedor configurado en config.yaml (sección web_search):
+    - use_mock: true → resultados simulados
+    - use_mock: false → índice BM25 local en index_dir
+    '''
+    import os
+    from ..core.settings import get_setting
+
+    if get_setting('web_search.use_mock', True):
+        from .mock import MockSearchProvider
+        return MockSearchProvider()
+
+    index_dir = get_setting('web_search.index_dir', './search_index')
+    if not os.path.exists(os.path.join(index_dir, 'manifest.json')):
+        from rich.console import Console
+        Console().print(f'[yellow]⚠️  No hay índice de búsqueda en {index_dir}, usando resultados simulados[/yellow]')
+        from .mock import MockSearchProvider
+        return MockSearchProvider()
+
+    from .bm25 import LocalBM25Provider
+    return LocalBM25Provider(index_dir)
@@ -0,0 +1,418 @@
+﻿'''
+Índice invertido local con scoring BM25.
+
+Ingiere un directorio de documentos (Markdown, texto, HTML), los divide en
+pasajes y construye un índice en disco particionado en shards. Las postings
+se guardan como arrays NumPy y se abren con memory-mapping, así una consulta
+solo toca las postings de sus términos aunque el índice tenga millones de pasajes.
+
+Uso:
+    python -m src.search.bm25 build ./docs --index ./search_index
+    python -m src.search.bm25 query "machine learning in healthcare" --index ./search_index
+'''
+import argparse
+import json
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .base import SearchProvider, SearchResult
+from .extract import html_to_text, markdown_to_text
+from ..utils.text_features import tokenize
+
+INDEX_VERSION = 1
+
+SUPPORTED_EXTENSIONS = {
+    '.md': 'markdown', '.markdown': 'markdown',
+    '.txt': 'text', '.text': 'text',
+    '.html': 'html', '.htm': 'html',
+}
+
+def split_passages(text: str, passage_words: int = 120) -> Iterator[str]:
+    '''Agrupa párrafos en pasajes de ~passage_words palabras'''
+    current: List[str] = []
+    count = 0
+
+    for paragraph in re.split(r'\n\s*\n', text):
+        words = paragraph.split()
+        if not words:
+            continue
+
+        # Párrafos muy largos se cortan en ventanas
+        while len(words) > passage_words:
+            if current:
+                yield ' '.join(current)
+                current, count = [], 0
+            yield ' '.join(words[:passage_words])
+            words = words[passage_words:]
+
+        if count + len(words) > passage_words and current:
+            yield ' '.join(current)
+            current, count = [], 0
+
+        current.extend(words)
+        count += len(words)
+
+    if current:
+        yield ' '.join(current)
+
+
+def read_document(path: str) -> Tuple[Optional[str], str]:
+    '''Lee un documento y retorna (título, texto plano)'''
+    kind = SUPPORTED_EXTENSIONS[os.path.splitext(path)[1].lower()]
+    with open(path, encoding='utf-8', errors='replace') as f:
+        raw = f.read()
+
+    if kind == 'html':
+        return html_to_text(raw)
+    if kind == 'markdown':
+        return markdown_to_text(raw)
+
+    first_line = next((line.strip() for line in raw.splitlines() if line.strip()), None)
+    return (first_line[:120] if first_line else None), raw
+
+
+class _ShardWriter:
+    '''Acumula postings de un shard en buffers compactos y los vuelca a disco'''
+
+    def __init__(self, shard_dir: str):
+        self.shard_dir = shard_dir
+        self.vocab: Dict[str, int] = {}
+        self.term_ids = array('i')
+        self.passage_ids = array('i')
+        self.tfs = array('H')
+        self.doc_lengths = array('i')
+        self.passage_doc = array('i')
+        self.text_offsets = array('q', [0])
+        self.docs: List[Dict[str, str]] = []
+        os.makedirs(shard_dir, exist_ok=True)
+        self._text_file = open(os.path.join(shard_dir, 'text.bin'), 'wb')
+
+    @property
+    def n_passages(self) -> int:
+        return len(self.doc_lengths)
+
+    def add_document(self, meta: Dict[str, str], passages: List[str]):
+        doc_id = len(self.docs)
+        self.docs.append(meta)
+
+        for passage in passages:
+            tokens = tokenize(passage)
+            if not tokens:
+                continue
+
+            passage_id = self.n_passages
+            for term, tf in Counter(tokens).items():
+                term_id = self.vocab.setdefault(term, len(self.vocab))
+                self.term_ids.append(term_id)
+                self.passage_ids.append(passage_id)
+                self.tfs.append(min(tf, 65535))
+
+            self.doc_lengths.append(len(tokens))
+            self.passage_doc.append(doc_id)
+
+            encoded = passage.encode('utf-8')
+            self._text_file.write(encoded)
+            self.text_offsets.append(self.text_offsets[-1] + len(encoded))
+
+    def close(self) -> Dict[str, int]:
+        '''Ordena las postings por término y escribe los arrays del shard'''
+        self._text_file.close()
+
+        term_ids = np.frombuffer(self.term_ids, dtype=np.int32)
+        passage_ids = np.frombuffer(self.passage_ids, dtype=np.int32)
+        tfs = np.frombuffer(self.tfs, dtype=np.uint16)
+
+        order = np.lexsort((passage_ids, term_ids))
+        df = np.bincount(term_ids, minlength=len(self.vocab)).astype(np.int32)
+        offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+
+        def save(name: str, data: np.ndarray):
+            np.save(os.path.join(self.shard_dir, name), data)
+
+        save('postings_passages.npy', passage_ids[order])
+        save('postings_tf.npy', tfs[order])
+        save('offsets.npy', offsets)
+        save('df.npy', df)
+        save('doc_lengths.npy', np.frombuffer(self.doc_lengths, dtype=np.int32))
+        save('passage_doc.npy', np.frombuffer(self.passage_doc, dtype=np.int32))
+        save('text_offsets.npy', np.frombuffer(self.text_offsets, dtype=np.int64))
+
+        with open(os.path.join(self.shard_dir, 'vocab.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        with open(os.path.join(self.shard_dir, 'docs.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.docs, f, ensure_ascii=False)
+
+        return {
+            'passages': self.n_passages,
+            'documents': len(self.docs),
+            'tokens': int(np.frombuffer(self.doc_lengths, dtype=np.int32).sum()) if self.n_passages else 0,
+        }
+
+
+class BM25IndexBuilder:
+    '''Construye un índice BM25 particionado a partir de un directorio de documentos'''
+
+    def __init__(self, index_dir: str, shard_size: int = 200_000, passage_words: int = 120):
+        self.index_dir = index_dir
+        self.shard_size = shard_size
+        self.passage_words = passage_words
+
+    def build(self, docs_dir: str) -> Dict:
+        '''
+        Ingiere recursivamente docs_dir y escribe el índice.
+
+        Returns:
+            Manifest del índice (cantidad de documentos, pasajes, shards)
+        '''
+        start = time.perf_counter()
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        shards: List[str] = []
+        totals = {'passages': 0, 'documents': 0, 'tokens': 0}
+        writer: Optional[_ShardWriter] = None
+
+        for path in self._iter_files(docs_dir):
+            title, text = read_document(path)
+            passages = list(split_passages(text, self.passage_words))
+            if not passages:
+                continue
+
+            # Un documento nunca se parte entre shards
+            if writer is None or writer.n_passages >= self.shard_size:
+                if writer is not None:
+                    self._accumulate(totals, writer.close())
+                name = f'shard_{len(shards):04d}'
+                shards.append(name)
+                writer = _ShardWriter(os.path.join(self.index_dir, name))
+
+            writer.add_document(self._document_meta(path, docs_dir, title), passages)
+
+        if writer is not None:
+            self._accumulate(totals, writer.close())
+
+        manifest = {
+            'version': INDEX_VERSION,
+            'shards': shards,
+            'n_documents': totals['documents'],
+            'n_passages': totals['passages'],
+            'avg_passage_length': totals['tokens'] / totals['passages'] if totals['passages'] else 0.0,
+            'passage_words': self.passage_words,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'build_seconds': round(time.perf_counter() - start, 2),
+        }
+        with open(os.path.join(self.index_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        return manifest
+
+    @staticmethod
+    def _accumulate(totals: Dict[str, int], shard_totals: Dict[str, int]):
+        for key, value in shard_totals.items():
+            totals[key] += value
+
+    @staticmethod
+    def _iter_files(docs_dir: str) -> Iterator[str]:
+        for root, dirs, files in os.walk(docs_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    yield os.path.join(root, name)
+
+    @staticmethod
+    def _document_meta(path: str, docs_dir: str, title: Optional[str]) -> Dict[str, str]:
+        relative = os.path.relpath(path, docs_dir)
+        parts = relative.split(os.sep)
+        return {
+            'title': title or os.path.splitext(parts[-1])[0].replace('_', ' '),
+            'url': 'file://' + os.path.abspath(path),
+            'source': parts[0] if len(parts) > 1 else 'local',
+            'date': datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d'),
+        }
+
+
+class _Shard:
+    '''Shard abierto en modo memory-mapped'''
+
+    def __init__(self, shard_dir: str):
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(shard_dir, name), mmap_mode='r')
+
+        with open(os.path.join(shard_dir, 'vocab.json'), encoding='utf-8') as f:
+            self.vocab: Dict[str, int] = json.load(f)
+
+        self.postings_passages = load('postings_passages.npy')
+        self.postings_tf = load('postings_tf.npy')
+        self.offsets = load('offsets.npy')
+        self.df = load('df.npy')
+        self.doc_lengths = load('doc_lengths.npy')
+        self.passage_doc = load('passage_doc.npy')
+        self.text_offsets = load('text_offsets.npy')
+        self.text = np.memmap(os.path.join(shard_dir, 'text.bin'), dtype=np.uint8, mode='r') \
+            if os.path.getsize(os.path.join(shard_dir, 'text.bin')) else np.zeros(0, dtype=np.uint8)
+        self._docs_path = os.path.join(shard_dir, 'docs.json')
+        self._docs: Optional[List[Dict[str, str]]] = None
+
+    @property
+    def docs(self) -> List[Dict[str, str]]:
+        if self._docs is None:
+            with open(self._docs_path, encoding='utf-8') as f:
+                self._docs = json.load(f)
+        return self._docs
+
+    def term_df(self, term: str) -> int:
+        term_id = self.vocab.get(term)
+        return int(self.df[term_id]) if term_id is not None else 0
+
+    def passage_text(self, passage_id: int) -> str:
+        start, end = self.text_offsets[passage_id], self.text_offsets[passage_id + 1]
+        return bytes(self.text[start:end]).decode('utf-8', errors='replace')
+
+
+class LocalBM25Provider(SearchProvider):
+    '''Búsqueda offline sobre un índice BM25 construido con BM25IndexBuilder'''
+
+    name = 'bm25'
+
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75, snippet_chars: int = 400):
+        manifest_path = os.path.join(index_dir, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f'No hay un índice BM25 en {index_dir} (falta manifest.json)')
+
+        with open(manifest_path, encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.snippet_chars = snippet_chars
+        self.n_passages = self.manifest['n_passages']
+        self.avgdl = self.manifest['avg_passage_length'] or 1.0
+        self.shards = [_Shard(os.path.join(index_dir, name)) for name in self.manifest['shards']]
+
+    def search(self, query: str, max_results: int = 10) -> List[SearchResult]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.shards:
+            return []
+
+        # IDF global: df sumado entre shards
+        idf = {}
+        for term in terms:
+            df = sum(shard.term_df(term) for shard in self.shards)
+            if df:
+                idf[term] = np.log(1.0 + (self.n_passages - df + 0.5) / (df + 0.5))
+        if not idf:
+            return []
+
+        # Se piden más pasajes que resultados porque varios pueden ser del mismo documento
+        candidates: List[Tuple[float, int, int]] = []
+        per_shard = max_results * 4
+        for shard_index, shard in enumerate(self.shards):
+            passage_ids, scores = self._score_shard(shard, idf)
+            if len(scores) == 0:
+                continue
+            k = min(per_shard, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates.extend((float(scores[i]), shard_index, int(passage_ids[i])) for i in top)
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        if not candidates:
+            return []
+
+        # Un resultado por documento (su mejor pasaje)
+        best_score = candidates[0][0]
+        results: List[SearchResult] = []
+        seen_docs = set()
+        for score, shard_index, passage_id in candidates:
+            shard = self.shards[shard_index]
+            doc_id = int(shard.passage_doc[passage_id])
+            if (shard_index, doc_id) in seen_docs:
+                continue
+            seen_docs.add((shard_index, doc_id))
+
+            doc = shard.docs[doc_id]
+            snippet = shard.passage_text(passage_id)
+            if len(snippet) > self.snippet_chars:
+                snippet = snippet[:self.snippet_chars].rsplit(' ', 1)[0] + '...'
+
+            results.append({
+                'title': doc['title'],
+                'url': doc['url'],
+                'snippet': snippet,
+                'source': doc['source'],
+                'date': doc['date'],
+                'relevance': round(score / best_score, 3),
+                'score': round(score, 4),
+            })
+            if len(results) >= max_results:
+                break
+
+        return results
+
+    def _score_shard(self, shard: _Shard, idf: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        '''Suma las contribuciones BM25 de cada término sobre sus postings'''
+        passages_parts, score_parts = [], []
+
+        for term, term_idf in idf.items():
+            term_id = shard.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = shard.offsets[term_id], shard.offsets[term_id + 1]
+            passages = np.asarray(shard.postings_passages[start:end])
+            tf = np.asarray(shard.postings_tf[start:end], dtype=np.float32)
+            dl = np.asarray(shard.doc_lengths[passages], dtype=np.float32)
+
+            norm = self.k1 * (1.0 - self.b + self.b * dl / self.avgdl)
+            passages_parts.append(passages)
+            score_parts.append(term_idf * tf * (self.k1 + 1.0) / (tf + norm))
+
+        if not passages_parts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        all_passages = np.concatenate(passages_parts)
+        all_scores = np.concatenate(score_parts)
+        unique_passages, inverse = np.unique(all_passages, return_inverse=True)
+        return unique_passages, np.bincount(inverse, weights=all_scores).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Índice BM25 local')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='Construye el índice a partir de un directorio')
+    build.add_argument('docs_dir')
+    build.add_argument('--index', default='./search_index')
+    build.add_argument('--shard-size', type=int, default=200_000, help='Pasajes por shard')
+    build.add_argument('--passage-words', type=int, default=120)
+
+    query = sub.add_parser('query', help='Consulta el índice')
+    query.add_argument('text', nargs='+')
+    query.add_argument('--index', default='./search_index')
+    query.add_argument('-k', type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        manifest = BM25IndexBuilder(args.index, args.shard_size, args.passage_words).build(args.docs_dir)
+        print(f"✓ {manifest['n_documents']} documentos, {manifest['n_passages']} pasajes, "
+              f"{len(manifest['shards'])} shards en {manifest['build_seconds']}s → {args.index}")
+    else:
+        provider = LocalBM25Provider(args.index)
+        start = time.perf_counter()
+        results = provider.search(' '.join(args.text), args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for i, result in enumerate(results, 1):
+            print(f"{i:2d}. [{result['relevance']:.2f}] {result['title']} ({result['source']}, {result['date']})")
+            print(f"    {result['url']}")
+        print(f'{len(results)} resultados en {elapsed:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+﻿'''
+Selección de contexto en streaming para el curator.
+
+Pipeline de generadores: leer bloques → armar pasajes → puntuar → elegir los
+mejores con un heap acotado por presupuesto de tokens. En ningún momento se
+carga un documento completo: la memoria máxima es un bloque de lectura, un
+pasaje en construcción y los pasajes que entran en el presupuesto.
+'''
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Sequence, Set
+
+from ..utils.text_features import tokenize
+
+BLOCK_CHARS = 8192
+
+
+@dataclass(order=True)
+class Passage:
+    '''Fragmento de un documento con su puntaje para una consulta'''
+    score: float
+    order: int = field(compare=True)
+    text: str = field(compare=False, default='')
+    url: str = field(compare=False, default='')
+    title: Optional[str] = field(compare=False, default=None)
+
+    @property
+    def tokens(self) -> int:
+        # Misma estimación que LLMClient.count_tokens_estimate
+        return max(1, len(self.text) // 4)
+
+
+def read_blocks(path: str, block_chars: int = BLOCK_CHARS) -> Iterator[str]:
+    '''Lee el archivo de a bloques de tamaño fijo'''
+    with open(path, encoding='utf-8', errors='replace') as f:
+        while True:
+            block = f.read(block_chars)
+            if not block:
+                return
+            yield block
+
+
+def chunk_words(blocks: Iterable[str], passage_words: int = 120) -> Iterator[str]:
+    '''
+    Agrupa el texto en pasajes de passage_words palabras. Solo retiene la
+    palabra que puede haber quedado cortada al final de cada bloque.
+    '''
+    words: List[str] = []
+    carry = ''
+
+    for block in blocks:
+        block = carry + block
+        parts = block.split()
+        # Si el bloque no termina en espacio, la última palabra puede seguir en el próximo
+        carry = parts.pop() if parts and not block[-1].isspace() else ''
+        for word in parts:
+            words.append(word)
+            if len(words) >= passage_words:
+                yield ' '.join(words)
+                words = []
+
+    if carry:
+        words.append(carry)
+    if words:
+        yield ' '.join(words)
+
+
+def score_passages(
+    passages: Iterable[str],
+    query_terms: Set[str],
+    passage_words: int = 120,
+    k1: float = 1.2,
+    b: float = 0.75
+) -> Iterator[tuple[float, str]]:
+    '''
+    Puntaje tipo BM25 sin IDF (en streaming no se conocen las frecuencias
+    globales): saturación de tf y normalización por largo del pasaje.
+    '''
+    for text in passages:
+        tokens = tokenize(text)
+        if not tokens:
+            continue
+        length_norm = k1 * (1 - b + b * len(tokens) / passage_words)
+        score = 0.0
+        for term in query_terms:
+            tf = tokens.count(term)
+            if tf:
+                score += tf * (k1 + 1) / (tf + length_norm)
+        if score > 0:
+            yield score, text
+
+
+def select_within_budget(candidates: Iterable[Passage], token_budget: int) -> List[Passage]:
+    '''
+    Mantiene un min-heap con los mejores pasajes cuyo total de tokens entra
+    en el presupuesto: al pasarse, descarta el de menor puntaje.
+    '''
+    heap: List[Passage] = []
+    total = 0
+
+    for passage in candidates:
+        if passage.tokens > token_budget:
+            continue
+        heapq.heappush(heap, passage)
+        total += passage.tokens
+        while total > token_budget:
+            total -= heapq.heappop(heap).tokens
+
+    return sorted(heap, reverse=True)
+
+
+def select_context(
+    query: str,
+    documents: Sequence,
+    token_budget: int = 750,
+    passage_words: int = 120
+) -> List[Passage]:
+    '''
+    Elige los pasajes más relevantes para la consulta entre todos los
+    documentos (FetchedDocument), sin superar token_budget.
+
+    Returns:
+        Pasajes ordenados por puntaje descendente
+    '''
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return []
+
+    counter = itertools.count()
+
+    def candidates() -> Iterator[Passage]:
+        for doc in documents:
+            if not doc.path:
+                continue
+            passages = chunk_words(read_blocks(doc.path), passage_words)
+            for score, text in score_passages(passages, query_terms, passage_words):
+                # order desempata a favor del pasaje que apareció primero
+                yield Passage(score=score, order=-next(counter), text=text, url=doc.url, title=doc.title)
+
+    return select_within_budget(candidates(), token_budget)
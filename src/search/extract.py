@@ -0,0 +1,88 @@
+﻿'''
+Extracción de texto plano desde HTML y Markdown
+'''
+import re
+from html.parser import HTMLParser
+from typing import List, Optional
+
+# Tags cuyo contenido no es texto principal
+SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'svg', 'template'}
+
+# Tags que cortan párrafo
+BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'li', 'br', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'blockquote', 'pre', 'table', 'ul', 'ol'}
+
+
+class TextExtractor(HTMLParser):
+    '''
+    Parser HTML incremental: se le puede hacer feed() por chunks a medida que
+    llegan los bytes y va liberando párrafos completos con pop_paragraphs().
+    '''
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self._skip_depth = 0
+        self._in_title = False
+        self._buffer: List[str] = []
+        self._paragraphs: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'title':
+            self._in_title = True
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self._skip_depth > 0:
+            self._skip_depth -= 1
+        elif tag == 'title':
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title = ((self.title or '') + data).strip()
+        elif self._skip_depth == 0:
+            self._buffer.append(data)
+
+    def _flush(self):
+        text = re.sub(r'\s+', ' ', ''.join(self._buffer)).strip()
+        self._buffer = []
+        if text:
+            self._paragraphs.append(text)
+
+    def pop_paragraphs(self) -> List[str]:
+        '''Retorna (y descarta) los párrafos completos extraídos hasta ahora'''
+        paragraphs, self._paragraphs = self._paragraphs, []
+        return paragraphs
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def html_to_text(html: str) -> tuple[Optional[str], str]:
+    '''Retorna (título, texto) de un documento HTML'''
+    extractor = TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.title, '\n\n'.join(extractor.pop_paragraphs())
+
+
+def markdown_to_text(markdown: str) -> tuple[Optional[str], str]:
+    '''Retorna (título, texto) de un documento Markdown, sin sintaxis de formato'''
+    title = None
+    match = re.search(r'^#\s+(.+)$', markdown, flags=re.MULTILINE)
+    if match:
+        title = match.group(1).strip()
+
+    text = re.sub(r'```.*?```', ' ', markdown, flags=re.DOTALL)
+    text = re.sub(r'!\[[^\]]*\]\([^)]*\)', ' ', text)
+    text = re.sub(r'\[([^\]]+)\]\([^)]*\)', r'\1', text)
+    text = re.sub(r'^[ \t]*(?:#+|>+|[-*+]|\d+\.)[ \t]+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'[*_`]+', '', text)
+    return title, text
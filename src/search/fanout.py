@@ -0,0 +1,178 @@
+﻿'''
+Fan-out de consultas: expande el tema en sub-consultas, las ejecuta en paralelo
+contra el proveedor y fusiona los rankings con Reciprocal Rank Fusion (RRF).
+'''
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from rich.console import Console
+
+from .base import SearchProvider, SearchResult
+from ..utils.text_features import char_vectors
+
+console = Console()
+
+DEFAULT_TEMPLATES = [
+    '{topic}',
+    '{topic} applications and use cases',
+    '{topic} challenges and limitations',
+    '{topic} recent advances',
+    '{topic} overview fundamentals',
+    '{topic} comparison of approaches',
+]
+
+
+class QueryExpander:
+    '''
+    Genera sub-consultas a partir del tema.
+
+    Args:
+        max_queries: Cantidad máxima de consultas (incluye el tema original)
+        templates: Templates con {topic}; se usan si no hay LLM o si falla
+        llm_client: Si se pasa, pide las sub-consultas al modelo barato
+        cost_optimizer: Para elegir el modelo y registrar el uso del LLM
+    '''
+
+    def __init__(
+        self,
+        max_queries: int = 4,
+        templates: Optional[List[str]] = None,
+        llm_client=None,
+        cost_optimizer=None
+    ):
+        self.max_queries = max(1, max_queries)
+        self.templates = templates or DEFAULT_TEMPLATES
+        self.llm = llm_client
+        self.cost_optimizer = cost_optimizer
+
+    def expand(self, topic: str) -> List[str]:
+        queries = [topic]
+        if self.llm is not None:
+            queries += self._expand_with_llm(topic)
+        queries += [template.format(topic=topic) for template in self.templates]
+
+        # Sin repetidos, conservando el orden (el tema original siempre primero)
+        unique = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+        return unique[:self.max_queries]
+
+    def _expand_with_llm(self, topic: str) -> List[str]:
+        from ..models.enums import TaskComplexity
+
+        prompt = (
+            f"Write {self.max_queries - 1} short web search queries that together cover different "
+            f"aspects of the topic: {topic}\n"
+            f'Respond ONLY with a JSON list of strings, e.g. ["query 1", "query 2"]'
+        )
+        estimated_tokens, max_tokens = self.cost_optimizer.plan_tokens(
+            'query_expansion', self.llm.count_tokens_estimate(prompt), max_tokens=150, estimated_tokens=150
+        )
+        model = self.cost_optimizer.select_model(TaskComplexity.SIMPLE, estimated_tokens=estimated_tokens)
+
+        try:
+            response = self.llm.generate(
+                prompt=prompt, model=model, temperature=0.3, max_tokens=max_tokens, task='query_expansion'
+            )
+            self.cost_optimizer.log_usage(
+                model, self.llm.count_tokens_estimate(prompt + response), "Expansión de consultas"
+            )
+            start, end = response.find('['), response.rfind(']')
+            queries = json.loads(response[start:end + 1])
+            return [str(q) for q in queries if isinstance(q, str)]
+        except Exception as e:
+            console.print(f"[yellow]⚠️  Expansión con LLM falló, usando templates: {e}[/yellow]")
+            return []
+
+
+def normalize_url(url: str) -> str:
+    '''Clave de deduplicación: sin esquema, sin www, sin fragmento ni barra final'''
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return urlunsplit(('', host, parts.path.rstrip('/'), parts.query, ''))
+
+
+def reciprocal_rank_fusion(rankings: List[List[SearchResult]], k: int = 60) -> List[SearchResult]:
+    '''
+    Fusiona varios rankings: score(d) = Σ 1 / (k + rank_i(d)).
+    Los resultados con la misma URL (normalizada) se combinan en uno.
+    '''
+    fused: Dict[str, SearchResult] = {}
+
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            key = normalize_url(result.get('url', '')) or result.get('title', '')
+            if key not in fused:
+                fused[key] = {**result, 'fusion_score': 0.0}
+            entry = fused[key]
+            entry['fusion_score'] += 1.0 / (k + rank)
+            entry['relevance'] = max(entry.get('relevance') or 0.0, result.get('relevance') or 0.0)
+
+    return sorted(fused.values(), key=lambda r: r['fusion_score'], reverse=True)
+
+
+def drop_near_duplicate_titles(results: List[SearchResult], threshold: float = 0.9) -> List[SearchResult]:
+    '''
+    Elimina resultados cuyo título es casi idéntico (coseno de n-gramas de
+    caracteres) a otro mejor rankeado. Asume results ordenados por score.
+    '''
+    if len(results) < 2:
+        return results
+
+    vectors = char_vectors([r.get('title', '') for r in results])
+    similarity = vectors @ vectors.T
+
+    keep: List[int] = []
+    for i in range(len(results)):
+        if not keep or similarity[i, keep].max() < threshold:
+            keep.append(i)
+    return [results[i] for i in keep]
+
+
+class FanOutSearchProvider(SearchProvider):
+    '''
+    Envuelve un proveedor y ejecuta las sub-consultas en paralelo, así la
+    latencia total es la de la consulta más lenta y no la suma de todas.
+
+    Args:
+        provider: Proveedor real (mock, BM25, ...)
+        expander: Generador de sub-consultas
+        rrf_k: Constante de RRF (60 es el valor estándar)
+        title_threshold: Similitud a partir de la cual dos títulos son duplicados
+    '''
+
+    def __init__(
+        self,
+        provider: SearchProvider,
+        expander: Optional[QueryExpander] = None,
+        rrf_k: int = 60,
+        title_threshold: float = 0.9
+    ):
+        self.provider = provider
+        self.expander = expander or QueryExpander()
+        self.rrf_k = rrf_k
+        self.title_threshold = title_threshold
+        self.name = f'{provider.name}, fan-out x{self.expander.max_queries}'
+        self.fetchable = provider.fetchable
+        self.last_queries: List[str] = []
+
+    def search(self, query: str, max_results: int = 10) -> List[SearchResult]:
+        queries = self.expander.expand(query)
+        self.last_queries = queries
+
+        with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+            rankings = list(pool.map(lambda q: self._search_one(q, max_results), queries))
+
+        fused = reciprocal_rank_fusion(rankings, self.rrf_k)
+        results = drop_near_duplicate_titles(fused, self.title_threshold)
+        return results[:max_results]
+
+    def _search_one(self, query: str, max_results: int) -> List[SearchResult]:
+        try:
+            return self.provider.search(query, max_results)
+        except Exception as e:
+            # Una sub-consulta fallida no debe tirar abajo la búsqueda completa
+            console.print(f"[yellow]⚠️  Búsqueda '{query}' falló: {e}[/yellow]")
+            return []
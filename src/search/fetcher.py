@@ -0,0 +1,245 @@
+﻿'''
+Descarga concurrente del contenido de las fuentes.
+
+- Un httpx.AsyncClient con pool de conexiones y un semáforo por host
+- Extracción de texto en streaming (TextExtractor recibe los chunks a medida que llegan)
+- Caché en disco con GET condicional (ETag / Last-Modified → 304 Not Modified)
+- URLs file:// (índice BM25 local) se leen directo del disco
+'''
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+from .extract import TextExtractor
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'sources')
+
+TEXT_TYPES = ('text/plain', 'text/markdown')
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+@dataclass
+class FetchedDocument:
+    '''Resultado de descargar una fuente; el texto extraído queda en disco (path)'''
+    url: str
+    status: str                       # 'fetched' | 'not_modified' | 'local' | 'error'
+    title: Optional[str] = None
+    path: Optional[str] = None
+    chars: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.path is not None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def read_text(self, max_chars: Optional[int] = None) -> str:
+        if not self.path:
+            return ''
+        with open(self.path, encoding='utf-8') as f:
+            return f.read(max_chars) if max_chars else f.read()
+
+
+class SourceFetcher:
+    '''
+    Descarga y extrae el texto de un conjunto de URLs en paralelo.
+
+    Args:
+        cache_dir: Directorio de la caché (texto extraído + metadatos de validación)
+        max_connections: Conexiones simultáneas totales
+        per_host: Requests simultáneos por host (cortesía con cada servidor)
+        timeout: Timeout por request en segundos
+        max_bytes: Corte de lectura por documento
+    '''
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_connections: int = 20,
+        per_host: int = 4,
+        timeout: float = 15.0,
+        max_bytes: int = 2_000_000
+    ):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+
+    def fetch_all(self, urls: List[str]) -> List[FetchedDocument]:
+        '''Versión sincrónica: corre su propio event loop (usable desde un thread)'''
+        return asyncio.run(self.afetch_all(urls))
+
+    async def afetch_all(self, urls: List[str]) -> List[FetchedDocument]:
+        import httpx
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        urls = list(dict.fromkeys(u for u in urls if u))
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        async with httpx.AsyncClient(
+            limits=limits,
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            follow_redirects=True,
+            headers={'User-Agent': 'ai-research-assistant/1.0 (+source fetcher)'},
+        ) as client:
+            tasks = []
+            for url in urls:
+                host = urlsplit(url).netloc.lower()
+                semaphore = host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+                tasks.append(self._fetch_one(client, url, semaphore))
+            return list(await asyncio.gather(*tasks))
+
+    async def _fetch_one(self, client, url: str, semaphore: asyncio.Semaphore) -> FetchedDocument:
+        scheme = urlsplit(url).scheme.lower()
+        try:
+            if scheme == 'file':
+                return await asyncio.to_thread(self._fetch_local, url)
+            if scheme not in ('http', 'https'):
+                return FetchedDocument(url=url, status='error', error=f'Esquema no soportado: {scheme}')
+            async with semaphore:
+                return await self._fetch_http(client, url)
+        except Exception as e:
+            return FetchedDocument(url=url, status='error', error=str(e) or type(e).__name__)
+
+    async def _fetch_http(self, client, url: str) -> FetchedDocument:
+        meta = self._load_meta(url)
+        headers = {}
+        if meta and os.path.exists(meta['path']):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        async with client.stream('GET', url, headers=headers) as response:
+            if response.status_code == 304 and meta:
+                return FetchedDocument(
+                    url=url, status='not_modified', title=meta.get('title'),
+                    path=meta['path'], chars=meta.get('chars', 0)
+                )
+            if response.status_code >= 400:
+                return FetchedDocument(url=url, status='error', error=f'HTTP {response.status_code}')
+
+            content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+            if content_type and not content_type.startswith(HTML_TYPES + TEXT_TYPES):
+                return FetchedDocument(url=url, status='error', error=f'Tipo no soportado: {content_type}')
+
+            is_html = not content_type or content_type.startswith(HTML_TYPES)
+            path = self._text_path(url)
+            title, chars = await self._stream_to_disk(response, path, is_html)
+
+        self._save_meta(url, {
+            'url': url,
+            'path': path,
+            'title': title,
+            'chars': chars,
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+            'fetched_at': time.time(),
+        })
+        return FetchedDocument(url=url, status='fetched', title=title, path=path, chars=chars)
+
+    async def _stream_to_disk(self, response, path: str, is_html: bool):
+        '''Extrae el texto chunk a chunk y lo escribe sin acumular el body en memoria'''
+        extractor = TextExtractor() if is_html else None
+        received = 0
+        chars = 0
+        tmp_path = path + '.tmp'
+
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            async for chunk in response.aiter_text():
+                received += len(chunk)
+                if extractor is not None:
+                    extractor.feed(chunk)
+                    chars += self._write_paragraphs(out, extractor.pop_paragraphs())
+                else:
+                    out.write(chunk)
+                    chars += len(chunk)
+                if received >= self.max_bytes:
+                    break
+            if extractor is not None:
+                extractor.close()
+                chars += self._write_paragraphs(out, extractor.pop_paragraphs())
+
+        os.replace(tmp_path, path)
+        return (extractor.title if extractor else None), chars
+
+    @staticmethod
+    def _write_paragraphs(out, paragraphs: List[str]) -> int:
+        written = 0
+        for paragraph in paragraphs:
+            out.write(paragraph + '\n\n')
+            written += len(paragraph) + 2
+        return written
+
+    def _fetch_local(self, url: str) -> FetchedDocument:
+        '''Documentos del índice local: se re-extraen sólo si cambió el mtime'''
+        from .bm25 import SUPPORTED_EXTENSIONS, read_document
+
+        file_path = url2pathname(urlsplit(url).path)
+        if os.path.splitext(file_path)[1].lower() not in SUPPORTED_EXTENSIONS:
+            return FetchedDocument(url=url, status='error', error='Extensión no soportada')
+
+        mtime = os.path.getmtime(file_path)
+        meta = self._load_meta(url)
+        if meta and meta.get('mtime') == mtime and os.path.exists(meta['path']):
+            return FetchedDocument(url=url, status='local', title=meta.get('title'),
+                                   path=meta['path'], chars=meta.get('chars', 0))
+
+        title, text = read_document(file_path)
+        path = self._text_path(url)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        self._save_meta(url, {'url': url, 'path': path, 'title': title, 'chars': len(text), 'mtime': mtime})
+        return FetchedDocument(url=url, status='local', title=title, path=path, chars=len(text))
+
+    # ------------------------------------------------------------------
+    # Caché
+    # ------------------------------------------------------------------
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _text_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, self._key(url) + '.txt')
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, self._key(url) + '.json')
+
+    def _load_meta(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self._meta_path(url), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, url: str, meta: Dict):
+        tmp_path = self._meta_path(url) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(url))
+
+
+def get_source_fetcher() -> Optional[SourceFetcher]:
+    '''Crea el fetcher según config.yaml (web_search.fetch), o None si está deshabilitado'''
+    from ..core.settings import get_setting
+
+    if not get_setting('web_search.fetch.enabled', True):
+        return None
+
+    return SourceFetcher(
+        cache_dir=get_setting('web_search.fetch.cache_dir', DEFAULT_CACHE_DIR),
+        max_connections=get_setting('web_search.fetch.max_connections', 20),
+        per_host=get_setting('web_search.fetch.per_host', 4),
+        timeout=get_setting('web_search.fetch.timeout', 15),
+    )
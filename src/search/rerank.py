@@ -0,0 +1,135 @@
+﻿'''
+Reranking vectorizado de fuentes: similitud TF-IDF con el tema, decaimiento por
+antigüedad, prior de autoridad de la fuente y selección MMR para diversidad.
+
+Todo el scoring se hace como operaciones de matriz sobre el batch completo de
+candidatos; el único costo por candidato en Python es la tokenización.
+'''
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .base import SearchResult
+from ..utils.text_features import word_vectors
+
+# Prior de autoridad por fuente (nombre en minúsculas); el resto usa default_authority
+AUTHORITY_PRIORS: Dict[str, float] = {
+    'nature': 1.0, 'science': 1.0,
+    'arxiv': 0.9, 'ieee': 0.9, 'acm': 0.9,
+    'mit technology review': 0.8, 'harvard business review': 0.75, 'mckinsey': 0.7,
+    'github': 0.6, 'wired': 0.55, 'techcrunch': 0.5, 'forbes': 0.5,
+    'stack overflow': 0.5, 'medium': 0.35,
+}
+
+DEFAULT_WEIGHTS = {
+    'similarity': 0.45,
+    'relevance': 0.2,
+    'recency': 0.2,
+    'authority': 0.15,
+}
+
+
+class SourceReranker:
+    '''
+    Ordena los resultados de búsqueda y elige un top-k relevante y diverso.
+
+    Args:
+        weights: Peso de cada señal (similarity, relevance, recency, authority)
+        half_life_days: Días en los que el puntaje de recencia cae a la mitad
+        mmr_lambda: Balance relevancia/diversidad de MMR (1.0 = sin diversidad)
+        authority_priors: Prior por fuente, por defecto AUTHORITY_PRIORS
+        default_authority: Prior para fuentes desconocidas
+        n_features: Dimensión del hashing (títulos + snippets son textos cortos)
+    '''
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        half_life_days: float = 180.0,
+        mmr_lambda: float = 0.7,
+        authority_priors: Optional[Dict[str, float]] = None,
+        default_authority: float = 0.5,
+        n_features: int = 2 ** 10,
+    ):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.half_life_days = half_life_days
+        self.mmr_lambda = mmr_lambda
+        self.authority_priors = AUTHORITY_PRIORS if authority_priors is None else authority_priors
+        self.default_authority = default_authority
+        self.n_features = n_features
+
+    def rerank(self, topic: str, sources: List[SearchResult], top_k: int = 5) -> List[SearchResult]:
+        '''
+        Devuelve hasta top_k fuentes en orden de selección MMR.
+        Cada resultado es una copia con el campo extra 'rerank_score'.
+        '''
+        if not sources or top_k <= 0:
+            return []
+
+        texts = [f"{src.get('title', '')} {src.get('snippet', '')}" for src in sources]
+        # El tema va en la fila 0 para que comparta el IDF del batch
+        vectors = word_vectors([topic] + texts, self.n_features)
+        query, candidates = vectors[0], vectors[1:]
+
+        scores = self.score(query, candidates, sources)
+        selected = self.mmr(scores, candidates, top_k)
+
+        return [{**sources[i], 'rerank_score': round(float(scores[i]), 4)} for i in selected]
+
+    def score(self, query: np.ndarray, candidates: np.ndarray, sources: List[SearchResult]) -> np.ndarray:
+        '''Combinación lineal de las cuatro señales, todas en [0, 1]'''
+        similarity = candidates @ query
+        relevance = np.clip(np.array([float(src.get('relevance') or 0.0) for src in sources]), 0.0, 1.0)
+
+        w = self.weights
+        return (
+            w['similarity'] * similarity
+            + w['relevance'] * relevance
+            + w['recency'] * self._recency(sources)
+            + w['authority'] * self._authority(sources)
+        )
+
+    def mmr(self, scores: np.ndarray, candidates: np.ndarray, top_k: int) -> List[int]:
+        '''
+        Maximal marginal relevance. Solo calcula la similitud contra cada
+        candidato elegido (k productos matriz-vector, no la matriz n x n).
+        '''
+        top_k = min(top_k, len(scores))
+
+        selected = [int(np.argmax(scores))]
+        max_similarity = candidates @ candidates[selected[0]]
+
+        while len(selected) < top_k:
+            marginal = self.mmr_lambda * scores - (1.0 - self.mmr_lambda) * max_similarity
+            marginal[selected] = -np.inf
+            pick = int(np.argmax(marginal))
+            selected.append(pick)
+            np.maximum(max_similarity, candidates @ candidates[pick], out=max_similarity)
+
+        return selected
+
+    def _recency(self, sources: List[SearchResult]) -> np.ndarray:
+        # Fechas inválidas o ausentes quedan como NaT y reciben puntaje neutro
+        dates = np.array([str(src.get('date') or '')[:10] or 'NaT' for src in sources])
+        try:
+            parsed = dates.astype('datetime64[D]')
+        except ValueError:
+            parsed = np.array([self._parse_date(d) for d in dates], dtype='datetime64[D]')
+
+        age_days = (np.datetime64(date.today(), 'D') - parsed).astype(np.float64)
+        recency = np.power(0.5, np.clip(age_days, 0.0, None) / self.half_life_days)
+        return np.where(np.isnat(parsed), 0.5, recency)
+
+    @staticmethod
+    def _parse_date(value: str) -> np.datetime64:
+        try:
+            return np.datetime64(value, 'D')
+        except ValueError:
+            return np.datetime64('NaT')
+
+    def _authority(self, sources: List[SearchResult]) -> np.ndarray:
+        return np.array([
+            self.authority_priors.get(str(src.get('source', '')).lower(), self.default_authority)
+            for src in sources
+        ])
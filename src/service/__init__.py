@@ -0,0 +1,15 @@
+﻿from importlib import import_module
+
+# Los módulos se importan recién cuando se accede al nombre (PEP 562)
+_EXPORTS = {
+    'ResearchDaemon': '.daemon',
+    'run_via_daemon': '.client',
+    'stop_daemon': '.client',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
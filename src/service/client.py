@@ -0,0 +1,108 @@
+﻿'''
+Cliente liviano del daemon (solo stdlib, para arrancar en milisegundos).
+
+Protocolo: mensajes JSON delimitados por newline sobre un Unix domain socket.
+- cliente → daemon: {"type": "run", "argv": [...], "cwd": "..."}
+                    {"type": "input", "data": "..."} | {"type": "eof"}
+                    {"type": "interrupt"} | {"type": "shutdown"}
+- daemon → cliente: {"type": "out", "data": "..."}
+                    {"type": "input"} (el daemon espera una línea de stdin)
+                    {"type": "exit", "code": 0}
+'''
+import json
+import os
+import socket
+import sys
+from typing import Dict, List, Optional
+
+
+def socket_path() -> str:
+    '''Ruta del socket (RESEARCH_DAEMON_SOCKET o /tmp/research-assistant-<uid>.sock)'''
+    default = os.path.join(
+        os.getenv('TMPDIR', '/tmp'),
+        f'research-assistant-{os.getuid() if hasattr(os, "getuid") else "user"}.sock'
+    )
+    return os.getenv('RESEARCH_DAEMON_SOCKET', default)
+
+
+def send_message(sock: socket.socket, message: Dict):
+    sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+
+def _connect() -> Optional[socket.socket]:
+    if not hasattr(socket, 'AF_UNIX') or os.getenv('RESEARCH_NO_DAEMON'):
+        return None
+
+    path = socket_path()
+    if not os.path.exists(path):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def run_via_daemon(argv: List[str]) -> Optional[int]:
+    '''
+    Ejecuta el CLI a través del daemon y reenvía la salida en streaming.
+
+    Returns:
+        Código de salida, o None si no hay daemon disponible
+    '''
+    sock = _connect()
+    if sock is None:
+        return None
+
+    with sock:
+        send_message(sock, {
+            'type': 'run',
+            'argv': argv,
+            'cwd': os.getcwd(),
+            'isatty': sys.stdout.isatty(),
+        })
+        reader = sock.makefile('r', encoding='utf-8')
+
+        while True:
+            try:
+                line = reader.readline()
+                if not line:
+                    # El daemon cerró la conexión sin mensaje de salida
+                    return 1
+
+                message = json.loads(line)
+                kind = message.get('type')
+
+                if kind == 'out':
+                    sys.stdout.write(message['data'])
+                    sys.stdout.flush()
+                elif kind == 'input':
+                    data = sys.stdin.readline()
+                    if data:
+                        send_message(sock, {'type': 'input', 'data': data})
+                    else:
+                        send_message(sock, {'type': 'eof'})
+                elif kind == 'exit':
+                    return int(message.get('code', 0))
+
+            except KeyboardInterrupt:
+                # Ctrl+C: el daemon cancela la corrida y responde con 'exit'
+                send_message(sock, {'type': 'interrupt'})
+
+
+def stop_daemon() -> bool:
+    '''Pide al daemon que termine. Retorna False si no había daemon.'''
+    sock = _connect()
+    if sock is None:
+        print('No hay un daemon corriendo.')
+        return False
+
+    with sock:
+        send_message(sock, {'type': 'shutdown'})
+        sock.makefile('r', encoding='utf-8').readline()
+
+    print('Daemon detenido.')
+    return True
@@ -0,0 +1,235 @@
+﻿'''
+Daemon que mantiene el intérprete, los módulos importados, el grafo compilado,
+las conexiones al LLM y los caches en memoria entre corridas del CLI.
+
+Las sesiones se atienden de a una: durante cada sesión stdout/stderr/stdin
+del proceso se redirigen al socket del cliente, así la salida de rich y los
+input() de la validación humana funcionan sin cambios en los agentes.
+'''
+import _thread
+import json
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from .client import send_message, socket_path
+
+
+class _SocketWriter:
+    '''Reemplazo de sys.stdout que envía cada write como mensaje "out"'''
+
+    def __init__(self, session: '_Session', isatty: bool):
+        self._session = session
+        self._isatty = isatty
+        self.encoding = 'utf-8'
+
+    def write(self, data: str) -> int:
+        if data:
+            self._session.send({'type': 'out', 'data': data})
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return self._isatty
+
+    def fileno(self) -> int:
+        # rich cae a COLUMNS / 80 columnas si no hay file descriptor real
+        raise OSError('socket stream has no fileno')
+
+
+class _SocketReader:
+    '''Reemplazo de sys.stdin: cada readline pide una línea al cliente'''
+
+    def __init__(self, session: '_Session'):
+        self._session = session
+        self.encoding = 'utf-8'
+
+    def readline(self, size: int = -1) -> str:
+        self._session.send({'type': 'input'})
+        return self._session.inputs.get()
+
+    def isatty(self) -> bool:
+        return False
+
+    def fileno(self) -> int:
+        raise OSError('socket stream has no fileno')
+
+
+class _Session:
+    '''Conexión de un cliente: envío thread-safe y cola de líneas de input'''
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.inputs: 'queue.Queue[str]' = queue.Queue()
+        self.closed = threading.Event()
+        self.running = threading.Event()
+        self._send_lock = threading.Lock()
+
+    def send(self, message: Dict):
+        if self.closed.is_set():
+            return
+        with self._send_lock:
+            try:
+                send_message(self.conn, message)
+            except OSError:
+                self.closed.set()
+
+    def listen(self, reader):
+        '''Thread que recibe input / interrupt del cliente durante la corrida'''
+        for line in reader:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+
+            kind = message.get('type')
+            if kind == 'input':
+                self.inputs.put(message.get('data', ''))
+            elif kind == 'eof':
+                self.inputs.put('')
+            elif kind == 'interrupt':
+                self._interrupt()
+                # interrupt_main no despierta al main thread bloqueado en un input()
+                if self.running.is_set():
+                    self.inputs.put('')
+
+        # Cliente desconectado: cancelar la corrida en curso
+        self.closed.set()
+        self.inputs.put('')
+        self._interrupt()
+
+    def _interrupt(self):
+        if self.running.is_set():
+            _thread.interrupt_main()
+
+
+class ResearchDaemon:
+    '''Servidor sobre Unix domain socket con un ResearchWorkflow "caliente"'''
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or socket_path()
+        self.workflow = None
+        self._stop = False
+
+    def warm_up(self) -> bool:
+        '''Valida configuración, importa todo y compila el grafo una sola vez'''
+        from src.cli import console
+        from src.core.config_validator import ConfigValidator
+        from src.core.http_pool import get_shared_pool
+
+        if not ConfigValidator.validate_all():
+            console.print("[red]❌ El daemon no puede iniciar debido a errores de configuración.[/red]")
+            return False
+
+        start = time.perf_counter()
+        from src.graph.workflow import ResearchWorkflow
+        self.workflow = ResearchWorkflow()
+        get_shared_pool().warm_up()
+
+        console.print(f'[dim]🔥 Workflow listo en {time.perf_counter() - start:.2f}s[/dim]')
+        return True
+
+    def serve_forever(self):
+        # El color de rich se decide al crear cada Console: forzarlo antes de importar
+        if not os.getenv('NO_COLOR'):
+            os.environ.setdefault('FORCE_COLOR', '1')
+
+        if not self.warm_up():
+            return
+
+        from src.cli import console
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        server.listen(8)
+
+        signal.signal(signal.SIGTERM, self._terminate)
+        console.print(f'[bold green]✓ Daemon escuchando en[/bold green] [cyan]{self.path}[/cyan]')
+
+        try:
+            while not self._stop:
+                conn, _ = server.accept()
+                with conn:
+                    self._handle(conn)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            console.print('[dim]Daemon detenido[/dim]')
+
+    def _terminate(self, *_):
+        '''
+        SIGTERM: cancela la corrida en curso (o el accept) y corta el loop.
+        El KeyboardInterrupt lo atrapa la sesión si hay una corriendo; _stop
+        garantiza que después no se acepte otra y se cierre el socket.
+        '''
+        self._stop = True
+        _thread.interrupt_main()
+
+    def _handle(self, conn: socket.socket):
+        reader = conn.makefile('r', encoding='utf-8')
+        first = reader.readline()
+        if not first:
+            return
+
+        try:
+            request = json.loads(first)
+        except ValueError:
+            return
+
+        session = _Session(conn)
+
+        if request.get('type') == 'shutdown':
+            self._stop = True
+            session.send({'type': 'exit', 'code': 0})
+            return
+
+        if request.get('type') != 'run':
+            session.send({'type': 'exit', 'code': 2})
+            return
+
+        threading.Thread(target=session.listen, args=(reader,), daemon=True).start()
+        code = self._run_session(session, request)
+        session.send({'type': 'exit', 'code': code})
+
+    def _run_session(self, session: _Session, request: Dict) -> int:
+        '''Corre el CLI con stdio redirigido al cliente'''
+        from src.cli import run_cli
+
+        saved_stdio = (sys.stdout, sys.stderr, sys.stdin)
+        saved_cwd = os.getcwd()
+        writer = _SocketWriter(session, bool(request.get('isatty')))
+
+        sys.stdout = writer
+        sys.stderr = writer
+        sys.stdin = _SocketReader(session)
+
+        session.running.set()
+        try:
+            if request.get('cwd') and os.path.isdir(request['cwd']):
+                os.chdir(request['cwd'])
+            self.workflow.supervisor.reset_run_state()
+            return run_cli(request.get('argv', []), workflow=self.workflow, validate=False)
+        except KeyboardInterrupt:
+            writer.write('\n⚠️  Investigación cancelada.\n')
+            return 130
+        except Exception as e:
+            writer.write(f'\n❌ Error en el daemon: {e}\n')
+            return 1
+        finally:
+            session.running.clear()
+            sys.stdout, sys.stderr, sys.stdin = saved_stdio
+            os.chdir(saved_cwd)
@@ -1,5 +1,10 @@
-﻿from .parsers import HumanInputParser
-from .visualizer import WorkflowVisualizer
-from .metrics_display import MetricsDisplay
+﻿from ..core.lazy import lazy_exports
 
-__all__ = ['HumanInputParser', 'WorkflowVisualizer', 'MetricsDisplay']
+_EXPORTS = {
+    'HumanInputParser': '.parsers',
+    'WorkflowVisualizer': '.visualizer',
+    'MetricsDisplay': '.metrics_display',
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,142 @@
+﻿'''
+Agrupamiento de findings con k-means vectorizado (NumPy) sobre TF-IDF hasheado
+'''
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..models.schemas import Finding
+from .text_features import word_vectors
+
+
+@dataclass
+class FindingCluster:
+    '''Grupo de findings con un título representativo'''
+    id: int
+    label: str
+    finding_ids: List[int] = field(default_factory=list)
+    relevance: float = 0.0
+
+
+def kmeans(
+    vectors: np.ndarray,
+    k: int,
+    n_iter: int = 50,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    K-means esférico (filas normalizadas, similitud coseno) con init k-means++.
+
+    Args:
+        vectors: Matriz (n x d) con filas normalizadas L2
+        k: Cantidad de clusters (se recorta a n)
+        n_iter: Iteraciones máximas de Lloyd
+        seed: Semilla para que el resultado sea reproducible
+
+    Returns:
+        (labels de largo n, centroides k x d)
+    '''
+    n = vectors.shape[0]
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+
+    # k-means++: cada centro nuevo se elige con probabilidad ∝ distancia² al más cercano
+    centers = [int(rng.integers(n))]
+    distance = 1.0 - vectors @ vectors[centers[0]]
+    for _ in range(1, k):
+        weights = np.clip(distance, 0.0, None) ** 2
+        total = weights.sum()
+        pick = int(rng.choice(n, p=weights / total)) if total > 0 else int(rng.integers(n))
+        centers.append(pick)
+        distance = np.minimum(distance, 1.0 - vectors @ vectors[pick])
+    centroids = vectors[centers].copy()
+
+    labels = np.full(n, -1)
+    for _ in range(n_iter):
+        similarity = vectors @ centroids.T
+        new_labels = similarity.argmax(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        # Suma por cluster en una sola operación (one-hot k x n por la matriz)
+        one_hot = np.zeros((k, n), dtype=vectors.dtype)
+        one_hot[labels, np.arange(n)] = 1.0
+        sums = one_hot @ vectors
+        sizes = one_hot.sum(axis=1)
+
+        # Cluster vacío: se re-siembra con el punto peor representado
+        for empty in np.flatnonzero(sizes == 0):
+            worst = int(similarity.max(axis=1).argmin())
+            sums[empty] = vectors[worst]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.maximum(norms, 1e-12)
+
+    return labels, centroids
+
+
+def default_cluster_count(n_findings: int) -> int:
+    '''Regla empírica √(n/2), entre 2 y 12 para que la tabla siga siendo legible'''
+    return max(2, min(12, round(math.sqrt(n_findings / 2))))
+
+
+def cluster_findings(
+    findings: List[Finding],
+    k: Optional[int] = None,
+    seed: int = 0
+) -> Tuple[List[Finding], List[FindingCluster]]:
+    '''
+    Agrupa findings por similitud de título + descripción.
+
+    Los clusters se numeran desde 1 por relevancia promedio descendente y los
+    findings se renumeran para que cada cluster tenga IDs contiguos (así
+    "approve 1-12" coincide con clusters completos). El label de cada cluster
+    es el título del finding más cercano al centroide.
+
+    Returns:
+        (findings renumerados en orden de cluster, clusters)
+    '''
+    if not findings:
+        return [], []
+
+    vectors = word_vectors([f'{f.title}. {f.description}' for f in findings])
+    labels, centroids = kmeans(vectors, k or default_cluster_count(len(findings)), seed=seed)
+
+    groups = []
+    for c in range(centroids.shape[0]):
+        members = np.flatnonzero(labels == c)
+        if members.size == 0:
+            continue
+        # Dentro del cluster: más relevantes primero
+        members = sorted(members, key=lambda i: findings[i].relevance_score, reverse=True)
+        representative = members[int((vectors[members] @ centroids[c]).argmax())]
+        relevance = float(np.mean([findings[i].relevance_score for i in members]))
+        groups.append((relevance, findings[representative].title, members))
+
+    groups.sort(key=lambda group: group[0], reverse=True)
+
+    renumbered: List[Finding] = []
+    clusters: List[FindingCluster] = []
+    for cluster_id, (relevance, label, members) in enumerate(groups, start=1):
+        ids = []
+        for i in members:
+            new_id = len(renumbered) + 1
+            renumbered.append(findings[i].model_copy(update={'id': new_id}))
+            ids.append(new_id)
+        clusters.append(FindingCluster(id=cluster_id, label=label, finding_ids=ids, relevance=relevance))
+
+    return renumbered, clusters
+
+
+def format_id_ranges(ids: List[int]) -> str:
+    '''[1, 2, 3, 7, 9, 10] → "1-3, 7, 9-10"'''
+    parts = []
+    for id in sorted(ids):
+        if parts and id == parts[-1][1] + 1:
+            parts[-1][1] = id
+        else:
+            parts.append([id, id])
+    return ', '.join(str(a) if a == b else f'{a}-{b}' for a, b in parts)
@@ -0,0 +1,183 @@
+﻿'''
+Compresión extractiva (sin LLM) del contenido curado antes del prompt del reporter
+
+1. Puntos clave y fuentes casi idénticos entre subtemas se dejan una sola vez.
+2. Si todavía no entra en el presupuesto, cada análisis se resume con TextRank
+   (PageRank sobre la similitud TF-IDF entre oraciones) conservando las
+   oraciones mejor rankeadas en su orden original.
+'''
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from ..models.schemas import CuratedContent
+from .text_features import char_vectors, word_vectors
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[\"\'(¿¡*\-\w])')
+
+
+def estimate_tokens(text: str) -> int:
+    '''Misma estimación que LLMClient.count_tokens_estimate (~4 caracteres por token)'''
+    return len(text) // 4
+
+
+@dataclass
+class CompressionStats:
+    '''Resultado de la compresión (tokens estimados del contenido)'''
+    original_tokens: int
+    compressed_tokens: int
+    key_points_removed: int = 0
+    sources_removed: int = 0
+    sentences_removed: int = 0
+
+    @property
+    def ratio(self) -> float:
+        '''Fracción que queda (1.0 = sin compresión)'''
+        return self.compressed_tokens / self.original_tokens if self.original_tokens else 1.0
+
+
+def split_sentences(text: str) -> List[str]:
+    '''Oraciones por párrafo (heurística de puntuación, suficiente para texto de LLM)'''
+    sentences = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        for sentence in _SENTENCE_RE.split(paragraph.strip()):
+            sentence = ' '.join(sentence.split())
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def textrank(sentences: List[str], damping: float = 0.85, n_iter: int = 100, tol: float = 1e-6) -> np.ndarray:
+    '''Puntaje de centralidad de cada oración (power iteration, suma 1)'''
+    n = len(sentences)
+    if n <= 1:
+        return np.ones(n)
+
+    vectors = word_vectors(sentences)
+    similarity = np.clip(vectors @ vectors.T, 0.0, None)
+    np.fill_diagonal(similarity, 0.0)
+
+    # Oraciones sin vecinos saltan a cualquier otra con igual probabilidad
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(row_sums > 0, similarity / np.maximum(row_sums, 1e-12), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(n_iter):
+        updated = (1.0 - damping) / n + damping * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < tol
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def summarize(text: str, token_budget: int, estimate: Callable[[str], int] = estimate_tokens) -> Tuple[str, int]:
+    '''
+    Resumen extractivo dentro del presupuesto (siempre queda al menos una oración).
+
+    Returns:
+        (texto resumido, oraciones descartadas)
+    '''
+    sentences = split_sentences(text)
+    if estimate(text) <= token_budget or len(sentences) <= 1:
+        return text, 0
+
+    scores = textrank(sentences)
+    chosen: List[int] = []
+    used = 0
+    for i in np.argsort(-scores, kind='stable'):
+        cost = estimate(sentences[i]) + 1
+        if chosen and used + cost > token_budget:
+            continue
+        chosen.append(int(i))
+        used += cost
+
+    return ' '.join(sentences[i] for i in sorted(chosen)), len(sentences) - len(chosen)
+
+
+def dedupe_across(groups: List[List[str]], threshold: float) -> Tuple[List[List[str]], int]:
+    '''
+    Quita de cada grupo los textos casi idénticos a uno ya visto (en este u otro
+    grupo anterior). Coseno sobre n-gramas de caracteres.
+
+    Returns:
+        (grupos sin duplicados, cantidad de textos quitados)
+    '''
+    flat = [(g, text) for g, group in enumerate(groups) for text in group]
+    if len(flat) < 2:
+        return [list(group) for group in groups], 0
+
+    vectors = char_vectors([text for _, text in flat])
+    similarity = vectors @ vectors.T
+
+    result: List[List[str]] = [[] for _ in groups]
+    kept: List[int] = []
+    for i, (g, text) in enumerate(flat):
+        if kept and similarity[i, kept].max() >= threshold:
+            continue
+        kept.append(i)
+        result[g].append(text)
+    return result, len(flat) - len(kept)
+
+
+def _allocate(lengths: List[int], available: int) -> List[int]:
+    '''Reparto "water-filling": los textos cortos quedan enteros y el resto se reparte parejo'''
+    allocation = [0] * len(lengths)
+    remaining = available
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    for position, i in enumerate(order):
+        fair = remaining // (len(order) - position)
+        allocation[i] = min(lengths[i], fair)
+        remaining -= allocation[i]
+    return allocation
+
+
+def compress_curated(
+    curated_content: List[CuratedContent],
+    token_budget: int,
+    key_point_threshold: float = 0.8,
+    source_threshold: float = 0.9,
+    estimate: Callable[[str], int] = estimate_tokens
+) -> Tuple[List[CuratedContent], CompressionStats]:
+    '''
+    Comprime el contenido curado para que análisis, puntos clave y fuentes
+    sumen como máximo token_budget tokens estimados (en la medida en que sea
+    posible dejando al menos una oración por análisis).
+
+    Returns:
+        (contenido comprimido, estadísticas)
+    '''
+    def tokens(items: List[CuratedContent]) -> int:
+        return sum(
+            estimate(c.analysis) + sum(estimate(p) for p in c.key_points) + sum(estimate(s) for s in c.sources)
+            for c in items
+        )
+
+    original_tokens = tokens(curated_content)
+    key_points, key_points_removed = dedupe_across([c.key_points for c in curated_content], key_point_threshold)
+    sources, sources_removed = dedupe_across([c.sources for c in curated_content], source_threshold)
+    compressed = [
+        c.model_copy(update={'key_points': kp, 'sources': src})
+        for c, kp, src in zip(curated_content, key_points, sources)
+    ]
+
+    sentences_removed = 0
+    if tokens(compressed) > token_budget:
+        fixed = tokens(compressed) - sum(estimate(c.analysis) for c in compressed)
+        allocation = _allocate([estimate(c.analysis) for c in compressed], max(0, token_budget - fixed))
+        summarized = []
+        for content, budget in zip(compressed, allocation):
+            analysis, removed = summarize(content.analysis, budget, estimate)
+            sentences_removed += removed
+            summarized.append(content.model_copy(update={'analysis': analysis}))
+        compressed = summarized
+
+    return compressed, CompressionStats(
+        original_tokens=original_tokens,
+        compressed_tokens=tokens(compressed),
+        key_points_removed=key_points_removed,
+        sources_removed=sources_removed,
+        sentences_removed=sentences_removed,
+    )
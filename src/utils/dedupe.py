@@ -0,0 +1,88 @@
+﻿'''
+Fusión de findings casi duplicados
+
+La similitud es el coseno sobre n-gramas de caracteres de título + descripción,
+o, si es mayor, el promedio con la similitud de los títulos canonizados: dos
+paráfrasis ("Applications of X" / "Practical uses of X") suelen tener
+descripciones redactadas distinto pero el mismo ángulo en el título.
+'''
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..models.schemas import Finding
+from .text_features import FACETS, char_vectors, title_vectors, tokenize
+
+# Peso de la similitud de títulos frente a la de título + descripción
+TITLE_WEIGHT = 0.5
+
+
+def _facets(title: str) -> set:
+    return {FACETS[token] for token in tokenize(title) if token in FACETS}
+
+
+def similarity_matrix(findings: List[Finding]) -> np.ndarray:
+    '''
+    Similitud entre findings (n x n). Los títulos solo suman si no declaran
+    ángulos distintos ("Benefits of X" vs "Challenges of X").
+    '''
+    full = char_vectors([f'{f.title}. {f.description}' for f in findings])
+    titles = title_vectors([f.title for f in findings])
+    full_sim = full @ full.T
+    title_sim = titles @ titles.T
+
+    facets = [_facets(f.title) for f in findings]
+    for i, a in enumerate(facets):
+        for j, b in enumerate(facets):
+            if a and b and not a & b:
+                title_sim[i, j] = 0.0
+
+    return np.maximum(full_sim, TITLE_WEIGHT * title_sim + (1 - TITLE_WEIGHT) * full_sim)
+
+
+def dedupe_findings(findings: List[Finding], threshold: float = 0.45) -> Tuple[List[Finding], List[Tuple[Finding, Finding]]]:
+    '''
+    Fusiona findings casi iguales (ver similarity_matrix). De cada grupo
+    se queda el de mayor relevance_score; los IDs se renumeran 1..n en el
+    orden original para que la tabla de validación no tenga huecos.
+
+    Args:
+        findings: Findings tal como salen del LLM
+        threshold: Similitud a partir de la cual dos findings son duplicados
+
+    Returns:
+        (findings sin duplicados, pares (conservado, descartado))
+    '''
+    if len(findings) < 2:
+        return findings, []
+
+    similarity = similarity_matrix(findings)
+
+    # Recorrer de mayor a menor relevancia: el primero de cada grupo es el que se conserva
+    order = sorted(range(len(findings)), key=lambda i: findings[i].relevance_score, reverse=True)
+    kept: List[int] = []
+    merged: List[Tuple[Finding, Finding]] = []
+
+    for i in order:
+        if kept:
+            best = max(kept, key=lambda k: similarity[i, k])
+            if similarity[i, best] >= threshold:
+                merged.append((findings[best], findings[i]))
+                continue
+        kept.append(i)
+
+    result = [findings[i].model_copy(update={'id': new_id}) for new_id, i in enumerate(sorted(kept), start=1)]
+    return result, merged
+
+
+def find_near_duplicate(finding: Finding, previous: List[Finding], threshold: float = 0.45) -> Optional[Finding]:
+    '''
+    Finding de previous casi igual al dado (para marcar duplicados a medida que
+    llegan en streaming; la fusión definitiva la hace dedupe_findings).
+    '''
+    if not previous:
+        return None
+
+    similarity = similarity_matrix(previous + [finding])[-1, :-1]
+    best = int(similarity.argmax())
+    return previous[best] if similarity[best] >= threshold else None
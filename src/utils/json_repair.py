@@ -0,0 +1,188 @@
+﻿'''
+Parser JSON tolerante para respuestas de LLM
+
+Recorre la respuesta una sola vez: ignora texto y fences de Markdown alrededor
+del JSON, corrige comas colgantes y saltos de línea crudos dentro de strings,
+y si la respuesta quedó truncada (max_tokens) cierra el string y los
+contenedores abiertos. Si el último miembro quedó a medias se descarta,
+volviendo al último punto seguro (la última coma o cierre completo).
+'''
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JSONRepairError(ValueError):
+    '''La respuesta no contiene JSON recuperable'''
+
+
+def _close(text: str, stack: List[str]) -> str:
+    # Sin comas, dos puntos ni claves colgando antes de cerrar
+    text = text.rstrip()
+    while text.endswith((',', ':')):
+        text = text[:-1].rstrip()
+    return text + ''.join(reversed(stack))
+
+
+def repair_json(text: str) -> Tuple[str, bool]:
+    '''
+    Extrae y repara el primer valor JSON (objeto o arreglo) del texto.
+
+    Returns:
+        (JSON válido como string, True si hubo que repararlo)
+
+    Raises:
+        JSONRepairError: si no hay JSON o no se puede recuperar
+    '''
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if not starts:
+        raise JSONRepairError('La respuesta no contiene JSON')
+
+    out: List[str] = []
+    stack: List[str] = []
+    # Último punto en que el JSON se puede cerrar sin miembros a medias
+    safe_length, safe_stack = 0, []
+    in_string = escape = repaired = False
+
+    for ch in text[min(starts):]:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch in '\n\r\t':
+                ch = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}[ch]
+                repaired = True
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+        elif ch in '}]':
+            if not stack:
+                break
+            # Coma colgante: {"a": 1,} → {"a": 1}
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+                repaired = True
+            closer = stack.pop()
+            repaired |= closer != ch
+            out.append(closer)
+            safe_length, safe_stack = len(out), list(stack)
+            if not stack:
+                break
+        elif ch == ',':
+            safe_length, safe_stack = len(out), list(stack)
+            out.append(ch)
+        else:
+            out.append(ch)
+
+    if not stack and not in_string:
+        return ''.join(out), repaired
+
+    # Truncado: primero se intenta conservar el último string (ej. un análisis a medias)
+    candidate = ''.join(out)
+    if in_string:
+        if escape:
+            candidate = candidate[:-1]
+        candidate += '"'
+    candidate = _close(candidate, stack)
+    try:
+        json.loads(candidate)
+        return candidate, True
+    except json.JSONDecodeError:
+        pass
+
+    if safe_length == 0:
+        raise JSONRepairError('JSON truncado antes del primer valor completo')
+    candidate = _close(''.join(out[:safe_length]), safe_stack)
+    try:
+        json.loads(candidate)
+    except json.JSONDecodeError as e:
+        raise JSONRepairError(f'JSON irrecuperable: {e}') from e
+    return candidate, True
+
+
+def parse_json(text: str) -> Tuple[Any, bool]:
+    '''
+    Parsea la respuesta del LLM.
+
+    Returns:
+        (valor, True si hubo que repararlo)
+
+    Raises:
+        JSONRepairError: si no hay JSON recuperable
+    '''
+    repaired_text, repaired = repair_json(text)
+    try:
+        return json.loads(repaired_text), repaired
+    except json.JSONDecodeError as e:
+        raise JSONRepairError(f'JSON inválido: {e}') from e
+
+
+class IncrementalJSONParser:
+    '''
+    Parser para respuestas en streaming: recibe la respuesta por partes y
+    devuelve cada objeto de un arreglo (ej. cada subtema de {"subtopics": [...]})
+    apenas se cierra, sin esperar al final del JSON.
+    '''
+
+    def __init__(self):
+        self._started = self._done = False
+        self._stack: List[str] = []
+        self._in_string = self._escape = False
+        # Objeto en curso (caracteres) y profundidad a la que empezó
+        self._item: Optional[List[str]] = None
+        self._item_depth = 0
+
+    def feed(self, chunk: str) -> List[Any]:
+        '''
+        Procesa un fragmento de la respuesta.
+
+        Returns:
+            Objetos que se completaron en este fragmento (los irrecuperables se omiten)
+        '''
+        completed: List[Any] = []
+        for ch in chunk:
+            if self._done:
+                break
+            if not self._started:
+                # Texto previo al JSON (prosa, fence de Markdown)
+                if ch not in '{[':
+                    continue
+                self._started = True
+            if self._item is not None:
+                self._item.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                if ch == '{' and self._item is None and self._stack and self._stack[-1] == ']':
+                    self._item, self._item_depth = ['{'], len(self._stack)
+                self._stack.append('}' if ch == '{' else ']')
+            elif ch in '}]' and self._stack:
+                self._stack.pop()
+                if self._item is not None and len(self._stack) == self._item_depth:
+                    try:
+                        completed.append(parse_json(''.join(self._item))[0])
+                    except JSONRepairError:
+                        pass
+                    self._item = None
+                self._done = not self._stack
+        return completed
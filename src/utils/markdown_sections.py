@@ -0,0 +1,96 @@
+﻿'''
+Lectura y parcheo de secciones de un reporte Markdown (encabezados ##)
+'''
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .text_features import char_vectors
+
+_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+
+
+@dataclass
+class Section:
+    '''Una sección: el encabezado y todo lo que sigue hasta el próximo del mismo nivel'''
+    title: str
+    body: str
+    level: int = 2
+
+    def render(self) -> str:
+        return f"{'#' * self.level} {self.title}\n{self.body}"
+
+
+def parse_sections(markdown: str, level: int = 2) -> Tuple[str, List[Section]]:
+    '''
+    Divide el Markdown en secciones del nivel indicado. Los encabezados más
+    profundos (###) quedan dentro del cuerpo; los que están dentro de bloques
+    de código se ignoran.
+
+    Returns:
+        (texto anterior a la primera sección, secciones)
+    '''
+    heading = re.compile(rf'^#{{{level}}}\s+(.+?)\s*#*\s*$')
+    preamble: List[str] = []
+    sections: List[Section] = []
+    current: Optional[Tuple[str, List[str]]] = None
+    in_fence = False
+
+    for line in markdown.splitlines(keepends=True):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else heading.match(line.rstrip('\n'))
+        if match:
+            if current is not None:
+                sections.append(Section(current[0], ''.join(current[1]), level))
+            current = (match.group(1), [])
+        elif current is None:
+            preamble.append(line)
+        else:
+            current[1].append(line)
+
+    if current is not None:
+        sections.append(Section(current[0], ''.join(current[1]), level))
+    return ''.join(preamble), sections
+
+
+def render_sections(preamble: str, sections: List[Section]) -> str:
+    '''Inversa de parse_sections'''
+    parts = [preamble] if preamble else []
+    for section in sections:
+        # Un cuerpo sin salto final no puede quedar pegado al encabezado siguiente
+        if parts and not parts[-1].endswith('\n'):
+            parts[-1] += '\n'
+        parts.append(section.render())
+    return ''.join(parts)
+
+
+def _normalize(title: str) -> str:
+    return ' '.join(re.findall(r'\w+', title.lower()))
+
+
+def find_section(sections: List[Section], *titles: str, threshold: float = 0.6) -> Optional[int]:
+    '''
+    Índice de la sección cuyo título coincide con alguno de los dados:
+    primero por igualdad normalizada y, si no, por similitud de n-gramas de
+    caracteres (el LLM no siempre copia el título del subtema al pie de la letra).
+    '''
+    if not sections or not titles:
+        return None
+
+    wanted = {_normalize(title) for title in titles}
+    for i, section in enumerate(sections):
+        if _normalize(section.title) in wanted:
+            return i
+
+    vectors = char_vectors([section.title for section in sections] + list(titles))
+    similarity = vectors[:len(sections)] @ vectors[len(sections):].T
+    best = int(similarity.max(axis=1).argmax())
+    return best if similarity[best].max() >= threshold else None
+
+
+def extract_section(markdown: str, *titles: str) -> Optional[Section]:
+    '''Sección de un texto suelto (ej: la respuesta del LLM) por título'''
+    _, sections = parse_sections(markdown)
+    index = find_section(sections, *titles)
+    return sections[index] if index is not None else None
@@ -4,7 +4,7 @@ Display avanzado de métricas de costo
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
-from typing import Dict
+from typing import Dict, List
 
 console = Console()
 
@@ -135,6 +135,11 @@ class MetricsDisplay:
         console.print('[bold]💵 Análisis Comparativo de Costos:[/bold]')
         console.print()
         
+        # Con llamadas en el ledger de uso: re-juego medido de políticas alternativas
+        if metrics.get('policies'):
+            MetricsDisplay._display_policy_comparison(metrics['policies'])
+            return
+        
         savings = metrics['savings']
         actual = savings['actual_cost']
         worst_case = savings['worst_case']
@@ -145,16 +150,6 @@ class MetricsDisplay:
         total_calls = metrics['total_calls']
         best_case = total_calls * (1000 / 1000) * 0.0001  # Todo cheap
         
-        # Si todos los costos son 0, mostrar costos simulados
-        if worst_case == 0:
-            # Usar precios simulados más realistas
-            worst_case = total_calls * 0.015  # ~$0.015 por llamada con GPT-4
-            actual = (metrics['distribution']['cheap']['calls'] * 0.001 + 
-                    metrics['distribution']['expensive']['calls'] * 0.015)
-            best_case = total_calls * 0.001
-            savings_amount = worst_case - actual
-            savings_pct = (savings_amount / worst_case * 100) if worst_case > 0 else 0
-        
         # Gráfico de barras comparativo
         max_cost = max(actual, worst_case, best_case)
         bar_scale = 40 / max_cost if max_cost > 0 else 1
@@ -175,8 +170,40 @@ class MetricsDisplay:
             console.print(f'  [yellow]Costo similar al worst case[/yellow]')
         
         console.print()
-        console.print('[dim]💡 Costos simulados basados en precios de OpenAI GPT-4 (~$0.03/1K tokens)[/dim]')
-        console.print('[dim]   para demostrar el valor de la optimización.[/dim]')
+        console.print('[dim]💡 Sin llamadas en el ledger de uso: worst case estimado con la tabla de precios[/dim]')
+    
+    @staticmethod
+    def _display_policy_comparison(policies: List[Dict]):
+        '''Costo y latencia de esta corrida re-jugada con otras políticas de ruteo'''
+        actual = policies[0]
+        max_cost = max(policy['cost'] for policy in policies)
+        bar_scale = 20 / max_cost if max_cost > 0 else 1
+        
+        table = Table(show_header=True, header_style='bold cyan', box=None, padding=(0, 1))
+        table.add_column('Política', style='cyan')
+        table.add_column('Costo', justify='right')
+        table.add_column('', style='green', no_wrap=True)
+        table.add_column('p50', justify='right')
+        table.add_column('p95', justify='right')
+        table.add_column('Tokens/s', justify='right')
+        for policy in policies:
+            is_actual = policy is actual
+            table.add_row(
+                f"[bold]{policy['name']}[/bold]" if is_actual else policy['name'],
+                f"[bold]${policy['cost']:.4f}[/bold]" if is_actual else f"${policy['cost']:.4f}",
+                '█' * int(policy['cost'] * bar_scale),
+                f"{policy['p50_s']:.1f}s",
+                f"{policy['p95_s']:.1f}s",
+                f"{policy['throughput_tps']:.0f}"
+            )
+        console.print(table)
+        console.print()
+        
+        worst = next((policy for policy in policies if policy['name'] == 'Todo modelo caro'), None)
+        if worst is not None and worst['cost'] > actual['cost']:
+            savings = worst['cost'] - actual['cost']
+            console.print(f"  [bold green]✓ Ahorro vs todo modelo caro: ${savings:.4f} ({savings / worst['cost'] * 100:.1f}%)[/bold green]")
+        console.print(f"[dim]💡 Medido: las {actual['calls']:.0f} llamadas de esta corrida (ledger de uso) re-jugadas con cada política[/dim]")
     
     @staticmethod
     def _display_insights(metrics: Dict):
@@ -228,5 +255,20 @@ class MetricsDisplay:
         elif savings_pct > 0:
             insights.append(f'[yellow]•[/yellow] Ahorro moderado ({int(savings_pct)}%)')
         
+        # Insight 5: Respuestas estructuradas
+        parsing = metrics.get('parsing', {})
+        if parsing.get('failures'):
+            insights.append(f'[red]✗[/red] {parsing["failures"]} respuestas no se pudieron parsear (tokens desperdiciados)')
+        if parsing.get('repairs'):
+            insights.append(f'[yellow]•[/yellow] {parsing["repairs"]} respuestas JSON reparadas (truncadas o mal formadas)')
+        
+        # Insight 6: Cascada
+        cascade = metrics.get('cascade', {})
+        if cascade.get('tasks'):
+            insights.append(
+                f'[cyan]•[/cyan] Cascada: {cascade["tasks"] - cascade["escalations"]}/{cascade["tasks"]} tareas '
+                f'resueltas sin escalar ({cascade["escalation_rate"]:.0%} escaladas)'
+            )
+        
         for insight in insights:
             console.print(f'  {insight}')
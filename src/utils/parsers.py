@@ -17,18 +17,26 @@ class HumanInputParser:
     - approve all
     - reject all
     - approve all except 2,3
+    - approve 1-40              (rangos de IDs)
+    - approve cluster 2,3       (todos los subtemas de esos clusters)
     """
     
     def __init__(self):
         self.last_feedback: Optional[HumanFeedback] = None
     
-    def parse(self, user_input: str, available_ids: List[int]) -> Tuple[HumanFeedback, Optional[str]]:
+    def parse(
+        self,
+        user_input: str,
+        available_ids: List[int],
+        clusters: Optional[Dict[int, List[int]]] = None
+    ) -> Tuple[HumanFeedback, Optional[str]]:
         """
         Parsea el input del usuario.
         
         Args:
             user_input: Comando ingresado por el usuario
             available_ids: IDs válidos de findings disponibles
+            clusters: Mapa cluster → IDs de sus findings (modo survey)
         
         Returns:
             Tuple de (HumanFeedback, error_message)
@@ -61,9 +69,11 @@ class HumanInputParser:
                 return feedback, None
             
             # CASO 3: approve all except X,Y
-            match = re.match(r'approve\s+all\s+except\s+([\d,\s]+)', user_input)
+            match = re.match(r'approve\s+all\s+except\s+(.+)', user_input)
             if match:
-                except_ids = self._parse_id_list(match.group(1))
+                except_ids, error = self._resolve_ids(match.group(1), clusters, available_ids)
+                if error:
+                    return None, error
                 # Validar IDs
                 invalid = [id for id in except_ids if id not in available_ids]
                 if invalid:
@@ -84,7 +94,9 @@ class HumanInputParser:
                 if cmd.startswith('approve'):
                     ids_str = cmd.replace('approve', '').strip()
                     if ids_str:
-                        ids = self._parse_id_list(ids_str)
+                        ids, error = self._resolve_ids(ids_str, clusters, available_ids)
+                        if error:
+                            return None, error
                         # Validar IDs
                         invalid = [id for id in ids if id not in available_ids]
                         if invalid:
@@ -95,7 +107,9 @@ class HumanInputParser:
                 elif cmd.startswith('reject'):
                     ids_str = cmd.replace('reject', '').strip()
                     if ids_str:
-                        ids = self._parse_id_list(ids_str)
+                        ids, error = self._resolve_ids(ids_str, clusters, available_ids)
+                        if error:
+                            return None, error
                         # Validar IDs
                         invalid = [id for id in ids if id not in available_ids]
                         if invalid:
@@ -168,21 +182,61 @@ class HumanInputParser:
     def _matches_reject_all(self, text: str) -> bool:
         return bool(re.match(r'reject\s+all\s*$', text))
     
-    def _parse_id_list(self, ids_str: str) -> List[int]:
-        """Parsea una lista de IDs: '1,3,5' o '1 3 5'"""
-        # Limpiar y splitear
-        ids_str = ids_str.replace(',', ' ')
+    def _parse_id_list(self, ids_str: str, valid_ids: Optional[List[int]] = None) -> List[int]:
+        """
+        Parsea una lista de IDs: '1,3,5', '1 3 5' o rangos '1-40'.
+        
+        Con valid_ids los rangos se recortan al mínimo/máximo válido antes de
+        expandirse ('approve 1-20000000' no arma 20M de IDs); los extremos que
+        quedan afuera se devuelven tal cual para que se reporten como inválidos.
+        """
+        # Limpiar y splitear ('1 - 40' → '1-40')
+        ids_str = re.sub(r'\s*-\s*', '-', ids_str.replace(',', ' '))
         parts = ids_str.split()
+        lowest, highest = (min(valid_ids), max(valid_ids)) if valid_ids else (None, None)
         
         ids = []
         for part in parts:
             try:
-                ids.append(int(part))
+                if '-' in part:
+                    start, end = (int(n) for n in part.split('-', 1))
+                    start, end = min(start, end), max(start, end)
+                    if lowest is None:
+                        ids.extend(range(start, end + 1))
+                        continue
+                    ids.extend(range(max(start, lowest), min(end, highest) + 1))
+                    ids.extend(n for n in (start, end) if n < lowest or n > highest)
+                else:
+                    ids.append(int(part))
             except ValueError:
                 continue
         
         return ids
     
+    def _resolve_ids(
+        self,
+        ids_str: str,
+        clusters: Optional[Dict[int, List[int]]],
+        available_ids: Optional[List[int]] = None
+    ) -> Tuple[List[int], Optional[str]]:
+        """Resuelve IDs de findings o referencias a clusters ('cluster 2,3')"""
+        match = re.match(r'clusters?\s+(.+)', ids_str.strip())
+        if not match:
+            return self._parse_id_list(ids_str, available_ids), None
+        
+        if not clusters:
+            return [], "❌ No hay clusters en esta validación. Usá IDs de subtemas: approve 1,3"
+        
+        cluster_ids = self._parse_id_list(match.group(1), list(clusters))
+        invalid = [c for c in cluster_ids if c not in clusters]
+        if invalid or not cluster_ids:
+            return [], f"❌ Clusters inválidos: {invalid}. Clusters disponibles: {sorted(clusters)}"
+        
+        ids = []
+        for cluster_id in cluster_ids:
+            ids.extend(clusters[cluster_id])
+        return ids, None
+    
     def _split_commands(self, text: str) -> List[str]:
         """Splitea múltiples comandos por 'and' o ';'"""
         # Primero por 'and', luego por ';'
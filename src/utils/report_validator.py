@@ -0,0 +1,86 @@
+﻿'''
+Validación local de la estructura del reporte (sin LLM)
+'''
+from dataclasses import dataclass
+from typing import List, Literal, Optional
+
+from .markdown_sections import find_section, parse_sections
+
+INTRODUCTION_TITLES = ('Introduction', 'Introducción')
+CONCLUSIONS_TITLES = ('Conclusions', 'Conclusiones')
+CLOSING_TITLES = CONCLUSIONS_TITLES + ('References', 'Referencias')
+
+
+@dataclass
+class ReportIssue:
+    '''Sección faltante o demasiado corta'''
+    kind: Literal['missing', 'short']
+    role: Literal['introduction', 'subtopic', 'conclusions']
+    section: str
+    words: int = 0
+    # Subtema al que corresponde (solo con role='subtopic')
+    subtopic: Optional[str] = None
+
+    def describe(self) -> str:
+        if self.kind == 'missing':
+            return f'falta la sección "{self.section}"'
+        return f'"{self.section}" tiene solo {self.words} palabras'
+
+
+def validate_report(
+    report: str,
+    subtopics: List[str],
+    min_words: int = 500,
+    min_section_words: int = 60,
+    expansion_words: int = 150
+) -> List[ReportIssue]:
+    '''
+    Revisa que el reporte tenga introducción, una sección por subtema y
+    conclusiones, cada una con un mínimo de palabras. Si el total queda por
+    debajo de min_words, marca además las secciones de subtemas más cortas
+    (suponiendo que regenerar una agrega ~expansion_words palabras).
+
+    Args:
+        report: Markdown generado
+        subtopics: Títulos de los subtemas curados
+        min_words: Mínimo de palabras del reporte completo
+        min_section_words: Mínimo por sección
+
+    Returns:
+        Problemas encontrados (vacío si el reporte está bien)
+    '''
+    _, sections = parse_sections(report)
+    issues: List[ReportIssue] = []
+    flagged = set()
+
+    def check(titles, role, name, subtopic=None):
+        index = find_section(sections, *titles)
+        if index is None:
+            issues.append(ReportIssue('missing', role, name, subtopic=subtopic))
+            return
+        words = len(sections[index].body.split())
+        if words < min_section_words:
+            issues.append(ReportIssue('short', role, sections[index].title, words, subtopic))
+            flagged.add(index)
+
+    check(INTRODUCTION_TITLES, 'introduction', 'Introduction')
+    for subtopic in subtopics:
+        check((subtopic,), 'subtopic', subtopic, subtopic)
+    check(CONCLUSIONS_TITLES, 'conclusions', 'Conclusions')
+
+    deficit = min_words - len(report.split())
+    if deficit > 0:
+        # Faltan palabras: expandir los subtemas más cortos que todavía no estén marcados
+        deficit -= expansion_words * len(issues)
+        candidates = []
+        for subtopic in subtopics:
+            index = find_section(sections, subtopic)
+            if index is not None and index not in flagged:
+                candidates.append((len(sections[index].body.split()), sections[index].title, subtopic))
+        for words, title, subtopic in sorted(candidates):
+            if deficit <= 0:
+                break
+            issues.append(ReportIssue('short', 'subtopic', title, words, subtopic))
+            deficit -= expansion_words
+
+    return issues
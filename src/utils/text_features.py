@@ -0,0 +1,125 @@
+﻿'''
+Features de texto vectorizadas: tokenización, hashing trick y TF-IDF en NumPy
+'''
+import re
+import zlib
+from functools import lru_cache
+from typing import Iterable, List, Sequence
+
+import numpy as np
+
+STOPWORDS = frozenset('''
+a an and are as at be but by for from has have how in is it its of on or that the this to was were what
+when where which who why will with within into about over than then there these those their them they
+we you your our not no can could should would may might also more most such other some any all each
+el la los las un una unos unas y o de del en por para con sin sobre que como es son se su sus al lo
+'''.split())
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Ángulo de un subtema ("Applications of X", "Practical uses of X"): sinónimos
+# frecuentes en títulos generados por el LLM, llevados a una forma canónica
+FACETS = {
+    word: facet
+    for facet, words in {
+        'applications': 'application applications use uses usage aplicación aplicaciones uso usos',
+        'ethics': 'ethics ethical moral morality ética éticas ético éticos',
+        'challenges': 'challenge challenges limitation limitations problems barriers obstacles '
+                      'desafío desafíos reto retos limitaciones',
+        'costs': 'cost costs economics economic price prices pricing costo costos economía',
+        'benefits': 'benefit benefits advantages pros beneficio beneficios ventajas',
+        'future': 'future trends outlook prospects futuro tendencias perspectivas',
+        'history': 'history evolution origins historia evolución orígenes',
+        'impact': 'impact impacts effects implications impacto efectos implicaciones',
+    }.items()
+    for word in words.split()
+}
+
+# Palabras de relleno en títulos que no cambian el subtema
+TITLE_FILLERS = frozenset('''
+practical real world key main overview introduction concerns considerations issues aspects
+prácticos prácticas principales introducción consideraciones aspectos
+'''.split())
+
+DEFAULT_FEATURES = 2 ** 12
+
+
+def tokenize(text: str) -> List[str]:
+    '''Minúsculas, tokens alfanuméricos, sin stopwords ni tokens de 1 caracter'''
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS and not token.isdigit()
+    ]
+
+
+def title_tokens(title: str) -> List[str]:
+    '''Tokens de un título con los ángulos canonizados (FACETS), sin relleno ni plural simple'''
+    tokens = []
+    for token in tokenize(title):
+        if token in TITLE_FILLERS:
+            continue
+        if token in FACETS:
+            tokens.append(FACETS[token])
+        else:
+            tokens.append(token[:-1] if len(token) > 3 and token.endswith('s') else token)
+    return tokens
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = (3, 4, 5)) -> List[str]:
+    '''N-gramas de caracteres sobre el texto normalizado (robusto a plurales y variantes)'''
+    normalized = ' ' + ' '.join(_TOKEN_RE.findall(text.lower())) + ' '
+    return [normalized[i:i + n] for n in sizes for i in range(len(normalized) - n + 1)]
+
+
+@lru_cache(maxsize=200_000)
+def _bucket(token: str, n_features: int) -> int:
+    # crc32 es determinístico entre procesos (a diferencia de hash())
+    return zlib.crc32(token.encode('utf-8')) & (n_features - 1)
+
+
+def hash_counts(documents: Iterable[List[str]], n_features: int = DEFAULT_FEATURES) -> np.ndarray:
+    '''
+    Matriz de conteos (n_docs x n_features) con el hashing trick.
+    n_features debe ser potencia de 2.
+    '''
+    rows: List[int] = []
+    cols: List[int] = []
+    n_docs = 0
+
+    for row, tokens in enumerate(documents):
+        n_docs = row + 1
+        rows.extend([row] * len(tokens))
+        cols.extend(_bucket(token, n_features) for token in tokens)
+
+    flat = np.asarray(rows, dtype=np.int64) * n_features + np.asarray(cols, dtype=np.int64)
+    counts = np.bincount(flat, minlength=n_docs * n_features).astype(np.float32)
+    return counts.reshape(n_docs, n_features)
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def tfidf(counts: np.ndarray) -> np.ndarray:
+    '''TF sublineal x IDF suavizado calculado sobre el propio batch, filas normalizadas L2'''
+    n_docs = counts.shape[0]
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+    tf = np.log1p(counts)
+    return l2_normalize(tf * idf.astype(np.float32))
+
+
+def word_vectors(texts: Sequence[str], n_features: int = DEFAULT_FEATURES) -> np.ndarray:
+    '''TF-IDF hasheado de palabras, una fila normalizada por texto'''
+    return tfidf(hash_counts((tokenize(text) for text in texts), n_features))
+
+
+def title_vectors(titles: Sequence[str], n_features: int = DEFAULT_FEATURES) -> np.ndarray:
+    '''TF-IDF hasheado de title_tokens: las palabras del tema, comunes a todo el batch, pesan poco'''
+    return tfidf(hash_counts((title_tokens(title) for title in titles), n_features))
+
+
+def char_vectors(texts: Sequence[str], n_features: int = DEFAULT_FEATURES) -> np.ndarray:
+    '''TF-IDF hasheado de n-gramas de caracteres, una fila normalizada por texto'''
+    return tfidf(hash_counts((char_ngrams(text) for text in texts), n_features))
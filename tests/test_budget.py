@@ -0,0 +1,184 @@
+﻿'''
+Tests del presupuesto por corrida: escalones, degradación y reporte "anytime"
+'''
+import json
+import threading
+import time
+import pytest
+from src.agents.curator import CuratorAgent
+from src.agents.reporter import ReporterAgent
+from src.agents.supervisor import SupervisorAgent
+from src.core.budget import RunBudget, make_run_budget
+from src.core.cost_optimizer import CostOptimizer
+from src.models.enums import TaskComplexity
+from src.models.schemas import CuratedContent, Finding
+
+ANALYSIS = json.dumps({
+    'analysis': ' '.join(['insight'] * 150),
+    'key_points': ['a', 'b', 'c'],
+    'sources': ['IEA'],
+})
+SHORT_ANALYSIS = json.dumps({'analysis': 'Too short.', 'key_points': ['a'], 'sources': []})
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class _BlockingLLM:
+    '''El subtema "Slow" no responde hasta que se libera el evento'''
+
+    def __init__(self, slow_response=ANALYSIS):
+        self.release = threading.Event()
+        self.slow_response = slow_response
+        self.slow_calls = 0
+
+    def generate(self, prompt, **kwargs):
+        if 'Slow' in prompt:
+            self.slow_calls += 1
+            self.release.wait(5)
+            return self.slow_response
+        return ANALYSIS
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+def _finding(id, title, relevance=0.8):
+    return Finding(id=id, title=title, description=f'{title} in schools', relevance_score=relevance, source='LLM')
+
+def _optimizer():
+    optimizer = CostOptimizer()
+    optimizer.output_lengths = None
+    optimizer.cascade = False
+    return optimizer
+
+class TestRunBudget:
+    '''REQUIREMENT: El presupuesto baja de escalón según la mayor fracción consumida (costo o tiempo)'''
+
+    def test_levels_by_cost(self):
+        budget = RunBudget(max_cost=1.0)
+
+        assert budget.level(0.1) == 'normal'
+        assert budget.level(0.6) == 'tight'
+        assert budget.level(0.9) == 'critical'
+        assert budget.exhausted(1.0)
+
+    def test_levels_by_time(self):
+        clock = _Clock()
+        budget = RunBudget(deadline_s=100, report_reserve_s=20, clock=clock)
+
+        assert budget.level(0.0) == 'normal'
+        clock.now += 70
+        assert budget.plan(0.0).max_tier == 'moderate'
+        assert budget.remaining_time() == 30
+        assert budget.remaining_time(budget.report_reserve_s) == 10
+        assert not budget.needs_anytime_report(0.0)
+        clock.now += 25
+        assert budget.needs_anytime_report(0.0)
+
+    def test_no_limits_no_budget(self):
+        assert make_run_budget() is None
+        assert make_run_budget(max_cost=0.05).max_cost == 0.05
+
+class TestCostOptimizerBudget:
+    '''REQUIREMENT: Con el presupuesto ajustado no se usan tiers caros y max_tokens se achica'''
+
+    def test_tier_cap(self):
+        optimizer = _optimizer()
+        optimizer.apply_budget('cheap', 0.5)
+
+        assert optimizer.select_model(TaskComplexity.CRITICAL, force_model='expensive') == optimizer.models['cheap']
+        assert optimizer.tiers() == [optimizer.models['cheap']]
+
+    def test_token_scale(self):
+        optimizer = _optimizer()
+        optimizer.apply_budget('moderate', 0.5)
+
+        assert optimizer.plan_tokens('report', 100, max_tokens=3000, estimated_tokens=3000) == (3000, 1500)
+        optimizer.apply_budget(None, 1.0)
+        assert optimizer.plan_tokens('report', 100, max_tokens=3000, estimated_tokens=3000) == (3000, 3000)
+
+class TestCuratorBudget:
+    '''REQUIREMENT: Vencido el deadline el curator devuelve lo que terminó; agotado el costo no empieza análisis nuevos'''
+
+    def test_deadline_returns_finished_analyses(self):
+        llm = _BlockingLLM()
+        curator = CuratorAgent(llm, _optimizer())
+        curator.knowledge_cache = None
+        curator.max_concurrency = 2
+        budget = RunBudget(deadline_s=0.5, report_reserve_s=0)
+
+        try:
+            curated = curator.curate([_finding(1, 'Fast'), _finding(2, 'Slow')], 'AI', budget=budget)
+        finally:
+            llm.release.set()
+
+        assert [c.topic for c in curated] == ['Fast']
+
+    def test_abandoned_analysis_is_reserved_and_does_not_escalate(self):
+        llm = _BlockingLLM(slow_response=SHORT_ANALYSIS)
+        optimizer = _optimizer()
+        optimizer.cascade = True
+        optimizer.models = {'cheap': 'small', 'moderate': 'medium', 'expensive': 'large'}
+        curator = CuratorAgent(llm, optimizer)
+        curator.knowledge_cache = None
+        curator.max_concurrency = 2
+
+        try:
+            curator.curate([_finding(1, 'Fast'), _finding(2, 'Slow')], 'AI', budget=RunBudget(deadline_s=0.5, report_reserve_s=0))
+            # La llamada abandonada ya cuenta para el presupuesto (y para el reporte anytime)
+            assert optimizer.committed_cost > optimizer.metrics.total_cost
+        finally:
+            llm.release.set()
+
+        for _ in range(100):
+            if optimizer.committed_cost == optimizer.metrics.total_cost:
+                break
+            time.sleep(0.02)
+        # Sin cancelación el análisis corto habría escalado a 'medium'
+        assert llm.slow_calls == 1
+        assert optimizer.committed_cost == pytest.approx(optimizer.metrics.total_cost)
+
+    def test_exhausted_cost_skips_analysis(self):
+        llm = _BlockingLLM()
+        curator = CuratorAgent(llm, _optimizer())
+        curator.knowledge_cache = None
+        curator.cost_optimizer.metrics.expensive_cost = 1.0
+
+        curated = curator.curate([_finding(1, 'Fast')], 'AI', budget=RunBudget(max_cost=0.5))
+
+        assert curated == []
+
+    def test_low_relevance_findings_are_dropped(self):
+        findings = [_finding(1, 'Ethics', 0.9), _finding(2, 'Costs', 0.3), _finding(3, 'Training', 0.2)]
+
+        kept = SupervisorAgent._drop_low_relevance(findings, 0.5, prior={3: None})
+        assert [f.id for f in kept] == [1, 3]
+
+        # Siempre queda el más relevante
+        kept = SupervisorAgent._drop_low_relevance(findings[1:], 0.7, prior={})
+        assert [f.id for f in kept] == [2]
+
+class TestAnytimeReport:
+    '''REQUIREMENT: El reporte parcial se arma sin LLM con lo curado y lista los subtemas pendientes'''
+
+    def test_structure(self, tmp_path):
+        reporter = ReporterAgent(None, _optimizer())
+        curated = [CuratedContent(topic='Ethics', analysis='Fairness matters.', key_points=['Bias audits'],
+                                  sources=['IEA'], word_count=2)]
+        findings = [_finding(1, 'Ethics'), _finding(2, 'Costs')]
+
+        report, path = reporter.generate_anytime_report('AI', curated, str(tmp_path), findings)
+
+        headings = [line for line in report.splitlines() if line.startswith('#')]
+        assert headings == ['# AI: Partial Analysis', '## Introduction', '## Ethics',
+                            '## Pending Subtopics', '## Conclusions', '## References']
+        assert '- Costs: Costs in schools' in report
+        assert '- Bias audits' in report
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == report
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
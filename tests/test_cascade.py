@@ -0,0 +1,161 @@
+﻿'''
+Tests de la cascada: modelo barato primero, chequeos locales y escalamiento
+'''
+import json
+import pytest
+from src.agents.curator import CuratorAgent
+from src.agents.investigator import InvestigatorAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.core.usage_ledger import UsageLedger, UsageRecord
+from src.models.schemas import Finding
+from src.search.mock import MockSearchProvider
+
+GOOD_ANALYSIS = json.dumps({
+    'analysis': ' '.join(['insight'] * 150),
+    'key_points': ['a', 'b', 'c'],
+    'sources': ['IEA'],
+})
+SHORT_ANALYSIS = json.dumps({'analysis': 'Too short.', 'key_points': ['a'], 'sources': []})
+
+def _subtopics(n):
+    return json.dumps({'subtopics': [
+        {'id': i, 'title': title, 'description': f'{title} in schools', 'relevance': 0.8}
+        for i, title in enumerate(['Ethics', 'Costs', 'Teacher training', 'Assessment', 'Accessibility'][:n], start=1)
+    ]})
+
+class _TieredLLM:
+    '''Responde según el modelo pedido'''
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def generate(self, prompt, **kwargs):
+        self.calls.append((kwargs['model'], kwargs.get('escalation', 0)))
+        return self.responses[kwargs['model']]
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+def _finding():
+    return Finding(id=1, title='Ethics', description='Fairness', relevance_score=0.9, source='LLM')
+
+class TestCascade:
+    '''REQUIREMENT: Solo las salidas que fallan los chequeos locales se repiten en el tier siguiente'''
+
+    def _optimizer(self):
+        optimizer = CostOptimizer()
+        optimizer.models = {'cheap': 'small', 'moderate': 'small', 'expensive': 'large'}
+        optimizer.cascade = True
+        optimizer.max_escalations = 1
+        optimizer.output_lengths = None
+        return optimizer
+
+    def test_next_tier(self):
+        optimizer = self._optimizer()
+
+        assert optimizer.tiers() == ['small', 'large']
+        assert optimizer.next_tier('small') == 'large'
+        assert optimizer.next_tier('large') is None
+        assert optimizer.next_tier('small', escalation=1) is None
+
+    def test_curator_stays_on_cheap_model(self):
+        llm = _TieredLLM({'small': GOOD_ANALYSIS, 'large': GOOD_ANALYSIS})
+        curator = CuratorAgent(llm, self._optimizer())
+        curator.knowledge_cache = None
+
+        curator.curate([_finding()], 'AI')
+
+        assert llm.calls == [('small', 0)]
+        assert curator.cost_optimizer.metrics.cascade_tasks == 1
+        assert curator.cost_optimizer.metrics.escalations == 0
+
+    def _three_tier_optimizer(self):
+        optimizer = self._optimizer()
+        optimizer.models = {'cheap': 'small', 'moderate': 'medium', 'expensive': 'large'}
+        optimizer.max_escalations = 2
+        return optimizer
+
+    def test_next_tier_cap(self):
+        optimizer = self._three_tier_optimizer()
+
+        assert optimizer.next_tier('small', max_tier='moderate') == 'medium'
+        assert optimizer.next_tier('medium', escalation=1, max_tier='moderate') is None
+        assert optimizer.next_tier('medium', escalation=1) == 'large'
+
+    def test_curator_escalates_short_analysis(self):
+        llm = _TieredLLM({'small': SHORT_ANALYSIS, 'medium': GOOD_ANALYSIS, 'large': GOOD_ANALYSIS})
+        curator = CuratorAgent(llm, self._three_tier_optimizer())
+        curator.knowledge_cache = None
+
+        curated = curator.curate([_finding()], 'AI')
+
+        assert llm.calls == [('small', 0), ('medium', 1)]
+        assert curated[0].key_points == ['a', 'b', 'c']
+        assert curator.cost_optimizer.get_detailed_metrics()['cascade']['escalation_rate'] == 1.0
+
+    def test_curator_never_escalates_past_moderate(self):
+        llm = _TieredLLM({'small': SHORT_ANALYSIS, 'medium': SHORT_ANALYSIS, 'large': GOOD_ANALYSIS})
+        curator = CuratorAgent(llm, self._three_tier_optimizer())
+        curator.knowledge_cache = None
+
+        curated = curator.curate([_finding()], 'AI')
+
+        assert llm.calls == [('small', 0), ('medium', 1)]
+        assert curated[0].analysis == 'Too short.'
+
+    def test_curator_does_not_escalate_when_cheap_is_moderate(self):
+        # Configuración por defecto: MODEL_CHEAP == MODEL_MODERATE
+        llm = _TieredLLM({'small': SHORT_ANALYSIS, 'large': GOOD_ANALYSIS})
+        curator = CuratorAgent(llm, self._optimizer())
+        curator.knowledge_cache = None
+
+        curated = curator.curate([_finding()], 'AI')
+
+        assert llm.calls == [('small', 0)]
+        assert curated[0].analysis == 'Too short.'
+
+    def test_curator_logs_reported_usage(self):
+        llm = _TieredLLM({'small': GOOD_ANALYSIS})
+        llm.last_usage = UsageRecord(task='analysis', model='small', prompt_tokens=700, completion_tokens=300,
+                                     max_tokens=1500)
+        optimizer = self._optimizer()
+        optimizer.PRICES = {'small': 0.001}
+        curator = CuratorAgent(llm, optimizer)
+        curator.knowledge_cache = None
+
+        curator.curate([_finding()], 'AI')
+
+        assert optimizer.metrics.cheap_cost == pytest.approx(0.001)
+
+    def test_investigator_escalates_too_few_subtopics(self):
+        llm = _TieredLLM({'small': _subtopics(2), 'large': _subtopics(5)})
+        investigator = InvestigatorAgent(llm, self._optimizer(), MockSearchProvider())
+        investigator.streaming = False
+
+        findings = investigator.investigate('AI in education')
+
+        assert llm.calls == [('small', 0), ('large', 1)]
+        assert len(findings) == 5
+
+    def test_investigator_escalates_invalid_json(self):
+        llm = _TieredLLM({'small': 'Here are some subtopics: ethics, costs', 'large': _subtopics(4)})
+        investigator = InvestigatorAgent(llm, self._optimizer(), MockSearchProvider())
+        investigator.streaming = False
+
+        findings = investigator.investigate('AI in education')
+
+        assert [f.source for f in findings] == ['LLM Analysis'] * 4
+        assert investigator.cost_optimizer.metrics.escalations == 1
+
+    def test_ledger_escalation_rate(self, tmp_path):
+        ledger = UsageLedger(str(tmp_path / 'usage.jsonl'))
+        for escalation in (0, 0, 0, 1):
+            ledger.record(UsageRecord(task='analysis', model='m', prompt_tokens=1, completion_tokens=1,
+                                      max_tokens=10, escalation=escalation))
+
+        assert ledger.escalation_rate('analysis') == pytest.approx(1 / 3)
+        assert ledger.escalation_rate('report') == 0.0
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
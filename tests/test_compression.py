@@ -0,0 +1,88 @@
+﻿'''
+Tests de la compresión extractiva del contexto del reporter
+'''
+import numpy as np
+import pytest
+from src.models.schemas import CuratedContent
+from src.utils.compression import (
+    compress_curated, dedupe_across, estimate_tokens, split_sentences, summarize, textrank
+)
+
+ANALYSIS = (
+    'Solar panels convert sunlight into electricity using photovoltaic cells. '
+    'Photovoltaic cells in solar panels are made of silicon. '
+    'The efficiency of solar panels and photovoltaic cells keeps improving every year. '
+    'My neighbour owns a red bicycle. '
+    'Cheaper silicon makes solar panels affordable for households.\n\n'
+    'Grid operators must balance solar electricity with storage. '
+    'Batteries store solar electricity for the night.'
+)
+
+def _content(topic, analysis=ANALYSIS, key_points=None, sources=None):
+    return CuratedContent(topic=topic, analysis=analysis, key_points=key_points or [], sources=sources or [],
+                          word_count=len(analysis.split()))
+
+class TestContextCompression:
+    '''REQUIREMENT: El contexto del reporter entra en un presupuesto de tokens sin llamar al LLM'''
+
+    def test_split_sentences(self):
+        sentences = split_sentences(ANALYSIS)
+
+        assert len(sentences) == 7
+        assert sentences[0].startswith('Solar panels convert')
+        assert sentences[-1] == 'Batteries store solar electricity for the night.'
+
+    def test_textrank_prefers_central_sentences(self):
+        sentences = split_sentences(ANALYSIS)
+        scores = textrank(sentences)
+
+        assert scores.sum() == pytest.approx(1.0)
+        assert int(np.argmin(scores)) == 3  # la bicicleta no tiene relación con nada
+
+    def test_summarize_respects_budget_and_order(self):
+        summary, removed = summarize(ANALYSIS, token_budget=40)
+
+        assert estimate_tokens(summary) <= 40 + len(split_sentences(summary))
+        assert removed > 0
+        assert 'bicycle' not in summary
+        # Las oraciones elegidas conservan su orden original
+        positions = [ANALYSIS.index(s) for s in split_sentences(summary)]
+        assert positions == sorted(positions)
+
+    def test_dedupe_across_subtopics(self):
+        groups = [
+            ['Solar panels are getting cheaper', 'Storage is key'],
+            ['Solar panels are getting cheaper.', 'Policy incentives matter'],
+        ]
+
+        result, removed = dedupe_across(groups, threshold=0.8)
+
+        assert removed == 1
+        assert result == [['Solar panels are getting cheaper', 'Storage is key'], ['Policy incentives matter']]
+
+    def test_compress_within_budget(self):
+        curated = [
+            _content(f'Subtopic {i}', key_points=['Solar is cheap', f'Point {i}'], sources=['https://iea.org/solar'])
+            for i in range(6)
+        ]
+
+        compressed, stats = compress_curated(curated, token_budget=300)
+
+        assert stats.original_tokens > 300
+        assert stats.compressed_tokens <= 300
+        assert stats.ratio < 0.6
+        assert stats.key_points_removed == 5
+        assert stats.sources_removed == 5
+        assert [c.topic for c in compressed] == [c.topic for c in curated]
+        assert all(c.analysis for c in compressed)
+
+    def test_short_content_is_untouched(self):
+        curated = [_content('Solar', key_points=['A'], sources=['B'])]
+
+        compressed, stats = compress_curated(curated, token_budget=2000)
+
+        assert compressed[0].analysis == ANALYSIS
+        assert stats.ratio == 1.0
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
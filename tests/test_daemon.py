@@ -0,0 +1,180 @@
+﻿'''
+Tests del daemon y su protocolo sobre Unix domain socket
+'''
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from src.service.daemon import ResearchDaemon
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Requiere Unix domain sockets')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Daemon real (serve_forever) con un workflow que se queda esperando input()
+DAEMON_SCRIPT = '''
+import sys
+from src.service.daemon import ResearchDaemon
+from tests.test_daemon import _FakeWorkflow
+
+class Daemon(ResearchDaemon):
+    def warm_up(self):
+        self.workflow = _FakeWorkflow()
+        return True
+
+Daemon(path=sys.argv[1]).serve_forever()
+'''
+
+class _FakeSupervisor:
+    def __init__(self):
+        self.resets = 0
+
+    def reset_run_state(self):
+        self.resets += 1
+
+class _FakeWorkflow:
+    '''Workflow sin LLM: pide una decisión por input() como la validación humana'''
+
+    def __init__(self):
+        self.supervisor = _FakeSupervisor()
+        self.topics = []
+        self.decisions = []
+
+    def run(self, topic, survey=False, max_cost=None, deadline_s=None, interactive=False):
+        self.topics.append(topic)
+        print(f'Investigando {topic}')
+        self.decisions.append(input('[Tu decisión] > '))
+        return {}
+
+class TestDaemonProtocol:
+    '''REQUIREMENT: El CLI se ejecuta en un daemon caliente y la salida vuelve en streaming'''
+
+    def setup_method(self):
+        self.daemon = ResearchDaemon(path='unused')
+        self.daemon.workflow = _FakeWorkflow()
+
+    def _serve_once(self, server):
+        conn, _ = server.accept()
+        with conn:
+            self.daemon._handle(conn)
+
+    def _session(self, tmp_path, request):
+        path = str(tmp_path / 'daemon.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+        thread = threading.Thread(target=self._serve_once, args=(server,), daemon=True)
+        thread.start()
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        client.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        reader = client.makefile('r', encoding='utf-8')
+
+        output, inputs_requested, exit_code = '', 0, None
+        for line in reader:
+            message = json.loads(line)
+            if message['type'] == 'out':
+                output += message['data']
+            elif message['type'] == 'input':
+                inputs_requested += 1
+                client.sendall((json.dumps({'type': 'input', 'data': 'approve all\n'}) + '\n').encode('utf-8'))
+            elif message['type'] == 'exit':
+                exit_code = message['code']
+                break
+
+        client.close()
+        thread.join(timeout=5)
+        server.close()
+        return output, inputs_requested, exit_code
+
+    def test_run_streams_output_and_forwards_input(self, tmp_path):
+        output, inputs_requested, exit_code = self._session(tmp_path, {
+            'type': 'run', 'argv': ['Test', 'topic'], 'cwd': os.getcwd(), 'isatty': False
+        })
+
+        assert exit_code == 0
+        assert 'Investigando Test topic' in output
+        assert '[Tu decisión] >' in output
+        assert inputs_requested == 1
+        assert self.daemon.workflow.decisions == ['approve all']
+        assert self.daemon.workflow.supervisor.resets == 1
+
+    def test_shutdown_request(self, tmp_path):
+        _, _, exit_code = self._session(tmp_path, {'type': 'shutdown'})
+
+        assert exit_code == 0
+        assert self.daemon._stop
+
+def _start_daemon(path):
+    process = subprocess.Popen([sys.executable, '-c', DAEMON_SCRIPT, path], cwd=ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        if os.path.exists(path) or process.poll() is not None:
+            break
+        time.sleep(0.05)
+    return process
+
+def _run(path, on_input, request=None):
+    '''Manda una corrida; on_input(client) se llama en cada pedido de input. Retorna el exit code'''
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(10)
+    client.connect(path)
+    client.sendall((json.dumps(request or {'type': 'run', 'argv': ['Test'], 'isatty': False}) + '\n').encode('utf-8'))
+
+    exit_code = None
+    for line in client.makefile('r', encoding='utf-8'):
+        message = json.loads(line)
+        if message['type'] == 'input':
+            on_input(client)
+        elif message['type'] == 'exit':
+            exit_code = message['code']
+            break
+    client.close()
+    return exit_code
+
+def _send(client, message):
+    client.sendall((json.dumps(message) + '\n').encode('utf-8'))
+
+class TestDaemonSignals:
+    '''REQUIREMENT: SIGTERM durante una corrida la cancela, detiene el daemon y borra el socket'''
+
+    def test_sigterm_during_run(self, tmp_path):
+        path = str(tmp_path / 'daemon.sock')
+        process = _start_daemon(path)
+        try:
+            exit_code = _run(path, lambda client: process.send_signal(signal.SIGTERM))
+
+            assert process.wait(timeout=10) == 0
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+        assert exit_code == 130
+        assert not os.path.exists(path)
+
+    def test_interrupt_while_waiting_for_input(self, tmp_path):
+        '''Ctrl+C del cliente en un input() cancela la sesión y el daemon sigue atendiendo'''
+        path = str(tmp_path / 'daemon.sock')
+        process = _start_daemon(path)
+        try:
+            interrupted = _run(path, lambda client: _send(client, {'type': 'interrupt'}))
+            answered = _run(path, lambda client: _send(client, {'type': 'input', 'data': 'approve all\n'}))
+            stopped = _run(path, lambda client: None, {'type': 'shutdown'})
+
+            assert process.wait(timeout=10) == 0
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+        assert interrupted == 130
+        assert answered == 0
+        assert stopped == 0
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
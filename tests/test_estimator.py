@@ -0,0 +1,81 @@
+﻿'''
+Tests de la estimación previa de costo y tiempo (validación humana)
+'''
+import pytest
+from src.agents.supervisor import SupervisorAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.core.estimator import RunEstimator
+from src.core.usage_ledger import UsageLedger, UsageRecord
+
+def _optimizer():
+    optimizer = CostOptimizer()
+    optimizer.models = {'cheap': 'small', 'moderate': 'small', 'expensive': 'large'}
+    optimizer.PRICES = {'small': 0.0001, 'large': 0.001}
+    optimizer.cascade = True
+    optimizer.max_escalations = 1
+    return optimizer
+
+def _ledger(tmp_path, analyses=(0, 0, 0, 0, 1), report_latency=20.0):
+    ledger = UsageLedger(str(tmp_path / 'usage.jsonl'))
+    for escalation in analyses:
+        ledger.record(UsageRecord(task='analysis', model='small', prompt_tokens=600, completion_tokens=400,
+                                  max_tokens=1500, latency_s=4.0, escalation=escalation))
+    for _ in range(5):
+        ledger.record(UsageRecord(task='report', model='large', prompt_tokens=2000, completion_tokens=2000,
+                                  max_tokens=3000, latency_s=report_latency))
+    return ledger
+
+class TestRunEstimator:
+    '''REQUIREMENT: La estimación sale del ledger y del ruteo y la concurrencia vigentes'''
+
+    def test_from_history(self, tmp_path):
+        optimizer = _optimizer()
+        optimizer.curator_max_tier = 'expensive'
+        estimator = RunEstimator(optimizer, _ledger(tmp_path), max_concurrency=2)
+
+        estimate = estimator.estimate(4)
+
+        # 4 análisis de 1000 tokens en el tier barato + 1/4 escalados al caro
+        assert estimate.curator_cost == pytest.approx(4 * (0.0001 + 0.25 * 0.001))
+        assert estimate.reporter_cost == pytest.approx(4 * 0.001)
+        # 2 tandas de 4s (x1.25 por escalamientos) + el reporte
+        assert estimate.seconds == pytest.approx(2 * 4.0 * 1.25 + 20.0)
+        assert estimate.from_history
+
+    def test_curator_cap_means_no_escalation_cost(self, tmp_path):
+        estimate = RunEstimator(_optimizer(), _ledger(tmp_path), max_concurrency=2).estimate(4)
+
+        # El curator no pasa de moderate, que es el mismo modelo que cheap
+        assert estimate.curator_cost == pytest.approx(4 * 0.0001)
+        assert estimate.calls == 5
+
+    def test_defaults_without_history(self):
+        estimate = RunEstimator(_optimizer(), ledger=None).estimate(3)
+
+        assert not estimate.from_history
+        assert estimate.cost > 0
+        assert 'sin historial' in estimate.describe()
+
+    def test_budget_cap_lowers_the_estimate(self, tmp_path):
+        optimizer = _optimizer()
+        estimator = RunEstimator(optimizer, _ledger(tmp_path))
+        full = estimator.estimate(3).cost
+
+        optimizer.apply_budget('cheap', 0.5)
+
+        assert estimator.estimate(3).cost < full
+
+    def test_reused_and_empty(self, tmp_path):
+        estimator = RunEstimator(_optimizer(), _ledger(tmp_path))
+
+        assert estimator.estimate(3, reused=3).curator_cost == 0
+        assert estimator.estimate(0).cost == 0
+        assert estimator.estimate(0).describe() == 'sin subtemas para analizar'
+
+    def test_read_decision_without_terminal_uses_input(self, monkeypatch):
+        monkeypatch.setattr('builtins.input', lambda prompt: 'approve all')
+
+        assert SupervisorAgent._read_decision(lambda text: '💰') == 'approve all'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
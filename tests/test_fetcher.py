@@ -0,0 +1,152 @@
+﻿'''
+Tests de la descarga de fuentes contra un servidor HTTP local
+'''
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.agents.curator import CuratorAgent
+from src.models.schemas import Finding
+from src.search.fetcher import FetchedDocument, SourceFetcher
+
+PAGE = (
+    '<html><head><title>Grid storage</title><style>body {}</style></head><body>'
+    '<nav>Home | About</nav>'
+    '<p>Grid scale batteries store solar energy for the evening peak.</p>'
+    '<p>Pumped hydro remains the largest storage technology.</p>'
+    '<footer>Copyright</footer></body></html>'
+)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if self.path.startswith('/slow'):
+                time.sleep(0.2)
+            if self.path == '/missing':
+                self._send(404, b'not found', 'text/plain')
+            elif self.path == '/binary':
+                self._send(200, b'\x00\x01', 'application/pdf')
+            elif self.path == '/notes.txt':
+                self._send(200, b'Plain text notes about storage.', 'text/plain')
+            elif self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.send_header('ETag', '"v1"')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            else:
+                self._send(200, PAGE.encode('utf-8'), 'text/html; charset=utf-8', etag='"v1"')
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _send(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    httpd.active = 0
+    httpd.max_active = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def _url(server, path):
+    return f'http://127.0.0.1:{server.server_address[1]}{path}'
+
+class TestSourceFetcher:
+    '''REQUIREMENT: Descarga concurrente con extracción en streaming y caché condicional'''
+
+    def test_extracts_main_text(self, server, tmp_path):
+        doc = SourceFetcher(cache_dir=str(tmp_path)).fetch_all([_url(server, '/page')])[0]
+
+        assert doc.status == 'fetched'
+        assert doc.title == 'Grid storage'
+        text = doc.read_text()
+        assert 'Grid scale batteries' in text
+        assert 'Pumped hydro' in text
+        assert 'Home | About' not in text
+        assert 'Copyright' not in text
+
+    def test_conditional_get_uses_cache(self, server, tmp_path):
+        fetcher = SourceFetcher(cache_dir=str(tmp_path))
+        first = fetcher.fetch_all([_url(server, '/page')])[0]
+        second = fetcher.fetch_all([_url(server, '/page')])[0]
+
+        assert first.status == 'fetched'
+        assert second.status == 'not_modified'
+        assert second.read_text() == first.read_text()
+        assert server.requests[-1][1].get('If-None-Match') == '"v1"'
+
+    def test_per_host_limit(self, server, tmp_path):
+        urls = [_url(server, f'/slow/{i}') for i in range(8)]
+
+        start = time.perf_counter()
+        documents = SourceFetcher(cache_dir=str(tmp_path), per_host=2).fetch_all(urls)
+        elapsed = time.perf_counter() - start
+
+        assert all(doc.ok for doc in documents)
+        assert server.max_active <= 2
+        assert elapsed < 8 * 0.2, 'Debe haber requests en paralelo'
+
+    def test_errors_and_unsupported_types(self, server, tmp_path):
+        documents = SourceFetcher(cache_dir=str(tmp_path)).fetch_all([
+            _url(server, '/missing'), _url(server, '/binary'), _url(server, '/notes.txt'), 'ftp://host/file'
+        ])
+
+        assert [doc.status for doc in documents] == ['error', 'error', 'fetched', 'error']
+        assert documents[0].error == 'HTTP 404'
+        assert documents[2].read_text() == 'Plain text notes about storage.'
+
+    def test_local_file_urls(self, tmp_path):
+        path = tmp_path / 'doc.md'
+        path.write_text('# Local doc\n\nSome **local** content.', encoding='utf-8')
+
+        doc = SourceFetcher(cache_dir=str(tmp_path / 'cache')).fetch_all([path.as_uri()])[0]
+
+        assert doc.status == 'local'
+        assert doc.title == 'Local doc'
+        assert 'Some local content.' in doc.read_text()
+
+class TestCuratorExcerpts:
+    '''REQUIREMENT: El curator recibe extractos de las fuentes más afines al subtema'''
+
+    def test_picks_most_similar_document(self, tmp_path):
+        documents = []
+        for name, text in [('solar', 'Solar batteries store energy for the grid.'),
+                           ('cooking', 'Pasta recipes with tomato sauce.')]:
+            path = tmp_path / f'{name}.txt'
+            path.write_text(text, encoding='utf-8')
+            documents.append(FetchedDocument(url=f'https://example.org/{name}', status='fetched',
+                                             title=name, path=str(path)))
+
+        curator = CuratorAgent(llm_client=None, cost_optimizer=None)
+        finding = Finding(id=1, title='Battery storage', description='Storing solar energy in batteries')
+        excerpts, used = curator._source_excerpts(finding, documents)
+
+        assert [doc.title for doc in used] == ['solar']
+        assert 'Solar batteries' in excerpts
+        assert 'Pasta' not in excerpts
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
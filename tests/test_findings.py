@@ -0,0 +1,192 @@
+﻿'''
+Tests del post-procesamiento de findings del Investigator
+'''
+import threading
+import time
+import numpy as np
+import pytest
+from src.agents.curator import CuratorAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.models.schemas import Finding
+from src.utils.clustering import cluster_findings, format_id_ranges, kmeans
+from src.utils.dedupe import dedupe_findings, find_near_duplicate
+
+def _finding(id, title, description, relevance=0.5):
+    return Finding(id=id, title=title, description=description, relevance_score=relevance)
+
+FINDINGS = [
+    _finding(1, 'Applications of Machine Learning',
+             'Practical applications of machine learning in industry such as healthcare and finance', 0.8),
+    _finding(2, 'Practical uses of Machine Learning',
+             'How machine learning is applied in practice in industries like healthcare and finance', 0.9),
+    _finding(3, 'Ethical Considerations of ML', 'Bias, fairness and privacy concerns raised by machine learning systems', 0.7),
+    _finding(4, 'Deep Learning Architectures', 'Neural network architectures such as CNNs and transformers', 0.6),
+    _finding(5, 'Challenges of Machine Learning', 'Data quality, interpretability and scalability challenges', 0.5),
+]
+
+class TestFindingDedupe:
+    '''REQUIREMENT: Los subtemas casi duplicados se fusionan antes de la validación'''
+
+    def test_merges_near_duplicates_keeping_higher_relevance(self):
+        findings, merged = dedupe_findings(FINDINGS)
+
+        titles = [f.title for f in findings]
+        assert len(findings) == 4
+        assert 'Practical uses of Machine Learning' in titles
+        assert 'Applications of Machine Learning' not in titles
+        assert merged[0][0].relevance_score == 0.9
+
+    def test_ids_are_renumbered_in_original_order(self):
+        findings, _ = dedupe_findings(FINDINGS)
+
+        assert [f.id for f in findings] == [1, 2, 3, 4]
+        assert findings[1].title == 'Ethical Considerations of ML'
+
+    def test_distinct_findings_are_untouched(self):
+        distinct = [FINDINGS[2], FINDINGS[3], FINDINGS[4]]
+        findings, merged = dedupe_findings(distinct)
+
+        assert merged == []
+        assert [f.title for f in findings] == [f.title for f in distinct]
+
+    def test_original_findings_are_not_mutated(self):
+        dedupe_findings(FINDINGS)
+
+        assert [f.id for f in FINDINGS] == [1, 2, 3, 4, 5]
+
+# Paráfrasis como las devuelve el LLM: mismo subtema, descripciones redactadas distinto
+PARAPHRASES = [
+    [
+        _finding(1, 'Applications of Machine Learning',
+                 'Machine learning powers fraud detection in banks, demand forecasting in retail and diagnostic imaging in hospitals.', 0.8),
+        _finding(2, 'Practical uses of Machine Learning',
+                 'Companies deploy ML models to spot fraudulent transactions, predict what customers will buy and help radiologists read scans.', 0.9),
+        _finding(3, 'Machine Learning in Healthcare', 'Models that assist diagnosis, triage and drug discovery in hospitals.'),
+        _finding(4, 'Machine Learning in Finance', 'Credit scoring, algorithmic trading and fraud detection in banks.'),
+        _finding(5, 'Challenges of Machine Learning', 'Data quality, interpretability and scalability challenges'),
+        _finding(6, 'History of Machine Learning', 'From perceptrons in the 1950s to the deep learning boom of the 2010s.'),
+    ],
+    [
+        _finding(1, 'Ethical concerns of AI in education',
+                 'Student data privacy, algorithmic bias in grading and the risk of over-reliance on automated tutors.', 0.9),
+        _finding(2, 'Ethics of AI in education',
+                 'Schools must protect pupil records, audit biased assessment tools and avoid replacing teachers with chatbots.', 0.7),
+        _finding(3, 'Benefits of AI in education', 'Personalised learning, instant feedback and less grading workload for teachers.'),
+        _finding(4, 'Challenges of AI in education', 'Unequal access to devices, cost of licenses and lack of teacher training.'),
+        _finding(5, 'AI tutoring systems', 'Adaptive tutors that personalise exercises and feedback for each student.'),
+    ],
+    [
+        _finding(1, 'Cost of solar energy',
+                 'Panel prices have fallen sharply, making rooftop photovoltaic systems competitive with grid electricity.', 0.9),
+        _finding(2, 'Economics of solar energy',
+                 'Cheaper modules and installation have brought the levelized cost of solar generation below coal in many markets.', 0.6),
+        _finding(3, 'Solar energy storage', 'Batteries that store daytime photovoltaic output for use at night.'),
+        _finding(4, 'Solar energy policy', 'Feed-in tariffs, net metering and tax credits that encourage adoption.'),
+        _finding(5, 'Solar panel recycling', 'Recovering silicon, silver and glass from end-of-life modules.'),
+    ],
+]
+
+class TestParaphraseDedupe:
+    '''REQUIREMENT: Las paráfrasis del mismo subtema se fusionan aunque las descripciones no compartan palabras'''
+
+    @pytest.mark.parametrize('batch', PARAPHRASES, ids=['applications', 'ethics', 'costs'])
+    def test_only_the_paraphrase_pair_is_merged(self, batch):
+        findings, merged = dedupe_findings(batch)
+
+        assert len(findings) == len(batch) - 1
+        assert [{kept.title, dropped.title} for kept, dropped in merged] == [{batch[0].title, batch[1].title}]
+
+    def test_different_angles_of_the_same_topic_are_kept(self):
+        batch = PARAPHRASES[1]
+
+        assert find_near_duplicate(batch[3], [batch[2]]) is None
+        assert find_near_duplicate(batch[1], batch[2:] + [batch[0]]) is batch[0]
+
+THEMES = {
+    'solar': 'solar panels photovoltaic energy',
+    'medicine': 'clinical trials drug medicine patients',
+    'finance': 'banking credit markets finance',
+}
+
+def _survey_findings():
+    findings = []
+    for theme, words in THEMES.items():
+        for i in range(10):
+            findings.append(_finding(len(findings) + 1, f'{theme.title()} topic {i}', f'{words} aspect {i}',
+                                     0.9 if theme == 'medicine' else 0.5))
+    # Mezclar el orden para que los IDs originales no sigan a los clusters
+    return [findings[i] for i in np.random.default_rng(1).permutation(len(findings))]
+
+class TestFindingClusters:
+    '''REQUIREMENT: Modo survey: los candidatos se agrupan para validar por cluster'''
+
+    def test_kmeans_separates_obvious_groups(self):
+        vectors = np.array([[1, 0], [0.99, 0.1], [0, 1], [0.1, 0.99]], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        labels, _ = kmeans(vectors, 2)
+
+        assert labels[0] == labels[1]
+        assert labels[2] == labels[3]
+        assert labels[0] != labels[2]
+
+    def test_clusters_group_themes_with_contiguous_ids(self):
+        findings, clusters = cluster_findings(_survey_findings(), k=3)
+
+        assert len(clusters) == 3
+        assert [f.id for f in findings] == list(range(1, 31))
+        by_id = {f.id: f for f in findings}
+        for cluster in clusters:
+            themes = {by_id[id].title.split()[0] for id in cluster.finding_ids}
+            assert len(themes) == 1, f'Cluster mezclado: {themes}'
+            assert cluster.finding_ids == list(range(cluster.finding_ids[0], cluster.finding_ids[-1] + 1))
+
+    def test_clusters_sorted_by_relevance(self):
+        findings, clusters = cluster_findings(_survey_findings(), k=3)
+
+        assert clusters[0].id == 1
+        assert clusters[0].label.startswith('Medicine')
+        assert clusters[0].finding_ids[0] == 1
+
+    def test_format_id_ranges(self):
+        assert format_id_ranges([9, 1, 2, 3, 7, 10]) == '1-3, 7, 9-10'
+
+class _SlowLLM:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.1)
+        with self.lock:
+            self.active -= 1
+        return 'ANALYSIS: text'
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+class TestCuratorConcurrency:
+    '''REQUIREMENT: El curator analiza varios subtemas en paralelo sin perder el orden'''
+
+    def test_parallel_curation_keeps_order(self):
+        llm = _SlowLLM()
+        curator = CuratorAgent(llm, CostOptimizer())
+        curator.cost_optimizer.cascade = False
+        curator.max_concurrency = 4
+        curator.knowledge_cache = None
+        findings = [_finding(i, f'Topic {i}', 'desc') for i in range(1, 9)]
+
+        start = time.perf_counter()
+        curated = curator.curate(findings, 'Main')
+        elapsed = time.perf_counter() - start
+
+        assert [c.topic for c in curated] == [f.title for f in findings]
+        assert llm.max_active == 4
+        assert elapsed < 8 * 0.1
+        assert curator.cost_optimizer.metrics.total_calls == 8
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,165 @@
+﻿'''
+Tests de hedging: duplicar requests lentos y quedarse con el primero
+'''
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.core.cost_optimizer import CostOptimizer
+from src.core.hedging import HedgePolicy, run_hedged
+from src.core.key_pool import Endpoint
+from src.core.llm_client import LLMClient
+from src.core.usage_ledger import UsageLedger, UsageRecord
+from tests.test_llm_client import _FakeRaw
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+def _sleepy(delays, results=('primary', 'backup')):
+    def attempt(index):
+        time.sleep(delays[index])
+        if isinstance(results[index], Exception):
+            raise results[index]
+        return results[index]
+    return attempt
+
+class TestRunHedged:
+    '''REQUIREMENT: El duplicado sale solo pasado el umbral y gana el primero en responder'''
+
+    def test_fast_primary_is_not_hedged(self, executor):
+        result = run_hedged(_sleepy([0.0, 0.0]), 0.5, executor, allow=lambda: True)
+
+        assert result == ('primary', False, False)
+
+    def test_slow_primary_is_hedged(self, executor):
+        discarded = threading.Event()
+        start = time.perf_counter()
+
+        result = run_hedged(_sleepy([0.5, 0.0]), 0.05, executor, allow=lambda: True,
+                            discard=lambda value: discarded.set())
+
+        assert result == ('backup', True, True)
+        assert time.perf_counter() - start < 0.4
+        # El original perdedor se libera cuando termina
+        assert discarded.wait(2.0)
+
+    def test_budget_exhausted_waits_for_primary(self, executor):
+        result = run_hedged(_sleepy([0.2, 0.0]), 0.05, executor, allow=lambda: False)
+
+        assert result == ('primary', False, False)
+
+    def test_failed_backup_falls_back_to_primary(self, executor):
+        attempt = _sleepy([0.2, 0.0], ['primary', RuntimeError('boom')])
+
+        assert run_hedged(attempt, 0.05, executor, allow=lambda: True) == ('primary', True, False)
+
+class TestHedgePolicy:
+    '''REQUIREMENT: Umbral por p95 observado y tope de tasa y tokens'''
+
+    def test_delay_from_ledger(self, tmp_path):
+        ledger = UsageLedger(str(tmp_path / 'usage.jsonl'))
+        policy = HedgePolicy(['report'], ledger, min_samples=5, default_delay_s=8.0, min_delay_s=0.5)
+        assert policy.delay('report') == 8.0
+
+        for seconds in [1.0, 1.2, 1.1, 1.3, 6.0, 1.0, 1.2, 1.1, 1.0, 1.4]:
+            ledger.record(UsageRecord(task='report', model='m', prompt_tokens=1, completion_tokens=1,
+                                      max_tokens=10, first_token_s=seconds))
+
+        assert policy.delay('report') == 6.0
+        assert policy.applies('report') and not policy.applies('analysis') and not policy.applies(None)
+
+    def test_rate_and_token_caps(self):
+        policy = HedgePolicy(['report'], max_rate=0.1, budget_tokens=1000)
+        for _ in range(10):
+            policy.count_eligible()
+
+        assert policy.allow()
+        policy.record(backup_won=True, extra_tokens=100)
+        assert policy.allow()
+        policy.record(backup_won=False, extra_tokens=100)
+        assert not policy.allow()  # 2 duplicados para 10 llamadas
+
+        policy.reset()
+        policy.count_eligible()
+        policy.record(backup_won=True, extra_tokens=1000)
+        assert not policy.allow()  # sin presupuesto de tokens
+
+class _FirstCallSlowClient:
+    '''La primera llamada (de cualquier key) tarda; las demás responden al instante'''
+
+    def __init__(self, name, state):
+        outer = self
+
+        class _Raw:
+            def create(self, **kwargs):
+                with state['lock']:
+                    state['calls'].append(name)
+                    first = len(state['calls']) == 1
+                if first:
+                    time.sleep(0.5)
+                return _FakeRaw(f'from {name}')
+
+        completions = type('Completions', (), {'with_raw_response': _Raw()})()
+        self.chat = type('Chat', (), {'completions': completions})()
+
+class TestHedgedClient:
+    '''REQUIREMENT: El LLMClient duplica por otra key las llamadas elegibles lentas'''
+
+    def test_duplicate_goes_to_another_key(self, monkeypatch):
+        monkeypatch.setattr('src.core.llm_client.get_usage_ledger', lambda: None)
+        client = LLMClient(endpoints=[Endpoint('gsk_a'), Endpoint('gsk_b')])
+        state = {'calls': [], 'lock': threading.Lock()}
+        for endpoint in client.pool.endpoints:
+            endpoint.client = _FirstCallSlowClient(endpoint.name, state)
+        client.hedging = HedgePolicy(['report'], default_delay_s=0.05)
+
+        result = client.generate('hola', task='report')
+
+        assert len(set(state['calls'])) == 2
+        assert result == f'from {state["calls"][1]}'
+        assert client.hedging.stats.hedged == 1
+        assert client.hedging.stats.backup_wins == 1
+        assert client.last_usage.hedged
+
+    def test_losing_duplicate_is_charged(self, monkeypatch):
+        monkeypatch.setattr('src.core.llm_client.get_usage_ledger', lambda: None)
+
+        def committed_cost(hedge_delay):
+            client = LLMClient(endpoints=[Endpoint('gsk_a'), Endpoint('gsk_b')])
+            state = {'calls': [], 'lock': threading.Lock()}
+            for endpoint in client.pool.endpoints:
+                endpoint.client = _FirstCallSlowClient(endpoint.name, state)
+            client.hedging = HedgePolicy(['report'], default_delay_s=hedge_delay)
+            optimizer = CostOptimizer()
+            client.on_hedge_cost = optimizer.log_hedge
+
+            # Como un agente: registra el uso de la respuesta que recibió
+            client.generate('hola', model='m', task='report')
+            usage = client.last_usage
+            optimizer.log_usage('m', usage.prompt_tokens + usage.completion_tokens)
+            return optimizer
+
+        single, hedged = committed_cost(5.0), committed_cost(0.05)
+
+        assert single.metrics.hedge_calls == 0
+        assert hedged.metrics.hedge_calls == 1
+        assert hedged.committed_cost == pytest.approx(2 * single.committed_cost)
+        assert hedged.get_detailed_metrics()['hedging']['cost'] == pytest.approx(single.committed_cost)
+
+    def test_other_tasks_are_not_hedged(self, monkeypatch):
+        monkeypatch.setattr('src.core.llm_client.get_usage_ledger', lambda: None)
+        client = LLMClient(endpoints=[Endpoint('gsk_a'), Endpoint('gsk_b')])
+        state = {'calls': [], 'lock': threading.Lock()}
+        for endpoint in client.pool.endpoints:
+            endpoint.client = _FirstCallSlowClient(endpoint.name, state)
+        client.hedging = HedgePolicy(['report'], default_delay_s=0.05)
+
+        client.generate('hola', task='analysis')
+
+        assert len(state['calls']) == 1
+        assert client.hedging.stats.eligible == 0
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -1,6 +1,7 @@
 ﻿'''
 Tests del Human Input Parser - Validación de REQUIREMENT crítico
 '''
+import time
 import pytest
 from src.utils.parsers import HumanInputParser
 
@@ -98,5 +99,83 @@ class TestHumanInTheLoop:
         assert error is not None
         assert 'conflicto' in error.lower()
 
+class TestSurveyValidation:
+    '''REQUIREMENT: Con muchos candidatos se aprueban rangos de IDs y clusters completos'''
+    
+    def setup_method(self):
+        self.parser = HumanInputParser()
+        self.available_ids = list(range(1, 61))
+        self.clusters = {1: list(range(1, 21)), 2: list(range(21, 41)), 3: list(range(41, 61))}
+    
+    def test_approve_range(self):
+        '''Comando: approve 1-40'''
+        feedback, error = self.parser.parse('approve 1-40', self.available_ids)
+        
+        assert error is None
+        assert sorted(feedback.approved_ids) == list(range(1, 41))
+    
+    def test_ranges_mixed_with_ids(self):
+        '''Comando: approve 1 - 3, 10'''
+        feedback, error = self.parser.parse('approve 1 - 3, 10', self.available_ids)
+        
+        assert error is None
+        assert sorted(feedback.approved_ids) == [1, 2, 3, 10]
+    
+    def test_range_out_of_bounds(self):
+        feedback, error = self.parser.parse('approve 50-70', self.available_ids)
+        
+        assert feedback is None
+        assert 'inválidos' in error
+    
+    def test_huge_range_is_clamped(self):
+        '''Un rango enorme no se expande entero: solo se reportan los extremos inválidos'''
+        start = time.perf_counter()
+        feedback, error = self.parser.parse('approve 1-20000000', self.available_ids)
+        
+        assert time.perf_counter() - start < 0.5
+        assert feedback is None
+        assert 'inválidos en approve: [20000000]' in error
+        
+        feedback, error = self.parser.parse('approve all except 55-99999999', self.available_ids)
+        assert feedback is None and '[99999999]' in error
+        
+        feedback, error = self.parser.parse('approve cluster 1-9999999', self.available_ids, self.clusters)
+        assert feedback is None and len(error) < 200
+    
+    def test_approve_clusters(self):
+        '''Comando: approve cluster 1,3'''
+        feedback, error = self.parser.parse('approve cluster 1,3', self.available_ids, self.clusters)
+        
+        assert error is None
+        assert sorted(feedback.approved_ids) == list(range(1, 21)) + list(range(41, 61))
+    
+    def test_approve_all_except_cluster(self):
+        '''Comando: approve all except cluster 2'''
+        feedback, error = self.parser.parse('approve all except cluster 2', self.available_ids, self.clusters)
+        
+        assert error is None
+        assert len(feedback.approved_ids) == 40
+        assert sorted(feedback.rejected_ids) == list(range(21, 41))
+    
+    def test_cluster_and_reject_ids(self):
+        '''Comando: approve cluster 1 and reject 45'''
+        feedback, error = self.parser.parse('approve cluster 1 and reject 45', self.available_ids, self.clusters)
+        
+        assert error is None
+        assert sorted(feedback.approved_ids) == list(range(1, 21))
+        assert feedback.rejected_ids == [45]
+    
+    def test_unknown_cluster(self):
+        feedback, error = self.parser.parse('approve cluster 7', self.available_ids, self.clusters)
+        
+        assert feedback is None
+        assert 'clusters' in error.lower()
+    
+    def test_cluster_without_clusters(self):
+        feedback, error = self.parser.parse('approve cluster 1', self.available_ids)
+        
+        assert feedback is None
+        assert error is not None
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,194 @@
+﻿'''
+Tests de la cola durable para ejecución distribuida
+'''
+import time
+import pytest
+from src.core.job_queue import JobQueue
+from src.graph.distributed import DistributedResearchWorkflow, ResearchWorker, RUN_COMPLETED, RUN_FAILED, RUN_REPORTING
+from src.models.schemas import Finding, CuratedContent
+
+class TestJobQueue:
+    '''REQUIREMENT: Jobs durables con lease, heartbeat, ack y reintentos'''
+
+    def _queue(self, tmp_path, **kwargs):
+        return JobQueue(str(tmp_path / 'queue.db'), **kwargs)
+
+    def test_claim_and_ack(self, tmp_path):
+        queue = self._queue(tmp_path)
+        job_id = queue.enqueue('run1', 'curate', {'x': 1})
+
+        job = queue.claim('worker-a')
+        assert job is not None
+        assert job.id == job_id
+        assert job.payload == {'x': 1}
+
+        # Nadie más puede tomarlo mientras tiene lease
+        assert queue.claim('worker-b') is None
+
+        assert queue.ack(job_id, 'worker-a')
+        assert queue.job_status(job_id) == 'done'
+
+    def test_expired_lease_is_retried_by_other_worker(self, tmp_path):
+        '''Un worker muerto (sin heartbeat) no debe perder el job'''
+        queue = self._queue(tmp_path, lease_seconds=0.05)
+        job_id = queue.enqueue('run1', 'curate')
+
+        assert queue.claim('dead-worker').id == job_id
+        time.sleep(0.1)
+
+        retried = queue.claim('worker-b')
+        assert retried is not None
+        assert retried.id == job_id
+        assert retried.attempts == 2
+
+        # El worker muerto ya no puede confirmar
+        assert not queue.ack(job_id, 'dead-worker')
+        assert queue.ack(job_id, 'worker-b')
+
+    def test_heartbeat_keeps_lease(self, tmp_path):
+        queue = self._queue(tmp_path, lease_seconds=0.2)
+        job_id = queue.enqueue('run1', 'curate')
+        queue.claim('worker-a')
+
+        for _ in range(3):
+            time.sleep(0.1)
+            assert queue.heartbeat(job_id, 'worker-a')
+
+        assert queue.claim('worker-b') is None
+
+    def test_fail_exhausts_attempts(self, tmp_path):
+        queue = self._queue(tmp_path, max_attempts=1)
+        job_id = queue.enqueue('run1', 'curate')
+        queue.claim('worker-a')
+
+        assert queue.fail(job_id, 'worker-a', 'boom') == 'failed'
+        assert queue.claim('worker-b') is None
+
+    def test_expired_last_attempt_is_returned_as_failed(self, tmp_path):
+        queue = self._queue(tmp_path, lease_seconds=0.05, max_attempts=1)
+        job_id = queue.enqueue('run1', 'curate')
+        queue.claim('dead-worker')
+        time.sleep(0.1)
+
+        assert queue.claim('worker-b') is None
+        expired = queue.expire_leases()
+
+        assert [job.id for job in expired] == [job_id]
+        assert queue.job_status(job_id) == 'failed'
+        assert queue.expire_leases() == []
+
+    def test_idempotent_enqueue(self, tmp_path):
+        queue = self._queue(tmp_path)
+        queue.enqueue('run1', 'report', job_id='report:run1')
+        queue.enqueue('run1', 'report', job_id='report:run1')
+
+        assert queue.count('run1', 'report') == 1
+
+class TestDistributedWorkflow:
+    '''REQUIREMENT: Curación por finding en workers y estado compartido'''
+
+    def test_feedback_enqueues_one_curation_per_finding(self, tmp_path):
+        queue = JobQueue(str(tmp_path / 'queue.db'))
+        workflow = DistributedResearchWorkflow(queue)
+        run_id = workflow.submit('Test topic')
+
+        findings = [
+            Finding(id=i, title=f'Sub {i}', description='d', relevance_score=0.8)
+            for i in (1, 2, 3)
+        ]
+        queue.update_run(run_id, 'awaiting_feedback', {
+            'raw_findings': [f.model_dump(mode='json') for f in findings]
+        })
+
+        error = workflow.submit_feedback(run_id, 'approve 1,3')
+
+        assert error is None
+        assert queue.count(run_id, 'curate') == 2
+
+    def test_report_enqueued_after_last_curation(self, tmp_path):
+        queue = JobQueue(str(tmp_path / 'queue.db'))
+        worker = ResearchWorker(queue, worker_id='w1')
+
+        # Curación simulada: no llama al LLM
+        def fake_curate(job):
+            finding = Finding.model_validate(job.payload['finding'])
+            queue.save_result(job.run_id, f'curate:{finding.id}', CuratedContent(
+                topic=finding.title, analysis='a', key_points=[], sources=[], word_count=1
+            ).model_dump(mode='json'))
+        worker.handlers['curate'] = fake_curate
+        del worker.handlers['investigate']
+        del worker.handlers['report']
+
+        run_id = queue.create_run('Test', {'approved_findings': []})
+        for i in (1, 2):
+            finding = Finding(id=i, title=f'Sub {i}', description='d')
+            queue.enqueue(run_id, 'curate', {'topic': 'Test', 'finding': finding.model_dump(mode='json')})
+
+        assert worker.process_one()
+        assert queue.count(run_id, 'report') == 0
+        assert worker.process_one()
+
+        assert queue.count(run_id, 'report') == 1
+        assert queue.load_run(run_id)['status'] == RUN_REPORTING
+        assert len(queue.load_results(run_id)) == 2
+
+    def test_dead_worker_on_last_attempt_does_not_hang_the_run(self, tmp_path):
+        queue = JobQueue(str(tmp_path / 'queue.db'), lease_seconds=0.05, max_attempts=1)
+        worker = ResearchWorker(queue, worker_id='w1')
+        worker.handlers = {'curate': worker.handlers['curate']}
+
+        run_id = queue.create_run('Test', {'approved_findings': []})
+        queue.save_result(run_id, 'curate:1', CuratedContent(
+            topic='Sub 1', analysis='a', key_points=[], sources=[], word_count=1
+        ).model_dump(mode='json'))
+        queue.enqueue(run_id, 'curate', {}, job_id='curate:done')
+        queue.ack(queue.claim('w0').id, 'w0')
+        queue.enqueue(run_id, 'curate', {}, job_id='curate:lost')
+        queue.claim('dead-worker')
+        time.sleep(0.1)
+
+        assert not worker.process_one()
+
+        # Se reporta con lo que se curó
+        assert queue.job_status('curate:lost') == 'failed'
+        assert queue.count(run_id, 'report') == 1
+        assert queue.load_run(run_id)['status'] == RUN_REPORTING
+
+    def test_lost_lease_does_not_enqueue_report(self, tmp_path):
+        queue = JobQueue(str(tmp_path / 'queue.db'), lease_seconds=0.05)
+        worker = ResearchWorker(queue, worker_id='w1')
+        # Worker trabado (sin heartbeats): su lease vence y otro worker toma el job
+        worker._heartbeat_loop = lambda job, stop: None
+
+        def slow_curate(job):
+            time.sleep(0.1)
+            # w2 re-toma el job, lo termina y la corrida sigue hasta completarse
+            assert queue.claim('w2').id == job.id
+            assert queue.ack(job.id, 'w2')
+            queue.update_run(job.run_id, RUN_COMPLETED)
+        worker.handlers = {'curate': slow_curate}
+
+        run_id = queue.create_run('Test', {'approved_findings': []})
+        queue.enqueue(run_id, 'curate', {})
+
+        assert worker.process_one()
+
+        # El ack tardío de w1 no vuelve a encolar el reporte ni pisa el estado
+        assert queue.count(run_id, 'report') == 0
+        assert queue.load_run(run_id)['status'] == RUN_COMPLETED
+
+    def test_dead_worker_on_last_investigation_fails_the_run(self, tmp_path):
+        queue = JobQueue(str(tmp_path / 'queue.db'), lease_seconds=0.05, max_attempts=1)
+        worker = ResearchWorker(queue, worker_id='w1')
+        run_id = DistributedResearchWorkflow(queue).submit('Test')
+        queue.claim('dead-worker')
+        time.sleep(0.1)
+
+        assert not worker.process_one()
+
+        run = queue.load_run(run_id)
+        assert run['status'] == RUN_FAILED
+        assert run['state']['error'] == 'lease expired'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
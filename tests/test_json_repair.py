@@ -0,0 +1,118 @@
+﻿'''
+Tests del parser JSON tolerante y del parseo estructurado de los agentes
+'''
+import pytest
+from src.agents.curator import CuratorAgent
+from src.agents.investigator import InvestigatorAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.search.mock import MockSearchProvider
+from src.utils.json_repair import JSONRepairError, parse_json
+
+class TestJSONRepair:
+    '''REQUIREMENT: Una sola pasada recupera JSON con ruido, comas colgantes o truncado'''
+
+    def test_valid_json_is_not_repaired(self):
+        assert parse_json('{"a": [1, 2], "b": "x"}') == ({'a': [1, 2], 'b': 'x'}, False)
+
+    def test_markdown_fence_and_prose(self):
+        data, repaired = parse_json('Here you go:\n```json\n{"a": 1}\n```\nHope it helps!')
+
+        assert data == {'a': 1}
+        assert not repaired
+
+    def test_trailing_commas(self):
+        assert parse_json('{"a": [1, 2,], "b": 3,}') == ({'a': [1, 2], 'b': 3}, True)
+
+    def test_raw_newlines_inside_strings(self):
+        data, repaired = parse_json('{"analysis": "First paragraph.\n\nSecond one."}')
+
+        assert data['analysis'] == 'First paragraph.\n\nSecond one.'
+        assert repaired
+
+    def test_truncated_string_is_kept(self):
+        data, repaired = parse_json('{"analysis": "A long analysis that was cut')
+
+        assert data == {'analysis': 'A long analysis that was cut'}
+        assert repaired
+
+    def test_truncated_member_is_dropped(self):
+        data, _ = parse_json('{"subtopics": [{"id": 1, "title": "A"}, {"id": 2, "title": "B", "descr')
+
+        assert data['subtopics'][0] == {'id': 1, 'title': 'A'}
+        assert data['subtopics'][1] == {'id': 2, 'title': 'B'}
+
+    def test_truncated_after_colon(self):
+        assert parse_json('{"a": 1, "b":')[0] == {'a': 1}
+
+    def test_no_json(self):
+        with pytest.raises(JSONRepairError):
+            parse_json('Sorry, I cannot help with that.')
+
+class TestAgentParsing:
+    '''REQUIREMENT: Los agentes no pierden puntos clave ni caen a fallback por formato'''
+
+    def test_curator_json(self):
+        curator = CuratorAgent(None, CostOptimizer())
+
+        analysis, key_points, sources = curator._parse_analysis_response(
+            '{"analysis": "Text", "key_points": ["a", "b"], "sources": ["IEA"]}'
+        )
+
+        assert (analysis, key_points, sources) == ('Text', ['a', 'b'], ['IEA'])
+        assert curator.cost_optimizer.metrics.parse_failures == 0
+
+    def test_curator_english_headers(self):
+        '''El prompt pedía encabezados en inglés y el parser buscaba los españoles'''
+        curator = CuratorAgent(None, CostOptimizer())
+
+        analysis, key_points, sources = curator._parse_analysis_response(
+            'ANALYSIS:\nText.\n\nKEY POINTS:\n- a\n- b\n\nSOURCES/AREAS:\n- IEA'
+        )
+
+        assert (analysis, key_points, sources) == ('Text.', ['a', 'b'], ['IEA'])
+        assert curator.cost_optimizer.metrics.parse_repairs == 1
+
+    def test_curator_unstructured_counts_failure(self):
+        curator = CuratorAgent(None, CostOptimizer())
+
+        analysis, key_points, _ = curator._parse_analysis_response('Just prose.')
+
+        assert analysis == 'Just prose.'
+        assert key_points == []
+        assert curator.cost_optimizer.metrics.parse_failures == 1
+
+    def test_investigator_truncated_response(self):
+        investigator = InvestigatorAgent(None, CostOptimizer(), MockSearchProvider())
+
+        findings = investigator._parse_llm_response(
+            '```json\n{"subtopics": [{"id": 1, "title": "Ethics", "description": "Bias", "relevance": 0.9},'
+            ' {"id": 2, "title": "Costs", "description": "Budg',
+            'AI'
+        )
+
+        assert [f.title for f in findings] == ['Ethics', 'Costs']
+        assert findings[1].description == 'Budg'
+        assert investigator.cost_optimizer.metrics.parse_repairs == 1
+
+    def test_investigator_invalid_items_are_skipped(self):
+        investigator = InvestigatorAgent(None, CostOptimizer(), MockSearchProvider())
+
+        findings = investigator._parse_llm_response(
+            '{"subtopics": [{"title": "Ethics", "relevance": "high"}, {"id": 2}, {"id": 3, "title": "Costs", "relevance": 1.7}]}',
+            'AI'
+        )
+
+        assert [(f.id, f.title) for f in findings] == [(1, 'Ethics'), (3, 'Costs')]
+        assert findings[0].relevance_score == 0.5
+        assert findings[1].relevance_score == 1.0
+
+    def test_investigator_fallback_counts_failure(self):
+        investigator = InvestigatorAgent(None, CostOptimizer(), MockSearchProvider())
+
+        findings = investigator._parse_llm_response('No JSON here', 'AI')
+
+        assert findings[0].source == 'Fallback'
+        assert investigator.cost_optimizer.metrics.parse_failures == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
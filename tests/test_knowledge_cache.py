@@ -0,0 +1,120 @@
+﻿'''
+Tests de la caché de conocimiento entre corridas
+'''
+import time
+import pytest
+from src.agents.curator import CuratorAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.core.knowledge_cache import KnowledgeCache, knowledge_key
+from src.models.schemas import CuratedContent, Finding
+
+def _content(topic, analysis='Análisis detallado'):
+    return CuratedContent(topic=topic, analysis=analysis, key_points=['a', 'b'], sources=[], word_count=2)
+
+class _CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return 'ANALYSIS: text'
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+class TestKnowledgeCache:
+    '''REQUIREMENT: Análisis reutilizables por subtema normalizado, con TTL y tope de tamaño'''
+
+    def _cache(self, tmp_path, **kwargs):
+        return KnowledgeCache(str(tmp_path / 'knowledge.db'), **kwargs)
+
+    def test_key_ignores_case_accents_and_punctuation(self):
+        a = knowledge_key('IA en Educación', 'Ethical considerations', 'Privacy, bias.')
+        b = knowledge_key('ia en educacion', '  ethical   CONSIDERATIONS ', 'privacy bias')
+
+        assert a == b
+        assert a != knowledge_key('IA en Educación', 'Ethical considerations', 'Privacy, bias.', version=2)
+
+    def test_roundtrip(self, tmp_path):
+        cache = self._cache(tmp_path)
+        cache.put('Topic', 'Ethics', 'Desc', _content('Ethics'))
+
+        cached = cache.get('topic', 'ethics', 'desc.')
+        assert cached is not None
+        assert cached.analysis == 'Análisis detallado'
+        assert cache.get('Other topic', 'Ethics', 'Desc') is None
+
+    def test_version_bump_invalidates(self, tmp_path):
+        self._cache(tmp_path).put('Topic', 'Ethics', 'Desc', _content('Ethics'))
+
+        assert self._cache(tmp_path, version=99).get('Topic', 'Ethics', 'Desc') is None
+
+    def test_ttl_expires_entries(self, tmp_path):
+        cache = self._cache(tmp_path, ttl_seconds=0.05)
+        cache.put('Topic', 'Ethics', 'Desc', _content('Ethics'))
+        time.sleep(0.1)
+
+        assert cache.get('Topic', 'Ethics', 'Desc') is None
+        assert cache.stats()['entries'] == 0
+
+    def test_size_limit_evicts_least_recently_used(self, tmp_path):
+        entry_size = len(_content('T0', 'x' * 500).model_dump_json())
+        cache = self._cache(tmp_path, max_bytes=entry_size * 3)
+        for i in range(3):
+            cache.put('Topic', f'T{i}', 'Desc', _content(f'T{i}', 'x' * 500))
+            time.sleep(0.01)
+        # T0 se usa, así que el menos reciente pasa a ser T1
+        assert cache.get('Topic', 'T0', 'Desc') is not None
+
+        cache.put('Topic', 'T3', 'Desc', _content('T3', 'x' * 500))
+
+        assert cache.stats()['bytes'] <= entry_size * 3
+        assert cache.get('Topic', 'T1', 'Desc') is None
+        assert cache.get('Topic', 'T0', 'Desc') is not None
+        assert cache.get('Topic', 'T3', 'Desc') is not None
+
+class TestCuratorReuse:
+    '''REQUIREMENT: El curator consulta la caché antes de llamar al LLM'''
+
+    def test_second_run_reuses_analyses(self, tmp_path):
+        findings = [
+            Finding(id=1, title='Ethical considerations', description='Bias', relevance_score=0.9, source='Test'),
+            Finding(id=2, title='Costs', description='Budget', relevance_score=0.8, source='Test'),
+        ]
+        llm = _CountingLLM()
+        curator = CuratorAgent(llm, CostOptimizer())
+        curator.cost_optimizer.cascade = False
+        curator.knowledge_cache = KnowledgeCache(str(tmp_path / 'knowledge.db'))
+
+        curator.curate(findings, 'AI in Education')
+        assert llm.calls == 2
+
+        # Misma corrida con un subtema nuevo y otro escrito distinto
+        rerun = [
+            Finding(id=1, title='Ethical Considerations!', description='bias', relevance_score=0.9, source='Test'),
+            Finding(id=2, title='Adoption', description='Schools', relevance_score=0.7, source='Test'),
+        ]
+        curated = curator.curate(rerun, 'AI in education')
+
+        assert llm.calls == 3
+        assert curator.cache_hits == 1
+        assert [c.topic for c in curated] == ['Ethical Considerations!', 'Adoption']
+
+    def test_prior_analyses_skip_llm(self):
+        findings = [
+            Finding(id=1, title='Ethics', description='Bias', relevance_score=0.9, source='Test'),
+            Finding(id=2, title='Costs', description='Budget', relevance_score=0.8, source='Test'),
+        ]
+        llm = _CountingLLM()
+        curator = CuratorAgent(llm, CostOptimizer())
+        curator.cost_optimizer.cascade = False
+        curator.knowledge_cache = None
+
+        curated = curator.curate(findings, 'AI in Education', prior={1: _content('Ethics', 'Previo')})
+
+        assert llm.calls == 1
+        assert curated[0].analysis == 'Previo'
+        assert curator.cache_hits == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
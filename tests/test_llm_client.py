@@ -0,0 +1,250 @@
+﻿'''
+Tests del LLMClient - pool de API keys, failover y transporte HTTP compartido
+'''
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import groq
+import pytest
+from src.core.key_pool import Endpoint, KeyPool, parse_duration
+from src.core.llm_client import LLMClient
+from src.core.http_pool import SharedHTTPPool
+
+class _FakeRaw:
+    def __init__(self, content, headers=None):
+        self.headers = httpx.Headers(headers or {})
+        self._content = content
+
+    def parse(self):
+        message = type('Message', (), {'content': self._content})
+        choice = type('Choice', (), {'message': message})
+        return type('Completion', (), {'choices': [choice]})
+
+class _FakeClient:
+    '''Imita client.chat.completions.with_raw_response.create'''
+
+    def __init__(self, outcome):
+        self.calls = 0
+        outer = self
+
+        class _Raw:
+            def create(self, **kwargs):
+                outer.calls += 1
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+        completions = type('Completions', (), {'with_raw_response': _Raw()})()
+        self.chat = type('Chat', (), {'completions': completions})()
+
+def _rate_limit_error():
+    request = httpx.Request('POST', 'https://api.groq.com/openai/v1/chat/completions')
+    response = httpx.Response(429, request=request, headers={'retry-after': '30'})
+    return groq.RateLimitError('rate limited', response=response, body=None)
+
+class TestKeyPool:
+    '''REQUIREMENT: Selección por cuota/latencia y health score por key'''
+
+    def test_prefers_lower_latency(self):
+        fast, slow = Endpoint('gsk_fast'), Endpoint('gsk_slow')
+        pool = KeyPool([fast, slow])
+
+        pool.record_success(fast, 0.2)
+        pool.record_success(slow, 2.0)
+
+        assert pool.select() is fast
+
+    def test_prefers_remaining_quota(self):
+        a, b = Endpoint('gsk_a'), Endpoint('gsk_b')
+        pool = KeyPool([a, b])
+
+        pool.record_success(a, 0.5, {'x-ratelimit-remaining-tokens': '100', 'x-ratelimit-limit-tokens': '6000'})
+        pool.record_success(b, 0.5, {'x-ratelimit-remaining-tokens': '5900', 'x-ratelimit-limit-tokens': '6000'})
+
+        assert pool.select() is b
+
+    def test_avoids_keys_nearly_out_of_requests(self):
+        a, b = Endpoint('gsk_a'), Endpoint('gsk_b')
+        pool = KeyPool([a, b])
+
+        pool.record_success(a, 0.3, {'x-ratelimit-remaining-requests': '2', 'x-ratelimit-limit-requests': '1000'})
+        pool.record_success(b, 0.5, {'x-ratelimit-remaining-requests': '900', 'x-ratelimit-limit-requests': '1000'})
+
+        assert pool.select() is b
+
+    def test_latency_is_tracked_per_call_mode(self):
+        a, b = Endpoint('gsk_a'), Endpoint('gsk_b')
+        pool = KeyPool([a, b])
+
+        # a solo tiene streams (tiempo hasta headers), b solo respuestas completas
+        pool.record_success(a, 0.1, mode='stream')
+        pool.record_success(a, 4.0)
+        pool.record_success(b, 2.0)
+        pool.record_success(b, 0.3, mode='stream')
+
+        assert a.latency_ewma == {'stream': 0.1, 'complete': 4.0}
+        assert pool.select() is b
+        assert pool.select(mode='stream') is a
+
+    def test_rate_limited_key_cools_down(self):
+        a, b = Endpoint('gsk_a'), Endpoint('gsk_b')
+        pool = KeyPool([a, b])
+
+        pool.record_failure(a, 429, {'retry-after': '30'})
+
+        assert a.health < 1.0
+        assert a.cooldown_until > time.time() + 20
+        assert pool.select() is b
+
+    def test_parse_duration(self):
+        assert parse_duration('7.5s') == pytest.approx(7.5)
+        assert parse_duration('2m30s') == pytest.approx(150)
+        assert parse_duration('120ms') == pytest.approx(0.12)
+        assert parse_duration('10') == pytest.approx(10)
+
+class TestLLMClientFailover:
+    '''REQUIREMENT: Failover a otra key ante 429/5xx'''
+
+    def test_fails_over_on_429(self):
+        client = LLMClient(endpoints=[Endpoint('gsk_first'), Endpoint('gsk_second')])
+        first, second = client.pool.endpoints
+        first.client = _FakeClient(_rate_limit_error())
+        second.client = _FakeClient(_FakeRaw('respuesta', {'x-ratelimit-remaining-requests': '99'}))
+
+        result = client.generate('hola')
+
+        assert result == 'respuesta'
+        assert first.client.calls == 1
+        assert second.client.calls == 1
+        assert first.failures == 1
+        assert second.successes == 1
+        assert second.remaining_requests == 99
+
+    def test_mirror_endpoint_request_url(self, monkeypatch):
+        urls = []
+
+        def handler(request):
+            urls.append(str(request.url))
+            return httpx.Response(200, json={
+                'id': 'x', 'object': 'chat.completion', 'created': 0, 'model': 'm',
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'ok'}}],
+            })
+
+        pool = SharedHTTPPool(http2=False)
+        pool.client = httpx.Client(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr('src.core.llm_client.get_shared_pool', lambda: pool)
+        client = LLMClient(endpoints=[Endpoint('sk_mirror', base_url='https://mirror.example.com/openai/v1/')])
+
+        assert client.generate('hola', model='m') == 'ok'
+        assert urls == ['https://mirror.example.com/openai/v1/chat/completions']
+
+    def test_raises_when_all_keys_fail(self):
+        client = LLMClient(endpoints=[Endpoint('gsk_only')])
+        client.pool.endpoints[0].client = _FakeClient(_rate_limit_error())
+
+        with pytest.raises(groq.RateLimitError):
+            client.generate('hola')
+
+class _JSONModeClient:
+    '''Rechaza response_format con 400, como un modelo sin JSON mode'''
+
+    def __init__(self):
+        self.requests = []
+        outer = self
+
+        class _Raw:
+            def create(self, **kwargs):
+                outer.requests.append(kwargs)
+                if 'response_format' in kwargs:
+                    request = httpx.Request('POST', 'https://api.groq.com/openai/v1/chat/completions')
+                    raise groq.BadRequestError('json mode unsupported', response=httpx.Response(400, request=request), body=None)
+                return _FakeRaw('{"ok": true}')
+
+        completions = type('Completions', (), {'with_raw_response': _Raw()})()
+        self.chat = type('Chat', (), {'completions': completions})()
+
+class TestStructuredOutput:
+    '''REQUIREMENT: JSON mode donde el modelo lo soporte, sin romper donde no'''
+
+    def test_response_format_is_forwarded(self):
+        client = LLMClient(endpoints=[Endpoint('gsk_only')])
+        fake = _FakeClient(_FakeRaw('{}'))
+        calls = []
+        create = fake.chat.completions.with_raw_response.create
+        fake.chat.completions.with_raw_response.create = lambda **kwargs: calls.append(kwargs) or create(**kwargs)
+        client.pool.endpoints[0].client = fake
+
+        client.generate('hola JSON', response_format={'type': 'json_object'})
+
+        assert calls[0]['response_format'] == {'type': 'json_object'}
+
+    def test_retries_without_response_format_on_400(self):
+        client = LLMClient(endpoints=[Endpoint('gsk_only')])
+        fake = _JSONModeClient()
+        client.pool.endpoints[0].client = fake
+
+        result = client.generate('hola JSON', response_format={'type': 'json_object'})
+
+        assert result == '{"ok": true}'
+        assert len(fake.requests) == 2
+        assert 'response_format' not in fake.requests[1]
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.do_HEAD()
+        self.wfile.write(b'ok')
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class TestSharedHTTPPool:
+    '''REQUIREMENT: Conexiones keep-alive compartidas con estadísticas de reuso'''
+
+    def setup_method(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        pool = SharedHTTPPool(http2=False)
+        for _ in range(3):
+            pool.client.get(self.url)
+
+        stats = pool.stats()
+        pool.close()
+
+        assert stats['requests'] == 3
+        assert stats['new_connections'] == 1
+        assert stats['reuse_ratio'] == pytest.approx(2 / 3)
+
+    def test_warm_up_opens_connection(self):
+        pool = SharedHTTPPool(http2=False)
+        pool.warm_up([self.url])
+        pool.client.get(self.url)
+
+        stats = pool.stats()
+        pool.close()
+
+        assert stats['new_connections'] == 1
+        assert stats['reused_connections'] == 1
+
+    def test_clients_share_transport(self):
+        first = LLMClient(endpoints=[Endpoint('gsk_a')])
+        second = LLMClient(endpoints=[Endpoint('gsk_b')])
+
+        assert first.http_pool is second.http_pool
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,136 @@
+﻿'''
+Tests del parcheo de secciones y la actualización incremental de reportes
+'''
+import glob
+import pytest
+from src.agents.reporter import ReporterAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.core.report_index import ReportIndex
+from src.models.schemas import CuratedContent
+from src.utils.markdown_sections import find_section, parse_sections, render_sections
+
+REPORT = '''# AI in Education: Comprehensive Analysis
+## Introduction
+Old introduction.
+
+## Personalized Learning Platforms
+Adaptive systems.
+
+**Key Points:**
+- Point A
+
+## Ethical Considerations
+Bias and privacy.
+
+```python
+## not a heading
+```
+
+## Conclusions
+Old conclusions.
+
+## References
+- Source 1
+'''
+
+def _content(topic):
+    return CuratedContent(topic=topic, analysis=f'Analysis of {topic}', key_points=[f'{topic} point'], sources=[], word_count=3)
+
+class _FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if 'introduction and conclusions' in prompt:
+            return '## Introduction\nNew introduction.\n\n## Conclusions\nNew conclusions.\n'
+        title = prompt.split('## ', 1)[1].split('\n', 1)[0]
+        return f'## {title}\nFresh section about {title}.\n'
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+class TestMarkdownSections:
+    '''REQUIREMENT: Las secciones ## de un reporte se pueden leer y reemplazar sin tocar el resto'''
+
+    def test_roundtrip_is_lossless(self):
+        preamble, sections = parse_sections(REPORT)
+
+        assert preamble == '# AI in Education: Comprehensive Analysis\n'
+        assert [s.title for s in sections] == [
+            'Introduction', 'Personalized Learning Platforms', 'Ethical Considerations', 'Conclusions', 'References'
+        ]
+        assert render_sections(preamble, sections) == REPORT
+
+    def test_example_reports_roundtrip(self):
+        for path in glob.glob('examples/*.md'):
+            with open(path, encoding='utf-8-sig') as f:
+                text = f.read()
+            preamble, sections = parse_sections(text)
+            assert len(sections) >= 4
+            assert render_sections(preamble, sections) == text
+
+    def test_find_section_fuzzy(self):
+        _, sections = parse_sections(REPORT)
+
+        assert find_section(sections, 'Ethical considerations') == 2
+        assert find_section(sections, 'Personalised learning platform') == 1
+        assert find_section(sections, 'Conclusiones', 'Conclusions') == 3
+        assert find_section(sections, 'Quantum hardware') is None
+
+class TestIncrementalRefresh:
+    '''REQUIREMENT: Agregar o modificar un subtema regenera solo sus secciones más intro y conclusiones'''
+
+    def test_patch_only_affected_sections(self, tmp_path):
+        path = str(tmp_path / 'ai_education.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(REPORT)
+        llm = _FakeLLM()
+        reporter = ReporterAgent(llm, CostOptimizer())
+
+        curated = [_content('Personalized Learning Platforms'), _content('Teacher Training')]
+        report, file_path = reporter.refresh_report(
+            'AI in Education',
+            path,
+            curated,
+            updated=[(None, curated[1])],
+            removed_titles=['Ethical Considerations']
+        )
+
+        _, sections = parse_sections(report)
+        assert file_path == path
+        assert [s.title for s in sections] == [
+            'Introduction', 'Personalized Learning Platforms', 'Teacher Training', 'Conclusions', 'References'
+        ]
+        # La sección sin cambios queda intacta, la nueva se redactó y el marco se re-sintetizó
+        assert sections[1].body == 'Adaptive systems.\n\n**Key Points:**\n- Point A\n\n'
+        assert 'Fresh section about Teacher Training' in sections[2].body
+        assert sections[0].body.strip() == 'New introduction.'
+        assert sections[3].body.strip() == 'New conclusions.'
+        assert sections[4].body == '- Source 1\n'
+        # Una llamada por sección nueva y una para introducción + conclusiones
+        assert len(llm.prompts) == 2
+
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == report
+        sidecar = ReportIndex.load_sidecar(path)
+        assert [c.topic for c in sidecar['curated_content']] == ['Personalized Learning Platforms', 'Teacher Training']
+
+    def test_modified_subtopic_replaces_its_section(self, tmp_path):
+        path = str(tmp_path / 'ai_education.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(REPORT)
+        reporter = ReporterAgent(_FakeLLM(), CostOptimizer())
+
+        curated = [_content('Personalized Learning Platforms'), _content('Algorithmic Bias in Grading')]
+        report, _ = reporter.refresh_report(
+            'AI in Education', path, curated,
+            updated=[('Ethical Considerations', curated[1])],
+            removed_titles=[]
+        )
+
+        _, sections = parse_sections(report)
+        assert [s.title for s in sections][1:3] == ['Personalized Learning Platforms', 'Algorithmic Bias in Grading']
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,109 @@
+﻿'''
+Tests del simulador de políticas de ruteo sobre el ledger de uso
+'''
+import numpy as np
+import pytest
+from src.core.cost_optimizer import TIER_ORDER, CostOptimizer, route_tier
+from src.core.policy_simulator import TASK_COMPLEXITY, PolicySimulator, RoutingPolicy
+from src.core.usage_ledger import UsageLedger, UsageRecord
+from src.models.enums import TaskComplexity
+
+PRICES = {'small': 0.0001, 'large': 0.001}
+MODELS = {'cheap': 'small', 'moderate': 'small', 'expensive': 'large'}
+
+def _record(task, model='small', prompt=500, completion=500, latency=2.0, escalation=0, first_token=None):
+    return UsageRecord(task=task, model=model, prompt_tokens=prompt, completion_tokens=completion,
+                       max_tokens=1500, latency_s=latency, escalation=escalation, first_token_s=first_token)
+
+def _history():
+    records = [_record('analysis') for _ in range(4)]
+    records.append(_record('analysis', model='large', latency=10.0, escalation=1))
+    records.append(_record('report', model='large', prompt=2000, completion=2000, latency=40.0))
+    return records
+
+def _policy(**overrides):
+    return RoutingPolicy(name='test', models=dict(MODELS), **overrides)
+
+class TestPolicySimulator:
+    '''REQUIREMENT: Re-jugar el historial con otra política da costo, p50/p95 y throughput medidos'''
+
+    def test_route_matches_route_tier(self):
+        rng = np.random.default_rng(1)
+        tasks = list(TASK_COMPLEXITY) + ['unknown']
+        records = [_record(tasks[i % len(tasks)], prompt=int(t), completion=0)
+                   for i, t in enumerate(rng.integers(0, 2000, 200))]
+        simulator = PolicySimulator(records, PRICES)
+        policy = _policy(cascade=False, simple_task_max_tokens=300, complex_task_min_tokens=800)
+
+        expected = [
+            TIER_ORDER.index(route_tier(TASK_COMPLEXITY.get(r.task, TaskComplexity.CRITICAL), r.prompt_tokens, 300, 800))
+            for r in records
+        ]
+        assert simulator.route(policy).tolist() == expected
+
+    def test_observed_and_forced_tiers(self):
+        simulator = PolicySimulator(_history(), PRICES)
+
+        observed = simulator.observed()
+        everything_expensive = simulator.simulate(_policy(force_tier='expensive', cascade=False))
+        everything_cheap = simulator.simulate(_policy(force_tier='cheap', cascade=False))
+
+        # 4 análisis baratos + 1 escalado + el reporte en el modelo caro
+        assert observed.cost == pytest.approx(4 * 1000 * 0.0001 / 1000 + 1000 * 0.001 / 1000 + 4000 * 0.001 / 1000)
+        assert everything_cheap.cost < observed.cost < everything_expensive.cost
+        assert observed.calls == 6
+
+    def test_cascade_uses_observed_escalation_rate(self):
+        simulator = PolicySimulator(_history(), PRICES)
+
+        result = simulator.simulate(_policy(cascade=True, curator_max_tier='expensive'))
+
+        # 1 escalamiento cada 4 primeros intentos de análisis
+        assert result.escalations == pytest.approx(1.0)
+        assert result.cost == pytest.approx(simulator.observed().cost)
+        assert simulator.simulate(_policy(cascade=False)).escalations == 0
+        # Con el tope por defecto (moderate = small) los análisis no escalan al modelo caro
+        assert simulator.simulate(_policy(cascade=True)).escalations == 0
+
+    def test_latency_scales_with_model_speed(self):
+        simulator = PolicySimulator(_history(), PRICES)
+
+        # small: 2s / 500 tokens de salida; large: 10s / 500 (mediana)
+        assert simulator.seconds_per_token['small'] == pytest.approx(0.004)
+        slow = simulator.simulate(_policy(force_tier='expensive', cascade=False))
+        fast = simulator.simulate(_policy(force_tier='cheap', cascade=False))
+        assert slow.p50_s > fast.p50_s
+        assert slow.throughput_tps < fast.throughput_tps
+
+    def test_hedging_cuts_the_tail_at_a_cost(self):
+        records = [_record('report', latency=2.0, first_token=1.0) for _ in range(19)]
+        records.append(_record('report', latency=60.0, first_token=58.0))
+        simulator = PolicySimulator(records, PRICES)
+
+        plain = simulator.simulate(_policy(cascade=False))
+        hedged = simulator.simulate(_policy(cascade=False, hedging=True, hedge_tasks=('report',), hedge_quantile=0.9))
+
+        assert hedged.hedges == 1
+        assert hedged.p95_s < plain.p95_s
+        assert hedged.cost > plain.cost
+
+    def test_empty_history(self):
+        result = PolicySimulator([], PRICES).simulate(_policy())
+
+        assert result.cost == 0 and result.calls == 0
+
+    def test_cost_optimizer_replays_current_run(self, tmp_path, monkeypatch):
+        ledger = UsageLedger(str(tmp_path / 'usage.jsonl'))
+        monkeypatch.setattr('src.core.usage_ledger.get_usage_ledger', lambda: ledger)
+        optimizer = CostOptimizer()
+        assert optimizer.simulate_policies() == []
+
+        for record in _history():
+            ledger.record(record)
+        policies = optimizer.get_detailed_metrics()['policies']
+
+        assert policies[0]['name'] == 'Tu sistema'
+        assert {'Todo modelo caro', 'Política actual', 'Todo modelo barato'} <= {p['name'] for p in policies}
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,105 @@
+﻿'''
+Tests del índice de reportes generados
+'''
+import os
+import pytest
+from src.core.report_index import ReportIndex, match_prior_subtopics, signature_similarity, text_signature
+from src.graph.workflow import ResearchWorkflow
+from src.models.schemas import CuratedContent, Finding
+
+def _content(topic):
+    return CuratedContent(topic=topic, analysis=f'Análisis de {topic}', key_points=['a'], sources=[], word_count=3)
+
+def _finding(id, title):
+    return Finding(id=id, title=title, description=f'Sobre {title}', relevance_score=0.8, source='Test')
+
+def _report(tmp_path, name, topic, subtopics):
+    path = str(tmp_path / f'{name}.md')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'# {topic}\n')
+    index = ReportIndex(str(tmp_path))
+    index.add(topic, path, [_content(s) for s in subtopics], [_finding(i, s) for i, s in enumerate(subtopics, 1)])
+    return index, path
+
+class TestReportIndex:
+    '''REQUIREMENT: Reportes previos indexados para detectar temas casi repetidos'''
+
+    def test_signature_similarity(self):
+        base = text_signature('Artificial Intelligence in Education')
+
+        assert signature_similarity(base, text_signature('artificial intelligence in education')) == pytest.approx(1.0, abs=1e-3)
+        assert signature_similarity(base, text_signature('Artificial intelligence in higher education')) > 0.85
+        assert signature_similarity(base, text_signature('Quantum computing hardware')) < 0.3
+
+    def test_finds_similar_recent_report(self, tmp_path):
+        index, path = _report(tmp_path, 'ai_education', 'Artificial Intelligence in Education', ['Ethics', 'Costs'])
+        _report(tmp_path, 'blockchain', 'Blockchain in supply chain', ['Traceability'])
+
+        match = index.find_similar('artificial intelligence in education', threshold=0.85)
+
+        assert match is not None
+        entry, similarity = match
+        assert entry.path == path
+        assert entry.subtopics == ['Ethics', 'Costs']
+        assert index.find_similar('Quantum computing hardware', threshold=0.85) is None
+
+    def test_max_age_and_deleted_reports_are_skipped(self, tmp_path):
+        index, path = _report(tmp_path, 'ai_education', 'Artificial Intelligence in Education', ['Ethics'])
+
+        assert index.find_similar('Artificial Intelligence in Education', max_age_days=0) is None
+
+        os.remove(path)
+        assert index.entries() == []
+
+    def test_sidecar_roundtrip(self, tmp_path):
+        _, path = _report(tmp_path, 'ai_education', 'Artificial Intelligence in Education', ['Ethics', 'Costs'])
+
+        sidecar = ReportIndex.load_sidecar(path)
+
+        assert sidecar['topic'] == 'Artificial Intelligence in Education'
+        assert [c.topic for c in sidecar['curated_content']] == ['Ethics', 'Costs']
+        assert [f.title for f in sidecar['findings']] == ['Ethics', 'Costs']
+
+    def test_match_prior_subtopics(self):
+        prior = [_content('Ethical considerations of AI tutors'), _content('Implementation costs')]
+        findings = [
+            _finding(1, 'Ethical considerations for AI tutors'),
+            _finding(2, 'Teacher training programs'),
+            _finding(3, 'Implementation costs in schools'),
+        ]
+
+        reused, pending = match_prior_subtopics(findings, prior, threshold=0.6)
+
+        assert sorted(reused) == [1, 3]
+        assert reused[1].analysis == 'Análisis de Ethical considerations of AI tutors'
+        assert reused[1].topic == 'Ethical considerations for AI tutors'
+        assert [f.id for f in pending] == [2]
+
+class TestPreviousReportPrompt:
+    '''REQUIREMENT: reuse "ask" solo pregunta en el CLI; daemon, workers y scripts no se bloquean'''
+
+    def _check(self, tmp_path, monkeypatch, interactive, answer='r'):
+        _report(tmp_path, 'ai_education', 'Artificial Intelligence in Education', ['Ethics'])
+        settings = {'output.reports_dir': str(tmp_path), 'output.report_index.reuse': 'ask'}
+        monkeypatch.setattr('src.graph.workflow.get_setting', lambda key, default=None: settings.get(key, default))
+        prompts = []
+        monkeypatch.setattr('builtins.input', lambda prompt='': prompts.append(prompt) or answer)
+
+        workflow = object.__new__(ResearchWorkflow)
+        decision, _ = workflow._check_previous_reports('Artificial Intelligence in Education', interactive=interactive)
+        return decision, prompts
+
+    def test_non_interactive_never_prompts(self, tmp_path, monkeypatch):
+        decision, prompts = self._check(tmp_path, monkeypatch, interactive=False)
+
+        assert decision is None
+        assert prompts == []
+
+    def test_interactive_asks(self, tmp_path, monkeypatch):
+        decision, prompts = self._check(tmp_path, monkeypatch, interactive=True)
+
+        assert decision == 'reuse'
+        assert len(prompts) == 1
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,95 @@
+﻿'''
+Tests de la validación de estructura del reporte y la regeneración por sección
+'''
+import glob
+import pytest
+from src.agents.reporter import ReporterAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.models.schemas import CuratedContent
+from src.utils.markdown_sections import parse_sections
+from src.utils.report_validator import validate_report
+
+PARAGRAPH = ' '.join(['word'] * 80)
+
+def _content(topic):
+    return CuratedContent(topic=topic, analysis=f'Analysis of {topic}', key_points=[f'{topic} point'], sources=[], word_count=3)
+
+def _report(*sections):
+    return '# Topic: Comprehensive Analysis\n' + ''.join(f'## {title}\n{body}\n\n' for title, body in sections)
+
+class _FakeLLM:
+    '''El reporte completo llega sin conclusiones y con una sección corta'''
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if 'Generate a comprehensive research report' in prompt:
+            return _report(('Introduction', PARAGRAPH), ('Ethics', PARAGRAPH), ('Costs', 'Too short.'))
+        if 'introduction and conclusions' in prompt:
+            return f'## Introduction\nNew intro.\n\n## Conclusions\n{PARAGRAPH}\n'
+        title = prompt.split('## ', 1)[1].split('\n', 1)[0]
+        return f'## {title}\n{PARAGRAPH} {title}\n'
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+class TestReportValidator:
+    '''REQUIREMENT: El reporte tiene introducción, una sección por subtema y conclusiones con largo mínimo'''
+
+    def test_complete_report_has_no_issues(self):
+        report = _report(('Introduction', PARAGRAPH), ('Ethics', PARAGRAPH), ('Costs', PARAGRAPH),
+                         ('Conclusions', PARAGRAPH))
+
+        assert validate_report(report, ['Ethics', 'Costs'], min_words=300) == []
+
+    def test_example_reports_are_valid(self):
+        for path in glob.glob('examples/*.md'):
+            with open(path, encoding='utf-8-sig') as f:
+                report = f.read()
+            _, sections = parse_sections(report)
+            subtopics = [s.title for s in sections if s.title not in ('Introduction', 'Conclusions', 'References')]
+            assert validate_report(report, subtopics) == []
+
+    def test_missing_and_short_sections(self):
+        report = _report(('Introduction', PARAGRAPH), ('Ethics', 'Too short.'))
+
+        issues = validate_report(report, ['Ethics', 'Costs'], min_words=0)
+
+        assert [(i.kind, i.role, i.section) for i in issues] == [
+            ('short', 'subtopic', 'Ethics'),
+            ('missing', 'subtopic', 'Costs'),
+            ('missing', 'conclusions', 'Conclusions'),
+        ]
+
+    def test_word_deficit_flags_shortest_sections(self):
+        report = _report(('Introduction', PARAGRAPH), ('Ethics', PARAGRAPH + ' extra'), ('Costs', PARAGRAPH),
+                         ('Conclusions', PARAGRAPH))
+
+        issues = validate_report(report, ['Ethics', 'Costs'], min_words=400)
+
+        assert [i.section for i in issues] == ['Costs']
+
+class TestTargetedRegeneration:
+    '''REQUIREMENT: Solo se regeneran las secciones con problemas, no el reporte completo'''
+
+    def test_generate_report_splices_repaired_sections(self, tmp_path):
+        llm = _FakeLLM()
+        reporter = ReporterAgent(llm, CostOptimizer())
+
+        report, _ = reporter.generate_report('Topic', [_content('Ethics'), _content('Costs')], output_dir=str(tmp_path))
+
+        _, sections = parse_sections(report)
+        assert [s.title for s in sections] == ['Introduction', 'Ethics', 'Costs', 'Conclusions']
+        # La introducción estaba bien: no se reemplaza
+        assert sections[0].body.strip() == PARAGRAPH
+        assert sections[2].body.strip().endswith('Costs')
+        assert len(sections[3].body.split()) == 80
+        # Reporte + marco (conclusiones) + Costs (corta) + Ethics (para llegar al mínimo de palabras)
+        assert len(llm.prompts) == 4
+        assert not any('Generate a comprehensive research report' in p for p in llm.prompts[1:])
+        assert validate_report(report, ['Ethics', 'Costs'], min_words=0) == []
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,252 @@
+﻿'''
+Tests de los proveedores de búsqueda (índice BM25 local y mock)
+'''
+import time
+import tracemalloc
+from datetime import date, timedelta
+import pytest
+from src.search.base import SearchProvider
+from src.search.bm25 import BM25IndexBuilder, LocalBM25Provider, split_passages
+from src.search.chunker import chunk_words, select_context
+from src.search.fetcher import FetchedDocument
+from src.search.fanout import FanOutSearchProvider, QueryExpander, reciprocal_rank_fusion
+from src.search.mock import MockSearchProvider
+from src.search.rerank import SourceReranker
+from src.utils.text_features import tokenize
+
+DOCS = {
+    'nature/solar.md': '# Solar energy storage\n\nBattery storage makes solar energy dispatchable. '
+                       'Lithium batteries and grid storage reduce curtailment of solar farms.',
+    'ieee/grid.html': '<html><head><title>Smart grid control</title><script>var solar = 1;</script></head>'
+                      '<body><nav>menu</nav><p>Smart grid control balances demand and supply in real time.</p></body></html>',
+    'notes.txt': 'Crop rotation\n\nCrop rotation improves soil health and reduces pests in agriculture.',
+}
+
+@pytest.fixture
+def index_dir(tmp_path):
+    docs_dir = tmp_path / 'docs'
+    for relative, content in DOCS.items():
+        path = docs_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+
+    index_dir = tmp_path / 'index'
+    # shard_size=1 fuerza un shard por documento
+    BM25IndexBuilder(str(index_dir), shard_size=1).build(str(docs_dir))
+    return str(index_dir)
+
+class TestBM25Provider:
+    '''REQUIREMENT: Recuperación offline real con BM25 sobre índice en disco'''
+
+    def test_builds_sharded_index(self, index_dir):
+        provider = LocalBM25Provider(index_dir)
+
+        assert provider.manifest['n_documents'] == 3
+        assert len(provider.shards) == 3
+
+    def test_most_relevant_document_first(self, index_dir):
+        results = LocalBM25Provider(index_dir).search('solar battery storage')
+
+        assert results, 'Debe encontrar resultados'
+        assert results[0]['title'] == 'Solar energy storage'
+        assert results[0]['source'] == 'nature'
+        assert results[0]['relevance'] == 1.0
+        assert results[0]['url'].startswith('file://')
+
+    def test_html_scripts_are_not_indexed(self, index_dir):
+        results = LocalBM25Provider(index_dir).search('smart grid')
+
+        assert results[0]['title'] == 'Smart grid control'
+        assert 'var solar' not in results[0]['snippet']
+        assert 'menu' not in results[0]['snippet']
+
+    def test_respects_max_results(self, index_dir):
+        results = LocalBM25Provider(index_dir).search('solar grid crop', max_results=2)
+
+        assert len(results) == 2
+
+    def test_unknown_terms_return_empty(self, index_dir):
+        assert LocalBM25Provider(index_dir).search('quantum') == []
+
+    def test_split_passages_bounds_length(self):
+        text = ' '.join(['word'] * 250)
+        passages = list(split_passages(text, passage_words=100))
+
+        assert [len(p.split()) for p in passages] == [100, 100, 50]
+
+    def test_tokenize_drops_stopwords(self):
+        assert tokenize('The future of AI and Energy') == ['future', 'ai', 'energy']
+
+class TestMockProvider:
+    def test_mock_results_have_expected_fields(self):
+        results = MockSearchProvider().search('Test topic', max_results=5)
+
+        assert 0 < len(results) <= 5
+        for result in results:
+            assert {'title', 'url', 'snippet', 'source', 'date', 'relevance'} <= set(result)
+
+def _source(title, snippet='', source='Medium', days_ago=30, relevance=0.8):
+    return {
+        'title': title, 'url': f'https://example.com/{title}', 'snippet': snippet, 'source': source,
+        'date': (date.today() - timedelta(days=days_ago)).isoformat(), 'relevance': relevance,
+    }
+
+class TestSourceReranker:
+    '''REQUIREMENT: El top-k de fuentes combina similitud, recencia, autoridad y diversidad'''
+
+    def test_prefers_on_topic_sources(self):
+        sources = [
+            _source('Cooking pasta at home', 'Recipes for pasta and sauces'),
+            _source('Quantum computing error correction', 'Surface codes for quantum error correction'),
+        ]
+        top = SourceReranker().rerank('quantum error correction', sources, top_k=1)
+
+        assert top[0]['title'] == 'Quantum computing error correction'
+        assert 'rerank_score' in top[0]
+
+    def test_recency_and_authority_break_ties(self):
+        old = _source('Solar storage', 'Battery storage for solar', source='Medium', days_ago=900)
+        new = _source('Solar storage', 'Battery storage for solar', source='Nature', days_ago=5)
+        top = SourceReranker().rerank('solar storage', [old, new], top_k=2)
+
+        assert top[0]['source'] == 'Nature'
+
+    def test_mmr_skips_near_duplicates(self):
+        duplicate = 'Transformer attention scaling laws for language models'
+        sources = [
+            _source(duplicate, relevance=0.95),
+            _source(duplicate + ' explained', relevance=0.94),
+            _source('Language model evaluation benchmarks', 'Benchmarks for language models', relevance=0.7),
+        ]
+        top = SourceReranker(mmr_lambda=0.5).rerank('language models', sources, top_k=2)
+
+        titles = [src['title'] for src in top]
+        assert 'Language model evaluation benchmarks' in titles
+
+    def test_invalid_dates_do_not_fail(self):
+        sources = [_source('A topic'), {**_source('B topic'), 'date': 'unknown'}, {**_source('C topic'), 'date': None}]
+
+        assert len(SourceReranker().rerank('topic', sources, top_k=5)) == 3
+
+    def test_empty_sources(self):
+        assert SourceReranker().rerank('topic', []) == []
+
+    def test_thousands_of_candidates_scale(self):
+        sources = MockSearchProvider().search('Machine learning', max_results=10) * 300
+        reranker = SourceReranker()
+
+        start = time.perf_counter()
+        top = reranker.rerank('Machine learning', sources, top_k=5)
+        elapsed = time.perf_counter() - start
+
+        assert len(top) == 5
+        assert elapsed < 2.0
+
+class _SlowProvider(SearchProvider):
+    '''Proveedor determinístico con latencia fija por consulta'''
+
+    name = 'slow'
+
+    def __init__(self, results_by_query, delay=0.2):
+        self.results_by_query = results_by_query
+        self.delay = delay
+
+    def search(self, query, max_results=10):
+        time.sleep(self.delay)
+        return self.results_by_query.get(query, [])[:max_results]
+
+class TestQueryFanOut:
+    '''REQUIREMENT: Sub-consultas en paralelo fusionadas con RRF y sin duplicados'''
+
+    def test_expander_keeps_topic_first_and_limits(self):
+        queries = QueryExpander(max_queries=3).expand('Solar energy')
+
+        assert queries[0] == 'Solar energy'
+        assert len(queries) == 3
+        assert len(set(queries)) == 3
+
+    def test_rrf_favors_results_found_by_several_queries(self):
+        shared = _source('Shared result')
+        fused = reciprocal_rank_fusion([
+            [_source('Only first'), shared],
+            [_source('Only second'), shared],
+        ])
+
+        assert fused[0]['title'] == 'Shared result'
+        assert len(fused) == 3
+
+    def test_rrf_merges_equivalent_urls(self):
+        a = {**_source('Same page'), 'url': 'https://www.example.com/page/'}
+        b = {**_source('Same page'), 'url': 'http://example.com/page#section'}
+
+        assert len(reciprocal_rank_fusion([[a], [b]])) == 1
+
+    def test_queries_run_concurrently_and_dedupe_titles(self):
+        expander = QueryExpander(max_queries=4, templates=['{topic} a', '{topic} b', '{topic} c'])
+        queries = expander.expand('topic')
+        results_by_query = {
+            q: [_source(f'Result for {q}'), _source('Battery storage guide')] for q in queries
+        }
+        results_by_query['topic a'].append(_source('Battery storage guide!'))
+        provider = FanOutSearchProvider(_SlowProvider(results_by_query, delay=0.2), expander)
+
+        start = time.perf_counter()
+        results = provider.search('topic', max_results=20)
+        elapsed = time.perf_counter() - start
+
+        titles = [r['title'] for r in results]
+        assert elapsed < 0.6, 'Las 4 consultas deben correr en paralelo'
+        assert titles.count('Battery storage guide') == 1
+        assert 'Battery storage guide!' not in titles
+        assert len(results) == 5
+
+    def test_failed_subquery_does_not_break_search(self):
+        class _Failing(SearchProvider):
+            def search(self, query, max_results=10):
+                if query != 'topic':
+                    raise RuntimeError('boom')
+                return [_source('Ok')]
+
+        results = FanOutSearchProvider(_Failing(), QueryExpander(max_queries=3)).search('topic')
+
+        assert [r['title'] for r in results] == ['Ok']
+
+class TestContextChunker:
+    '''REQUIREMENT: Contexto del curator en streaming, con memoria acotada y presupuesto de tokens'''
+
+    def test_chunk_words_across_block_boundaries(self):
+        blocks = ['alpha bet', 'a gamma ', 'delta epsilon']
+
+        assert list(chunk_words(blocks, passage_words=2)) == ['alpha beta', 'gamma delta', 'epsilon']
+
+    def test_selects_relevant_passages_within_budget(self, tmp_path):
+        path = tmp_path / 'doc.txt'
+        filler = 'unrelated words about cooking pasta and sauces ' * 30
+        path.write_text(filler + ' battery storage for solar farms ' * 5 + filler, encoding='utf-8')
+        doc = FetchedDocument(url='https://example.org/doc', status='fetched', path=str(path))
+
+        passages = select_context('solar battery storage', [doc], token_budget=100, passage_words=20)
+
+        assert passages
+        assert sum(p.tokens for p in passages) <= 100
+        assert all('battery' in p.text for p in passages)
+        assert passages == sorted(passages, key=lambda p: p.score, reverse=True)
+
+    def test_peak_memory_is_flat_for_large_documents(self, tmp_path):
+        path = tmp_path / 'large.txt'
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(40_000):
+                f.write(f'paragraph {i} about energy markets and grid storage batteries. ' * 2 + '\n')
+        doc = FetchedDocument(url='https://example.org/large', status='fetched', path=str(path))
+        assert path.stat().st_size > 5_000_000
+
+        tracemalloc.start()
+        passages = select_context('grid storage batteries', [doc], token_budget=500)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert passages
+        assert peak < 1_000_000, f'Pico de memoria {peak} bytes'
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,132 @@
+﻿'''
+Tests del parseo incremental de subtemas en streaming y la curación especulativa
+'''
+import pytest
+from src.agents.curator import CuratorAgent
+from src.agents.investigator import InvestigatorAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.models.schemas import Finding
+from src.search.mock import MockSearchProvider
+from src.utils.json_repair import IncrementalJSONParser
+
+RESPONSE = (
+    'Sure!\n```json\n{"subtopics": ['
+    '{"id": 1, "title": "Ethics {and} bias", "description": "Fairness", "relevance": 0.9}, '
+    '{"id": 2, "title": "Costs", "description": "Budgets \\"per\\" student", "relevance": 0.7}, '
+    '{"id": 3, "title": "Ethics and bias", "description": "Fairness", "relevance": 0.6}'
+    ']}\n```'
+)
+
+class _StreamingLLM:
+    '''Entrega la respuesta de a pocos caracteres y registra qué pasó durante el streaming'''
+
+    def __init__(self, response=RESPONSE, chunk_size=7):
+        self.response = response
+        self.chunk_size = chunk_size
+        self.calls = []
+        self.streaming = False
+
+    def generate(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get('stream') and kwargs.get('on_chunk'):
+            self.streaming = True
+            for i in range(0, len(self.response), self.chunk_size):
+                kwargs['on_chunk'](self.response[i:i + self.chunk_size])
+            self.streaming = False
+        return self.response
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+class TestIncrementalJSONParser:
+    '''REQUIREMENT: Cada subtema se obtiene apenas se cierra su objeto JSON'''
+
+    def test_emits_items_as_they_complete(self):
+        parser = IncrementalJSONParser()
+        emitted = []
+        for i in range(0, len(RESPONSE), 5):
+            emitted += [(i, item['id']) for item in parser.feed(RESPONSE[i:i + 5])]
+
+        assert [item_id for _, item_id in emitted] == [1, 2, 3]
+        # El primero sale mucho antes del final de la respuesta
+        assert emitted[0][0] < RESPONSE.index('"id": 2')
+
+    def test_nested_containers_and_escapes(self):
+        parser = IncrementalJSONParser()
+
+        items = parser.feed('[{"a": [1, {"b": "}"}]}, {"c": "x\\"]"}]')
+
+        assert items == [{'a': [1, {'b': '}'}]}, {'c': 'x"]'}]
+
+    def test_truncated_item_is_not_emitted(self):
+        parser = IncrementalJSONParser()
+
+        assert parser.feed('{"subtopics": [{"id": 1, "title": "A"}, {"id": 2, "ti') == [{'id': 1, 'title': 'A'}]
+
+class TestStreamingInvestigator:
+    '''REQUIREMENT: Los subtemas pasan a las etapas siguientes mientras el LLM sigue generando'''
+
+    def test_on_finding_during_stream(self):
+        llm = _StreamingLLM()
+        investigator = InvestigatorAgent(llm, CostOptimizer(), MockSearchProvider())
+        investigator.streaming = True
+        seen = []
+
+        findings = investigator.investigate('AI in education', on_finding=lambda f: seen.append((f.title, llm.streaming)))
+
+        # El tercero es casi duplicado del primero: no se propaga y la deduplicación final lo fusiona
+        assert seen == [('Ethics {and} bias', True), ('Costs', True)]
+        assert [f.title for f in findings] == ['Ethics {and} bias', 'Costs']
+        assert llm.calls[0]['stream'] is True
+        assert 'response_format' not in llm.calls[0]
+
+    def test_non_streaming_mode(self):
+        llm = _StreamingLLM()
+        investigator = InvestigatorAgent(llm, CostOptimizer(), MockSearchProvider())
+        investigator.streaming = False
+        seen = []
+
+        findings = investigator.investigate('AI in education', on_finding=seen.append)
+
+        assert seen == []
+        assert len(findings) == 2
+        assert not llm.calls[0].get('stream')
+
+class _AnalysisLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return '{"analysis": "Text", "key_points": ["a"], "sources": []}'
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+class TestSpeculativeCuration:
+    '''REQUIREMENT: curate() reutiliza los análisis especulativos de subtemas aprobados sin cambios'''
+
+    def test_speculation_is_reused(self):
+        llm = _AnalysisLLM()
+        curator = CuratorAgent(llm, CostOptimizer())
+        curator.cost_optimizer.cascade = False
+        curator.knowledge_cache = None
+        ethics = Finding(id=1, title='Ethics', description='Fairness', relevance_score=0.9, source='LLM')
+        costs = Finding(id=2, title='Costs', description='Budgets', relevance_score=0.7, source='LLM')
+
+        curator.speculate(ethics, 'AI')
+        curator.speculate(costs, 'AI')
+        curator._speculation_pool.shutdown(wait=True)
+        assert len(llm.prompts) == 2
+
+        # Ethics se aprueba tal cual; Costs se aprueba con la descripción editada
+        edited = costs.model_copy(update={'description': 'Budgets per student'})
+        curated = curator.curate([ethics, edited], 'AI')
+
+        assert [c.topic for c in curated] == ['Ethics', 'Costs']
+        assert len(llm.prompts) == 3
+        assert 'Budgets per student' in llm.prompts[-1]
+        assert curator._speculation == {}
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,124 @@
+﻿'''
+Tests del ledger de uso y del modelo de longitud de salida
+'''
+import pytest
+from src.agents.reporter import END_OF_REPORT, ReporterAgent
+from src.core.cost_optimizer import CostOptimizer
+from src.core.key_pool import Endpoint
+from src.core.llm_client import LLMClient
+from src.core.usage_ledger import OutputLengthModel, UsageLedger, UsageRecord
+from src.models.schemas import CuratedContent
+from tests.test_llm_client import _FakeClient, _FakeRaw
+
+def _record(task, completion_tokens, finish_reason='stop'):
+    return UsageRecord(task=task, model='m', prompt_tokens=100, completion_tokens=completion_tokens,
+                       max_tokens=1500, finish_reason=finish_reason)
+
+class TestUsageLedger:
+    '''REQUIREMENT: El uso real de cada llamada queda registrado por tipo de prompt'''
+
+    def test_roundtrip_across_instances(self, tmp_path):
+        path = str(tmp_path / 'usage.jsonl')
+        UsageLedger(path).record(_record('analysis', 420))
+        UsageLedger(path).record(_record('report', 2100))
+
+        ledger = UsageLedger(path)
+
+        assert [r.completion_tokens for r in ledger.records()] == [420, 2100]
+        assert [r.task for r in ledger.records('analysis')] == ['analysis']
+        assert ledger.records()[0].timestamp > 0
+
+    def test_compaction_keeps_recent(self, tmp_path):
+        path = tmp_path / 'usage.jsonl'
+        ledger = UsageLedger(str(path), max_records=3)
+        for tokens in range(10):
+            ledger.record(_record('analysis', tokens))
+
+        assert [r.completion_tokens for r in UsageLedger(str(path), max_records=3).records()] == [7, 8, 9]
+        assert len(path.read_text().splitlines()) <= 6
+
+    def test_client_records_usage(self, tmp_path, monkeypatch):
+        ledger = UsageLedger(str(tmp_path / 'usage.jsonl'))
+        monkeypatch.setattr('src.core.llm_client.get_usage_ledger', lambda: ledger)
+        client = LLMClient(endpoints=[Endpoint('gsk_only')])
+        client.pool.endpoints[0].client = _FakeClient(_FakeRaw('x' * 400))
+
+        client.generate('hola', max_tokens=300)
+        assert ledger.records() == []
+        assert client.last_usage.completion_tokens == 100
+
+        client.generate('hola', max_tokens=300, task='analysis')
+        assert [(r.task, r.completion_tokens, r.max_tokens) for r in ledger.records()] == [('analysis', 100, 300)]
+
+class TestOutputLengthModel:
+    '''REQUIREMENT: max_tokens y la estimación para select_model salen de las longitudes observadas'''
+
+    def _model(self, tmp_path, lengths, task='analysis', **kwargs):
+        ledger = UsageLedger(str(tmp_path / 'usage.jsonl'))
+        for tokens in lengths:
+            ledger.record(_record(task, tokens))
+        return OutputLengthModel(ledger, **kwargs)
+
+    def test_without_history_uses_defaults(self, tmp_path):
+        model = self._model(tmp_path, [400, 500])
+
+        assert model.predict('analysis') is None
+        assert model.max_tokens('analysis', 1500) == 1500
+        assert model.estimated_tokens('analysis', 300, 1500) == 1500
+
+    def test_quantile_with_margin(self, tmp_path):
+        model = self._model(tmp_path, range(100, 1100, 50), quantile=0.9, margin=1.2)
+
+        assert model.predict('analysis') == 950
+        assert model.max_tokens('analysis', 1500) == 1140
+        assert model.estimated_tokens('analysis', 300, 1500) == 300 + 575
+
+    def test_default_is_a_ceiling(self, tmp_path):
+        model = self._model(tmp_path, [1400] * 10)
+
+        assert model.max_tokens('analysis', 1500) == 1500
+
+    def test_recent_truncation_falls_back(self, tmp_path):
+        model = self._model(tmp_path, [400] * 10)
+        model.ledger.record(_record('analysis', 480, finish_reason='length'))
+
+        assert model.max_tokens('analysis', 1500) == 1500
+
+    def test_cost_optimizer_plan(self, tmp_path):
+        optimizer = CostOptimizer()
+        optimizer.output_lengths = self._model(tmp_path, [300] * 10, margin=1.5)
+
+        assert optimizer.plan_tokens('analysis', 200, max_tokens=1500, estimated_tokens=1500) == (500, 450)
+        assert optimizer.plan_tokens('report', 200, max_tokens=3000, estimated_tokens=3000) == (3000, 3000)
+
+class _ReportLLM:
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        body = ' '.join(['word'] * 80)
+        return (f'# Solar\n\n## Introduction\n{body}\n\n## Panels\n{body}\n\n## Conclusions\n{body}\n\n'
+                f'## References\n- IEA\n{END_OF_REPORT}\nExtra notes')
+
+    def count_tokens_estimate(self, text):
+        return len(text) // 4
+
+class TestReportStopSequence:
+    '''REQUIREMENT: El reporte termina en la marca de fin (stop sequence)'''
+
+    def test_marker_is_requested_and_stripped(self, tmp_path):
+        llm = _ReportLLM()
+        reporter = ReporterAgent(llm, CostOptimizer())
+        reporter.cost_optimizer.output_lengths = None
+        content = CuratedContent(topic='Panels', analysis='Text', key_points=['a'], sources=[], word_count=1)
+
+        generated, _ = reporter.generate_report('Solar test', [content], output_dir=str(tmp_path))
+
+        assert llm.calls[0]['stop'] == [END_OF_REPORT]
+        assert llm.calls[0]['task'] == 'report'
+        assert END_OF_REPORT not in generated
+        assert 'Extra notes' not in generated
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,152 @@
+﻿"""
+Research Assistant - Modo distribuido
+Workers y comandos para encolar corridas sobre la cola durable.
+
+Uso:
+    python worker.py work                      # inicia un worker
+    python worker.py submit "tema"             # encola una corrida y guía la validación
+    python worker.py submit --survey "tema"    # modo survey (validación por clusters)
+    python worker.py feedback <run_id> "approve 1,3"
+    python worker.py status <run_id>
+"""
+import argparse
+import sys
+
+from rich.console import Console
+
+console = Console()
+
+def _display_findings(findings):
+    from rich.table import Table
+
+    table = Table(title='Subtemas Identificados', show_header=True, header_style='bold cyan')
+    table.add_column('ID', style='cyan', width=4, justify='center')
+    table.add_column('Título', style='magenta', width=40)
+    table.add_column('Relevancia', style='green', width=10, justify='center')
+
+    for finding in findings:
+        table.add_row(str(finding.id), finding.title, f'{finding.relevance_score:.1f}')
+
+    console.print(table)
+
+def _display_clusters(clusters):
+    from rich.table import Table
+    from src.utils.clustering import format_id_ranges
+
+    table = Table(title='Subtemas Identificados (por cluster)', show_header=True, header_style='bold cyan')
+    table.add_column('Cluster', style='cyan', width=8, justify='center')
+    table.add_column('Tema representativo', style='magenta', width=44)
+    table.add_column('IDs', style='white', width=16)
+
+    for cluster in clusters:
+        table.add_row(str(cluster['id']), cluster['label'], format_id_ranges(cluster['finding_ids']))
+
+    console.print(table)
+
+def cmd_work(args):
+    from src.core.job_queue import JobQueue
+    from src.graph.distributed import ResearchWorker
+
+    queue = JobQueue(args.db, lease_seconds=args.lease)
+    worker = ResearchWorker(queue, poll_interval=args.poll)
+    worker.run_forever(max_jobs=args.max_jobs, stop_when_idle=args.stop_when_idle)
+
+def cmd_submit(args):
+    from src.core.job_queue import JobQueue
+    from src.graph.distributed import (
+        DistributedResearchWorkflow, RUN_AWAITING_FEEDBACK, RUN_COMPLETED
+    )
+
+    workflow = DistributedResearchWorkflow(JobQueue(args.db))
+    topic = " ".join(args.topic)
+    run_id = workflow.submit(topic, survey=args.survey)
+    console.print(f'[green]✓[/green] Corrida encolada: [bold]{run_id}[/bold]')
+
+    if args.no_wait:
+        return
+
+    console.print('[dim]Esperando a que un worker complete la investigación...[/dim]')
+    run = workflow.wait_for(run_id, (RUN_AWAITING_FEEDBACK, RUN_COMPLETED))
+    if run['status'] != RUN_AWAITING_FEEDBACK:
+        console.print(f'[red]❌ La corrida terminó en estado {run["status"]}: {run["state"].get("error")}[/red]')
+        return
+
+    if run['state'].get('clusters'):
+        _display_clusters(run['state']['clusters'])
+    else:
+        _display_findings(workflow.get_findings(run_id))
+
+    error = 'pending'
+    while error:
+        user_input = input('[Tu decisión] > ').strip()
+        error = workflow.submit_feedback(run_id, user_input)
+        if error:
+            console.print(error)
+
+    console.print('[dim]Curación distribuida en curso...[/dim]')
+    run = workflow.wait_for(run_id, (RUN_COMPLETED,))
+    if run['status'] == RUN_COMPLETED and run['state'].get('report_file_path'):
+        console.print(f'[bold green]✓ Reporte listo:[/bold green] [cyan]{run["state"]["report_file_path"]}[/cyan]')
+    else:
+        console.print(f'[yellow]⚠️  Corrida finalizada en estado {run["status"]}: {run["state"].get("error")}[/yellow]')
+
+def cmd_feedback(args):
+    from src.core.job_queue import JobQueue
+    from src.graph.distributed import DistributedResearchWorkflow
+
+    workflow = DistributedResearchWorkflow(JobQueue(args.db))
+    error = workflow.submit_feedback(args.run_id, " ".join(args.command))
+    if error:
+        console.print(error)
+        sys.exit(1)
+    console.print('[green]✓[/green] Feedback registrado, curación encolada')
+
+def cmd_status(args):
+    from src.core.job_queue import JobQueue
+    from src.graph.distributed import DistributedResearchWorkflow
+
+    queue = JobQueue(args.db)
+    run = DistributedResearchWorkflow(queue).status(args.run_id)
+    if run is None:
+        console.print(f'[red]❌ Run {args.run_id} no existe[/red]')
+        sys.exit(1)
+
+    console.print(f'[bold]{run["run_id"]}[/bold] · {run["topic"]}')
+    console.print(f'  Estado: {run["status"]}')
+    console.print(f'  Curaciones: {run["curate_done"]} ok · {run["curate_pending"]} pendientes · {run["curate_failed"]} fallidas')
+    if run['state'].get('report_file_path'):
+        console.print(f'  Reporte: [cyan]{run["state"]["report_file_path"]}[/cyan]')
+    console.print(f'  Cola: {queue.stats()}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Research Assistant distribuido')
+    parser.add_argument('--db', default=None, help='Ruta de la base compartida (default: RESEARCH_QUEUE_DB o .queue/research.db)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    work = sub.add_parser('work', help='Inicia un worker')
+    work.add_argument('--lease', type=float, default=60.0, help='Segundos de lease por job')
+    work.add_argument('--poll', type=float, default=1.0, help='Intervalo de polling (segundos)')
+    work.add_argument('--max-jobs', type=int, default=None)
+    work.add_argument('--stop-when-idle', action='store_true')
+    work.set_defaults(func=cmd_work)
+
+    submit = sub.add_parser('submit', help='Encola una corrida')
+    submit.add_argument('topic', nargs='+')
+    submit.add_argument('--no-wait', action='store_true', help='No esperar ni pedir validación')
+    submit.add_argument('--survey', action='store_true', help='Muchos subtemas candidatos, validados por cluster')
+    submit.set_defaults(func=cmd_submit)
+
+    feedback = sub.add_parser('feedback', help='Entrega la validación humana de una corrida')
+    feedback.add_argument('run_id')
+    feedback.add_argument('command', nargs='+')
+    feedback.set_defaults(func=cmd_feedback)
+
+    status = sub.add_parser('status', help='Muestra el estado de una corrida')
+    status.add_argument('run_id')
+    status.set_defaults(func=cmd_status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()